@@ -0,0 +1,80 @@
+"""ベンチマーク用の合成データ（モデルを呼ばずに作る SimulationResponse と、レポートの上書き情報）。"""
+
+import random
+
+from models import SimulationResponse
+
+CATEGORIES = (
+    "crowd_safety",
+    "traffic_logistics",
+    "environmental_health",
+    "operational",
+    "visibility",
+    "legal_compliance",
+)
+ROLES = ("主催", "警備", "自治体", "施設", "その他")
+
+
+def synthetic_response(n_risks: int = 30, locale: str = "ja", seed: int = 1) -> SimulationResponse:
+    """リスク n_risks 件・ToDo 2 倍の件数の結果。説明文の長さは件ごとに変える。"""
+    rnd = random.Random(seed)
+    risks = [
+        {
+            "id": f"r{i}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "title": f"リスク<{i}> & 項目",
+            "description": "説明 " * (5 + i % 40),
+            "probability": rnd.random(),
+            "severity": 1 + rnd.random() * 9,
+            "location": {"center": {"lat": 35.0, "lng": 139.0}, "radius_meters": 30},
+            "location_description": "メインステージ正面" if i % 2 else "",
+            "mitigation_actions": [f"対策{i}a", f"対策{i}b"],
+        }
+        for i in range(n_risks)
+    ]
+    tasks = [
+        {
+            "id": f"t{i}",
+            "risk_id": f"r{i % n_risks}",
+            "who": ROLES[i % len(ROLES)],
+            "action": f"タスク{i} を実施する " + "x" * (i % 90),
+            "due_by": "2026-08-01T09:00" if i % 2 else None,
+        }
+        for i in range(n_risks * 2)
+    ]
+    return SimulationResponse.model_validate({
+        "simulation_id": f"bench-{seed}-{n_risks}",
+        "event_name": "夏フェス & <テスト>",
+        "event_location": "東京",
+        "date_time": "2026-08-01T10:00",
+        "risks": risks,
+        "overall_risk_score": 7.3,
+        "summary": "総評 " * 50,
+        "recommendations": [f"推奨{i} " * 10 for i in range(8)],
+        "risk_count_by_category": {c: n_risks // len(CATEGORIES) for c in CATEGORIES},
+        "locale": locale,
+        "bottlenecks": [
+            {"location_description": f"ゲート{i}", "reason": "狭い通路", "suggested_measures": ["誘導員配置", "一方通行"]}
+            for i in range(20)
+        ],
+        "mitigation_tasks": tasks,
+    })
+
+
+def report_overlays(pins: int = 300, memos: int = 200) -> dict:
+    """PDF リクエストに載せる上書き情報（ピン・現場メモ・ToDo のチェック・差分サマリー）。"""
+    return {
+        "delta_summary": {
+            "riskScoreBefore": 7.3,
+            "riskScoreAfter": 6.8,
+            "dangerCountBefore": 4,
+            "dangerCountAfter": 3,
+            "congestionDeltaMinutes": -12,
+        },
+        "todo_checks": {"t1": True, "t3": True},
+        "pins": [{"id": f"p{i}", "name": f"ピン{i}", "memo": "メモ " * 8, "type": "guidance"} for i in range(pins)],
+        "site_check_memos": [
+            {"id": f"s{i}", "label": f"確認{i}", "category": "設備", "memo": "施錠なし " * 10, "linkedTaskId": f"t{i}"}
+            for i in range(memos)
+        ],
+    }
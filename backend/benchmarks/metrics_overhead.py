@@ -0,0 +1,97 @@
+"""MetricsMiddleware と記録のオーバーヘッドを測るスクリプト。
+
+最も軽いデータのエンドポイント（GET /api/mitigation/{id}）と、記録しないプローブ（GET /health・GET /ready。METRICS_SKIP_PATHS）を
+ASGI アプリへ直接（HTTP クライアント・ソケットを通さずに）呼び、METRICS_ENABLED のオン・オフを交互に切り替えて
+1 リクエストあたりの CPU 時間の差を出す。ソケットや HTTP の解析を含まないぶん、実際の比率より大きく出る。
+
+    cd backend && python benchmarks/metrics_overhead.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("LLM_BACKEND", "standin")
+os.environ.setdefault("LLM_STANDIN_LATENCY_MS", "0")
+os.environ.setdefault("RENDER_POOL_WORKERS", "0")
+os.environ.setdefault("RENDER_WARMUP", "0")
+os.environ.setdefault("RESULT_STORE_PATH", ":memory:")
+os.environ.setdefault("TRANSLATION_MEMORY_PATH", ":memory:")
+
+PATHS = ()
+REQUESTS = 200
+ROUNDS = 400
+SIMULATION = {
+    "event_name": "夏祭り",
+    "event_type": "music_festival",
+    "event_location": "渋谷",
+    "date_time": "2026-08-01T10:00",
+    "expected_attendance": 5000,
+    "audience_type": "mixed",
+    "polygon": [{"lat": 35.0, "lng": 139.0}, {"lat": 35.002, "lng": 139.0}, {"lat": 35.002, "lng": 139.003}],
+}
+
+
+async def main() -> None:
+    import httpx
+
+    import main as app_module
+    from services import metrics
+
+    async with app_module.lifespan(app_module.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url="http://bench", timeout=600) as client:
+            simulation_id = (await client.post("/api/simulate", json=SIMULATION)).json()["simulation_id"]
+
+        async def call(path: str) -> None:
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": b"",
+                "root_path": "",
+                "headers": [(b"host", b"bench")],
+                "client": ("127.0.0.1", 1),
+                "server": ("bench", 80),
+            }
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                pass
+
+            await app_module.app(scope, receive, send)
+
+        enabled = metrics.ENABLED
+        for path in PATHS or (f"/api/mitigation/{simulation_id}", "/health", "/ready"):
+            for _ in range(200):
+                await call(path)
+            base: list[float] = []
+            added: list[float] = []
+            # オン・オフを続けて（順序も入れ替えて）測った組ごとの差の中央値。CPU のクロック変動・他のプロセスの影響を打ち消す
+            for i in range(ROUNDS):
+                timings = {}
+                for flag in (True, False) if i % 2 else (False, True):
+                    metrics.ENABLED = flag
+                    t0 = time.process_time()
+                    for _ in range(REQUESTS):
+                        await call(path)
+                    timings[flag] = (time.process_time() - t0) / REQUESTS * 1e6
+                base.append(timings[False])
+                added.append(timings[True] - timings[False])
+            off, diff = statistics.median(base), statistics.median(added)
+            name = path.replace(simulation_id, "{id}")
+            print(f"GET {name:24s} off={off:7.1f}us added={diff:5.2f}us ({100 * diff / off:+.2f}%)")
+        metrics.ENABLED = enabled
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""500 リスクの PDF レポートの描画メモリ・所要時間と、ストリーミング配信の一時ファイルの後始末を測るスクリプト。
+
+1. 描画（このプロセス内）: 先読みを PDF_STORY_WINDOW 件に抑えた場合と、story を全件先に作る場合（窓を無制限にする）の
+   tracemalloc のピーク・所要時間・ページ数
+2. /api/report/pdf: stream=false（本文をまとめて返す）と stream=true（一時ファイルから分割して送る）の
+   最初のバイトまでの時間・全体の時間と、本文を読まずに閉じた場合も含めて一時ファイルが残らないこと
+
+    cd backend && python benchmarks/pdf_report_stream.py
+"""
+
+import asyncio
+import glob
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("LLM_BACKEND", "standin")
+os.environ.setdefault("RENDER_POOL_WORKERS", "1")
+os.environ.setdefault("RENDER_WARMUP", "1")
+os.environ.setdefault("RESULT_STORE_PATH", ":memory:")
+os.environ.setdefault("TRANSLATION_MEMORY_PATH", ":memory:")
+
+from fixtures import report_overlays, synthetic_response  # noqa: E402
+
+RISKS = 500
+UNBOUNDED = 10**9
+
+
+def spooled_files() -> set[str]:
+    return set(glob.glob(os.path.join(os.getenv("PDF_SPOOL_DIR") or tempfile.gettempdir(), "flowguard_*.pdf")))
+
+
+def render_in_process() -> None:
+    from services import pdf_report
+    from services.report_ir import build_report_ir
+
+    ir = build_report_ir(synthetic_response(RISKS), **report_overlays())
+    pdf_report.warm_up()
+    print(f"report: {RISKS} risks, {ir.item_count()} items, full variant")
+    default_window = pdf_report.STORY_WINDOW
+    for name, window in (("bounded", default_window), ("unbounded", UNBOUNDED)):
+        pdf_report.STORY_WINDOW = window
+        # 時間は tracemalloc なしで測る（有効にすると数倍遅くなる）
+        t0 = time.perf_counter()
+        data = pdf_report.render_pdf(ir, "full")
+        elapsed = time.perf_counter() - t0
+        tracemalloc.start()
+        pdf_report.render_pdf(ir, "full")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        pages = len(re.findall(rb"/Type /Page\b", data))
+        print(f"{name:9s} peak={peak / 2**20:5.1f}MB time={elapsed:5.2f}s pages={pages} size={len(data) // 1024}KB")
+    pdf_report.STORY_WINDOW = default_window
+
+
+async def through_api() -> None:
+    import httpx
+
+    import main as app_module
+
+    body = {**synthetic_response(RISKS).model_dump(mode="json"), **report_overlays()}
+    before = spooled_files()
+    async with app_module.lifespan(app_module.app):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            # stream=false は描画キャッシュに載るので最後に測る（streaming はキャッシュに載せない）
+            for stream in ("true", "false"):
+                t0 = time.perf_counter()
+                ttfb = None
+                size = 0
+                async with client.stream("POST", f"/api/report/pdf?stream={stream}", json=body) as response:
+                    async for chunk in response.aiter_bytes():
+                        ttfb = ttfb if ttfb is not None else time.perf_counter() - t0
+                        size += len(chunk)
+                print(
+                    f"stream={stream:5s} status={response.status_code} size={size // 1024}KB "
+                    f"ttfb={ttfb:5.2f}s total={time.perf_counter() - t0:5.2f}s"
+                )
+                if stream == "true":
+                    # ヘッダーだけ受け取って本文を読まずに閉じる
+                    async with client.stream("POST", "/api/report/pdf?stream=true", json=body) as response:
+                        print(f"closed before reading: status={response.status_code}")
+    leftover = spooled_files() - before
+    print(f"leftover temp files: {len(leftover)}")
+    assert not leftover, leftover
+
+
+if __name__ == "__main__":
+    render_in_process()
+    asyncio.run(through_api())
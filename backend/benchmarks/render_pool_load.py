@@ -0,0 +1,138 @@
+"""PDF の一括出力中も /api/simulate・/api/assist・/health が詰まらないことを確かめる負荷スクリプト。
+
+アプリ（lifespan で起動した描画プール RENDER_POOL_WORKERS=2）に ASGITransport で繋ぎ、
+
+- 待機: /api/simulate（スタンドインのモデル、1 回 50ms 固定）・/api/assist・/health を 1 クライアントずつ叩き続ける
+- 負荷: 同じことを、EXPORTERS 本の並行クライアントが POST /api/report/pdf（毎回別の結果で描画キャッシュに当たらない
+  120 リスク・stream=false）を出し続けている間に行う
+
+の 2 区間で応答時間を出す。描画はプール（render_pdf）のワーカープロセスで行われるので、負荷区間でもイベントループは止まらない。
+CPU がワーカー数 + 1 より少ない環境では、ワーカーと CPU を取り合うぶん simulate・assist も遅くなる（/health は数 ms のまま）。
+待ち行列が一杯の出力は 503（再試行）になる。RENDER_POOL_WORKERS=0（スレッドで描画）で走らせると比較になる
+（GIL を描画が握るので、simulate が秒単位まで遅れる。このときは /health の検査をしない）。
+
+    cd backend && python benchmarks/render_pool_load.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("LLM_BACKEND", "standin")
+os.environ.setdefault("LLM_STANDIN_LATENCY_MS", "50")
+os.environ.setdefault("RENDER_POOL_WORKERS", "2")
+os.environ.setdefault("RENDER_WARMUP", "1")
+os.environ.setdefault("RESULT_STORE_PATH", ":memory:")
+os.environ.setdefault("TRANSLATION_MEMORY_PATH", ":memory:")
+os.environ.setdefault("BUDGET_CALLS", "1000000")
+os.environ.setdefault("BUDGET_TOKENS", "1000000000")
+
+from fixtures import report_overlays, synthetic_response  # noqa: E402
+
+EXPORTERS = 8
+PHASE_S = 8.0
+RISKS = 120
+EXPORT_BODIES = 80
+SIMULATION = {
+    "event_name": "夏祭り",
+    "event_type": "music_festival",
+    "event_location": "渋谷",
+    "date_time": "2026-08-01T10:00",
+    "expected_attendance": 5000,
+    "audience_type": "mixed",
+    "polygon": [{"lat": 35.0, "lng": 139.0}, {"lat": 35.002, "lng": 139.0}, {"lat": 35.002, "lng": 139.003}],
+}
+ASSIST = {"question": "駐車場の混雑対策を教えて", "context": {"step": "result", "event_name": "夏祭り", "risk_count": 12}}
+
+
+async def probe(client, method: str, path: str, body: dict | None, until: float, latencies: list[float], statuses: list[int]) -> None:
+    while time.perf_counter() < until:
+        t0 = time.perf_counter()
+        response = await client.request(method, path, json=body)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        statuses.append(response.status_code)
+        await asyncio.sleep(0.02)
+
+
+def export_bodies(count: int) -> list[dict]:
+    """出力ごとに別の結果（描画キャッシュに当たらない）。クライアントも同じプロセスなので先に作っておく。"""
+    overlays = report_overlays(pins=40, memos=20)
+    return [{**synthetic_response(RISKS, seed=seed).model_dump(mode="json"), **overlays} for seed in range(count)]
+
+
+async def export(client, bodies: list[dict], stop: asyncio.Event, statuses: list[int]) -> None:
+    while not stop.is_set() and bodies:
+        response = await client.post("/api/report/pdf?variant=full&stream=false", json=bodies.pop())
+        statuses.append(response.status_code)
+        if response.status_code == 503:
+            await asyncio.sleep(0.05)
+
+
+def summary(name: str, latencies: list[float], statuses: list[int]) -> str:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    bad = sum(1 for s in statuses if s != 200)
+    return (
+        f"{name:14s} n={len(ordered):4d} p50={statistics.median(ordered):7.1f}ms "
+        f"p99={p99:7.1f}ms max={ordered[-1]:7.1f}ms non-200={bad}"
+    )
+
+
+async def phase(client, with_exports: bool) -> tuple[dict[str, tuple[list[float], list[int]]], list[int]]:
+    probes = {
+        "POST /api/simulate": ("POST", "/api/simulate", SIMULATION),
+        "POST /api/assist": ("POST", "/api/assist", ASSIST),
+        "GET /health": ("GET", "/health", None),
+    }
+    results: dict[str, tuple[list[float], list[int]]] = {name: ([], []) for name in probes}
+    exports: list[int] = []
+    stop = asyncio.Event()
+    bodies = export_bodies(EXPORT_BODIES) if with_exports else []
+    exporters = [asyncio.create_task(export(client, bodies, stop, exports)) for _ in range(EXPORTERS if with_exports else 0)]
+    if exporters:
+        # プールが埋まってから測る
+        await asyncio.sleep(1.0)
+    until = time.perf_counter() + PHASE_S
+    await asyncio.gather(*(probe(client, *spec, until, *results[name]) for name, spec in probes.items()))
+    stop.set()
+    await asyncio.gather(*exporters)
+    return results, exports
+
+
+async def main() -> None:
+    import httpx
+
+    import main as app_module
+
+    async with app_module.lifespan(app_module.app):
+        pool = app_module.render_pool
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            idle, _ = await phase(client, with_exports=False)
+            loaded, exports = await phase(client, with_exports=True)
+        stats = pool.stats()
+
+    print(f"render pool: workers={pool.workers} capacity={stats['capacity']} exporters={EXPORTERS} risks={RISKS}")
+    for title, results in (("idle", idle), (f"{EXPORTERS} exporters", loaded)):
+        print(f"-- {title}")
+        for name, (latencies, statuses) in results.items():
+            print(summary(name, latencies, statuses))
+    done = sum(1 for s in exports if s == 200)
+    busy = sum(1 for s in exports if s == 503)
+    print(f"exports: ok={done} busy(503)={busy} other={len(exports) - done - busy} pool completed={stats['completed']} rejected={stats['rejected']}")
+
+    assert done > 0
+    for name, (latencies, statuses) in loaded.items():
+        assert all(s == 200 for s in statuses), name
+    if pool.workers > 0:
+        health = sorted(loaded["GET /health"][0])
+        assert health[int(len(health) * 0.99)] < 100, "event loop blocked during export"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
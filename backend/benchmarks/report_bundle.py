@@ -0,0 +1,72 @@
+"""/api/report/bundle（複数 variant の PDF を 1 リクエストで）と、variant ごとに /api/report/pdf を順に呼ぶ場合の比較。
+
+既定の variant（全体・1 枚要約・役割別 4 種）を、描画キャッシュに当たらないよう毎回別の結果で描画する。
+
+- 順に: variant ごとに POST /api/report/pdf（ブラウザのメニューから 1 つずつ出力するのと同じ）
+- zip: POST /api/report/bundle（描画プールで並列に描画してまとめて返す）
+- multipart: 描画が終わった順に流す。最初のパートまでの時間も出す（ASGITransport は本文をまとめて返すので、
+  エンドポイントの関数を直接呼んで本文のイテレータを読む）
+
+    cd backend && python benchmarks/report_bundle.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("LLM_BACKEND", "standin")
+os.environ.setdefault("RENDER_POOL_WORKERS", "2")
+os.environ.setdefault("RENDER_WARMUP", "1")
+os.environ.setdefault("RESULT_STORE_PATH", ":memory:")
+os.environ.setdefault("TRANSLATION_MEMORY_PATH", ":memory:")
+
+from fixtures import report_overlays, synthetic_response  # noqa: E402
+
+RISKS = 120
+
+
+def request_body(seed: int) -> dict:
+    return {**synthetic_response(RISKS, seed=seed).model_dump(mode="json"), **report_overlays(pins=40, memos=20)}
+
+
+async def main() -> None:
+    import httpx
+
+    import main as app_module
+
+    variants = list(app_module.DEFAULT_BUNDLE_VARIANTS)
+    async with app_module.lifespan(app_module.app):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            print(f"{RISKS} risks, variants={','.join(variants)}, render workers={app_module.render_pool.workers}")
+
+            t0 = time.perf_counter()
+            body = request_body(1)
+            for v in variants:
+                response = await client.post(f"/api/report/pdf?variant={v}&stream=false", json=body)
+                assert response.status_code == 200, response.text
+            print(f"one by one  total={time.perf_counter() - t0:5.2f}s requests={len(variants)}")
+
+            t0 = time.perf_counter()
+            response = await client.post("/api/report/bundle", json=request_body(2))
+            assert response.status_code == 200, response.text
+            print(f"zip         total={time.perf_counter() - t0:5.2f}s size={len(response.content) // 1024}KB")
+
+        t0 = time.perf_counter()
+        streaming = await app_module.export_report_bundle(request_body(3), None, "multipart")
+        first = None
+        parts = 0
+        async for chunk in streaming.body_iterator:
+            if chunk.startswith(b"--") and b"X-Report-Variant" in chunk[:400]:
+                parts += 1
+                first = first if first is not None else time.perf_counter() - t0
+        print(f"multipart   first part={first:5.2f}s total={time.perf_counter() - t0:5.2f}s parts={parts}")
+        assert parts == len(variants)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""結果翻訳のバッチ分け・同時実行・再試行を、スタンドインのモデルで測るスクリプト。
+
+60 リスク（説明・根拠を長くした合成データ）の結果を、空の翻訳メモリから英語に訳す。モデルの遅延は
+1 回 200ms + 出力 1 トークンあたり 0.4ms（LLM_STANDIN_LATENCY_MS / LLM_STANDIN_MS_PER_TOKEN と同じ仕組み）。
+
+- 同時実行 1（GEMINI_MAX_CONCURRENCY=1。バッチを順に訳すのと同じ）
+- 既定の同時実行数
+- 503 を 20%・途中切れ（壊れた JSON）を 10% 注入（バッチ単位の再試行で訳し残しが無いこと）
+- 同時実行 2（同時に走る呼び出しが 2 を超えないこと）
+
+の所要時間・呼び出し回数・最大同時実行数・訳し残しの件数を出す。
+
+    cd backend && python benchmarks/translate_batches.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import synthetic_response  # noqa: E402
+
+RISKS = 60
+SCENARIOS = (
+    # (名前, GEMINI_MAX_CONCURRENCY, LLM_STANDIN_ERRORS, 途中切れの率)
+    ("concurrency=1", "1", "", 0.0),
+    ("default", None, "", 0.0),
+    ("503 20% + truncate 10%", None, "503=0.2", 0.1),
+    ("concurrency=2", "2", "", 0.0),
+)
+
+
+def long_payload() -> dict:
+    payload = synthetic_response(RISKS).model_dump(mode="json")
+    for risk in payload["risks"]:
+        risk["description"] = "群衆が集中し転倒の危険がある。" * 8 + risk["id"]
+        risk["evidence"] = "過去の同種イベントで事故があった。" * 3 + risk["id"]
+    return payload
+
+
+async def run(name: str, concurrency: str | None, errors: str, truncate: float) -> None:
+    from services.gemini_service import GeminiService
+    from services.llm_standin import StandInBackend
+    from services.translation_memory import TranslationMemory, extract_strings
+
+    if concurrency is None:
+        os.environ.pop("GEMINI_MAX_CONCURRENCY", None)
+    else:
+        os.environ["GEMINI_MAX_CONCURRENCY"] = concurrency
+    backend = StandInBackend(latency="200", error_rates=errors, truncate_rate=truncate, ms_per_token=0.4, seed=3)
+    live = peak = 0
+    generate = backend.generate
+
+    async def counting(*args, **kwargs):
+        nonlocal live, peak
+        live += 1
+        peak = max(peak, live)
+        try:
+            return await generate(*args, **kwargs)
+        finally:
+            live -= 1
+
+    backend.generate = counting
+    service = GeminiService(backend=backend)
+    memory = TranslationMemory(path=":memory:")
+    payload = long_payload()
+    t0 = time.perf_counter()
+    out = await service.translate_simulation_to_english(payload, memory)
+    elapsed = time.perf_counter() - t0
+    memory.close()
+    # スタンドインの訳文は "[en] 原文"
+    left = sum(1 for _, text in extract_strings(out) if not text.startswith("[en]"))
+    stats = backend.stats()
+    print(
+        f"{name:24s} wall={elapsed:5.2f}s calls={sum(stats['calls'].values()):3d} "
+        f"errors={sum(stats['errors'].values()):2d} truncated={stats['truncated']:2d} peak={peak:2d} untranslated={left}"
+    )
+    if concurrency is not None:
+        assert peak <= int(concurrency)
+    assert left == 0
+
+
+async def main() -> None:
+    os.environ.setdefault("LLM_BACKEND", "standin")
+    for scenario in SCENARIOS:
+        await run(*scenario)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
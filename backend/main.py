@@ -1,20 +1,40 @@
+import asyncio
+import io
+import json
 import logging
 import os
-from contextlib import asynccontextmanager
+import sqlite3
+import tempfile
+import time
+import uuid
+import zipfile
+from contextlib import aclosing, asynccontextmanager, suppress
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from pydantic import ValidationError as PydanticValidationError
-from models import SimulationRequest, SimulationResponse, LatLng
+from models import AnalysisTier, SimulationRequest, SimulationResponse, LatLng, PreAssessVariantsRequest
 from services.risk_engine import RiskEngine
-from services.assist_engine import AssistEngine
-from services.pdf_report import build_pdf, get_report_text
+from services.assist_engine import AssistEngine, AssistSessionExpired
+from services.mitigation_engine import MitigationEffectEngine, StaleMitigationRevision
+from services.render_cache import RenderCache, etag_matches, render_key
+from services.render_pool import RenderPool, RenderPoolBusy, RenderPoolRestarted, RenderTimeout
+from services.result_store import ResultStore
+from services.translation_memory import TranslationMemory
+from services.model_routing import STAGE_METRICS
+from services.model_usage import usage_ledger
+from services.budget import BudgetExceeded, BudgetManager, request_fingerprint, usage_tokens
+from services.llm_backend import LLMBackend, make_backend
+from services.cassette import active_cassette
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, ENABLED as METRICS_ENABLED, REGISTRY, Family, MetricsMiddleware
+from services.pdf_report import PDF_SPOOL_DIR, PDF_VARIANTS, render_pdf, render_pdf_to_file, warm_up as warm_up_pdf_renderer
+from services.report_ir import ReportIR, build_report_ir, render_report, report_formats
 from services.roads_service import snap_path_to_map_boundaries
 from pydantic import BaseModel, Field
-from typing import Any
+from typing import Any, Callable
 
 load_dotenv()
 
@@ -24,18 +44,96 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+llm_backend: LLMBackend | None = None
 risk_engine: RiskEngine | None = None
 assist_engine: AssistEngine | None = None
+result_store: ResultStore | None = None
+render_pool: RenderPool | None = None
+render_cache: RenderCache | None = None
+translation_memory: TranslationMemory | None = None
+budgets: BudgetManager | None = None
+mitigation_engine = MitigationEffectEngine()
+# 描画系のウォームアップ状態（/health, /ready で返す）
+renderer_warmup: dict[str, Any] = {"ready": False, "warmup_ms": None}
+
+
+async def _warm_up_renderer() -> None:
+    """フォント解決・登録と小さな文書の描画を先に済ませ、最初の PDF リクエストに負担を残さない。"""
+    t0 = time.perf_counter()
+    try:
+        # 親プロセスで先に解決しておくと、パス（ディスクキャッシュ）をワーカーが再利用できる
+        local = await asyncio.to_thread(warm_up_pdf_renderer)
+        pool = await render_pool.warm_up() if render_pool is not None else None
+        renderer_warmup.update(
+            ready=True,
+            warmup_ms=round((time.perf_counter() - t0) * 1000, 1),
+            font=local["font"],
+            unicode_font=local["unicode"],
+            font_ms=local["font_ms"],
+            workers_warmed=pool["workers"] if pool else 0,
+        )
+        logger.info("Renderer warm-up finished: %s", renderer_warmup)
+    except Exception as exc:
+        renderer_warmup.update(ready=False, warmup_ms=round((time.perf_counter() - t0) * 1000, 1), error=str(exc)[:200])
+        logger.warning("Renderer warm-up failed: %s", exc)
+
+
+async def _save_budgets() -> None:
+    """予算の残量を BUDGET_SAVE_INTERVAL_S ごとにまとめて保存する（精算のたびにイベントループ上で SQLite に書かない）。"""
+    while True:
+        await asyncio.sleep(budgets.save_interval_s)
+        try:
+            await asyncio.to_thread(budgets.flush)
+        except sqlite3.Error as exc:
+            logger.warning("Saving budgets failed: %s", exc)
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
-    global risk_engine, assist_engine
-    risk_engine = RiskEngine()
-    assist_engine = AssistEngine()
+    global llm_backend, risk_engine, assist_engine, result_store, render_pool, render_cache, translation_memory, budgets
+    # 解析とアシストで同じバックエンド（LLM_BACKEND）を使う
+    llm_backend = make_backend()
+    risk_engine = RiskEngine(llm_backend)
+    assist_engine = AssistEngine(llm_backend)
+    result_store = ResultStore()
+    render_pool = RenderPool()
+    render_cache = RenderCache()
+    translation_memory = TranslationMemory()
+    budgets = BudgetManager()
+    mitigation_engine.set_loader(result_store.get)
+    budget_saver = asyncio.create_task(_save_budgets()) if budgets.persistent else None
+    if BUDGET_TRUSTED_PROXIES == 0 and os.getenv("K_SERVICE"):
+        logger.warning(
+            "BUDGET_TRUSTED_PROXIES=0 on Cloud Run: every request is budgeted as the front-end proxy's address, "
+            "so one heavy client exhausts the budget for everyone. Set BUDGET_TRUSTED_PROXIES=1 (2 behind a load balancer)."
+        )
+    warmup_mode = os.getenv("RENDER_WARMUP", "1").strip().lower()
+    warmup_task = None
+    if warmup_mode == "background":
+        warmup_task = asyncio.create_task(_warm_up_renderer())
+    elif warmup_mode not in ("0", "false", "no", "off"):
+        await _warm_up_renderer()
+    else:
+        renderer_warmup.update(ready=True, warmup_ms=0.0)
     logger.info("FlowGuard AI backend started.")
     yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await warmup_task
+    if budget_saver is not None:
+        budget_saver.cancel()
+        with suppress(asyncio.CancelledError):
+            await budget_saver
     logger.info("FlowGuard AI backend shutting down.")
+    await assist_engine.aclose()
+    await llm_backend.aclose()
+    render_pool.shutdown()
+    result_store.close()
+    translation_memory.close()
+    await asyncio.to_thread(budgets.close)
+    if active_cassette() is not None:
+        active_cassette().close()
 
 
 app = FastAPI(
@@ -51,12 +149,115 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After", "X-Budget-Downgraded-From", "X-Budget-Cached"],
 )
+# 最も外側に置き、CORS のプリフライトも含めて数える
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "service": "flowguard-ai"}
+    body: dict[str, Any] = {"status": "ok", "service": "flowguard-ai", "renderer_warmup": renderer_warmup}
+    if render_pool is not None:
+        body["renderer"] = render_pool.stats()
+    if render_cache is not None:
+        body["render_cache"] = render_cache.stats()
+    if assist_engine is not None:
+        body["assist"] = assist_engine.stats()
+    if translation_memory is not None:
+        body["translation_memory"] = translation_memory.stats()
+    if llm_backend is not None:
+        body["llm_backend"] = llm_backend.stats()
+    if active_cassette() is not None:
+        body["cassette"] = active_cassette().stats()
+    body["model_stages"] = STAGE_METRICS.stats()
+    if budgets is not None:
+        body["budgets"] = budgets.stats()
+    return body
+
+
+def _service_metrics() -> list[Family]:
+    """スクレイプのときに各サービスの stats() から作る値（待ち行列の深さ・同時実行枠・キャッシュのヒット数・予算の判定）。"""
+    families: list[Family] = []
+    cache_lookups = Family("flowguard_cache_lookups_total", "counter", "Cache lookups by cache and result (hit, miss).")
+    cache_entries = Family("flowguard_cache_entries", "gauge", "Entries currently held in memory by cache.")
+    families += [cache_lookups, cache_entries]
+
+    def cache(name: str, stats: dict, entries_key: str | None = "entries") -> None:
+        cache_lookups.samples += [({"cache": name, "result": "hit"}, stats["hits"]), ({"cache": name, "result": "miss"}, stats["misses"])]
+        if entries_key is not None:
+            cache_entries.samples.append(({"cache": name}, stats[entries_key]))
+
+    if render_pool is not None:
+        pool = render_pool.stats()
+        families += [
+            Family("flowguard_render_pool_in_flight", "gauge", "Render jobs running or queued.", [({}, pool["in_flight"])]),
+            Family("flowguard_render_pool_capacity", "gauge", "Render jobs accepted before 503 (workers + queue).", [({}, pool["capacity"])]),
+            Family(
+                "flowguard_render_pool_jobs_total",
+                "counter",
+                "Render jobs by outcome.",
+                [({"outcome": outcome}, pool[k]) for outcome, k in (("completed", "completed"), ("rejected", "rejected"), ("timeout", "timeouts"))],
+            ),
+            Family("flowguard_render_pool_restarts_total", "counter", "Render worker pool restarts.", [({}, pool["restarts"])]),
+        ]
+    if render_cache is not None:
+        stats = render_cache.stats()
+        cache("render", stats)
+        families.append(Family("flowguard_render_cache_bytes", "gauge", "Bytes held by the render cache.", [({}, stats["bytes"])]))
+    if translation_memory is not None:
+        cache("translation_memory", translation_memory.stats(), "hot")
+    if assist_engine is not None:
+        assist = assist_engine.stats()
+        cache("assist_answer", assist["answer_cache"])
+        cache("assist_session", assist["sessions"], "sessions")
+        cache("report_index", assist["retrieval"], "indexes")
+        latency = assist["latency"]
+        families.append(
+            Family(
+                "flowguard_assist_streams_total",
+                "counter",
+                "Assist streams started and how they ended early (cancelled, superseded, errors).",
+                [({"event": k}, latency[k]) for k in ("streams", "cancelled", "superseded", "errors")],
+            )
+        )
+    if risk_engine is not None:
+        slots = risk_engine.gemini.slot_stats()
+        families += [
+            Family("flowguard_model_slots_limit", "gauge", "Concurrent model call limit (GEMINI_MAX_CONCURRENCY).", [({}, slots["limit"])]),
+            Family("flowguard_model_slots_in_use", "gauge", "Model calls currently holding a slot.", [({}, slots["in_use"])]),
+            Family("flowguard_model_slots_waiting", "gauge", "Model calls waiting for a slot.", [({}, slots["waiting"])]),
+        ]
+    if budgets is not None and budgets.enabled:
+        stats = budgets.stats()
+        families.append(
+            Family(
+                "flowguard_budget_decisions_total",
+                "counter",
+                "Budget admission decisions by outcome.",
+                [({"outcome": k}, stats[k]) for k in ("admitted", "downgraded", "served_cached", "rejected")],
+            )
+        )
+    return families
+
+
+REGISTRY.register_collector(_service_metrics)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus のテキスト形式。エンドポイント・モデル呼び出し・外部呼び出しの件数と所要時間、待ち行列・キャッシュの値。"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/ready")
+async def readiness_check():
+    """描画系のウォームアップが済んでいれば 200、まだなら 503。起動プローブ用。"""
+    if not renderer_warmup.get("ready"):
+        return JSONResponse({"ready": False, **renderer_warmup}, status_code=503)
+    return {"ready": True, "warmup_ms": renderer_warmup.get("warmup_ms")}
 
 
 @app.get("/api/config")
@@ -82,18 +283,84 @@ async def snap_to_boundaries(body: dict):
     return {"path": [{"lat": p.lat, "lng": p.lng} for p in snapped]}
 
 
+def _trusted_proxy_count() -> int:
+    """X-Forwarded-For のうち信用する右端からの個数（前段のプロキシの数）。0 なら接続元そのもの。
+    未設定なら Cloud Run（K_SERVICE がある）では 1（Google のフロントエンドが付けた 1 個）、それ以外は 0。"""
+    value = os.getenv("BUDGET_TRUSTED_PROXIES", "").strip()
+    if value:
+        return int(value)
+    return 1 if os.getenv("K_SERVICE") else 0
+
+
+BUDGET_TRUSTED_PROXIES = _trusted_proxy_count()
+
+
+def _budget_key(http_request: Request) -> str:
+    """予算を数える単位（接続元 IP）。プロジェクト・所有者はサーバーで確かめられないため、クライアントが付ける
+    ヘッダ（参加コード等）は使わない（付け替えるだけで新しいバケットになる）。X-Forwarded-For は前段のプロキシが
+    付けた右端の BUDGET_TRUSTED_PROXIES 個だけを信用し、クライアントが書いた左側は読まない。"""
+    if BUDGET_TRUSTED_PROXIES > 0:
+        hops = [h.strip() for h in http_request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        if len(hops) >= BUDGET_TRUSTED_PROXIES:
+            return f"ip:{hops[-BUDGET_TRUSTED_PROXIES]}"
+    return f"ip:{http_request.client.host if http_request.client else 'unknown'}"
+
+
+def _budget_exceeded(exc: BudgetExceeded) -> HTTPException:
+    budgets.note("rejected")
+    logger.info("Budget exceeded: %s", exc)
+    return HTTPException(
+        status_code=429,
+        detail=f"Usage budget (rate limit) exceeded. Please try again in {exc.retry_after_s} seconds.",
+        headers={"Retry-After": str(exc.retry_after_s)},
+    )
+
+
 @app.post("/api/simulate", response_model=SimulationResponse)
-async def simulate(request: SimulationRequest):
+async def simulate(request: SimulationRequest, http_request: Request, response: Response):
+    """予算（BUDGET_*）が足りなければ軽い段階で解析し（X-Budget-Downgraded-From）、それも無理なら同じ条件の
+    保存済みの結果を返す（X-Budget-Cached）。どちらも無ければ 429（Retry-After 付き）。"""
     if risk_engine is None:
         raise HTTPException(status_code=503, detail="Service not ready")
 
+    budget_key = _budget_key(http_request)
+    fingerprint = request_fingerprint(request.model_dump_json(exclude={"analysis_tier"}))
+    try:
+        reservation, tier = budgets.reserve_tier(budget_key, request.analysis_tier.value)
+    except BudgetExceeded as exc:
+        simulation_id = budgets.recent_result(budget_key, fingerprint)
+        cached = None
+        if simulation_id and result_store is not None:
+            cached = await asyncio.to_thread(result_store.get, simulation_id)
+        if cached is None:
+            raise _budget_exceeded(exc)
+        budgets.note("served_cached")
+        response.headers["X-Budget-Cached"] = cached.simulation_id
+        response.headers["Retry-After"] = str(exc.retry_after_s)
+        return cached
+    if tier != request.analysis_tier.value:
+        response.headers["X-Budget-Downgraded-From"] = request.analysis_tier.value
+        request = request.model_copy(update={"analysis_tier": AnalysisTier(tier)})
+
     try:
         result = await risk_engine.run_simulation(request)
+        budgets.settle(reservation, *usage_tokens(result.usage))
+        mitigation_engine.register(result)
+        if result_store is not None:
+            await asyncio.to_thread(result_store.put, result)
+            budgets.remember_result(budget_key, fingerprint, result.simulation_id)
+            if request.bilingual:
+                # 英語版も保存しておき、ロケール切り替え（/api/translate-simulation）は翻訳せずに返す
+                english = await asyncio.to_thread(risk_engine.english_variant, result, translation_memory)
+                if english is not None:
+                    await asyncio.to_thread(result_store.put, SimulationResponse.model_validate(english), "en")
         return result
     except ValueError as exc:
         logger.error("Validation error during simulation: %s", exc)
+        budgets.release(reservation)
         raise HTTPException(status_code=422, detail=str(exc))
     except Exception as exc:
+        # モデルを呼んだ後の失敗もあるため、予約した見積もりはそのまま使ったものとする
         exc_str = str(exc)
         logger.error("Simulation failed: %s", exc_str[:300])
 
@@ -108,6 +375,84 @@ async def simulate(request: SimulationRequest):
         )
 
 
+@app.post("/api/simulate/preview", response_model=SimulationResponse)
+async def simulate_preview(request: SimulationRequest):
+    """LLM 分析前に即時表示する暫定結果（provisional=true）。"""
+    if risk_engine is None:
+        raise HTTPException(status_code=503, detail="Service not ready")
+    return risk_engine.pre_assess(request)
+
+
+@app.post("/api/simulate/preview/variants")
+async def simulate_preview_variants(body: PreAssessVariantsRequest):
+    """What-if スライダー用: base と各 variant の暫定スコアを一括計算する。"""
+    if risk_engine is None:
+        raise HTTPException(status_code=503, detail="Service not ready")
+    variants = [v.model_dump(exclude_none=True) for v in body.variants]
+    results = risk_engine.evaluate_variants(body.base, variants)
+    return {"base": results[0], "variants": results[1:]}
+
+
+class MitigationToggleBody(BaseModel):
+    task_id: str = Field(..., min_length=1, max_length=100)
+    checked: bool
+    # 直前の応答の revision。違えば 409 を返すので、クライアントはチェック全体を PUT で同期し直す
+    revision: str | None = Field(None, max_length=64)
+
+
+class MitigationSyncBody(BaseModel):
+    todo_checks: dict[str, bool] = Field(default_factory=dict)
+    adopted_todos: list[dict] | None = None
+
+
+def _mitigation_payload(snapshot: dict | None) -> dict:
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Unknown simulation_id.")
+    return snapshot
+
+
+@app.get("/api/mitigation/{simulation_id}")
+async def get_mitigation_effect(simulation_id: str):
+    """対策効果（対策前→対策後）の現在の集計。"""
+    return _mitigation_payload(await asyncio.to_thread(mitigation_engine.current, simulation_id))
+
+
+@app.post("/api/mitigation/{simulation_id}/toggle")
+async def toggle_mitigation_task(simulation_id: str, body: MitigationToggleBody):
+    """ToDo 1 件のチェック切り替え。寄与の足し引きで集計を更新して返す。
+    サーバーの状態は共有のキャッシュなので、revision が現在と違えば 409（チェック全体を PUT で送り直す）。"""
+    try:
+        snapshot = await asyncio.to_thread(
+            mitigation_engine.toggle, simulation_id, body.task_id, body.checked, body.revision
+        )
+    except StaleMitigationRevision:
+        raise HTTPException(status_code=409, detail="Mitigation state changed. Sync all checks.")
+    return _mitigation_payload(snapshot)
+
+
+@app.put("/api/mitigation/{simulation_id}")
+async def sync_mitigation_checks(simulation_id: str, body: MitigationSyncBody):
+    """チェック状態・採用ToDo をまとめて同期する（初回・採用ToDo の変更時と、toggle が 409 になったとき）。"""
+    snapshot = await asyncio.to_thread(mitigation_engine.sync, simulation_id, body.todo_checks, body.adopted_todos)
+    return _mitigation_payload(snapshot)
+
+
+def _resolve_delta_summary(
+    payload: SimulationResponse,
+    delta_summary: dict | None,
+    todo_checks: dict | None,
+    adopted_todos: list | None,
+) -> dict | None:
+    """ToDo のチェック状態が届いていればサーバー側の対策効果エンジンで集計し、なければ送られた値を使う。"""
+    if isinstance(todo_checks, dict) and payload.simulation_id:
+        return mitigation_engine.summary_for(
+            payload,
+            todo_checks,
+            adopted_todos if isinstance(adopted_todos, list) else None,
+        )
+    return delta_summary
+
+
 SCENARIO_TEMPLATES = [
     {
         "id": "music_festival",
@@ -186,27 +531,338 @@ async def validate_input(body: ValidateInputBody):
 
 class AssistRequestBody(BaseModel):
     question: str = Field("", max_length=2000)
-    context: dict | None = Field(None, description="Optional app state for context-aware answers (step, event_name, risk_count, overall_risk_score, summary, todo_checked_count, todo_total_count, pins_count, map_todos_count)")
+    context: dict | None = Field(None, description="Optional app state for context-aware answers (step, event_name, risk_count, overall_risk_score, summary, todo_checked_count, todo_total_count, pins_count, map_todos_count). With simulation_id and no report_text, the report is built from the stored result.")
+    session_id: str | None = Field(None, max_length=128, description="Project or simulation id. Static context (summary, risks, report) is shared per session id by all its clients and cached provider-side.")
+    context_digest: str | None = Field(None, max_length=64, description="Digest returned by the previous answer. With it, context may omit the static keys; 409 if the session is gone.")
+    client_id: str | None = Field(None, max_length=64, description="Per-tab id. Conversation memory is kept per client, and a stream is superseded only by the same client's next question.")
+
+
+REPORT_OVERLAY_KEYS = ("delta_summary", "site_check_memos", "todo_checks", "adopted_todos", "pins")
+
+
+def _stored_result(simulation_id: str, translation_locale: str | None = None) -> SimulationResponse:
+    if result_store is None:
+        raise HTTPException(status_code=503, detail="Service not ready")
+    payload = result_store.get(simulation_id, translation_locale or "")
+    if payload is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Unknown simulation_id. Send the full simulation result instead.",
+        )
+    return payload
+
+
+def _load_report_request(body: dict[str, Any]) -> tuple[SimulationResponse, dict[str, Any]]:
+    """レポート系リクエストを (結果, 差分) に分ける。本文が無く simulation_id だけならストアから取得する。
+    ストアの読み出し・本文の検証を行うので asyncio.to_thread で呼ぶ。"""
+    body = body if isinstance(body, dict) else {}
+    overlays = {k: body.get(k) for k in REPORT_OVERLAY_KEYS}
+    if "risks" not in body and body.get("simulation_id"):
+        payload = _stored_result(str(body["simulation_id"]), body.get("translation_locale"))
+    else:
+        payload_dict = {k: v for k, v in body.items() if k not in REPORT_OVERLAY_KEYS}
+        payload = SimulationResponse.model_validate(payload_dict)
+    overlays["delta_summary"] = _resolve_delta_summary(
+        payload, overlays["delta_summary"], overlays["todo_checks"], overlays["adopted_todos"]
+    )
+    return payload, overlays
+
+
+def _render_error(exc: Exception) -> HTTPException:
+    if isinstance(exc, RenderPoolRestarted):
+        return HTTPException(
+            status_code=503,
+            detail="Report renderer was restarted. Please retry.",
+            headers={"Retry-After": "1"},
+        )
+    if isinstance(exc, RenderPoolBusy):
+        return HTTPException(
+            status_code=503,
+            detail="Report renderer is busy. Please retry shortly.",
+            headers={"Retry-After": "2"},
+        )
+    return HTTPException(status_code=504, detail="Report generation timed out.")
+
+
+def _report_ir(payload: SimulationResponse, overlays: dict[str, Any]) -> ReportIR:
+    """レポート IR を組み立てる（同じ内容ならキャッシュ済みのものを返す）。"""
+    return build_report_ir(payload, **overlays)
+
+
+async def _render_text(
+    payload: SimulationResponse,
+    key: str | None = None,
+    fmt: str = "text",
+    **overlays: Any,
+) -> str:
+    key = key or render_key(fmt, payload, overlays=overlays)
+    if render_cache is not None:
+        cached = render_cache.get(key)
+        if cached is not None:
+            return cached
+    ir = _report_ir(payload, overlays)
+    if render_pool is None:
+        text = render_report(ir, fmt)
+    else:
+        text = await render_pool.render_text(ir, fmt)
+    if render_cache is not None:
+        render_cache.put(key, text)
+    return text
+
+
+async def _render_pdf(payload: SimulationResponse, variant: str, key: str, **overlays: Any) -> bytes:
+    if render_cache is not None:
+        cached = render_cache.get(key)
+        if cached is not None:
+            return cached
+    return await _render_pdf_ir(_report_ir(payload, overlays), variant, key)
+
+
+async def _render_pdf_ir(ir: ReportIR, variant: str, key: str) -> bytes:
+    if render_pool is None:
+        pdf_bytes = render_pdf(ir, variant)
+    else:
+        pdf_bytes = await render_pool.render_pdf(ir, variant)
+    if render_cache is not None:
+        render_cache.put(key, pdf_bytes)
+    return pdf_bytes
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """送り終えたとき・途中で切断・失敗したときのどれでも、本文のジェネレータを閉じてから on_close を呼ぶ StreamingResponse。
+    ジェネレータの finally は本文を読み始めていないと走らず、BackgroundTask も切断時には呼ばれないため、後始末はこちらで行う。"""
+
+    def __init__(self, content, on_close: Callable[[], None], **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                if hasattr(self.body_iterator, "aclose"):
+                    await self.body_iterator.aclose()
+            finally:
+                self._on_close()
+
+
+# これ以上の件数（リスク・ToDo・ピン・現場メモの合計）の PDF は一時ファイル経由でストリーミング配信する
+PDF_STREAM_MIN_ITEMS = int(os.getenv("PDF_STREAM_MIN_ITEMS", "300"))
+PDF_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+async def _render_pdf_file(ir: ReportIR, variant: str) -> str:
+    """PDF を一時ファイルに書き出してパスを返す。パスはここで決め、描画の前に切断された（取り消された）・失敗したときは
+    描画が終わってから消す（取り消してもワーカー・スレッドの描画は止まらず、後からファイルを書くため）。"""
+    fd, path = tempfile.mkstemp(prefix="flowguard_", suffix=".pdf", dir=PDF_SPOOL_DIR)
+    os.close(fd)
+    if render_pool is None:
+        job = asyncio.ensure_future(asyncio.to_thread(render_pdf_to_file, ir, variant, path))
+    else:
+        job = asyncio.ensure_future(render_pool.render_pdf_file(ir, variant, path))
+    try:
+        return await asyncio.shield(job)
+    except BaseException:
+        job.add_done_callback(lambda _: _unlink_quietly(path))
+        raise
+
+
+async def _stream_file(path: str):
+    """一時ファイルを PDF_STREAM_CHUNK_BYTES ずつ送る。削除は _ClosingStreamingResponse の on_close（_unlink_quietly）で行う。"""
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, PDF_STREAM_CHUNK_BYTES):
+            yield chunk
+
+
+def _unlink_quietly(path: str) -> None:
+    with suppress(OSError):
+        os.unlink(path)
+
+
+def _not_modified(key: str) -> Response:
+    if render_cache is not None:
+        render_cache.record_not_modified()
+    return Response(status_code=304, headers={"ETag": f'"{key}"'})
+
+
+async def _context_with_report_text(context: dict | None, with_overlays: bool = True) -> dict | None:
+    """アシスト用: context に simulation_id があり report_text が無ければ、保存済みの結果から本文を組み立てる。
+    with_overlays=False はセッション用で、ToDo のチェック等を含まない本文（チェックで変わらない）にする。"""
+    if not context or context.get("report_text") or not context.get("simulation_id") or result_store is None:
+        return context
+    locale = context.get("translation_locale") or ""
+    payload = await asyncio.to_thread(result_store.get, str(context["simulation_id"]), locale)
+    if payload is None:
+        return context
+    overlays: dict[str, Any] = {}
+    if with_overlays:
+        overlays = {k: context.get(k) for k in REPORT_OVERLAY_KEYS}
+        overlays["delta_summary"] = await asyncio.to_thread(
+            _resolve_delta_summary, payload, overlays["delta_summary"], overlays["todo_checks"], overlays["adopted_todos"]
+        )
+    try:
+        text = await _render_text(payload, **overlays)
+    except (RenderPoolBusy, RenderTimeout):
+        logger.warning("Report text for assist skipped (renderer busy)")
+        return context
+    return {**context, "report_text": text}
+
+
+def _with_mitigation_effect(context: dict | None) -> dict | None:
+    """セッション用: チェック状態から対策効果（対策前→対策後）を集計し、質問ごとの状態として添える。
+    共有の状態（ダッシュボード・他の参加者）は変えず、複製に適用して読むだけ。"""
+    if not context or not context.get("simulation_id") or not isinstance(context.get("todo_checks"), dict):
+        return context
+    summary = mitigation_engine.summary_for(str(context["simulation_id"]), context["todo_checks"])
+    return {**context, "mitigation_effect": summary} if summary else context
+
+
+def _assist_context_key(body: AssistRequestBody) -> str | None:
+    """静的コンテキスト（要約・リスク・レポート本文とそのキャッシュ）の単位。session_id（参加コード・シミュレーション ID）と
+    翻訳ロケールで決まり、プロジェクトの参加者が共有する。会話メモリ・ストリームの打ち切りは client_id で分ける。"""
+    if not body.session_id:
+        return None
+    locale = (body.context or {}).get("translation_locale") or ""
+    return f"{body.session_id}:{locale}" if locale else body.session_id
+
+
+def _assist_stream_key(body: AssistRequestBody, context_key: str | None) -> str | None:
+    """打ち切り（同じキーの次の質問で前のストリームを止める）の単位。参加者・タブごとで、client_id が無ければ打ち切らない。"""
+    if not body.client_id:
+        return None
+    return f"{context_key or ''}|{body.client_id}"
+
+
+async def _assist_context(body: AssistRequestBody, context_key: str | None) -> dict | None:
+    context = body.context
+    if context_key is None:
+        return await _context_with_report_text(context)
+    if body.context_digest and assist_engine.session_for(context_key, body.context_digest) is not None:
+        # 静的コンテキストはセッション側にある。状態だけを添える
+        return await asyncio.to_thread(_with_mitigation_effect, context)
+    context = await _context_with_report_text(context, with_overlays=False)
+    return await asyncio.to_thread(_with_mitigation_effect, context)
 
 
 @app.post("/api/assist")
-async def assist(body: AssistRequestBody):
+async def assist(body: AssistRequestBody, http_request: Request):
+    """アシスト。session_id を付けると静的コンテキスト（要約・リスク・レポート本文）をセッションに保持し、
+    返した context_digest を次回送れば context は状態（ステップ・ToDo 進捗等）だけでよい。"""
+    if assist_engine is None:
+        raise HTTPException(status_code=503, detail="Service not ready.")
+    try:
+        reservation = budgets.reserve(_budget_key(http_request), "assist")
+    except BudgetExceeded as exc:
+        raise _budget_exceeded(exc)
+    try:
+        context_key = _assist_context_key(body)
+        context = await _assist_context(body, context_key)
+        with usage_ledger() as ledger:
+            try:
+                result = await assist_engine.ask(
+                    body.question, context, context_key, body.context_digest, client_id=body.client_id
+                )
+            finally:
+                # 回答キャッシュに当たったときは呼び出し 0 で、予約はそのまま戻る
+                budgets.settle(reservation, *usage_tokens(ledger.summary()))
+        if result["session_id"]:
+            result["session_id"] = body.session_id
+        return result
+    except AssistSessionExpired:
+        raise HTTPException(status_code=409, detail="assist_session_expired")
+    except Exception as exc:
+        logger.exception("Assist failed: %s", exc)
+        raise HTTPException(status_code=500, detail="Assistant failed. Please try again.")
+    finally:
+        # モデルを呼ぶ前（コンテキストの組み立て等）の失敗。精算済みなら何もしない
+        budgets.release(reservation)
+
+
+def _sse(event: dict) -> str:
+    name = event.pop("event")
+    return f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/assist/stream")
+async def assist_stream(body: AssistRequestBody, request: Request):
+    """アシストのストリーミング版（Server-Sent Events）。Body は /api/assist と同じ。
+    イベント: meta（session_id, context_digest）→ delta（text）の繰り返し → done（ttft_ms, total_ms, chars）。
+    同じクライアント（client_id）の次の質問が来たら前のストリームは cancelled で終わり、クライアントが切断したらモデル呼び出しも止める。"""
     if assist_engine is None:
         raise HTTPException(status_code=503, detail="Service not ready.")
+    started = time.perf_counter()
+    context_key = _assist_context_key(body)
     try:
-        answer = await assist_engine.answer(body.question, context=body.context)
-        return {"answer": answer}
+        reservation = budgets.reserve(_budget_key(request), "assist")
+    except BudgetExceeded as exc:
+        raise _budget_exceeded(exc)
+    try:
+        context = await _assist_context(body, context_key)
+        turn = await assist_engine.prepare(
+            body.question, context, context_key, body.context_digest, started=started, client_id=body.client_id
+        )
+    except AssistSessionExpired:
+        budgets.release(reservation)
+        raise HTTPException(status_code=409, detail="assist_session_expired")
     except Exception as exc:
+        budgets.release(reservation)
         logger.exception("Assist failed: %s", exc)
         raise HTTPException(status_code=500, detail="Assistant failed. Please try again.")
+    stream_key = _assist_stream_key(body, context_key)
+
+    async def events():
+        async with aclosing(assist_engine.stream(turn, stream_key)) as stream:
+            async for event in stream:
+                if event["event"] == "ping":
+                    if await request.is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                if event["event"] == "meta" and event["session_id"]:
+                    event["session_id"] = body.session_id
+                yield _sse(event)
+
+    def settle() -> None:
+        # 切断・打ち切り・本文を 1 度も読まなかった場合も、それまでに使った分を精算する
+        budgets.settle(reservation, *usage_tokens(turn.usage.summary() if turn.usage else None))
+
+    return _ClosingStreamingResponse(
+        events(),
+        settle,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/api/translate-simulation")
-async def translate_simulation(body: dict):
+async def translate_simulation(body: dict, http_request: Request):
     if risk_engine is None:
         raise HTTPException(status_code=503, detail="Service not ready")
+    if "risks" not in body and body.get("simulation_id"):
+        stored = None
+        if result_store is not None:
+            stored = await asyncio.to_thread(result_store.get, str(body["simulation_id"]), "en")
+        if stored is not None:
+            return stored  # バイリンガル生成・翻訳済みの英語版
+        body = (await asyncio.to_thread(_stored_result, str(body["simulation_id"]))).model_dump(mode="json")
     try:
-        translated = await risk_engine.translate_simulation_to_english(body)
+        reservation = budgets.reserve(_budget_key(http_request), "translate")
+    except BudgetExceeded as exc:
+        raise _budget_exceeded(exc)
+    try:
+        # 台帳には翻訳で呼んだ分だけが入る（英語版の usage はシミュレーションの分を含む）。失敗してもそれまでの分を精算する
+        with usage_ledger() as ledger:
+            try:
+                translated = await risk_engine.translate_simulation_to_english(body, translation_memory)
+            finally:
+                budgets.settle(reservation, *usage_tokens(ledger.summary()))
+        translated["translation_locale"] = "en"
+        if result_store is not None:
+            try:
+                await asyncio.to_thread(result_store.put, SimulationResponse.model_validate(translated), "en")
+            except PydanticValidationError as exc:
+                logger.warning("Translated result not stored: %s", exc)
         return translated
     except Exception as exc:
         logger.error("Translate simulation failed: %s", exc)
@@ -217,29 +873,27 @@ async def translate_simulation(body: dict):
 
 
 @app.post("/api/report/text")
-async def export_report_text(body: dict[str, Any]):
-    """PDFフル版と同じ構成のレポートをプレーンテキストで返す。アシストのコンテキスト用。"""
+async def export_report_text(
+    body: dict[str, Any],
+    fmt: str = Query("text", alias="format"),
+    if_none_match: str | None = Header(None),
+):
+    """PDFフル版と同じ構成のレポートをテキストで返す。アシストのコンテキスト用。
+    format は text（既定）・markdown・html。本文の代わりに simulation_id と差分
+    （todo_checks, pins 等）だけを送ってもよい。"""
+    if fmt not in report_formats():
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(report_formats())}.")
     try:
-        delta_summary = body.get("delta_summary") if isinstance(body, dict) else None
-        site_check_memos = body.get("site_check_memos") if isinstance(body, dict) else None
-        todo_checks = body.get("todo_checks") if isinstance(body, dict) else None
-        adopted_todos = body.get("adopted_todos") if isinstance(body, dict) else None
-        pins = body.get("pins") if isinstance(body, dict) else None
-        payload_dict = {
-            k: v
-            for k, v in (body or {}).items()
-            if k not in ("delta_summary", "site_check_memos", "todo_checks", "adopted_todos", "pins")
-        }
-        payload = SimulationResponse.model_validate(payload_dict)
-        text = get_report_text(
-            payload,
-            delta_summary=delta_summary,
-            site_check_memos=site_check_memos,
-            todo_checks=todo_checks,
-            adopted_todos=adopted_todos,
-            pins=pins,
-        )
-        return {"text": text}
+        payload, overlays = await asyncio.to_thread(_load_report_request, body)
+        key = render_key(fmt, payload, overlays=overlays)
+        if etag_matches(if_none_match, key):
+            return _not_modified(key)
+        text = await _render_text(payload, key=key, fmt=fmt, **overlays)
+        return JSONResponse({"text": text, "format": fmt}, headers={"ETag": f'"{key}"'})
+    except HTTPException:
+        raise
+    except (RenderPoolBusy, RenderTimeout) as exc:
+        raise _render_error(exc)
     except PydanticValidationError as exc:
         logger.warning("Report text payload validation error: %s", exc)
         raise HTTPException(status_code=400, detail=exc.errors()[0].get("msg", str(exc)) if exc.errors() else str(exc))
@@ -252,40 +906,42 @@ async def export_report_text(body: dict[str, Any]):
 async def export_report_pdf(
     body: dict[str, Any],
     variant: str | None = None,
+    stream: bool | None = None,
+    if_none_match: str | None = Header(None),
 ):
+    """PDF レポート。stream=true（未指定なら PDF_STREAM_MIN_ITEMS 件以上のとき）は描画プロセスが
+    一時ファイルに書き出し、API プロセスは本文をメモリに載せずに分割して送る（キャッシュには載せない）。"""
     try:
-        delta_summary = body.get("delta_summary") if isinstance(body, dict) else None
-        site_check_memos = body.get("site_check_memos") if isinstance(body, dict) else None
-        todo_checks = body.get("todo_checks") if isinstance(body, dict) else None
-        adopted_todos = body.get("adopted_todos") if isinstance(body, dict) else None
-        pins = body.get("pins") if isinstance(body, dict) else None
-        payload_dict = {
-            k: v
-            for k, v in (body or {}).items()
-            if k not in ("delta_summary", "site_check_memos", "todo_checks", "adopted_todos", "pins")
-        }
-        payload = SimulationResponse.model_validate(payload_dict)
+        payload, overlays = await asyncio.to_thread(_load_report_request, body)
         sim_id = getattr(payload, "simulation_id", None) or ""
         if not sim_id:
             raise HTTPException(status_code=400, detail="simulation_id is required for PDF report.")
-        pdf_bytes = build_pdf(
-            payload,
-            variant=(variant or "full"),
-            delta_summary=delta_summary,
-            site_check_memos=site_check_memos,
-            todo_checks=todo_checks,
-            adopted_todos=adopted_todos,
-            pins=pins,
-        )
+        pdf_variant = variant or "full"
+        key = render_key("pdf", payload, pdf_variant, overlays)
+        if etag_matches(if_none_match, key):
+            return _not_modified(key)
         suffix = "_1page" if (variant or "").strip().lower() == "one_page" else ""
         filename = f"FlowGuard_Report_{sim_id[:8]}{suffix}.pdf"
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f'attachment; filename="{filename}"',
-            },
-        )
+        headers = {
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "ETag": f'"{key}"',
+        }
+        pdf_bytes = render_cache.get(key) if render_cache is not None else None
+        if pdf_bytes is None:
+            ir = _report_ir(payload, overlays)
+            if stream if stream is not None else ir.item_count() >= PDF_STREAM_MIN_ITEMS:
+                path = await _render_pdf_file(ir, pdf_variant)
+                headers["Content-Length"] = str(os.path.getsize(path))
+                # 送り終えても、本文を送る前に切断されても一時ファイルを消す
+                return _ClosingStreamingResponse(
+                    _stream_file(path), lambda: _unlink_quietly(path), media_type="application/pdf", headers=headers
+                )
+            pdf_bytes = await _render_pdf_ir(ir, pdf_variant, key)
+        return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+    except HTTPException:
+        raise
+    except (RenderPoolBusy, RenderTimeout) as exc:
+        raise _render_error(exc)
     except PydanticValidationError as exc:
         logger.warning("PDF report payload validation error: %s", exc)
         raise HTTPException(status_code=400, detail=exc.errors()[0].get("msg", str(exc)) if exc.errors() else str(exc))
@@ -301,6 +957,98 @@ async def export_report_pdf(
         raise HTTPException(status_code=500, detail=detail)
 
 
+DEFAULT_BUNDLE_VARIANTS = ("full", "one_page", "role_organizer", "role_security", "role_local_gov", "role_venue_manager")
+
+
+def _bundle_variants(variants: str | None) -> list[str]:
+    if not variants:
+        return list(DEFAULT_BUNDLE_VARIANTS)
+    wanted = list(dict.fromkeys(v.strip().lower() for v in variants.split(",") if v.strip()))
+    unknown = [v for v in wanted if v not in PDF_VARIANTS]
+    if unknown or not wanted:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown variants: {', '.join(unknown) or '(none)'}. Allowed: {', '.join(PDF_VARIANTS)}",
+        )
+    return wanted
+
+
+@app.post("/api/report/bundle")
+async def export_report_bundle(
+    body: dict[str, Any],
+    variants: str | None = None,
+    fmt: str = Query("zip", alias="format"),
+):
+    """複数 variant の PDF を 1 リクエストで出力する。本文の検証・差分の集計は 1 回だけ行い、
+    各 variant は描画プールで並列に描画する。format=zip は ZIP、format=multipart は
+    描画が終わった順に multipart/mixed で流す（最初のファイルが全体の完了を待たずに届く）。"""
+    if fmt not in ("zip", "multipart"):
+        raise HTTPException(status_code=400, detail="format must be 'zip' or 'multipart'.")
+    wanted = _bundle_variants(variants)
+    try:
+        payload, overlays = await asyncio.to_thread(_load_report_request, body)
+    except HTTPException:
+        raise
+    except PydanticValidationError as exc:
+        logger.warning("Bundle payload validation error: %s", exc)
+        raise HTTPException(status_code=400, detail=exc.errors()[0].get("msg", str(exc)) if exc.errors() else str(exc))
+    sim_id = payload.simulation_id or ""
+    if not sim_id:
+        raise HTTPException(status_code=400, detail="simulation_id is required for PDF report.")
+
+    async def render(v: str) -> tuple[str, bytes]:
+        return v, await _render_pdf(payload, v, render_key("pdf", payload, v, overlays), **overlays)
+
+    def filename(v: str) -> str:
+        return f"FlowGuard_Report_{sim_id[:8]}_{v}.pdf"
+
+    if fmt == "zip":
+        try:
+            rendered = dict(await asyncio.gather(*(render(v) for v in wanted)))
+        except (RenderPoolBusy, RenderTimeout) as exc:
+            raise _render_error(exc)
+        except Exception as exc:
+            logger.exception("Bundle generation failed: %s", exc)
+            raise HTTPException(status_code=500, detail="Report generation failed.")
+        buffer = io.BytesIO()
+        # PDF は圧縮済みなので無圧縮で格納する
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+            for v in wanted:
+                zf.writestr(filename(v), rendered[v])
+        return Response(
+            content=buffer.getvalue(),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="FlowGuard_Reports_{sim_id[:8]}.zip"'},
+        )
+
+    boundary = uuid.uuid4().hex
+
+    async def render_part(v: str) -> tuple[str, bytes | Exception]:
+        try:
+            return await render(v)
+        except Exception as exc:
+            return v, exc
+
+    async def parts():
+        for task in asyncio.as_completed([render_part(v) for v in wanted]):
+            v, result = await task
+            if isinstance(result, Exception):
+                logger.warning("Bundle part %s failed: %s", v, result)
+                error = json.dumps({"variant": v, "error": type(result).__name__, "detail": str(result)[:200]})
+                yield (f"--{boundary}\r\nContent-Type: application/json\r\n\r\n{error}\r\n").encode("utf-8")
+                continue
+            head = (
+                f"--{boundary}\r\n"
+                "Content-Type: application/pdf\r\n"
+                f'Content-Disposition: attachment; filename="{filename(v)}"\r\n'
+                f"X-Report-Variant: {v}\r\n\r\n"
+            )
+            yield head.encode("utf-8") + result + b"\r\n"
+        yield f"--{boundary}--\r\n".encode("utf-8")
+
+    return StreamingResponse(parts(), media_type=f"multipart/mixed; boundary={boundary}")
+
+
 if __name__ == "__main__":
     import uvicorn
 
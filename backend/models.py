@@ -53,6 +53,12 @@ class AlertThreshold(str, Enum):
     AGGRESSIVE = "aggressive"
 
 
+class AnalysisTier(str, Enum):
+    FAST = "fast"
+    STANDARD = "standard"
+    DEEP = "deep"
+
+
 class LatLng(BaseModel):
     lat: float = Field(..., ge=-90, le=90)
     lng: float = Field(..., ge=-180, le=180)
@@ -73,6 +79,23 @@ class SimulationRequest(BaseModel):
     locale: str = Field(default="ja", pattern=r"^(ja|en)$")
     role: UserRole | None = Field(None, description="Viewpoint role for output tailoring")
     alert_threshold: AlertThreshold | None = Field(None, description="Alert sensitivity")
+    bilingual: bool = Field(False, description="Also generate English text fields in the same run (locale ja only)")
+    analysis_tier: AnalysisTier = Field(
+        AnalysisTier.STANDARD,
+        description="fast: quick planning check / standard / deep: final review (model, thinking, output size)",
+    )
+
+
+class WhatIfVariant(BaseModel):
+    expected_attendance: int | None = Field(None, ge=1, le=10_000_000)
+    temperature_celsius: float | None = Field(None, ge=-40, le=55)
+    precipitation_probability: float | None = Field(None, ge=0, le=100)
+    weather_condition: WeatherCondition | None = None
+
+
+class PreAssessVariantsRequest(BaseModel):
+    base: SimulationRequest
+    variants: list[WhatIfVariant] = Field(default_factory=list, max_length=1000)
 
 
 class RiskLocation(BaseModel):
@@ -80,6 +103,24 @@ class RiskLocation(BaseModel):
     radius_meters: float = Field(..., ge=0)
 
 
+class RiskItemText(BaseModel):
+    """バイリンガル生成時の英語の文面（リストは日本語と同じ件数・順序）。"""
+    title: str = ""
+    description: str = ""
+    location_description: str = ""
+    evidence: str = ""
+    mitigation_actions: list[str] = Field(default_factory=list)
+    cascading_risks: list[str] = Field(default_factory=list)
+
+
+class SimulationText(BaseModel):
+    """バイリンガル生成時の結果全体の英語の文面。"""
+    event_name: str = ""
+    event_location: str = ""
+    summary: str = ""
+    recommendations: list[str] = Field(default_factory=list)
+
+
 class RiskItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4())[:8])
     category: RiskCategory
@@ -95,6 +136,7 @@ class RiskItem(BaseModel):
     urgency: float | None = Field(None, ge=0, le=10)
     execution_difficulty: float | None = Field(None, ge=0, le=10)
     evidence: str = Field(default="", description="Root cause / which inputs drove this risk")
+    en: RiskItemText | None = Field(None, description="English text fields (bilingual runs only)")
 
 
 class TrafficPrediction(BaseModel):
@@ -190,6 +232,40 @@ class MitigationImpact(BaseModel):
     indicators_improved: list[str] = Field(default_factory=list)
 
 
+class ModelCallUsage(BaseModel):
+    """1 回のモデル呼び出し（失敗した試行も 1 件）。"""
+    stage: str
+    model: str
+    attempt: int = 1
+    ok: bool = True
+    latency_ms: float = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    thinking_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float | None = Field(None, description="Estimate from MODEL_PRICES; None for models without a price")
+
+
+class ModelUsageTotals(BaseModel):
+    calls: int = 0
+    failed: int = 0
+    latency_ms: float = Field(0, description="Sum of call latencies (parallel calls overlap)")
+    max_latency_ms: float = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    thinking_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float | None = None
+
+
+class SimulationUsage(BaseModel):
+    """シミュレーション（と、その結果の翻訳）のモデル呼び出しの内訳。"""
+    wall_ms: float = Field(0, description="Wall time of the runs that made these calls")
+    total: ModelUsageTotals = Field(default_factory=ModelUsageTotals)
+    by_stage: dict[str, ModelUsageTotals] = Field(default_factory=dict)
+    calls: list[ModelCallUsage] = Field(default_factory=list)
+
+
 class SimulationResponse(BaseModel):
     simulation_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     event_name: str
@@ -212,3 +288,8 @@ class SimulationResponse(BaseModel):
     map_routes: list[MapRouteSegment] = Field(default_factory=list)
     change_history: list[ChangeHistoryEntry] = Field(default_factory=list)
     mitigation_impacts: list[MitigationImpact] = Field(default_factory=list)
+    provisional: bool = Field(False, description="True for the rule-based pre-assessment returned before the AI result")
+    translation_locale: str | None = Field(None, description="Set on machine-translated copies (e.g. 'en'); the stored variant key")
+    en: SimulationText | None = Field(None, description="English summary fields (bilingual runs only)")
+    analysis_tier: str = Field("standard", description="Analysis tier the result was produced with")
+    usage: SimulationUsage | None = Field(None, description="Per-call model usage (tokens, latency, estimated cost)")
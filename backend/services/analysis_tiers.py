@@ -0,0 +1,133 @@
+"""解析の段階（fast / standard / deep）ごとのモデル・推論量・出力量・件数の目標。
+
+SimulationRequest.analysis_tier で選ぶ。standard はこれまでの挙動（MODEL_ID、gemini-3-pro なら
+thinking HIGH、単一モデルかマルチエージェントかは USE_MULTI_AGENT）と同じ。
+
+目安（1 回の解析。モデルの混雑状況で前後する）:
+  fast     gemini-2.5-flash・推論なし・単一呼び出し・6〜10 件       数秒〜15 秒 / standard の 1/10 程度のコスト
+  standard MODEL_ID・推論 HIGH（gemini-3-pro）・10〜20 件           30〜90 秒
+  deep     MODEL_ID・推論 HIGH・6 カテゴリ並列 + 合成・各 3〜8 件   60〜180 秒 / standard の 2〜3 倍のコスト
+fast は企画初期の当たり付け、deep は最終レビュー向け。
+"""
+
+import os
+
+from google.genai import types
+
+from models import AnalysisTier
+
+# 推論量: None はモデルの既定（設定を送らない）、"off" は推論なし（gemini-2.5 の flash 系のみ）
+ThinkingLevel = str | None
+
+
+class TierProfile:
+    def __init__(
+        self,
+        tier: AnalysisTier,
+        model_id: str,
+        synthesis_model_id: str,
+        thinking: ThinkingLevel,
+        agent_thinking: ThinkingLevel,
+        max_output_tokens: int,
+        category_max_output_tokens: int,
+        synthesis_max_output_tokens: int,
+        risk_count: tuple[int, int],
+        category_risk_count: tuple[int, int],
+        recommendation_count: tuple[int, int],
+        multi_agent: bool | None,
+    ) -> None:
+        self.tier = tier
+        self.model_id = model_id
+        self.synthesis_model_id = synthesis_model_id
+        # 単一モデルの解析 / カテゴリ別エージェントと合成
+        self.thinking = thinking
+        self.agent_thinking = agent_thinking
+        self.max_output_tokens = max_output_tokens
+        self.category_max_output_tokens = category_max_output_tokens
+        self.synthesis_max_output_tokens = synthesis_max_output_tokens
+        self.risk_count = risk_count
+        self.category_risk_count = category_risk_count
+        self.recommendation_count = recommendation_count
+        # None は USE_MULTI_AGENT に従う
+        self.multi_agent = multi_agent
+
+    def use_multi_agent(self) -> bool:
+        if self.multi_agent is not None:
+            return self.multi_agent
+        return os.environ.get("USE_MULTI_AGENT", "").strip().lower() in ("1", "true", "yes")
+
+    def describe(self) -> dict:
+        return {
+            "tier": self.tier.value,
+            "model": self.model_id,
+            "synthesis_model": self.synthesis_model_id,
+            "thinking": self.thinking,
+            "max_output_tokens": self.max_output_tokens,
+            "risk_count": list(self.risk_count),
+            "multi_agent": self.use_multi_agent(),
+        }
+
+
+def thinking_config(model_id: str, level: ThinkingLevel) -> types.ThinkingConfig | None:
+    """推論量をモデルの系列に合わせた設定にする（gemini-3 は thinking_level、gemini-2.5 は thinking_budget）。"""
+    if level is None:
+        return None
+    if "gemini-3" in model_id:
+        # gemini-3 は推論を無効にできないため off は LOW として扱う
+        return types.ThinkingConfig(
+            thinking_level=types.ThinkingLevel.HIGH if level == "high" else types.ThinkingLevel.LOW
+        )
+    if level == "off":
+        return types.ThinkingConfig(thinking_budget=0) if "flash" in model_id else None
+    return types.ThinkingConfig(thinking_budget=1024 if level == "low" else -1)
+
+
+def build_profiles(model_id: str | None = None) -> dict[AnalysisTier, TierProfile]:
+    model_id = model_id or os.getenv("MODEL_ID", "gemini-3-pro-preview")
+    fast_model = os.getenv("ANALYSIS_FAST_MODEL_ID", "gemini-2.5-flash")
+    deep_model = os.getenv("ANALYSIS_DEEP_MODEL_ID", model_id)
+    high = "high" if "gemini-3-pro" in model_id else None
+    return {
+        AnalysisTier.FAST: TierProfile(
+            AnalysisTier.FAST,
+            model_id=fast_model,
+            synthesis_model_id=fast_model,
+            thinking="off",
+            agent_thinking="off",
+            max_output_tokens=6144,
+            category_max_output_tokens=3072,
+            synthesis_max_output_tokens=2048,
+            risk_count=(6, 10),
+            category_risk_count=(1, 3),
+            recommendation_count=(3, 6),
+            multi_agent=False,
+        ),
+        AnalysisTier.STANDARD: TierProfile(
+            AnalysisTier.STANDARD,
+            model_id=model_id,
+            synthesis_model_id=model_id,
+            thinking=high,
+            agent_thinking=None,
+            max_output_tokens=16384,
+            category_max_output_tokens=8192,
+            synthesis_max_output_tokens=4096,
+            risk_count=(10, 20),
+            category_risk_count=(2, 6),
+            recommendation_count=(5, 15),
+            multi_agent=None,
+        ),
+        AnalysisTier.DEEP: TierProfile(
+            AnalysisTier.DEEP,
+            model_id=deep_model,
+            synthesis_model_id=deep_model,
+            thinking="high",
+            agent_thinking="high",
+            max_output_tokens=24576,
+            category_max_output_tokens=12288,
+            synthesis_max_output_tokens=6144,
+            risk_count=(15, 30),
+            category_risk_count=(3, 8),
+            recommendation_count=(8, 15),
+            multi_agent=True,
+        ),
+    }
@@ -0,0 +1,177 @@
+"""アシストの回答キャッシュ（アプリガイドだけで答えられる質問）。
+
+「アラート閾値とは？」「PDF はどう出力する？」のように、プロジェクトのデータを含まない質問は
+APP_GUIDE とシステムプロンプトだけで回答が決まる。正規化した質問の語の集合で近い質問を探し、
+十分に近ければモデルを呼ばずに以前の回答を返す。
+
+- 言語（質問の文字種で判定）とステップごとに別の区画に保持する。
+- 区画はガイドのダイジェスト（システムプロンプト + APP_GUIDE + モデル）を含む。ガイドが変われば古い回答は使わない。
+- 類似度は語の集合のコサイン。日本語はひらがなの連続（助詞・語尾）を除き、漢字・カタカナの連続を文字 bigram にする。
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_S = 86400
+DEFAULT_MIN_SIMILARITY = 0.8
+
+_SCRIPT_RE = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff\u3400-\u4dbf々]+|[\u30a0-\u30ff\uff66-\uff9f]+")
+_JA_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]")
+_EN_STOPWORDS = frozenset(
+    "a an the is are was be do does did i me my we you your it this that what which who whom how when where why "
+    "can could should would will shall may might to of in on for with from by at as about and or not any there "
+    "please tell explain show mean means meaning here use using app".split()
+)
+# 質問の言い回し（「何」「教えて」「方法」「意味」など）で、内容を区別しない語
+_JA_STOPWORDS = frozenset(["何", "教", "方", "方法", "仕方", "意味", "説明"])
+
+
+def question_language(question: str) -> str:
+    return "ja" if _JA_RE.search(question) else "en"
+
+
+def question_terms(question: str) -> frozenset[str]:
+    """類似度に使う語。英単語（ストップワードと複数形の s を除く）と、漢字・カタカナの連続の文字 bigram。"""
+    text = unicodedata.normalize("NFKC", question).lower()
+    terms: set[str] = set()
+    for run in _SCRIPT_RE.findall(text):
+        if run.isascii():
+            if run in _EN_STOPWORDS:
+                continue
+            if len(run) > 3 and run.endswith("s") and not run.endswith("ss"):
+                run = run[:-1]
+            terms.add(run)
+        elif len(run) == 1:
+            terms.add(run)
+        else:
+            terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    return frozenset(terms - _JA_STOPWORDS)
+
+
+def guide_digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()[:16]
+
+
+def _similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / math.sqrt(len(a) * len(b))
+
+
+class _Entry:
+    def __init__(self, question: str, terms: frozenset[str], answer: str) -> None:
+        self.question = question
+        self.terms = terms
+        self.answer = answer
+        self.created_at = time.time()
+        self.hits = 0
+
+
+class AnswerCacheKey:
+    """1 つの質問の検索キー（区画と語の集合）。miss のときは生成した回答をこのキーで登録する。"""
+
+    def __init__(self, bucket: str, question: str, terms: frozenset[str]) -> None:
+        self.bucket = bucket
+        self.question = question
+        self.terms = terms
+
+
+class AssistAnswerCache:
+    """区画（ガイドのダイジェスト・言語・ステップ）ごとの質問 → 回答。全体で LRU・有効期限付き。"""
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl_s: float | None = None,
+        min_similarity: float | None = None,
+    ) -> None:
+        self.max_entries = max_entries or int(os.getenv("ASSIST_ANSWER_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+        self.ttl_s = ttl_s or float(os.getenv("ASSIST_ANSWER_CACHE_TTL_S", DEFAULT_TTL_S))
+        self.min_similarity = min_similarity or float(
+            os.getenv("ASSIST_ANSWER_CACHE_MIN_SIMILARITY", DEFAULT_MIN_SIMILARITY)
+        )
+        self.enabled = self.max_entries > 0
+        self._entries: OrderedDict[tuple[str, frozenset[str]], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = ""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    def key(self, version: str, step: int, question: str) -> AnswerCacheKey:
+        """version はガイドのダイジェスト。前回と違えば（APP_GUIDE が変わった）全件を捨てる。"""
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                    logger.info("Assist answer cache invalidated (guide %s -> %s)", self._version, version)
+                self._entries.clear()
+                self._version = version
+        bucket = f"{version}:{question_language(question)}:{step}"
+        return AnswerCacheKey(bucket, question, question_terms(question))
+
+    def get(self, key: AnswerCacheKey) -> str | None:
+        if not self.enabled or not key.terms:
+            return None
+        now = time.time()
+        with self._lock:
+            best: tuple[str, frozenset[str]] | None = None
+            best_sim = 0.0
+            exact = (key.bucket, key.terms)
+            if exact in self._entries:
+                best, best_sim = exact, 1.0
+            else:
+                for entry_key, entry in self._entries.items():
+                    if entry_key[0] != key.bucket:
+                        continue
+                    sim = _similarity(key.terms, entry.terms)
+                    if sim > best_sim:
+                        best, best_sim = entry_key, sim
+            if best is not None and best_sim >= self.min_similarity:
+                entry = self._entries[best]
+                if now - entry.created_at < self.ttl_s:
+                    self._entries.move_to_end(best)
+                    entry.hits += 1
+                    self.hits += 1
+                    return entry.answer
+                del self._entries[best]
+            self.misses += 1
+            return None
+
+    def put(self, key: AnswerCacheKey, answer: str) -> None:
+        if not self.enabled or not key.terms or not answer:
+            return
+        with self._lock:
+            if not key.bucket.startswith(self._version + ":"):
+                return  # 生成中にガイドが変わった
+            self._entries[(key.bucket, key.terms)] = _Entry(key.question, key.terms, answer)
+            self._entries.move_to_end((key.bucket, key.terms))
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+        }
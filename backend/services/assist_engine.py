@@ -1,9 +1,20 @@
+import asyncio
 import logging
 import os
+import time
+from collections import deque
+from typing import AsyncIterator
 
-from google import genai
 from google.genai import types
 
+from services.assist_answer_cache import AnswerCacheKey, AssistAnswerCache, guide_digest
+from services.assist_memory import ConversationMemory, ConversationTurn
+from services.assist_session import AssistSession, AssistSessionStore, make_provider, static_digest
+from services.llm_backend import LLMBackend, make_backend
+from services.model_routing import STAGE_METRICS, ModelRouter, StageTimer
+from services.model_usage import UsageLedger, usage_ledger
+from services.report_retrieval import ReportRetriever
+
 logger = logging.getLogger(__name__)
 
 APP_GUIDE = """
@@ -64,7 +75,7 @@ PDFフル版を出力すると、以下の構成の文章・データが含ま
 ASSIST_SYSTEM_PROMPT = """You are a helpful in-app assistant for "FlowGuard AI", an event risk simulation application.
 Answer the user's questions based on (1) the app guide below and (2) the "Current app state" when provided.
 
-When "Report content" (PDFフル版と同じ構成のレポート本文) is provided in the state: use it as the primary source to answer concrete questions about the current project (e.g. 最大の問題、深刻なリスク、何をすべきか、推奨、対策一覧). The report content is the same as what the user would see in the exported PDF; cite it directly to give accurate, situation-specific answers.
+When "Report excerpts" (PDFフル版と同じ構成のレポート本文のうち、質問に関係する節・リスク) are provided in the state: use them as the primary source to answer concrete questions about the current project (e.g. 最大の問題、深刻なリスク、何をすべきか、推奨、対策一覧). The excerpts are taken from what the user would see in the exported PDF; cite them directly to give accurate, situation-specific answers.
 
 When no report content is available (e.g. on landing screen), use the other state data if any, or keep guidance brief and point the user to the next step.
 Keep answers short: typically 2–5 sentences. Only give longer explanations when the user explicitly asks for more detail.
@@ -72,47 +83,163 @@ Be concise and practical. Use the same language as the user's question (Japanese
 """
 
 
-class AssistEngine:
+# セッションの静的コンテキストに入れるキー（質問ごとに変わらない分析結果）。それ以外は質問ごとに送る状態。
+# report_text はセッションに保持し、質問に関係する抜粋だけを質問ごとに送る
+STATIC_CONTEXT_KEYS = ("event_name", "summary", "recommendations", "risks", "report_text")
+
+
+# 会話の要約に使うモデル（回答用より安いもの）
+DEFAULT_SUMMARY_MODEL_ID = "gemini-2.5-flash-lite"
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and the FlowGuard AI in-app assistant.
+Merge the previous summary with the new exchanges below. Keep the user's goals, facts about their event, decisions,
+answers that were given and open questions; drop greetings and repetition. Write at most {max_chars} characters,
+plain text, in the same language as the conversation.
+
+[Previous summary]
+{summary}
+
+[New exchanges]
+{exchanges}
+"""
+
+# ストリーミング中、断片がこの秒数届かなければ ping を挟む（切断の検出とプロキシのタイムアウト回避）
+DEFAULT_STREAM_PING_S = 2.0
+LATENCY_WINDOW = 256
+
+
+class AssistSessionExpired(Exception):
+    """context_digest 付きの質問に対応するセッションが無い（期限切れ・再起動）。全文の再送が必要。"""
+
+
+class AssistTurn:
+    """1 回の質問。prepare() が prompt と config を決め、ask() / stream() が実行する。
+    answer が先に決まっている（空の質問など）ときはモデルを呼ばない。"""
+
+    def __init__(self, session: AssistSession | None, started: float | None = None) -> None:
+        self.session = session
+        # 質問したクライアントの会話メモリ（セッションがあるときだけ）
+        self.memory: ConversationMemory | None = None
+        self.started = started if started is not None else time.perf_counter()
+        self.question = ""
+        self.prompt = ""
+        self.config: types.GenerateContentConfig | None = None
+        self.answer: str | None = None
+        self.first_token_at: float | None = None
+        self.emitted = 0
+        # アプリガイドだけで答える質問のとき、回答キャッシュのキー。cached は回答がキャッシュから来たか
+        self.cache_key: AnswerCacheKey | None = None
+        self.cached = False
+        # ストリーミングでモデルを呼んだときの使用量（呼び出しタスクの台帳）
+        self.usage: UsageLedger | None = None
+
+    def meta(self) -> dict:
+        if self.session is None:
+            return {"session_id": None, "context_digest": None}
+        return {"session_id": self.session.session_id, "context_digest": self.session.digest}
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+class AssistLatency:
+    """アシストの応答時間。最初の断片まで（TTFT）と全体を分けて、直近 LATENCY_WINDOW 件の p50 / p95 を出す。"""
+
     def __init__(self) -> None:
+        self._ttft_ms: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._total_ms: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.streams = 0
+        self.cancelled = 0
+        self.superseded = 0
+        self.errors = 0
+
+    def record_total(self, seconds: float) -> float:
+        ms = seconds * 1000
+        self._total_ms.append(ms)
+        return ms
+
+    def finish(self, turn: AssistTurn) -> dict:
+        """完了したストリームの計測値（done イベントに載せる）。"""
+        now = time.perf_counter()
+        first = turn.first_token_at if turn.first_token_at is not None else now
+        ttft_ms = (first - turn.started) * 1000
+        self._ttft_ms.append(ttft_ms)
+        total_ms = self.record_total(now - turn.started)
+        return {"ttft_ms": round(ttft_ms, 1), "total_ms": round(total_ms, 1), "chars": turn.emitted}
+
+    def stats(self) -> dict:
+        ttft = list(self._ttft_ms)
+        total = list(self._total_ms)
+        return {
+            "streams": self.streams,
+            "cancelled": self.cancelled,
+            "superseded": self.superseded,
+            "errors": self.errors,
+            "ttft_ms_p50": _percentile(ttft, 0.5),
+            "ttft_ms_p95": _percentile(ttft, 0.95),
+            "total_ms_p50": _percentile(total, 0.5),
+            "total_ms_p95": _percentile(total, 0.95),
+        }
+
+
+class AssistEngine:
+    def __init__(self, backend: LLMBackend | None = None) -> None:
         self._project_id = os.getenv("PROJECT_ID", "flowguard-hackathon-2026")
-        self._location = os.getenv("LOCATION", "us-central1")
-        self._model_id = os.getenv("MODEL_ID", "gemini-2.5-flash")
-        self._client = genai.Client(
-            vertexai=True,
-            project=self._project_id,
-            location=self._location,
+        # アシストには解析の段階が無いため、ルート表（assist / assist.summary）は起動時に 1 回だけ解決する。
+        # コンテキストキャッシュはモデルごとなので、呼び出しのたびにモデルを変えることはしない
+        router = ModelRouter()
+        route = router.route("assist")
+        self._model_id = route.model or os.getenv("MODEL_ID", "gemini-2.5-flash")
+        self._location = route.location or os.getenv("LOCATION", "us-central1")
+        self.backend = backend or make_backend(self._project_id, self._location)
+        self._system_instruction = ASSIST_SYSTEM_PROMPT + "\n\n" + APP_GUIDE
+        self._config = route.config(
+            types.GenerateContentConfig(
+                system_instruction=self._system_instruction,
+                temperature=0.3,
+                max_output_tokens=1024,
+            )
         )
-        self._config = types.GenerateContentConfig(
-            system_instruction=ASSIST_SYSTEM_PROMPT + "\n\n" + APP_GUIDE,
-            temperature=0.3,
-            max_output_tokens=1024,
+        self._summary_route = router.route("assist.summary")
+        self.sessions = AssistSessionStore()
+        self._cache_provider = make_provider(self.backend.client_for(self._location), self._model_id)
+        self._background: set[asyncio.Task] = set()
+        self._streams: dict[str, asyncio.Task] = {}
+        self._stream_ping_s = float(os.getenv("ASSIST_STREAM_PING_S", DEFAULT_STREAM_PING_S))
+        self.latency = AssistLatency()
+        self.retriever = ReportRetriever()
+        self.answers = AssistAnswerCache()
+        self._summary_model_id = self._summary_route.model or os.getenv(
+            "ASSIST_SUMMARY_MODEL_ID", DEFAULT_SUMMARY_MODEL_ID
         )
-        logger.info("AssistEngine initialised (model=%s)", self._model_id)
+        self.summaries = 0
+        self.summary_failures = 0
+        self.summarized_turns = 0
+        logger.info("AssistEngine initialised (model=%s, context_cache=%s)", self._model_id, self._cache_provider.name)
 
-    def _build_prompt(self, question: str, context: dict | None) -> str:
-        if not context:
-            return question
-        parts = ["[Current app state]"]
+    def _state_lines(self, context: dict) -> list[str]:
+        """質問ごとに変わりうる状態（ステップ・進捗・次にやるべき提案・ToDo・対策効果）。"""
+        parts = []
         if context.get("step") is not None:
             steps = ["Event setup", "Area designation", "Risk analysis dashboard"]
             step_idx = int(context["step"]) if isinstance(context.get("step"), (int, float)) else 0
             parts.append(f"Step: {steps[min(step_idx, 2)]} ({step_idx + 1}/3).")
             if step_idx == 0 and not context.get("risks") and not context.get("next_action_proposals"):
                 parts.append("On landing screen. No project joined. No analysis data yet.")
-        if context.get("event_name"):
-            parts.append(f"Event: {context['event_name']}.")
         if context.get("risk_count") is not None:
             parts.append(f"Risk count: {context['risk_count']} items.")
         if context.get("overall_risk_score") is not None:
             parts.append(f"Overall risk score: {context['overall_risk_score']}.")
-        if context.get("summary"):
-            parts.append(f"Summary: {context['summary'][:800]}.")
-        if context.get("recommendations") and isinstance(context["recommendations"], list):
-            recs = context["recommendations"][:15]
-            parts.append("Recommendations:")
-            for i, r in enumerate(recs, 1):
-                if isinstance(r, str) and r.strip():
-                    parts.append(f"  {i}. {r.strip()[:300]}")
+        effect = context.get("mitigation_effect")
+        if isinstance(effect, dict) and effect.get("riskScoreBefore") is not None:
+            line = f"Mitigation effect (checked ToDos): risk score {effect['riskScoreBefore']:.1f} → {effect.get('riskScoreAfter', effect['riskScoreBefore']):.1f}"
+            if effect.get("dangerCountBefore") is not None:
+                line += f", danger points {effect['dangerCountBefore']} → {effect.get('dangerCountAfter')}"
+            parts.append(line + ".")
         if context.get("next_action_proposals") and isinstance(context["next_action_proposals"], list):
             parts.append("Next action proposals (次にやるべき確認・対策):")
             for i, p in enumerate(context["next_action_proposals"][:15], 1):
@@ -121,6 +248,35 @@ class AssistEngine:
                     reason = (p.get("reason") or "").strip()[:200]
                     source = p.get("source") or ""
                     parts.append(f"  {i}. {title}. Reason: {reason}. (source: {source})")
+        if context.get("todos") and isinstance(context["todos"], list):
+            parts.append("ToDo list (action, who, done):")
+            for i, t in enumerate(context["todos"][:25], 1):
+                if isinstance(t, dict):
+                    action = (t.get("action") or "").strip() or "(no action)"
+                    who = (t.get("who") or "").strip() or "?"
+                    done = "done" if t.get("checked") else "not done"
+                    parts.append(f"  {i}. {action} (by {who}) - {done}.")
+        if context.get("todo_checked_count") is not None and context.get("todo_total_count") is not None:
+            parts.append(f"ToDo progress: {context['todo_checked_count']}/{context['todo_total_count']} done.")
+        if context.get("pins_count") is not None:
+            parts.append(f"Pins on map: {context['pins_count']}.")
+        if context.get("map_todos_count") is not None:
+            parts.append(f"Map ToDos: {context['map_todos_count']}.")
+        return parts
+
+    def _static_lines(self, context: dict) -> list[str]:
+        """質問をまたいで変わらない分析結果（イベント・要約・推奨・リスク）。レポート本文は _report_lines で抜粋する。"""
+        parts = []
+        if context.get("event_name"):
+            parts.append(f"Event: {context['event_name']}.")
+        if context.get("summary"):
+            parts.append(f"Summary: {context['summary'][:800]}.")
+        if context.get("recommendations") and isinstance(context["recommendations"], list):
+            recs = context["recommendations"][:15]
+            parts.append("Recommendations:")
+            for i, r in enumerate(recs, 1):
+                if isinstance(r, str) and r.strip():
+                    parts.append(f"  {i}. {r.strip()[:300]}")
         if context.get("risks") and isinstance(context["risks"], list):
             parts.append("Risks (severity, importance, urgency 1-10, title, description, mitigation_actions):")
             for i, r in enumerate(context["risks"][:20], 1):
@@ -139,40 +295,366 @@ class AssistEngine:
                         for ma in mit[:5]:
                             if isinstance(ma, str) and ma.strip():
                                 parts.append(f"      → 対策: {ma.strip()[:150]}")
-        if context.get("todos") and isinstance(context["todos"], list):
-            parts.append("ToDo list (action, who, done):")
-            for i, t in enumerate(context["todos"][:25], 1):
-                if isinstance(t, dict):
-                    action = (t.get("action") or "").strip() or "(no action)"
-                    who = (t.get("who") or "").strip() or "?"
-                    done = "done" if t.get("checked") else "not done"
-                    parts.append(f"  {i}. {action} (by {who}) - {done}.")
-        if context.get("todo_checked_count") is not None and context.get("todo_total_count") is not None:
-            parts.append(f"ToDo progress: {context['todo_checked_count']}/{context['todo_total_count']} done.")
-        if context.get("pins_count") is not None:
-            parts.append(f"Pins on map: {context['pins_count']}.")
-        if context.get("map_todos_count") is not None:
-            parts.append(f"Map ToDos: {context['map_todos_count']}.")
-        if context.get("report_text") and isinstance(context["report_text"], str) and context["report_text"].strip():
-            parts.append("[Report content - use this to answer concrete questions about the current project]")
-            parts.append(context["report_text"].strip()[:12000])
-            parts.append("")
+        return parts
+
+    @staticmethod
+    def _guide_only(context: dict | None) -> bool:
+        """プロジェクトのデータを含まない（アプリガイドだけで答えが決まる）質問か。step 以外がすべて空なら True。"""
+        if not context:
+            return True
+        return all(k == "step" or v is None or v == "" or v == 0 or v == [] or v == {} for k, v in context.items())
+
+    @staticmethod
+    def _report_text(context: dict | None) -> str:
+        text = (context or {}).get("report_text")
+        return text.strip() if isinstance(text, str) else ""
+
+    @staticmethod
+    def _report_lines(excerpts: str) -> list[str]:
+        if not excerpts:
+            return []
+        return ["[Report excerpts - the parts of the report relevant to the question]", excerpts, ""]
+
+    def _build_prompt(self, question: str, context: dict | None, excerpts: str = "") -> str:
+        if not context:
+            return question
+        parts = ["[Current app state]"]
+        parts.extend(self._state_lines(context))
+        parts.extend(self._static_lines(context))
+        parts.extend(self._report_lines(excerpts))
         parts.append("[User question]")
         parts.append(question)
         return "\n".join(parts)
 
-    async def answer(self, question: str, context: dict | None = None) -> str:
-        if not (question or str(question).strip()):
-            return "質問を入力してください。"
-        prompt = self._build_prompt(str(question).strip(), context)
+    def _session_prompt(
+        self, question: str, context: dict | None, excerpts: str = "", memory: ConversationMemory | None = None
+    ) -> str:
+        parts = memory.prompt_lines() if memory is not None else []
+        parts.append("[Current app state]")
+        parts.extend(self._state_lines(context or {}))
+        parts.extend(self._report_lines(excerpts))
+        parts.append("[User question]")
+        parts.append(question)
+        return "\n".join(parts)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _discard(self, handles: list[str | None]) -> None:
+        """外れたセッションのプロバイダ側キャッシュをバックグラウンドで削除する。"""
+        for handle in handles:
+            if handle:
+                self._spawn(self._cache_provider.delete(handle))
+
+    def _remember(self, turn: AssistTurn, answer: str) -> None:
+        """質問したクライアントの会話メモリに追加し、直近の枠から溢れた分があればバックグラウンドで要約する。"""
+        memory = turn.memory
+        if memory is None or not answer:
+            return
+        if memory.add(turn.question, answer) and not memory.summarizing:
+            memory.summarizing = True
+            self._spawn(self._summarize(memory))
+
+    async def _summarize(self, memory: ConversationMemory) -> None:
+        """要約待ちを安いモデルでこれまでの要約にまとめる（回答のクリティカルパスの外）。失敗したら質問だけを残す。"""
         try:
-            response = await self._client.aio.models.generate_content(
-                model=self._model_id,
-                contents=prompt,
-                config=self._config,
+            while memory.pending:
+                batch: list[ConversationTurn] = memory.take_pending()
+                exchanges = "\n".join(f"User: {t.question}\nAssistant: {t.answer}" for t in batch)
+                prompt = SUMMARY_PROMPT.format(
+                    max_chars=memory.summary_tokens, summary=memory.summary or "(none)", exchanges=exchanges
+                )
+                try:
+                    async with StageTimer(STAGE_METRICS, "assist.summary", self._summary_model_id) as timer:
+                        response = await self.backend.generate(
+                            self._summary_model_id,
+                            prompt,
+                            self._summary_route.config(
+                                types.GenerateContentConfig(temperature=0.2, max_output_tokens=memory.summary_tokens * 2)
+                            ),
+                            self._summary_route.location or self._location,
+                        )
+                        timer.usage = response.usage_metadata
+                    summary = (response.text or "").strip()
+                    if not summary:
+                        raise ValueError("empty summary")
+                    memory.fold(summary)
+                    self.summaries += 1
+                    self.summarized_turns += len(batch)
+                except Exception as exc:
+                    logger.warning("Assist conversation summary failed (%d turns): %s", len(batch), exc)
+                    memory.restore(batch)
+                    self.summary_failures += 1
+        finally:
+            memory.summarizing = False
+
+    def session_for(self, session_id: str | None, digest: str | None) -> AssistSession | None:
+        """有効なセッションを返す。digest を指定したときは静的コンテキストが一致する場合のみ。"""
+        if not session_id:
+            return None
+        session = self.sessions.get(session_id)
+        if session is None or (digest and session.digest != digest):
+            return None
+        return session
+
+    async def _open_session(self, session_id: str, static_context: str, report_text: str) -> AssistSession:
+        digest = static_digest(self._system_instruction, static_context, report_text)
+        current = self.sessions.get(session_id)
+        if current is not None and current.digest == digest:
+            return current
+        handle = await self._cache_provider.create(
+            session_id, self._system_instruction, static_context, int(self.sessions.ttl_s)
+        )
+        session = AssistSession(
+            session_id, digest, self._system_instruction, static_context, handle, self.sessions.ttl_s, report_text
+        )
+        if current is not None:
+            # 分析結果が変わっても会話は続いている
+            session.memories = current.memories
+        self._discard([s.handle for s in self.sessions.put(session)])
+        logger.info(
+            "Assist session %s opened (static=%d chars, cache=%s)",
+            session_id, len(static_context), "remote" if self._cache_provider.is_remote(handle) else "inline",
+        )
+        return session
+
+    def _session_config(self, session: AssistSession) -> types.GenerateContentConfig:
+        if self._cache_provider.is_remote(session.handle):
+            return types.GenerateContentConfig(
+                cached_content=session.handle,
+                temperature=self._config.temperature,
+                max_output_tokens=self._config.max_output_tokens,
             )
-            text = (response.text or "").strip()
-            return text or "回答を取得できませんでした。もう一度お試しください。"
-        except Exception as exc:
-            logger.exception("Assist answer failed: %s", exc)
-            return "申し訳ありません。一時的に回答できません。しばらくしてから再度お試しください。"
+        return types.GenerateContentConfig(
+            system_instruction=session.system_instruction + "\n\n[Project context]\n" + session.static_context,
+            temperature=self._config.temperature,
+            max_output_tokens=self._config.max_output_tokens,
+        )
+
+    async def _generate(self, prompt: str, config: types.GenerateContentConfig, attempt: int = 1) -> str:
+        async with StageTimer(STAGE_METRICS, "assist", self._model_id, attempt) as timer:
+            response = await self.backend.generate(self._model_id, prompt, config, self._location)
+            timer.usage = response.usage_metadata
+        return (response.text or "").strip()
+
+    async def prepare(
+        self,
+        question: str,
+        context: dict | None = None,
+        session_id: str | None = None,
+        context_digest: str | None = None,
+        started: float | None = None,
+        client_id: str | None = None,
+    ) -> AssistTurn:
+        """1 回の質問の prompt と config を決める。session_id があれば静的コンテキストを 1 回だけ保持し、
+        以降は状態と質問だけを送る。digest 付きでセッションが無ければ AssistSessionExpired。
+        会話メモリは client_id（参加者・タブ）ごとで、同じセッションの別のクライアントとは共有しない。"""
+        static_context = "\n".join(self._static_lines(context or {})) if context else ""
+        report_text = self._report_text(context)
+        has_static = bool(static_context or report_text)
+        session = self.session_for(session_id, context_digest) if not has_static else None
+        if session is None and session_id and has_static:
+            session = await self._open_session(session_id, static_context, report_text)
+        if session is None and context_digest and session_id:
+            raise AssistSessionExpired()
+        turn = AssistTurn(session, started)
+        if session is not None:
+            turn.memory = session.memory_for(client_id)
+        if not (question or str(question).strip()):
+            turn.answer = "質問を入力してください。"
+            return turn
+        question = str(question).strip()
+        turn.question = question
+        if session is None and self._guide_only(context):
+            step = (context or {}).get("step")
+            version = guide_digest(self._system_instruction, self._model_id)
+            turn.cache_key = self.answers.key(version, int(step) if isinstance(step, (int, float)) else 0, question)
+            cached = self.answers.get(turn.cache_key)
+            if cached is not None:
+                turn.answer = cached
+                turn.cached = True
+                return turn
+        if session is not None:
+            report_text = session.report_text
+        # 索引の作成（初回のみ、大きいレポートで数十 ms）はイベントループの外で行う
+        excerpts = await asyncio.to_thread(self.retriever.excerpts, report_text, question) if report_text else ""
+        if session is None:
+            turn.prompt = self._build_prompt(question, context, excerpts)
+            turn.config = self._config
+        else:
+            turn.prompt = self._session_prompt(question, context, excerpts, turn.memory)
+            turn.config = self._session_config(session)
+            session.questions += 1
+        return turn
+
+    def _fallback_inline(self, turn: AssistTurn, exc: Exception) -> bool:
+        """プロバイダ側のキャッシュが使えなければ、静的コンテキストを同送する config に切り替える。"""
+        session = turn.session
+        if session is None or not self._cache_provider.is_remote(session.handle):
+            return False
+        logger.warning("Assist cached content unusable (%s); answering inline: %s", session.handle, exc)
+        self._discard([session.handle])
+        session.handle = None
+        turn.config = self._session_config(session)
+        return True
+
+    async def ask(
+        self,
+        question: str,
+        context: dict | None = None,
+        session_id: str | None = None,
+        context_digest: str | None = None,
+        client_id: str | None = None,
+    ) -> dict:
+        """セッション対応の質問。返り値は {answer, session_id, context_digest}。
+        context_digest はクライアントが次回の軽量リクエストに使う。"""
+        turn = await self.prepare(question, context, session_id, context_digest, client_id=client_id)
+        if turn.answer is None:
+            try:
+                try:
+                    text = await self._generate(turn.prompt, turn.config)
+                except Exception as exc:
+                    if not self._fallback_inline(turn, exc):
+                        raise
+                    text = await self._generate(turn.prompt, turn.config, attempt=2)
+                turn.answer = text or "回答を取得できませんでした。もう一度お試しください。"
+                if text and turn.cache_key is not None:
+                    self.answers.put(turn.cache_key, text)
+                self._remember(turn, text)
+            except Exception as exc:
+                logger.exception("Assist answer failed: %s", exc)
+                turn.answer = "申し訳ありません。一時的に回答できません。しばらくしてから再度お試しください。"
+        self.latency.record_total(time.perf_counter() - turn.started)
+        return {"answer": turn.answer, **turn.meta(), "cached": turn.cached}
+
+    async def _produce(self, turn: AssistTurn, queue: asyncio.Queue) -> None:
+        """モデルのストリームを読み、届いた断片をそのまま queue に積む（別タスク。キャンセルで上流も閉じる）。"""
+
+        async def pump(attempt: int) -> None:
+            async with StageTimer(STAGE_METRICS, "assist", self._model_id, attempt) as timer:
+                stream = await self.backend.stream(self._model_id, turn.prompt, turn.config, self._location)
+                try:
+                    async for chunk in stream:
+                        # 使用量は最後の断片に入る
+                        timer.usage = getattr(chunk, "usage_metadata", None) or timer.usage
+                        text = chunk.text or ""
+                        if text:
+                            turn.emitted += len(text)
+                            queue.put_nowait(("delta", text))
+                finally:
+                    aclose = getattr(stream, "aclose", None)
+                    if aclose is not None:
+                        await aclose()
+
+        # このタスクの呼び出しを turn.usage に記録する（予算の精算に使う）
+        with usage_ledger() as ledger:
+            turn.usage = ledger
+            try:
+                try:
+                    await pump(1)
+                except Exception as exc:
+                    # 何も届いていなければ、静的コンテキストを同送して 1 回だけやり直す
+                    if turn.emitted or not self._fallback_inline(turn, exc):
+                        raise
+                    await pump(2)
+                queue.put_nowait(("end", None))
+            except asyncio.CancelledError:
+                queue.put_nowait(("cancelled", None))
+                raise
+            except Exception as exc:
+                logger.exception("Assist stream failed: %s", exc)
+                queue.put_nowait(("error", str(exc)))
+
+    async def stream(self, turn: AssistTurn, stream_key: str | None = None) -> AsyncIterator[dict]:
+        """回答を断片ごとに返す。イベントは meta → delta* → done / cancelled / error。
+        同じ stream_key（参加者・タブごと）の新しい質問が来たら前のストリームは上流ごと打ち切る（cancelled: superseded）。
+        断片が PING_S 秒届かなければ ping を返す（呼び出し側が切断を確認する機会）。"""
+        yield {"event": "meta", **turn.meta()}
+        if turn.answer is not None:
+            turn.first_token_at = time.perf_counter()
+            turn.emitted = len(turn.answer)
+            yield {"event": "delta", "text": turn.answer}
+            yield {"event": "done", **self.latency.finish(turn), "cached": turn.cached}
+            return
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(self._produce(turn, queue))
+        if stream_key:
+            previous = self._streams.get(stream_key)
+            if previous is not None and not previous.done():
+                previous.cancel()
+                self.latency.superseded += 1
+            self._streams[stream_key] = producer
+        self.latency.streams += 1
+        finished = False
+        collected: list[str] = []
+        try:
+            while True:
+                try:
+                    kind, value = await asyncio.wait_for(queue.get(), timeout=self._stream_ping_s)
+                except TimeoutError:
+                    yield {"event": "ping"}
+                    continue
+                if kind == "delta":
+                    if turn.first_token_at is None:
+                        turn.first_token_at = time.perf_counter()
+                    collected.append(value)
+                    yield {"event": "delta", "text": value}
+                elif kind == "end":
+                    finished = True
+                    if not turn.emitted:
+                        yield {"event": "delta", "text": "回答を取得できませんでした。もう一度お試しください。"}
+                    else:
+                        text = "".join(collected).strip()
+                        if turn.cache_key is not None:
+                            self.answers.put(turn.cache_key, text)
+                        self._remember(turn, text)
+                    yield {"event": "done", **self.latency.finish(turn), "cached": False}
+                    return
+                elif kind == "cancelled":
+                    finished = True
+                    yield {"event": "cancelled", "reason": "superseded"}
+                    return
+                else:
+                    finished = True
+                    self.latency.errors += 1
+                    yield {"event": "error", "message": "申し訳ありません。一時的に回答できません。しばらくしてから再度お試しください。"}
+                    return
+        finally:
+            if not producer.done():
+                producer.cancel()
+            if not finished:
+                # クライアントの切断（パネルを閉じた・中断した）
+                self.latency.cancelled += 1
+            if stream_key and self._streams.get(stream_key) is producer:
+                del self._streams[stream_key]
+
+    async def answer(self, question: str, context: dict | None = None) -> str:
+        """セッションなしの質問（回答の文字列だけを返す）。"""
+        return (await self.ask(question, context))["answer"]
+
+    def stats(self) -> dict:
+        return {
+            "sessions": self.sessions.stats(),
+            "context_cache": self._cache_provider.stats(),
+            "latency": self.latency.stats(),
+            "retrieval": self.retriever.stats(),
+            "answer_cache": self.answers.stats(),
+            "memory": {
+                "summary_model": self._summary_model_id,
+                "summaries": self.summaries,
+                "summary_failures": self.summary_failures,
+                "summarized_turns": self.summarized_turns,
+            },
+        }
+
+    async def aclose(self) -> None:
+        """終了時: 全セッションのプロバイダ側キャッシュを削除する。"""
+        handles = [s.handle for s in self.sessions.drain() if s.handle]
+        if handles:
+            await asyncio.gather(*(self._cache_provider.delete(h) for h in handles), return_exceptions=True)
+        for task in list(self._streams.values()):
+            task.cancel()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
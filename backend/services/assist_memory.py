@@ -0,0 +1,105 @@
+"""アシストの会話メモリ（セッションの参加者・タブごと・トークン予算付き）。
+
+直近の質問と回答はそのまま残し、予算（ASSIST_MEMORY_TOKENS の RECENT_SHARE）を超えた古いやり取りは
+要約待ちに回す。要約待ちは AssistEngine がバックグラウンドで安いモデルに渡し、これまでの要約と
+まとめ直す（質問への回答は待たない）。プロンプトに入るのは「要約 + 直近のやり取り」だけなので、
+会話がどれだけ続いても 1 回のプロンプトの大きさは予算で頭打ちになる。要約が終わるまでの要約待ちは
+プロンプトに入れない。
+"""
+
+import os
+
+DEFAULT_MEMORY_TOKENS = 1500
+# 予算のうち直近のやり取りに使う割合（残りが要約）
+RECENT_SHARE = 0.7
+# 1 回の回答をメモリに残すときの上限（トークン目安）。長い回答 1 件で直近の枠を使い切らないようにする
+TURN_ANSWER_TOKENS = 400
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の目安。ASCII は 4 文字で 1、それ以外（日本語）は 1 文字で 1 として数える。"""
+    ascii_chars = sum(1 for ch in text if ch < "\x80")
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def clip_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + "…"
+
+
+class ConversationTurn:
+    def __init__(self, question: str, answer: str) -> None:
+        self.question = question
+        self.answer = answer
+        self.tokens = estimate_tokens(question) + estimate_tokens(answer)
+
+
+class ConversationMemory:
+    """直近のやり取り（そのまま）・要約待ち・要約。要約の更新は呼び出し側（バックグラウンド）が行う。"""
+
+    def __init__(self, budget_tokens: int | None = None) -> None:
+        self.budget_tokens = budget_tokens or int(os.getenv("ASSIST_MEMORY_TOKENS", DEFAULT_MEMORY_TOKENS))
+        self.recent_tokens = int(self.budget_tokens * RECENT_SHARE)
+        self.summary_tokens = self.budget_tokens - self.recent_tokens
+        self.summary = ""
+        self.recent: list[ConversationTurn] = []
+        self.pending: list[ConversationTurn] = []
+        self.turns = 0
+        self.summarizing = False
+
+    def add(self, question: str, answer: str) -> bool:
+        """やり取りを追加する。直近の枠から押し出されたものがあれば True（要約を回す合図）。"""
+        turn = ConversationTurn(
+            clip_tokens(question, TURN_ANSWER_TOKENS // 2),
+            clip_tokens(answer, TURN_ANSWER_TOKENS),
+        )
+        self.recent.append(turn)
+        self.turns += 1
+        while len(self.recent) > 1 and sum(t.tokens for t in self.recent) > self.recent_tokens:
+            self.pending.append(self.recent.pop(0))
+        return bool(self.pending)
+
+    def take_pending(self) -> list[ConversationTurn]:
+        """要約に回すやり取り（取り出した分は fold / restore のどちらかで必ず戻す）。"""
+        batch, self.pending = self.pending, []
+        return batch
+
+    def fold(self, summary: str) -> None:
+        self.summary = clip_tokens(summary.strip(), self.summary_tokens)
+
+    def restore(self, batch: list[ConversationTurn]) -> None:
+        """要約に失敗したとき: 質問だけを要約の末尾に足して（古い側から切り詰めて）予算内に収める。"""
+        lines = [self.summary] if self.summary else []
+        lines.extend(f"- {t.question}" for t in batch)
+        text = "\n".join(lines)
+        while estimate_tokens(text) > self.summary_tokens and "\n" in text:
+            text = text.split("\n", 1)[1]
+        self.summary = clip_tokens(text, self.summary_tokens)
+
+    def prompt_lines(self) -> list[str]:
+        if not self.summary and not self.recent:
+            return []
+        parts = ["[Conversation so far]"]
+        if self.summary:
+            parts.append(f"Summary of earlier conversation: {self.summary}")
+        for t in self.recent:
+            parts.append(f"User: {t.question}")
+            parts.append(f"Assistant: {t.answer}")
+        return parts
+
+    def stats(self) -> dict:
+        return {
+            "turns": self.turns,
+            "recent": len(self.recent),
+            "pending": len(self.pending),
+            "summary_tokens": estimate_tokens(self.summary),
+            "recent_tokens": sum(t.tokens for t in self.recent),
+        }
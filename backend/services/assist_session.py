@@ -0,0 +1,251 @@
+"""アシストのセッション（プロジェクト・シミュレーション単位の静的コンテキスト）。
+
+アプリガイド・分析結果の要約・リスク一覧など、質問ごとに変わらない部分を
+セッションに 1 回だけ保持し、プロバイダ側のコンテキストキャッシュ（Vertex AI の cached content）にも
+登録する。各質問では変化する状態（ステップ・ToDo 進捗・対策効果など）、レポート本文のうち質問に関係する抜粋、
+質問だけを送る。
+
+セッション（静的コンテキストとキャッシュのハンドル）はプロジェクトの参加者で共有し、会話メモリは
+参加者・タブ（client_id）ごとにセッションの中で分ける。
+
+プロバイダ側のキャッシュは CachedContentProvider の実装で差し替える。
+- VertexCachedContentProvider: Vertex AI の caches API。静的コンテキストが小さすぎる・作成に失敗した場合は None。
+- LocalCachedContentProvider: プロセス内のフェイク。ハンドルを発行するだけで、
+  生成時は静的コンテキストを system_instruction に含めて送る（Vertex なしの開発・検証用、および失敗時の代替）。
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from google import genai
+from google.genai import types
+
+from services.assist_memory import ConversationMemory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS = 256
+# 1 つのセッション（プロジェクト）で会話メモリを保持する参加者・タブの数
+DEFAULT_MAX_CLIENTS = 32
+DEFAULT_TTL_S = 1800
+# Vertex のコンテキストキャッシュには最小トークン数があるため、これ未満の静的コンテキストは登録しない
+DEFAULT_MIN_CACHE_CHARS = 4096
+
+
+def static_digest(system_instruction: str, static_context: str, report_text: str = "") -> str:
+    h = hashlib.sha256()
+    h.update(system_instruction.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(static_context.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(report_text.encode("utf-8"))
+    return h.hexdigest()[:24]
+
+
+class CachedContentProvider:
+    """静的コンテキストをプロバイダ側に置く口。create は未対応・失敗なら None を返す。"""
+
+    name = "none"
+
+    async def create(self, session_id: str, system_instruction: str, static_context: str, ttl_s: int) -> str | None:
+        return None
+
+    async def delete(self, handle: str) -> None:
+        return None
+
+    def is_remote(self, handle: str | None) -> bool:
+        """handle がプロバイダ側で解決される（生成時に cached_content として渡せる）か。"""
+        return False
+
+    def stats(self) -> dict:
+        return {"provider": self.name}
+
+
+class LocalCachedContentProvider(CachedContentProvider):
+    """プロセス内のフェイク。発行したハンドルと作成・削除の回数だけを管理する。"""
+
+    name = "local"
+
+    def __init__(self) -> None:
+        self._entries: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.deleted = 0
+
+    async def create(self, session_id: str, system_instruction: str, static_context: str, ttl_s: int) -> str | None:
+        handle = f"local/{session_id[:32]}/{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            self._entries[handle] = len(system_instruction) + len(static_context)
+            self.created += 1
+        return handle
+
+    async def delete(self, handle: str) -> None:
+        with self._lock:
+            if self._entries.pop(handle, None) is not None:
+                self.deleted += 1
+
+    def stats(self) -> dict:
+        return {"provider": self.name, "entries": len(self._entries), "created": self.created, "deleted": self.deleted}
+
+
+class VertexCachedContentProvider(CachedContentProvider):
+    """Vertex AI のコンテキストキャッシュ（client.aio.caches）。"""
+
+    name = "vertex"
+
+    def __init__(self, client: genai.Client, model_id: str, min_chars: int | None = None) -> None:
+        self._client = client
+        self._model_id = model_id
+        self.min_chars = min_chars or int(os.getenv("ASSIST_CACHE_MIN_CHARS", DEFAULT_MIN_CACHE_CHARS))
+        self.created = 0
+        self.deleted = 0
+        self.failed = 0
+        self.skipped = 0
+
+    async def create(self, session_id: str, system_instruction: str, static_context: str, ttl_s: int) -> str | None:
+        if len(system_instruction) + len(static_context) < self.min_chars:
+            self.skipped += 1
+            return None
+        try:
+            cached = await self._client.aio.caches.create(
+                model=self._model_id,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_instruction,
+                    contents=[types.Content(role="user", parts=[types.Part(text=static_context)])],
+                    ttl=f"{int(ttl_s)}s",
+                    display_name=f"flowguard-assist-{session_id}"[:128],
+                ),
+            )
+        except Exception as exc:
+            self.failed += 1
+            logger.warning("Assist context cache not created (%s): %s", session_id, exc)
+            return None
+        self.created += 1
+        return cached.name
+
+    async def delete(self, handle: str) -> None:
+        try:
+            await self._client.aio.caches.delete(name=handle)
+            self.deleted += 1
+        except Exception as exc:
+            logger.info("Assist context cache delete failed (%s): %s", handle, exc)
+
+    def is_remote(self, handle: str | None) -> bool:
+        return bool(handle)
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.name,
+            "created": self.created,
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "skipped_small": self.skipped,
+        }
+
+
+class AssistSession:
+    def __init__(
+        self,
+        session_id: str,
+        digest: str,
+        system_instruction: str,
+        static_context: str,
+        handle: str | None,
+        ttl_s: float,
+        report_text: str = "",
+    ) -> None:
+        self.session_id = session_id
+        self.digest = digest
+        self.system_instruction = system_instruction
+        self.static_context = static_context
+        self.handle = handle
+        # レポート本文はプロバイダ側には置かず、質問ごとに関係する抜粋だけを送る
+        self.report_text = report_text
+        # 会話メモリは参加者・タブ（client_id）ごと。静的コンテキストだけをプロジェクトで共有する
+        self.memories: OrderedDict[str, ConversationMemory] = OrderedDict()
+        self.max_clients = int(os.getenv("ASSIST_SESSION_MAX_CLIENTS", DEFAULT_MAX_CLIENTS))
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl_s
+        self.questions = 0
+
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    def memory_for(self, client_id: str | None) -> ConversationMemory:
+        """client_id の会話メモリ（無ければ作る）。client_id が無いクライアントは 1 つのメモリを共有する。"""
+        key = client_id or ""
+        memory = self.memories.get(key)
+        if memory is None:
+            memory = self.memories[key] = ConversationMemory()
+            while len(self.memories) > self.max_clients:
+                self.memories.popitem(last=False)
+        self.memories.move_to_end(key)
+        return memory
+
+
+class AssistSessionStore:
+    """セッション ID → AssistSession（LRU・有効期限付き）。"""
+
+    def __init__(self, max_sessions: int | None = None, ttl_s: float | None = None) -> None:
+        self.max_sessions = max_sessions or int(os.getenv("ASSIST_SESSION_MAX", DEFAULT_MAX_SESSIONS))
+        self.ttl_s = ttl_s or float(os.getenv("ASSIST_SESSION_TTL_S", DEFAULT_TTL_S))
+        self._sessions: OrderedDict[str, AssistSession] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def get(self, session_id: str) -> AssistSession | None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.expired():
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return session
+
+    def put(self, session: AssistSession) -> list[AssistSession]:
+        """登録し、置き換え・期限切れ・上限超過で外れたセッションを返す（呼び出し側でキャッシュを削除する）。"""
+        dropped: list[AssistSession] = []
+        with self._lock:
+            old = self._sessions.pop(session.session_id, None)
+            if old is not None:
+                self.rebuilds += 1
+                if old.handle != session.handle:
+                    dropped.append(old)
+            self._sessions[session.session_id] = session
+            for sid in [sid for sid, s in self._sessions.items() if s.expired()]:
+                dropped.append(self._sessions.pop(sid))
+            while len(self._sessions) > self.max_sessions:
+                dropped.append(self._sessions.popitem(last=False)[1])
+        return dropped
+
+    def drain(self) -> list[AssistSession]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        return sessions
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds,
+        }
+
+
+def make_provider(client: genai.Client | None, model_id: str) -> CachedContentProvider:
+    """ASSIST_CONTEXT_CACHE: vertex（既定）/ local / off。client が無い（Vertex 以外のバックエンド）ときの vertex は local。"""
+    kind = os.getenv("ASSIST_CONTEXT_CACHE", "vertex").strip().lower()
+    if kind == "vertex" and client is not None:
+        return VertexCachedContentProvider(client, model_id)
+    if kind in ("vertex", "local"):
+        return LocalCachedContentProvider()
+    return CachedContentProvider()
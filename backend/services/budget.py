@@ -0,0 +1,309 @@
+"""接続元ごとのモデル使用量の予算。
+
+予算はトークン数と呼び出し数の 2 つのトークンバケット。容量は BUDGET_WINDOW_S 秒あたりの量で、
+使った分は時間に比例して戻る（窓の境目でまとめて戻る固定窓と違い、窓の先頭に要求が集中しない）。
+
+- 受付時に見積もり（段階・処理ごとの実績の指数移動平均）を予約し、終了時に実績（SimulationUsage）との差を精算する。
+  実行中のシミュレーションは打ち切らないため、見積もりを超えた分はバケットの借りになり、その後の受付を遅らせる
+- 見積もりが容量を超える処理は、バケットが満杯なら受け付ける（大きな deep が永久に通らないことはない）
+- 残りが足りなければ、呼び出し側が軽い段階（deep → standard → fast）や保存済みの結果に切り替える。
+  それも無ければ BudgetExceeded（retry_after_s は最も軽い選択肢が通るまでの秒数）
+- キーは main が決める（接続元 IP。クライアントが付けるプロジェクト ID 等は確かめられないので使わない）
+- BUDGET_STORE_PATH を指定すると残量を SQLite（WAL）に保存し、再起動で引き継ぐ。開いたときに直近 BUDGET_MAX_KEYS 件を
+  読み込み、精算で変わったバケットは flush（main が BUDGET_SAVE_INTERVAL_S ごとにイベントループの外で呼ぶ・close）でまとめて書く
+
+BUDGET_TOKENS / BUDGET_CALLS が 0 の方は制限しない（両方 0 で予算そのものを無効にする）。
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+
+from models import SimulationUsage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_S = 3600.0
+DEFAULT_TOKENS = 2_000_000
+DEFAULT_CALLS = 500
+DEFAULT_MAX_KEYS = 10000
+DEFAULT_RECENT_RESULTS = 1024
+DEFAULT_SAVE_INTERVAL_S = 5.0
+# 実績が無いうちの見積もり（トークン, 呼び出し）。simulate は段階ごと
+DEFAULT_ESTIMATES: dict[str, tuple[float, float]] = {
+    "simulate:fast": (6000, 1),
+    "simulate:standard": (25000, 2),
+    "simulate:deep": (90000, 7),
+    "translate": (15000, 3),
+    "assist": (4000, 1),
+}
+# 受け付けられない段階の代わりに試す、軽い段階の順
+TIER_FALLBACK = ("deep", "standard", "fast")
+_EWMA_ALPHA = 0.2
+
+
+class BudgetExceeded(Exception):
+    """予算が足りず、代わりの段階・保存済みの結果も無い。retry_after_s 秒後に受け付けられる見込み。"""
+
+    def __init__(self, key: str, operation: str, retry_after_s: int) -> None:
+        super().__init__(f"budget exceeded for {key} ({operation}); retry after {retry_after_s}s")
+        self.key = key
+        self.operation = operation
+        self.retry_after_s = retry_after_s
+
+
+@dataclass
+class Reservation:
+    key: str
+    operation: str
+    tokens: float
+    calls: float
+    settled: bool = False
+
+
+class _Bucket:
+    __slots__ = ("tokens", "calls", "updated_at")
+
+    def __init__(self, tokens: float, calls: float, updated_at: float) -> None:
+        self.tokens = tokens
+        self.calls = calls
+        self.updated_at = updated_at
+
+
+def usage_tokens(usage: SimulationUsage | None) -> tuple[int, int]:
+    """予算に数える (トークン, 呼び出し)。キャッシュ済みのトークンは prompt に含まれるため別に足さない。失敗した呼び出しも数える。"""
+    if usage is None:
+        return 0, 0
+    total = usage.total
+    return total.prompt_tokens + total.thinking_tokens + total.output_tokens, total.calls
+
+
+def request_fingerprint(payload: str) -> str:
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class BudgetManager:
+    def __init__(
+        self,
+        window_s: float | None = None,
+        tokens: int | None = None,
+        calls: int | None = None,
+        path: str | None = None,
+        max_keys: int | None = None,
+    ) -> None:
+        self.window_s = window_s or float(os.getenv("BUDGET_WINDOW_S", DEFAULT_WINDOW_S))
+        self.token_capacity = tokens if tokens is not None else int(os.getenv("BUDGET_TOKENS", DEFAULT_TOKENS))
+        self.call_capacity = calls if calls is not None else int(os.getenv("BUDGET_CALLS", DEFAULT_CALLS))
+        self.enabled = self.token_capacity > 0 or self.call_capacity > 0
+        self._max_keys = max_keys or int(os.getenv("BUDGET_MAX_KEYS", DEFAULT_MAX_KEYS))
+        self._buckets: OrderedDict[str, _Bucket] = OrderedDict()
+        self._estimates: dict[str, tuple[float, float]] = dict(DEFAULT_ESTIMATES)
+        # (キー, リクエストの指紋) → 直近の simulation_id（予算切れのときに返す保存済みの結果）
+        self._recent: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._recent_size = int(os.getenv("BUDGET_RECENT_RESULTS", DEFAULT_RECENT_RESULTS))
+        self._lock = threading.Lock()
+        # admitted / downgraded / served_cached / rejected
+        self.outcomes: Counter[str] = Counter()
+        self._path = path or os.getenv("BUDGET_STORE_PATH", "").strip() or None
+        self.save_interval_s = float(os.getenv("BUDGET_SAVE_INTERVAL_S", DEFAULT_SAVE_INTERVAL_S))
+        self._conn: sqlite3.Connection | None = None
+        # 精算で変わり、まだ書いていないバケットのキー
+        self._dirty: set[str] = set()
+        self._db_lock = threading.Lock()
+        if self._path and self.enabled:
+            self._conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " calls REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._load()
+        logger.info(
+            "Budgets %s (window=%ss, tokens=%d, calls=%d, path=%s)",
+            "enabled" if self.enabled else "disabled",
+            self.window_s,
+            self.token_capacity,
+            self.call_capacity,
+            self._path,
+        )
+
+    @property
+    def persistent(self) -> bool:
+        return self._conn is not None
+
+    # --- バケット ---
+
+    def _load(self) -> None:
+        """保存済みのバケットのうち、最近更新した BUDGET_MAX_KEYS 件を読み込む（受付のたびに SQLite を読まない）。"""
+        rows = self._conn.execute(
+            "SELECT key, tokens, calls, updated_at FROM buckets ORDER BY updated_at DESC LIMIT ?",
+            (self._max_keys,),
+        ).fetchall()
+        for key, tokens, calls, updated_at in reversed(rows):
+            self._buckets[key] = _Bucket(tokens, calls, updated_at)
+
+    def _bucket(self, key: str, now: float) -> _Bucket:
+        """キーのバケット（残量を now まで戻したもの）。ロックを持って呼ぶ。"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _Bucket(float(self.token_capacity), float(self.call_capacity), now)
+            self._buckets[key] = bucket
+            # 使われていないキーから追い出す（次は満杯から始まる。保存していても受付のたびに SQLite は読まない）
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+        elapsed = max(0.0, now - bucket.updated_at)
+        if elapsed:
+            refill = elapsed / self.window_s
+            bucket.tokens = min(float(self.token_capacity), bucket.tokens + refill * self.token_capacity)
+            bucket.calls = min(float(self.call_capacity), bucket.calls + refill * self.call_capacity)
+            bucket.updated_at = now
+        return bucket
+
+    def _wait_s(self, bucket: _Bucket, tokens: float, calls: float) -> float:
+        """tokens / calls を受け付けられるまでの秒数（0 なら今すぐ）。見積もりは容量で頭打ちにする。"""
+        wait = 0.0
+        for level, need, capacity in ((bucket.tokens, tokens, self.token_capacity), (bucket.calls, calls, self.call_capacity)):
+            if capacity <= 0:
+                continue
+            need = min(need, capacity)
+            if level < need:
+                wait = max(wait, (need - level) / capacity * self.window_s)
+        return wait
+
+    def flush(self) -> None:
+        """精算で変わったバケットをまとめて SQLite に書く。書き込みはイベントループの外（asyncio.to_thread）で呼ぶ。"""
+        if self._conn is None:
+            return
+        with self._lock:
+            rows = [
+                (key, bucket.tokens, bucket.calls, bucket.updated_at)
+                for key in self._dirty
+                if (bucket := self._buckets.get(key)) is not None
+            ]
+            self._dirty.clear()
+        if not rows:
+            return
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, calls, updated_at) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+
+    # --- 受付と精算 ---
+
+    def estimate(self, operation: str) -> tuple[float, float]:
+        return self._estimates.get(operation) or DEFAULT_ESTIMATES["assist"]
+
+    def try_reserve(self, key: str, operation: str) -> Reservation | None:
+        """見積もりを予約する。足りなければ None。予算が無効なら見積もり 0 の予約を返す。"""
+        if not self.enabled:
+            return Reservation(key, operation, 0.0, 0.0)
+        tokens, calls = self.estimate(operation)
+        now = time.time()
+        with self._lock:
+            bucket = self._bucket(key, now)
+            if self._wait_s(bucket, tokens, calls) > 0:
+                return None
+            bucket.tokens -= tokens
+            bucket.calls -= calls
+            self.outcomes["admitted"] += 1
+        return Reservation(key, operation, tokens, calls)
+
+    def reserve(self, key: str, operation: str) -> Reservation:
+        reservation = self.try_reserve(key, operation)
+        if reservation is None:
+            raise self.exceeded(key, operation)
+        return reservation
+
+    def reserve_tier(self, key: str, tier: str) -> tuple[Reservation, str]:
+        """シミュレーションの予約。tier が足りなければ軽い段階を順に試し、(予約, 受け付けた段階) を返す。"""
+        for candidate in TIER_FALLBACK[TIER_FALLBACK.index(tier):] if tier in TIER_FALLBACK else (tier,):
+            reservation = self.try_reserve(key, f"simulate:{candidate}")
+            if reservation is not None:
+                if candidate != tier:
+                    self.note("downgraded")
+                return reservation, candidate
+        raise self.exceeded(key, f"simulate:{TIER_FALLBACK[-1]}")
+
+    def exceeded(self, key: str, operation: str) -> BudgetExceeded:
+        """operation が受け付けられるまでの秒数を付けた BudgetExceeded。"""
+        tokens, calls = self.estimate(operation)
+        with self._lock:
+            wait = self._wait_s(self._bucket(key, time.time()), tokens, calls)
+        return BudgetExceeded(key, operation, max(1, int(wait + 0.999)))
+
+    def settle(self, reservation: Reservation, tokens: int, calls: int) -> None:
+        """実績で予約を精算する（多く見積もった分は戻し、超えた分は借りにする）。見積もりも実績に寄せる。"""
+        if reservation.settled or not self.enabled:
+            return
+        reservation.settled = True
+        with self._lock:
+            bucket = self._bucket(reservation.key, time.time())
+            bucket.tokens += reservation.tokens - tokens
+            bucket.calls += reservation.calls - calls
+            bucket.tokens = min(bucket.tokens, float(self.token_capacity))
+            bucket.calls = min(bucket.calls, float(self.call_capacity))
+            # 回答キャッシュに当たったアシスト等（呼び出し 0）は見積もりに入れない
+            if calls:
+                prior_tokens, prior_calls = self.estimate(reservation.operation)
+                self._estimates[reservation.operation] = (
+                    prior_tokens + _EWMA_ALPHA * (tokens - prior_tokens),
+                    prior_calls + _EWMA_ALPHA * (calls - prior_calls),
+                )
+            if self._conn is not None:
+                self._dirty.add(reservation.key)
+
+    def release(self, reservation: Reservation) -> None:
+        """呼び出しに至らず失敗した処理の予約を戻す。"""
+        self.settle(reservation, 0, 0)
+
+    # --- 予算切れのときに返す保存済みの結果 ---
+
+    def remember_result(self, key: str, fingerprint: str, simulation_id: str) -> None:
+        if not self.enabled or self._recent_size <= 0:
+            return
+        with self._lock:
+            self._recent[(key, fingerprint)] = simulation_id
+            self._recent.move_to_end((key, fingerprint))
+            while len(self._recent) > self._recent_size:
+                self._recent.popitem(last=False)
+
+    def recent_result(self, key: str, fingerprint: str) -> str | None:
+        with self._lock:
+            return self._recent.get((key, fingerprint))
+
+    def note(self, outcome: str) -> None:
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "window_s": self.window_s,
+                "tokens": self.token_capacity,
+                "calls": self.call_capacity,
+                "persistent": self._conn is not None,
+                "unsaved": len(self._dirty),
+                "keys": len(self._buckets),
+                **{name: self.outcomes[name] for name in ("admitted", "downgraded", "served_cached", "rejected")},
+                "estimates": {op: {"tokens": round(t), "calls": round(c, 2)} for op, (t, c) in self._estimates.items()},
+            }
+
+    def close(self) -> None:
+        self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
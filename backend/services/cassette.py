@@ -0,0 +1,299 @@
+"""外部呼び出し（Gemini・Overpass・Open-Meteo）の記録と再生（カセット）。
+
+CASSETTE_MODE=record で実際に呼んだ結果を、CASSETTE_MODE=replay で記録した結果を返す（ネットワークも認証情報も使わない）。
+解析・レポート生成のベンチマークを、本物のモデル出力と地図・天気の応答で CI 上で再現するため。
+
+- キーは正規化したリクエストのハッシュ。Gemini はモデル・本文・生成設定、HTTP はメソッド・URL（クエリは並べ替え）・本文
+  （フォームの値は空白を詰める。Overpass のクエリの改行・字下げの違いで外れないように）。リージョンやヘッダは含めない
+- 同じキーの呼び出しは記録した順に返し、尽きたら最後の結果を繰り返す（再試行で 503 → 成功のような並びも再現する）
+- カセットは gzip の JSON Lines（CASSETTE_PATH）。record は開始時に空にしたファイルを開いたままにし、1 件ずつ
+  ワーカースレッドで書いて flush する（終了時に close。閉じずに落ちたカセットも、書き終えた行までは再生できる）
+- 再生の遅延は CASSETTE_LATENCY: zero（既定。待たない）/ original（記録時の所要時間どおりに待つ）
+- 再生で見つからない呼び出しは CassetteMiss（天気・地図は既存の失敗時の扱いに落ちる）
+
+Gemini のコンテキストキャッシュ（アシスト）はカセットを通らないため、カセット使用中はプロセス内のフェイクになる。
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import AsyncIterator
+from urllib.parse import parse_qsl, urlsplit, urlunsplit, urlencode
+
+import httpx
+from google.genai import errors, types
+
+from services.llm_backend import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CASSETTE_PATH = "cassettes/default.jsonl.gz"
+
+
+class CassetteMiss(Exception):
+    """再生中に、カセットに無い呼び出しがあった。"""
+
+
+def _normalize_http(request: httpx.Request, body: bytes) -> dict:
+    url = urlsplit(str(request.url))
+    query = urlencode(sorted(parse_qsl(url.query, keep_blank_values=True)))
+    content_type = request.headers.get("content-type", "")
+    if "application/x-www-form-urlencoded" in content_type:
+        normalized = sorted((k, " ".join(v.split())) for k, v in parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+    elif "json" in content_type and body:
+        normalized = json.loads(body)
+    else:
+        normalized = body.decode("utf-8", "replace")
+    return {
+        "method": request.method,
+        "url": urlunsplit((url.scheme, url.netloc, url.path, query, "")),
+        "body": normalized,
+    }
+
+
+def _normalize_gemini(model: str, contents: str, config: types.GenerateContentConfig, stream: bool) -> dict:
+    return {
+        "model": model,
+        "contents": contents,
+        "config": config.model_dump(mode="json", exclude_none=True),
+        "stream": stream,
+    }
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str, latency: str = "zero") -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"CASSETTE_MODE must be off, record or replay (got {mode!r})")
+        self.path = path
+        self.mode = mode
+        self.original_latency = latency == "original"
+        self._entries: dict[str, list[dict]] = {}
+        self._cursor: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._file = None
+        if mode == "replay":
+            self._load(path)
+            logger.info("Cassette loaded for replay: %s (%d keys)", path, len(self._entries))
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+            logger.info("Cassette recording to %s", path)
+
+    def _load(self, path: str) -> None:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+            except EOFError:
+                # 記録中に落ちて gzip の終端が無い。flush 済みの行までを使う
+                logger.warning("Cassette %s ends without a gzip trailer (recording was not closed)", path)
+
+    @staticmethod
+    def key(kind: str, request: dict) -> str:
+        text = json.dumps([kind, request], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+    def take(self, kind: str, request: dict) -> dict:
+        key = self.key(kind, request)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"no {kind} interaction recorded for key {key} in {self.path}")
+            entry = entries[min(self._cursor[key], len(entries) - 1)]
+            self._cursor[key] += 1
+            self.replayed += 1
+        return entry
+
+    async def put(self, kind: str, request: dict, entry: dict) -> None:
+        line = json.dumps({"key": self.key(kind, request), "kind": kind, "request": request, **entry}, ensure_ascii=False)
+        await asyncio.to_thread(self._write, line)
+
+    def _write(self, line: str) -> None:
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError(f"cassette {self.path} is closed")
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    async def wait(self, seconds: float) -> None:
+        if self.original_latency and seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "latency": "original" if self.original_latency else "zero",
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+_cassette: Cassette | None = None
+_cassette_loaded = False
+
+
+def active_cassette() -> Cassette | None:
+    """CASSETTE_MODE が off（既定）なら None。プロセスで 1 つ。"""
+    global _cassette, _cassette_loaded
+    if not _cassette_loaded:
+        mode = os.getenv("CASSETTE_MODE", "off").strip().lower()
+        if mode not in ("", "off"):
+            _cassette = Cassette(
+                os.getenv("CASSETTE_PATH", DEFAULT_CASSETTE_PATH),
+                mode,
+                os.getenv("CASSETTE_LATENCY", "zero").strip().lower(),
+            )
+        _cassette_loaded = True
+    return _cassette
+
+
+def _api_error(error: dict) -> errors.APIError:
+    code = error["code"]
+    return errors.ClientError(code, error["details"]) if code < 500 else errors.ServerError(code, error["details"])
+
+
+class CassetteBackend(LLMBackend):
+    """別のバックエンドを包み、generate / stream をカセットに記録・再生する。APIError（429 等）も記録する。"""
+
+    name = "cassette"
+
+    def __init__(self, inner: LLMBackend, cassette: Cassette) -> None:
+        self.inner = inner
+        self.cassette = cassette
+
+    async def generate(self, model, contents, config, location=None):
+        request = _normalize_gemini(model, contents, config, stream=False)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.take("gemini", request)
+            await self.cassette.wait(entry["latency_s"])
+            if entry.get("error"):
+                raise _api_error(entry["error"])
+            return types.GenerateContentResponse.model_validate(entry["response"])
+        t0 = time.perf_counter()
+        try:
+            response = await self.inner.generate(model, contents, config, location)
+        except errors.APIError as exc:
+            await self.cassette.put("gemini", request, {
+                "latency_s": time.perf_counter() - t0,
+                "error": {"code": exc.code, "details": exc.details},
+            })
+            raise
+        await self.cassette.put("gemini", request, {
+            "latency_s": time.perf_counter() - t0,
+            "response": response.model_dump(mode="json", exclude_none=True),
+        })
+        return response
+
+    async def stream(self, model, contents, config, location=None):
+        request = _normalize_gemini(model, contents, config, stream=True)
+        if self.cassette.mode == "replay":
+            return self._replay_stream(request)
+        return self._record_stream(request, model, contents, config, location)
+
+    async def _replay_stream(self, request: dict) -> AsyncIterator[types.GenerateContentResponse]:
+        entry = self.cassette.take("gemini", request)
+        elapsed = 0.0
+        for offset, chunk in entry.get("chunks", []):
+            await self.cassette.wait(offset - elapsed)
+            elapsed = offset
+            yield types.GenerateContentResponse.model_validate(chunk)
+        if entry.get("error"):
+            await self.cassette.wait(entry["latency_s"] - elapsed)
+            raise _api_error(entry["error"])
+
+    async def _record_stream(self, request, model, contents, config, location) -> AsyncIterator[types.GenerateContentResponse]:
+        t0 = time.perf_counter()
+        chunks: list[tuple[float, dict]] = []
+        error = None
+        completed = False
+        try:
+            stream = await self.inner.stream(model, contents, config, location)
+            try:
+                async for chunk in stream:
+                    chunks.append((time.perf_counter() - t0, chunk.model_dump(mode="json", exclude_none=True)))
+                    yield chunk
+                completed = True
+            finally:
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        except errors.APIError as exc:
+            error = {"code": exc.code, "details": exc.details}
+            raise
+        finally:
+            # 途中で閉じられた（クライアントの切断）ストリームは記録しない
+            if error is not None or completed:
+                entry = {"latency_s": time.perf_counter() - t0, "chunks": chunks}
+                if error is not None:
+                    entry["error"] = error
+                await self.cassette.put("gemini", request, entry)
+
+    def stats(self) -> dict:
+        return {**self.inner.stats(), "cassette": self.cassette.mode}
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx の送信口。天気（Open-Meteo）・地図（Overpass）の呼び出しを記録・再生する。"""
+
+    def __init__(self, cassette: Cassette) -> None:
+        self.cassette = cassette
+        self._inner = httpx.AsyncHTTPTransport() if cassette.mode == "record" else None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        normalized = _normalize_http(request, body)
+        if self._inner is None:
+            entry = self.cassette.take("http", normalized)
+            await self.cassette.wait(entry["latency_s"])
+            return httpx.Response(
+                entry["status"],
+                headers={"content-type": entry["content_type"]},
+                content=entry["body"].encode("utf-8"),
+                request=request,
+            )
+        t0 = time.perf_counter()
+        response = await self._inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        content_type = response.headers.get("content-type", "application/octet-stream")
+        await self.cassette.put("http", normalized, {
+            "latency_s": time.perf_counter() - t0,
+            "status": response.status_code,
+            "content_type": content_type,
+            "body": content.decode("utf-8", "replace"),
+        })
+        return httpx.Response(response.status_code, headers={"content-type": content_type}, content=content, request=request)
+
+    async def aclose(self) -> None:
+        if self._inner is not None:
+            await self._inner.aclose()
+
+
+def outbound_transport() -> httpx.AsyncBaseTransport | None:
+    """外部 HTTP 呼び出し用の transport。カセットを使わないときは None（httpx の既定）。"""
+    cassette = active_cassette()
+    return CassetteTransport(cassette) if cassette is not None else None
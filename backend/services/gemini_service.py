@@ -3,8 +3,8 @@ import json
 import logging
 import os
 import re
+import time
 
-from google import genai
 from google.genai import types
 
 from models import (
@@ -13,7 +13,13 @@ from models import (
     AudienceType,
     WeatherCondition,
     RiskCategory,
+    AnalysisTier,
 )
+from services.analysis_tiers import TierProfile, build_profiles, thinking_config
+from services.geometry import polygon_centroid
+from services.llm_backend import LLMBackend, make_backend
+from services.model_routing import STAGE_METRICS, ModelRouter, StageTimer
+from services.translation_memory import TranslationMemory, apply_translations, extract_strings, pack_batches
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +50,18 @@ WEATHER_LABELS: dict[WeatherCondition, str] = {
     WeatherCondition.EXTREME_HEAT: "Extreme heat",
 }
 
+# 同時に実行するモデル呼び出しの上限（このプロセスの GeminiService 全体）
+DEFAULT_MAX_CONCURRENCY = 16
+# 翻訳 1 回あたりの入力の目安（トークン）と文字列数の上限、バッチごとの試行回数
+DEFAULT_TRANSLATE_BATCH_TOKENS = 2000
+DEFAULT_TRANSLATE_BATCH_MAX_ITEMS = 80
+DEFAULT_TRANSLATE_MAX_ATTEMPTS = 3
+
+TRANSLATE_SYSTEM_PROMPT = (
+    "You translate user-visible text of an event risk assessment from Japanese to English. "
+    "Use concise, professional safety-management wording and translate every value consistently."
+)
+
 SYSTEM_PROMPT = """\
 You are the Chief Risk Officer (CRO) for large-scale event management.
 You have decades of experience analysing and mitigating risks at major
@@ -121,7 +139,7 @@ CRITICAL - NUMERIC FIELDS ONLY:
 - severity: MUST be a number between 1.0 and 10.0 (e.g. 7.5, 4.0). Never use text labels; use numeric values only.
 - cascading_risks: MUST be an array of strings (e.g. ["risk A", "risk B"]). If a single description, use one-element array.
 
-Generate between 10 and 20 risk items, ensuring coverage across ALL six categories (include at least 1–2 visibility risks and at least 1–2 legal_compliance risks where relevant to the event type and location).
+Generate between {min_risks} and {max_risks} risk items, ensuring coverage across ALL six categories (include at least 1–2 visibility risks and at least 1–2 legal_compliance risks where relevant to the event type and location).
 Make locations realistic and within or near the specified polygon area.
 Probability should reflect real-world likelihood for this type and scale of event (as a number 0.0–1.0).
 Severity should reflect potential impact on human safety and event operations (as a number 1.0–10.0).\
@@ -151,7 +169,7 @@ ANALYSIS REQUIREMENTS:
 
 OUTPUT: VALID JSON only. Schema: { "risks": [ { "category": "<ASSIGNED_CATEGORY>", "title": "string", "description": "string", "location_description": "string", "probability": 0.0-1.0, "severity": 1.0-10.0, "location": { "center": { "lat", "lng" }, "radius_meters": number }, "mitigation_actions": ["string"], "cascading_risks": ["string"] } ] }
 - probability and severity MUST be numbers only (no "High"/"低").
-- Generate 2 to 6 risk items for this category. Use plain text only in all string fields (no markdown).
+- Generate {min_risks} to {max_risks} risk items for this category. Use plain text only in all string fields (no markdown).
 """
 
 SYNTHESIS_SYSTEM_PROMPT = """\
@@ -160,7 +178,7 @@ You are a synthesizer for event risk assessments. You receive a merged list of r
 Your task: produce a single overall assessment.
 - overall_risk_score: number 1.0 to 10.0 reflecting the combined severity and likelihood of all risks.
 - summary: one concise paragraph (Japanese or English per locale) summarizing the key findings and priority concerns.
-- recommendations: array of 5 to 15 actionable recommendation strings (same language as summary).
+- recommendations: array of {min_recommendations} to {max_recommendations} actionable recommendation strings (same language as summary).
 
 Output VALID JSON only: { "overall_risk_score": number, "summary": "string", "recommendations": ["string", ...] }
 Use plain text only (no markdown). Numeric fields must be numbers.
@@ -186,6 +204,28 @@ LOCALE_SUFFIX = {
 # Prompt builder
 # ---------------------------------------------------------------------------
 
+BILINGUAL_RISK_INSTRUCTION = (
+    "\n\nBILINGUAL OUTPUT:\n"
+    "Write every text field in Japanese as required above, and ALSO add to each risk an \"en\" object "
+    "with the English version of its text fields: "
+    "\"en\": { \"title\", \"description\", \"location_description\", \"evidence\", "
+    "\"mitigation_actions\": [ ... ], \"cascading_risks\": [ ... ] }. "
+    "The English lists must have the same number of items in the same order as the Japanese lists."
+)
+
+BILINGUAL_OVERALL_INSTRUCTION = (
+    "\n\nBILINGUAL OUTPUT (overall):\n"
+    "Also add a top-level \"en\" object with the English version of the overall text: "
+    "\"en\": { \"event_name\", \"event_location\", \"summary\", \"recommendations\": [ ... ] }. "
+    "recommendations must have the same number of items in the same order as the Japanese list."
+)
+
+
+def is_bilingual(request: SimulationRequest) -> bool:
+    """英語の文面も同時に生成するか（日本語で解析するときだけ意味がある）。"""
+    return request.bilingual and request.locale == "ja"
+
+
 def _format_date_time_for_prompt(date_time: str) -> str:
     if not date_time or not date_time.strip():
         return "Not specified."
@@ -209,8 +249,7 @@ def build_analysis_prompt(
     polygon_str = ", ".join(
         f"({p.lat:.6f}, {p.lng:.6f})" for p in request.polygon
     )
-    center_lat = sum(p.lat for p in request.polygon) / len(request.polygon)
-    center_lng = sum(p.lng for p in request.polygon) / len(request.polygon)
+    center_lat, center_lng = polygon_centroid(request.polygon)
     date_time_line = _format_date_time_for_prompt(request.date_time)
 
     if weather_override:
@@ -260,7 +299,28 @@ Ensure all risk locations fall within or very near the polygon area.\
 {locale_instruction}"""
 
 
-def _build_category_system_prompt(category: str, locale: str) -> str:
+def _temperature(model_id: str) -> float:
+    # gemini-3-pro は 1.0 が推奨値
+    return 1.0 if "gemini-3-pro" in model_id else 0.7
+
+
+def _output_tokens(base: int, bilingual: bool) -> int:
+    # バイリンガル生成は英語の文面の分だけ出力が増える
+    return base * 3 // 2 if bilingual else base
+
+
+def _fill_prompt(template: str, **params: object) -> str:
+    """プロンプトの {name} 欄（段階ごとの件数等）を埋める。スキーマの JSON の波括弧があるので str.format は使わない。
+    テンプレートに無い欄を渡したら KeyError（文面を変えて件数の指定が黙って消えないように）。"""
+    for name, value in params.items():
+        placeholder = "{" + name + "}"
+        if placeholder not in template:
+            raise KeyError(f"prompt has no {placeholder}")
+        template = template.replace(placeholder, str(value))
+    return template
+
+
+def _build_category_system_prompt(category: str, locale: str, bilingual: bool = False) -> str:
     focus = CATEGORY_FOCUS.get(category, "Focus only on risks in your assigned category.")
     locale_instruction = LOCALE_SUFFIX.get(locale, "")
     return (
@@ -269,11 +329,12 @@ def _build_category_system_prompt(category: str, locale: str) -> str:
         + "CRITICAL: Every risk in your output MUST have \"category\": \"" + category + "\".\n"
         + "Return ONLY valid JSON: { \"risks\": [ ... ] }.\n"
         + locale_instruction
+        + (BILINGUAL_RISK_INSTRUCTION if bilingual else "")
     )
 
 
 class GeminiService:
-    def __init__(self) -> None:
+    def __init__(self, backend: LLMBackend | None = None) -> None:
         self._project_id = os.getenv("PROJECT_ID", "flowguard-hackathon-2026")
         self._model_id = os.getenv("MODEL_ID", "gemini-3-pro-preview")
         if "gemini-3-pro" in self._model_id:
@@ -281,51 +342,104 @@ class GeminiService:
         else:
             self._location = os.getenv("LOCATION", "us-central1")
 
-        self._client = genai.Client(
-            vertexai=True,
-            project=self._project_id,
-            location=self._location,
-        )
-
-        temperature = 1.0 if "gemini-3-pro" in self._model_id else 0.7
-        thinking_config = (
-            types.ThinkingConfig(thinking_level=types.ThinkingLevel.HIGH)
-            if "gemini-3-pro" in self._model_id
-            else None
-        )
-        self._config = types.GenerateContentConfig(
-            system_instruction=SYSTEM_PROMPT,
-            temperature=temperature,
+        self.backend = backend or make_backend(self._project_id, self._location)
+        self._router = ModelRouter()
+
+        self._profiles = build_profiles(self._model_id)
+        # 解析・翻訳のすべての呼び出しで共有する同時実行数の上限
+        self._slot_limit = max(1, int(os.getenv("GEMINI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)))
+        self._model_slots = asyncio.Semaphore(self._slot_limit)
+        # 枠を待っている呼び出しと、枠を使っている呼び出しの数（/metrics）
+        self._slot_waiting = 0
+        self._slot_in_use = 0
+        self._translate_config = types.GenerateContentConfig(
+            system_instruction=TRANSLATE_SYSTEM_PROMPT,
+            temperature=_temperature(self._model_id),
             top_p=0.9,
             max_output_tokens=16384,
             response_mime_type="application/json",
-            thinking_config=thinking_config,
         )
 
         logger.info(
-            "GeminiService initialised (project=%s, location=%s, model=%s)",
+            "GeminiService initialised (project=%s, location=%s, model=%s, backend=%s)",
             self._project_id,
             self._location,
             self._model_id,
+            self.backend.name,
         )
 
+    def profile(self, request: SimulationRequest) -> TierProfile:
+        return self._profiles[request.analysis_tier]
+
+    async def _generate(
+        self,
+        stage: str,
+        contents: str,
+        config: types.GenerateContentConfig,
+        model_id: str,
+        thinking: str | None = None,
+        tier: AnalysisTier | None = None,
+        attempt: int = 1,
+    ):
+        """段階のルート（モデル・リージョン・生成設定）を重ねて呼ぶ。所要時間・トークン数・試行回数を段階ごとに記録する。"""
+        route = self._router.route(stage, tier.value if tier is not None else None)
+        model = route.model or model_id
+        location = route.location or ("global" if "gemini-3-pro" in model else self._location)
+        config = route.config(config)
+        tc = thinking_config(model, route.thinking if route.thinking is not None else thinking)
+        if tc is not None:
+            config = config.model_copy(update={"thinking_config": tc})
+        self._slot_waiting += 1
+        try:
+            await self._model_slots.acquire()
+        finally:
+            self._slot_waiting -= 1
+        self._slot_in_use += 1
+        try:
+            async with StageTimer(STAGE_METRICS, stage, model, attempt) as timer:
+                response = await self.backend.generate(model, contents, config, location)
+                timer.usage = response.usage_metadata
+        finally:
+            self._slot_in_use -= 1
+            self._model_slots.release()
+        return response
+
+    def slot_stats(self) -> dict:
+        """モデル呼び出しの同時実行枠（GEMINI_MAX_CONCURRENCY）の上限・使用中・待ち。"""
+        return {"limit": self._slot_limit, "in_use": self._slot_in_use, "waiting": self._slot_waiting}
+
     async def analyze_risks(
         self,
         request: SimulationRequest,
         max_retries: int = 3,
         weather_override: tuple[float, float, "WeatherCondition"] | None = None,
     ) -> dict:
+        profile = self.profile(request)
+        bilingual = is_bilingual(request)
         prompt = build_analysis_prompt(request, weather_override)
-        logger.info("Sending analysis request for event: %s", request.event_name)
+        if bilingual:
+            prompt += BILINGUAL_RISK_INSTRUCTION + BILINGUAL_OVERALL_INSTRUCTION
+        lo, hi = profile.risk_count
+        config = types.GenerateContentConfig(
+            system_instruction=_fill_prompt(SYSTEM_PROMPT, min_risks=lo, max_risks=hi),
+            temperature=_temperature(profile.model_id),
+            top_p=0.9,
+            max_output_tokens=_output_tokens(profile.max_output_tokens, bilingual),
+            response_mime_type="application/json",
+        )
+        logger.info(
+            "Sending analysis request for event: %s (tier=%s, model=%s)",
+            request.event_name,
+            profile.tier.value,
+            profile.model_id,
+        )
 
         last_error: Exception | None = None
 
         for attempt in range(1, max_retries + 1):
             try:
-                response = await self._client.aio.models.generate_content(
-                    model=self._model_id,
-                    contents=prompt,
-                    config=self._config,
+                response = await self._generate(
+                    "analysis", prompt, config, profile.model_id, profile.thinking, profile.tier, attempt
                 )
                 raw_text = response.text or ""
 
@@ -389,22 +503,29 @@ class GeminiService:
         max_retries: int = 2,
     ) -> dict:
         """マルチエージェント用: 指定カテゴリのみのリスクを返す。"""
-        system = _build_category_system_prompt(category, request.locale)
+        profile = self.profile(request)
+        bilingual = is_bilingual(request)
+        lo, hi = profile.category_risk_count
+        system = _fill_prompt(_build_category_system_prompt(category, request.locale, bilingual), min_risks=lo, max_risks=hi)
         prompt = build_analysis_prompt(request, weather_override)
         config = types.GenerateContentConfig(
             system_instruction=system,
             temperature=0.7,
             top_p=0.9,
-            max_output_tokens=8192,
+            max_output_tokens=_output_tokens(profile.category_max_output_tokens, bilingual),
             response_mime_type="application/json",
         )
         last_error: Exception | None = None
         for attempt in range(1, max_retries + 1):
             try:
-                response = await self._client.aio.models.generate_content(
-                    model=self._model_id,
-                    contents=prompt,
-                    config=config,
+                response = await self._generate(
+                    f"category.{category}",
+                    prompt,
+                    config,
+                    profile.model_id,
+                    profile.agent_thinking,
+                    profile.tier,
+                    attempt,
                 )
                 raw_text = response.text or ""
                 try:
@@ -433,7 +554,14 @@ class GeminiService:
         max_retries: int = 2,
     ) -> dict:
         """マルチエージェント用: マージ済みリスクから overall_risk_score, summary, recommendations を生成。"""
+        profile = self.profile(request)
+        lo, hi = profile.recommendation_count
         locale_instruction = LOCALE_SUFFIX.get(request.locale, "")
+        bilingual = is_bilingual(request)
+        if bilingual:
+            locale_instruction += BILINGUAL_OVERALL_INSTRUCTION
+            # 英語の文面は合成に不要（12000 文字の枠を日本語のリスクに使う）
+            merged_risks = [{k: v for k, v in r.items() if k != "en"} for r in merged_risks]
         prompt = f"""\
 Event: {request.event_name}
 Type: {EVENT_TYPE_LABELS.get(request.event_type, request.event_type.value)}
@@ -443,22 +571,26 @@ Attendance: {request.expected_attendance:,}
 MERGED RISKS FROM CATEGORY EXPERTS ({len(merged_risks)} items):
 {json.dumps(merged_risks, ensure_ascii=False, indent=0)[:12000]}
 
-Produce overall_risk_score (1.0-10.0), summary (one paragraph), and recommendations (5-15 items). Output valid JSON only.
+Produce overall_risk_score (1.0-10.0), summary (one paragraph), and recommendations ({lo}-{hi} items). Output valid JSON only.
 {locale_instruction}"""
         config = types.GenerateContentConfig(
-            system_instruction=SYNTHESIS_SYSTEM_PROMPT,
+            system_instruction=_fill_prompt(SYNTHESIS_SYSTEM_PROMPT, min_recommendations=lo, max_recommendations=hi),
             temperature=0.5,
             top_p=0.9,
-            max_output_tokens=4096,
+            max_output_tokens=_output_tokens(profile.synthesis_max_output_tokens, bilingual),
             response_mime_type="application/json",
         )
         last_error: Exception | None = None
         for attempt in range(1, max_retries + 1):
             try:
-                response = await self._client.aio.models.generate_content(
-                    model=self._model_id,
-                    contents=prompt,
-                    config=config,
+                response = await self._generate(
+                    "synthesis",
+                    prompt,
+                    config,
+                    profile.synthesis_model_id,
+                    profile.agent_thinking,
+                    profile.tier,
+                    attempt,
                 )
                 raw_text = response.text or ""
                 try:
@@ -469,6 +601,7 @@ Produce overall_risk_score (1.0-10.0), summary (one paragraph), and recommendati
                     "overall_risk_score": max(0.0, min(10.0, float(result.get("overall_risk_score", 5.0)))),
                     "summary": result.get("summary") or "Risk analysis complete.",
                     "recommendations": result.get("recommendations") or [],
+                    "en": result.get("en") if bilingual and isinstance(result.get("en"), dict) else None,
                 }
             except Exception as exc:
                 last_error = exc
@@ -483,130 +616,113 @@ Produce overall_risk_score (1.0-10.0), summary (one paragraph), and recommendati
             "recommendations": [],
         }
 
-    async def _translate_chunk(self, chunk: dict) -> dict:
-        import json as _json
+    async def _translate_batch(self, sources: list[str], attempt: int = 1) -> dict[str, str]:
+        """原文のリストを 1 回の呼び出しで訳す。戻り値は原文 → 訳文（モデルが落としたキーは含まない）。"""
+        keyed = {f"s{i}": text for i, text in enumerate(sources)}
         prompt = (
-            "Translate the following JSON from Japanese to English.\n"
-            "Rules: Preserve exact structure and keys. Translate only string values (user-visible text). "
-            "Do NOT translate keys, enum values (e.g. crowd_safety), numbers, or IDs. "
-            "Return valid JSON only, no markdown.\n\n"
-            + _json.dumps(chunk, ensure_ascii=False, indent=0)
+            "Translate each value of the following JSON object from Japanese to English.\n"
+            "Return a JSON object with exactly the same keys and the translated strings as values. "
+            "Keep numbers, times and proper nouns as they are (romanise Japanese place names). "
+            "Plain text only, no markdown.\n\n"
+            + json.dumps(keyed, ensure_ascii=False, indent=0)
         )
-        response = await self._client.aio.models.generate_content(
-            model=self._model_id,
-            contents=prompt,
-            config=self._config,
+        standard = self._profiles[AnalysisTier.STANDARD]
+        response = await self._generate(
+            "translation", prompt, self._translate_config, self._model_id, standard.thinking, attempt=attempt
         )
         raw_text = (response.text or "").strip()
         if raw_text.startswith("```"):
             raw_text = re.sub(r"^```(?:json)?\s*", "", raw_text)
             raw_text = re.sub(r"\s*```\s*$", "", raw_text)
         try:
-            return _json.loads(raw_text)
-        except _json.JSONDecodeError as e:
-            logger.warning("Translate chunk not valid JSON: %s", e)
-            raise ValueError("Translation chunk response was not valid JSON.") from e
-
-    async def translate_simulation_to_english(self, payload: dict) -> dict:
-        import copy as _copy
-        import json as _json
-
-        result = _copy.deepcopy(payload)
-        risks = result.get("risks") or []
-        batch_size = 5
-
-        head = {
-            "event_name": payload.get("event_name", ""),
-            "event_location": payload.get("event_location") or "",
-            "date_time": payload.get("date_time") or "",
-            "summary": payload.get("summary", ""),
-            "recommendations": payload.get("recommendations") or [],
+            data = json.loads(raw_text)
+        except json.JSONDecodeError as e:
+            logger.warning("Translate batch not valid JSON: %s", e)
+            raise ValueError("Translation batch response was not valid JSON.") from e
+        if not isinstance(data, dict):
+            raise ValueError("Translation batch response was not a JSON object.")
+        return {
+            keyed[key]: value.strip()
+            for key, value in data.items()
+            if key in keyed and isinstance(value, str) and value.strip()
         }
-        translated_head = await self._translate_chunk(head)
-        result["event_name"] = translated_head.get("event_name", result["event_name"])
-        result["event_location"] = translated_head.get("event_location", result.get("event_location"))
-        result["date_time"] = translated_head.get("date_time", result.get("date_time"))
-        result["summary"] = translated_head.get("summary", result.get("summary"))
-        result["recommendations"] = translated_head.get("recommendations", result.get("recommendations"))
-
-        for i in range(0, len(risks), batch_size):
-            batch = risks[i : i + batch_size]
-            translated_batch = await self._translate_chunk({"risks": batch})
-            out_risks = translated_batch.get("risks") or []
-            for j, tr in enumerate(out_risks):
-                idx = i + j
-                if idx < len(result["risks"]) and isinstance(tr, dict):
-                    for key in ("title", "description", "location_description", "evidence"):
-                        if key in tr:
-                            result["risks"][idx][key] = tr[key]
-                    for key in ("mitigation_actions", "cascading_risks"):
-                        if key in tr and isinstance(tr[key], list):
-                            result["risks"][idx][key] = tr[key]
-
-        import asyncio
-
-        tasks = payload.get("mitigation_tasks") or []
-        composite = payload.get("composite_risks") or []
-        bottlenecks = payload.get("bottlenecks") or []
-        series = payload.get("risk_time_series") or []
-
-        async def translate_tasks_chunk() -> list:
-            if not tasks:
-                return []
-            tr = await self._translate_chunk({"mitigation_tasks": tasks})
-            return tr.get("mitigation_tasks") or []
-
-        async def translate_composite_chunk() -> list:
-            if not composite:
-                return []
-            tr = await self._translate_chunk({"composite_risks": composite})
-            return tr.get("composite_risks") or []
-
-        async def translate_bottlenecks_chunk() -> list:
-            if not bottlenecks:
-                return []
-            tr = await self._translate_chunk({"bottlenecks": bottlenecks})
-            return tr.get("bottlenecks") or []
-
-        async def translate_series_chunk() -> list:
-            if not series:
-                return []
-            tr = await self._translate_chunk({"risk_time_series": [{"label": s.get("label")} for s in series]})
-            return tr.get("risk_time_series") or []
-
-        out_tasks, out_c, out_b, out_s = await asyncio.gather(
-            translate_tasks_chunk(),
-            translate_composite_chunk(),
-            translate_bottlenecks_chunk(),
-            translate_series_chunk(),
+
+    async def _translate_with_retry(
+        self,
+        batch: list[str],
+        memory: TranslationMemory | None,
+        max_attempts: int,
+    ) -> dict[str, str]:
+        """1 バッチを他のバッチと独立に再試行する。失敗・モデルが落としたキーは、残った文字列だけを訳し直す。
+        訳せた分はその場でメモリに保存する（他のバッチが失敗しても無駄にしない）。"""
+        translated: dict[str, str] = {}
+        pending = batch
+        for attempt in range(1, max_attempts + 1):
+            try:
+                result = await self._translate_batch(pending, attempt)
+            except Exception as exc:
+                if attempt == max_attempts:
+                    logger.error("Translate batch failed (%d strings): %s", len(pending), str(exc)[:200])
+                    raise
+                logger.warning(
+                    "Translate batch attempt %d/%d failed (%d strings): %s",
+                    attempt,
+                    max_attempts,
+                    len(pending),
+                    str(exc)[:120],
+                )
+                await asyncio.sleep(2 ** (attempt - 1))
+                continue
+            if memory is not None and result:
+                await asyncio.to_thread(memory.store, "en", result)
+            translated.update(result)
+            pending = [text for text in pending if text not in result]
+            if not pending:
+                break
+        if pending:
+            logger.warning("Translation left %d strings untranslated (missing in model output)", len(pending))
+        return translated
+
+    async def translate_simulation_to_english(
+        self,
+        payload: dict,
+        memory: TranslationMemory | None = None,
+    ) -> dict:
+        """表示文字列だけを取り出し、重複を除いてメモリに無いものだけを訳して組み立て直す。
+        未訳の文字列はトークン数の目安で釣り合うバッチに分け、全バッチを同時に（同時実行数の上限内で）訳す。"""
+        t0 = time.perf_counter()
+        strings = extract_strings(payload)
+        unique = list(dict.fromkeys(text for _, text in strings))
+        known = await asyncio.to_thread(memory.lookup, "en", unique) if memory is not None else {}
+        pending = [text for text in unique if text not in known]
+        batches = pack_batches(
+            pending,
+            int(os.getenv("TRANSLATE_BATCH_TOKENS", DEFAULT_TRANSLATE_BATCH_TOKENS)),
+            int(os.getenv("TRANSLATE_BATCH_MAX_ITEMS", DEFAULT_TRANSLATE_BATCH_MAX_ITEMS)),
+        )
+        max_attempts = max(1, int(os.getenv("TRANSLATE_MAX_ATTEMPTS", DEFAULT_TRANSLATE_MAX_ATTEMPTS)))
+
+        results = await asyncio.gather(
+            *(self._translate_with_retry(b, memory, max_attempts) for b in batches),
+            return_exceptions=True,
         )
+        translated: dict[str, str] = {}
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            translated.update(result)
 
-        for j, tr in enumerate(out_tasks):
-            if j < len(result.get("mitigation_tasks") or []) and isinstance(tr, dict):
-                for key in ("who", "action"):
-                    if key in tr:
-                        result["mitigation_tasks"][j][key] = tr[key]
-                if "required_items" in tr and isinstance(tr["required_items"], list):
-                    result["mitigation_tasks"][j]["required_items"] = tr["required_items"]
-
-        for j, tr in enumerate(out_c):
-            if j < len(result.get("composite_risks") or []) and isinstance(tr, dict):
-                for key in ("title", "description", "conditions"):
-                    if key in tr and (key != "conditions" or isinstance(tr[key], list)):
-                        result["composite_risks"][j][key] = tr[key]
-
-        for j, tr in enumerate(out_b):
-            if j < len(result.get("bottlenecks") or []) and isinstance(tr, dict):
-                for key in ("location_description", "reason", "suggested_measures"):
-                    if key in tr:
-                        result["bottlenecks"][j][key] = tr[key]
-
-        for j, tr in enumerate(out_s):
-            if j < len(result.get("risk_time_series") or []) and isinstance(tr, dict) and "label" in tr:
-                result["risk_time_series"][j]["label"] = tr["label"]
-
-        logger.info("Translated simulation response to English (chunked, parallel).")
-        return result
+        logger.info(
+            "Translated simulation to English: %d strings, %d unique, %d from memory, "
+            "%d translated in %d batches (%.0f ms)",
+            len(strings),
+            len(unique),
+            len(known),
+            len(translated),
+            len(batches),
+            (time.perf_counter() - t0) * 1000,
+        )
+        return apply_translations(payload, strings, {**known, **translated})
 
 
 def _repair_json(raw: str) -> dict:
@@ -0,0 +1,171 @@
+"""ポリゴン幾何の共通処理（NumPy ベクトル化）。
+
+面積は球面上で、重心・内外判定・境界への射影はポリゴン近傍の局所平面（正距円筒）で計算する。
+イベント会場規模（数 km 以内）では局所平面の誤差は無視できる。
+"""
+
+import numpy as np
+
+from models import LatLng
+
+EARTH_RADIUS_M = 6371008.8
+
+# ポリゴンから大きく外れた座標（未設定の 0,0 など）は境界ではなく内部の代表点に寄せる
+FAR_OUTSIDE_M = 5000.0
+# 境界上の最近点を内側へずらす距離（境界上の点は内外判定が揺れる）
+INWARD_NUDGE_M = 0.5
+
+
+def polygon_arrays(polygon: list[LatLng]) -> tuple[np.ndarray, np.ndarray]:
+    """LatLng のリストを (lats, lngs) の配列に変換する。"""
+    return (
+        np.array([p.lat for p in polygon], dtype=float),
+        np.array([p.lng for p in polygon], dtype=float),
+    )
+
+
+def geodesic_area_m2(lats: np.ndarray, lngs: np.ndarray) -> float:
+    """球面上の多角形面積（m²）。頂点は経緯度（度）。"""
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lng = np.radians(np.asarray(lngs, dtype=float))
+    lng_next = np.roll(lng, -1)
+    lat_next = np.roll(lat, -1)
+    dlng = (lng_next - lng + np.pi) % (2 * np.pi) - np.pi
+    total = np.sum(dlng * (2 + np.sin(lat) + np.sin(lat_next)))
+    return float(abs(total) * EARTH_RADIUS_M ** 2 / 2.0)
+
+
+class LocalFrame:
+    """基準点まわりの局所平面（メートル）との相互変換。"""
+
+    def __init__(self, lat0: float, lng0: float) -> None:
+        self.lat0 = lat0
+        self.lng0 = lng0
+        self._ky = np.radians(1.0) * EARTH_RADIUS_M
+        self._kx = self._ky * np.cos(np.radians(lat0))
+
+    def to_xy(self, lats: np.ndarray, lngs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        dlng = (np.asarray(lngs, dtype=float) - self.lng0 + 180.0) % 360.0 - 180.0
+        return dlng * self._kx, (np.asarray(lats, dtype=float) - self.lat0) * self._ky
+
+    def to_latlng(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return self.lat0 + np.asarray(y) / self._ky, self.lng0 + np.asarray(x) / self._kx
+
+
+def _frame_for(lats: np.ndarray, lngs: np.ndarray) -> LocalFrame:
+    return LocalFrame(float(np.mean(lats)), float(lngs[0]))
+
+
+def _centroid_xy(x: np.ndarray, y: np.ndarray) -> tuple[float, float, float]:
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y1 - x1 * y
+    area2 = float(np.sum(cross))
+    if abs(area2) < 1e-9:
+        return float(np.mean(x)), float(np.mean(y)), 0.0
+    cx = float(np.sum((x + x1) * cross) / (3.0 * area2))
+    cy = float(np.sum((y + y1) * cross) / (3.0 * area2))
+    return cx, cy, abs(area2) / 2.0
+
+
+def polygon_centroid(polygon: list[LatLng]) -> tuple[float, float]:
+    """面積重み付きの重心 (lat, lng)。頂点の偏りに影響されない。退化ポリゴンは頂点平均。"""
+    lats, lngs = polygon_arrays(polygon)
+    frame = _frame_for(lats, lngs)
+    x, y = frame.to_xy(lats, lngs)
+    cx, cy, _area = _centroid_xy(x, y)
+    lat, lng = frame.to_latlng(cx, cy)
+    return float(lat), float(lng)
+
+
+def _points_in_polygon_xy(px: np.ndarray, py: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # 偶奇則（レイキャスト）を 点 × 辺 の行列で一括判定
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    pxc, pyc = px[:, None], py[:, None]
+    straddles = (y > pyc) != (y1 > pyc)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x + (pyc - y) * (x1 - x) / (y1 - y)
+    hits = straddles & (pxc < x_cross)
+    return (np.count_nonzero(hits, axis=1) % 2) == 1
+
+
+def points_in_polygon(lats: np.ndarray, lngs: np.ndarray, polygon: list[LatLng]) -> np.ndarray:
+    """複数点の内外判定を一括で行い、bool 配列を返す。"""
+    plats, plngs = polygon_arrays(polygon)
+    frame = _frame_for(plats, plngs)
+    x, y = frame.to_xy(plats, plngs)
+    px, py = frame.to_xy(lats, lngs)
+    return _points_in_polygon_xy(np.atleast_1d(px), np.atleast_1d(py), x, y)
+
+
+def _interior_point_xy(x: np.ndarray, y: np.ndarray) -> tuple[float, float]:
+    """必ず内側にある代表点。凸なら重心、そうでなければ（L 字など重心が外に出る形）重心を通る水平線が
+    ポリゴンを横切る区間のうち最も長いものの中点。"""
+    cx, cy, _area = _centroid_xy(x, y)
+    if _points_in_polygon_xy(np.array([cx]), np.array([cy]), x, y)[0]:
+        return cx, cy
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    # 頂点の高さちょうどを避け、重心の高さと y の中央の高さを試す
+    span = float(np.max(y) - np.min(y)) or 1.0
+    for line_y in (cy, float(np.min(y) + np.max(y)) / 2.0):
+        line_y += span * 1e-7
+        straddles = (y > line_y) != (y1 > line_y)
+        if np.count_nonzero(straddles) < 2:
+            continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            xs = np.sort((x + (line_y - y) * (x1 - x) / (y1 - y))[straddles])
+        # 偶奇則で [xs[0], xs[1]], [xs[2], xs[3]], ... が内側
+        widths = xs[1::2] - xs[0::2][: len(xs[1::2])]
+        best = int(np.argmax(widths))
+        return float((xs[2 * best] + xs[2 * best + 1]) / 2.0), line_y
+    return float(np.mean(x)), float(np.mean(y))
+
+
+def _nearest_on_boundary_xy(
+    px: np.ndarray, py: np.ndarray, x: np.ndarray, y: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    dx, dy = x1 - x, y1 - y
+    seg2 = np.maximum(dx * dx + dy * dy, 1e-12)
+    t = ((px[:, None] - x) * dx + (py[:, None] - y) * dy) / seg2
+    t = np.clip(t, 0.0, 1.0)
+    qx = x + t * dx
+    qy = y + t * dy
+    d2 = (qx - px[:, None]) ** 2 + (qy - py[:, None]) ** 2
+    best = np.argmin(d2, axis=1)
+    rows = np.arange(px.shape[0])
+    return qx[rows, best], qy[rows, best], np.sqrt(d2[rows, best]), best
+
+
+def clamp_points_to_polygon(
+    lats: np.ndarray,
+    lngs: np.ndarray,
+    polygon: list[LatLng],
+    far_outside_m: float = FAR_OUTSIDE_M,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ポリゴン外の点を境界上の最近点（から INWARD_NUDGE_M だけ内側）に寄せる。far_outside_m より遠い点と、
+    寄せても内側に入らない点（鋭い角の近く）は内部の代表点（_interior_point_xy。凹でも内側）に置く。
+
+    戻り値は (lats, lngs, moved)。moved は補正した点の bool 配列。
+    """
+    plats, plngs = polygon_arrays(polygon)
+    frame = _frame_for(plats, plngs)
+    x, y = frame.to_xy(plats, plngs)
+    px, py = frame.to_xy(np.atleast_1d(lats), np.atleast_1d(lngs))
+    inside = _points_in_polygon_xy(px, py, x, y)
+    if inside.all():
+        return np.atleast_1d(np.asarray(lats, dtype=float)), np.atleast_1d(np.asarray(lngs, dtype=float)), ~inside
+
+    qx, qy, dist, seg = _nearest_on_boundary_xy(px, py, x, y)
+    # 辺の内向きの法線（反時計回りなら左側）へずらす
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    dx, dy = (x1 - x)[seg], (y1 - y)[seg]
+    length = np.maximum(np.hypot(dx, dy), 1e-9)
+    orientation = 1.0 if float(np.sum(x * y1 - x1 * y)) >= 0 else -1.0
+    qx = qx - orientation * INWARD_NUDGE_M * dy / length
+    qy = qy + orientation * INWARD_NUDGE_M * dx / length
+    ix, iy = _interior_point_xy(x, y)
+    far = (dist > far_outside_m) | ~_points_in_polygon_xy(qx, qy, x, y)
+    out_x = np.where(inside, px, np.where(far, ix, qx))
+    out_y = np.where(inside, py, np.where(far, iy, qy))
+    out_lats, out_lngs = frame.to_latlng(out_x, out_y)
+    return out_lats, out_lngs, ~inside
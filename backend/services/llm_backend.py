@@ -0,0 +1,173 @@
+"""モデル呼び出しの口（バックエンド）。GeminiService と AssistEngine はこの口だけを使う。
+
+LLM_BACKEND で選ぶ:
+  vertex（既定） Vertex AI（google-genai。リージョンごとにクライアントを作る）
+  standin        プロセス内のスタンドイン（services/llm_standin。認証情報なしで解析・翻訳・アシストを通す）
+  http           HTTP のスタンドイン（python -m services.llm_standin で起動し、LLM_STANDIN_URL で指定）
+
+応答はどのバックエンドでも types.GenerateContentResponse（.text / .usage_metadata）で、
+失敗は google.genai.errors.APIError（ClientError / ServerError。str に HTTP ステータスを含む）で返す。
+既存の再試行（"429" / "500" / "503" を含むか）はバックエンドに関係なく働く。
+"""
+
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+import httpx
+from google import genai
+from google.genai import errors, types
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STANDIN_URL = "http://127.0.0.1:8090"
+DEFAULT_HTTP_TIMEOUT_S = 300.0
+
+
+class LLMBackend(ABC):
+    """generate / stream の口。location はルート表で段階ごとに指定したリージョン（使わないバックエンドは無視する）。"""
+
+    name = "none"
+
+    @abstractmethod
+    async def generate(
+        self,
+        model: str,
+        contents: str,
+        config: types.GenerateContentConfig,
+        location: str | None = None,
+    ) -> types.GenerateContentResponse:
+        """1 回の呼び出しの応答。失敗は errors.APIError（ClientError / ServerError）。"""
+
+    @abstractmethod
+    async def stream(
+        self,
+        model: str,
+        contents: str,
+        config: types.GenerateContentConfig,
+        location: str | None = None,
+    ) -> AsyncIterator[types.GenerateContentResponse]:
+        """断片の非同期イテレータを返す（aclose で上流も閉じる）。"""
+
+    def client_for(self, location: str | None = None) -> genai.Client | None:
+        """コンテキストキャッシュ等に使う genai クライアント。Vertex 以外は None。"""
+        return None
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+    async def aclose(self) -> None:
+        return None
+
+
+class VertexBackend(LLMBackend):
+    name = "vertex"
+
+    def __init__(self, project_id: str, location: str) -> None:
+        self._project_id = project_id
+        self._location = location
+        # ルート表でリージョンを指定した段階用のクライアント（リージョンごとに 1 つ）
+        self._clients: dict[str, genai.Client] = {}
+
+    def client_for(self, location: str | None = None) -> genai.Client:
+        location = location or self._location
+        client = self._clients.get(location)
+        if client is None:
+            client = genai.Client(vertexai=True, project=self._project_id, location=location)
+            self._clients[location] = client
+        return client
+
+    async def generate(self, model, contents, config, location=None):
+        return await self.client_for(location).aio.models.generate_content(
+            model=model,
+            contents=contents,
+            config=config,
+        )
+
+    async def stream(self, model, contents, config, location=None):
+        return await self.client_for(location).aio.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config,
+        )
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "project": self._project_id, "locations": sorted(self._clients)}
+
+
+def _raise_for_status(response: httpx.Response, body: bytes) -> None:
+    if response.status_code < 400:
+        return
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = {"error": {"code": response.status_code, "message": body.decode("utf-8", "replace")[:200]}}
+    if response.status_code < 500:
+        raise errors.ClientError(response.status_code, payload)
+    raise errors.ServerError(response.status_code, payload)
+
+
+class HttpBackend(LLMBackend):
+    """HTTP のスタンドイン（services/llm_standin の app）を呼ぶ。接続はプロセス内で使い回す。"""
+
+    name = "http"
+
+    def __init__(self, base_url: str | None = None, timeout_s: float | None = None) -> None:
+        self.base_url = (base_url or os.getenv("LLM_STANDIN_URL", DEFAULT_STANDIN_URL)).rstrip("/")
+        timeout = timeout_s or float(os.getenv("LLM_HTTP_TIMEOUT_S", DEFAULT_HTTP_TIMEOUT_S))
+        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=timeout)
+
+    @staticmethod
+    def _body(model: str, contents: str, config: types.GenerateContentConfig) -> dict:
+        return {"model": model, "contents": contents, "config": config.model_dump(mode="json", exclude_none=True)}
+
+    async def generate(self, model, contents, config, location=None):
+        response = await self._client.post("/v1/generate", json=self._body(model, contents, config))
+        _raise_for_status(response, response.content)
+        return types.GenerateContentResponse.model_validate(response.json())
+
+    async def stream(self, model, contents, config, location=None):
+        body = self._body(model, contents, config)
+
+        async def chunks() -> AsyncIterator[types.GenerateContentResponse]:
+            async with self._client.stream("POST", "/v1/stream", json=body) as response:
+                if response.status_code >= 400:
+                    _raise_for_status(response, await response.aread())
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield types.GenerateContentResponse.model_validate_json(line)
+
+        return chunks()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "url": self.base_url}
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def _make_inner(project_id: str | None, location: str | None) -> LLMBackend:
+    kind = os.getenv("LLM_BACKEND", "vertex").strip().lower()
+    if kind == "standin":
+        from services.llm_standin import StandInBackend
+
+        return StandInBackend()
+    if kind == "http":
+        return HttpBackend()
+    if kind != "vertex":
+        raise ValueError(f"LLM_BACKEND must be vertex, standin or http (got {kind!r})")
+    return VertexBackend(
+        project_id or os.getenv("PROJECT_ID", "flowguard-hackathon-2026"),
+        location or os.getenv("LOCATION", "us-central1"),
+    )
+
+
+def make_backend(project_id: str | None = None, location: str | None = None) -> LLMBackend:
+    """LLM_BACKEND: vertex（既定）/ standin / http。CASSETTE_MODE が record / replay ならカセットで包む。"""
+    from services.cassette import CassetteBackend, active_cassette
+
+    backend = _make_inner(project_id, location)
+    cassette = active_cassette()
+    return CassetteBackend(backend, cassette) if cassette is not None else backend
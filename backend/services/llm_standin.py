@@ -0,0 +1,487 @@
+"""Gemini の代わりに決まった形の応答を返すスタンドイン（認証情報なしで解析・翻訳・アシストを通すため）。
+
+プロンプトから呼び出しの種類（解析・カテゴリ別エージェント・合成・翻訳・テキスト）を見分け、
+スキーマどおりのリスク JSON などを組み立てて返す。文面は同じプロンプトなら同じ（LLM_STANDIN_SEED で変わる）。
+遅延・失敗・途中切れは環境変数で指定する:
+
+  LLM_STANDIN_LATENCY_MS   1 回の遅延の分布。"800"（固定）/ "uniform:200,900" / "normal:800,200" /
+                           "lognormal:800,0.4"（中央値 ms, σ）。既定 lognormal:800,0.4
+  LLM_STANDIN_MS_PER_TOKEN 出力・推論トークン 1 つあたりに足す遅延（ms）。既定 0
+  LLM_STANDIN_ERRORS       失敗の率。"429=0.05,500=0.01,503=0.02"。429 は待たずに、5xx は遅延の後に返す
+  LLM_STANDIN_TRUNCATE     途中切れ（finish_reason MAX_TOKENS）の率。max_output_tokens を超える応答は常に切れる
+  LLM_STANDIN_SEED         文面と失敗の乱数の種。既定 0
+
+プロセス内では LLM_BACKEND=standin、別プロセス（HTTP）では
+  python -m services.llm_standin --port 8090
+で起動し、LLM_BACKEND=http と LLM_STANDIN_URL=http://127.0.0.1:8090 を指定する。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+from collections import Counter
+from typing import AsyncIterator
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from google.genai import errors, types
+from pydantic import BaseModel
+
+from services.assist_memory import estimate_tokens
+from services.llm_backend import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY = "lognormal:800,0.4"
+ERROR_STATUS = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+STREAM_CHUNK_CHARS = 48
+# 多角形が読めないときの中心（東京駅）
+FALLBACK_CENTER = (35.681236, 139.767125)
+# 質問が日本語か（アシストの回答の言語を合わせる）
+_JA_RE = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff]")
+
+# カテゴリごとの (日本語, 英語) の題名
+RISK_TITLES: dict[str, list[tuple[str, str]]] = {
+    "crowd_safety": [
+        ("入場口での群衆の滞留", "Crowd build-up at the entrance"),
+        ("終演後の退場の集中", "Exit surge after the final act"),
+        ("通路の一方通行の破綻", "Breakdown of one-way walkways"),
+    ],
+    "traffic_logistics": [
+        ("周辺道路の渋滞", "Congestion on surrounding roads"),
+        ("違法駐車による緊急車両の遅れ", "Illegal parking delaying emergency vehicles"),
+        ("最寄り駅の改札の混雑", "Crowding at the nearest station gates"),
+    ],
+    "environmental_health": [
+        ("熱中症の発生", "Heatstroke cases"),
+        ("急な降雨による避難の混乱", "Confusion caused by sudden rain"),
+        ("給水所の不足", "Too few water stations"),
+    ],
+    "operational": [
+        ("トイレの待ち行列", "Long restroom queues"),
+        ("無線の不通による連絡の遅れ", "Radio dead zones delaying communication"),
+        ("ごみ集積所のあふれ", "Overflowing waste collection points"),
+    ],
+    "visibility": [
+        ("ステージ裏の死角", "Blind spot behind the stage"),
+        ("仮設構造物による監視の遮り", "Temporary structures blocking camera views"),
+        ("夜間の照明不足", "Insufficient lighting after dark"),
+    ],
+    "legal_compliance": [
+        ("道路使用許可の申請漏れ", "Missing road use permit"),
+        ("食品営業の届出漏れ", "Missing food business notification"),
+        ("音楽著作権の手続き漏れ", "Missing music licensing"),
+    ],
+}
+PLACES = [
+    ("メインステージ正面", "the area in front of the main stage"),
+    ("東入口付近の歩道", "the sidewalk near the east entrance"),
+    ("会場西側の避難経路", "the evacuation route on the west side"),
+    ("北側の交差点", "the intersection on the north side"),
+    ("飲食ブース周辺", "the food stall area"),
+]
+ACTIONS = [
+    ("誘導員を増員する", "Add more crowd stewards"),
+    ("案内表示を設置する", "Put up guidance signs"),
+    ("巡回の頻度を上げる", "Patrol more often"),
+    ("本部との連絡手順を見直す", "Review the reporting procedure to headquarters"),
+]
+CASCADES = [
+    ("救護所の混雑", "Overloaded first-aid tents"),
+    ("SNS での混乱の拡散", "Confusion spreading on social media"),
+]
+
+
+def latency_sampler(spec: str | None = None):
+    """LLM_STANDIN_LATENCY_MS の書式から、乱数を受け取って秒を返す関数を作る。"""
+    spec = (spec or os.getenv("LLM_STANDIN_LATENCY_MS", DEFAULT_LATENCY)).strip()
+    kind, _, args = spec.partition(":")
+    if not args:
+        fixed = float(kind) / 1000
+        return lambda rng: fixed
+    a, b = (float(x) for x in args.split(","))
+    if kind == "uniform":
+        return lambda rng: rng.uniform(a, b) / 1000
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(a, b)) / 1000
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(a), b) / 1000
+    raise ValueError(f"LLM_STANDIN_LATENCY_MS: unknown distribution {kind!r}")
+
+
+def parse_error_rates(spec: str | None = None) -> list[tuple[int, float]]:
+    spec = (spec if spec is not None else os.getenv("LLM_STANDIN_ERRORS", "")).strip()
+    rates = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        code, _, rate = part.partition("=")
+        rates.append((int(code), float(rate)))
+    if sum(rate for _, rate in rates) > 1:
+        raise ValueError("LLM_STANDIN_ERRORS: rates must add up to 1 or less")
+    return rates
+
+
+def api_error(code: int) -> errors.APIError:
+    payload = {"error": {"code": code, "message": "stand-in injected error", "status": ERROR_STATUS.get(code, "UNKNOWN")}}
+    return errors.ClientError(code, payload) if code < 500 else errors.ServerError(code, payload)
+
+
+def _count(pattern: str, text: str, default: tuple[int, int]) -> tuple[int, int]:
+    m = re.search(pattern, text)
+    return (int(m.group(1)), int(m.group(2))) if m else default
+
+
+class StandInModel:
+    """プロンプトから応答の本文を組み立てる（遅延・失敗は扱わない）。"""
+
+    def __init__(self, seed: int = 0) -> None:
+        self.seed = seed
+
+    @staticmethod
+    def kind(contents: str, system: str, config: types.GenerateContentConfig) -> str:
+        if contents.startswith("Translate each value"):
+            return "translation"
+        if config.response_mime_type != "application/json":
+            return "text"
+        if "ASSIGNED CATEGORY:" in system:
+            return "category"
+        if "MERGED RISKS" in contents:
+            return "synthesis"
+        return "analysis"
+
+    def respond(self, model: str, contents: str, config: types.GenerateContentConfig) -> tuple[str, str]:
+        """(呼び出しの種類, 本文) を返す。"""
+        system = str(config.system_instruction or "")
+        kind = self.kind(contents, system, config)
+        digest = hashlib.sha256(f"{self.seed}\x00{model}\x00{system}\x00{contents}".encode("utf-8")).digest()
+        rng = random.Random(digest)
+        prompt = system + "\n" + contents
+        ja = "Respond entirely in Japanese" in prompt
+        if kind == "translation":
+            keyed = json.loads(contents[contents.index("{"):])
+            return kind, json.dumps({k: f"[en] {v}" for k, v in keyed.items()}, ensure_ascii=False)
+        if kind == "text":
+            return kind, self._text(rng, contents, ja)
+        if kind == "category":
+            category = re.search(r"ASSIGNED CATEGORY: (\w+)", system).group(1)
+            lo, hi = _count(r"Generate (\d+) to (\d+) risk items", system, (2, 6))
+            risks = self._risks(rng, contents, [category], rng.randint(lo, hi), ja, "BILINGUAL OUTPUT:" in prompt)
+            return kind, json.dumps({"risks": risks}, ensure_ascii=False)
+        if kind == "synthesis":
+            lo, hi = _count(r"recommendations \((\d+)-(\d+) items\)", contents, (5, 15))
+            return kind, json.dumps(self._overall(rng, contents, rng.randint(lo, hi), ja, prompt), ensure_ascii=False)
+        lo, hi = _count(r"Generate between (\d+) and (\d+) risk items", system, (10, 20))
+        risks = self._risks(rng, contents, list(RISK_TITLES), rng.randint(lo, hi), ja, "BILINGUAL OUTPUT:" in prompt)
+        result = {"risks": risks, **self._overall(rng, contents, rng.randint(5, 8), ja, prompt)}
+        return kind, json.dumps(result, ensure_ascii=False)
+
+    @staticmethod
+    def _polygon(contents: str) -> list[tuple[float, float]]:
+        m = re.search(r"Polygon vertices: \[(.*?)\]", contents)
+        if not m:
+            return []
+        return [(float(a), float(b)) for a, b in re.findall(r"\(([-\d.]+), ([-\d.]+)\)", m.group(1))]
+
+    def _risks(
+        self,
+        rng: random.Random,
+        contents: str,
+        categories: list[str],
+        count: int,
+        ja: bool,
+        bilingual: bool,
+    ) -> list[dict]:
+        polygon = self._polygon(contents)
+        if polygon:
+            center = (sum(p[0] for p in polygon) / len(polygon), sum(p[1] for p in polygon) / len(polygon))
+        else:
+            center = FALLBACK_CENTER
+        risks = []
+        for i in range(count):
+            category = categories[i % len(categories)]
+            title = rng.choice(RISK_TITLES[category])
+            place = rng.choice(PLACES)
+            actions = rng.sample(ACTIONS, rng.randint(2, 3))
+            cascades = rng.sample(CASCADES, rng.randint(0, 2))
+            # 中心から頂点へ向かう線分上の点（星形の多角形なら内側に入る）
+            vertex = rng.choice(polygon) if polygon else center
+            t = rng.uniform(0.1, 0.7)
+            lat = center[0] + t * (vertex[0] - center[0])
+            lng = center[1] + t * (vertex[1] - center[1])
+            text = {
+                "title": title[0] if ja else title[1],
+                "description": f"{place[0]}で{title[0]}が起きるおそれがある。" if ja else f"{title[1]} may occur at {place[1]}.",
+                "location_description": place[0] if ja else place[1],
+                "evidence": "来場者数と会場の形状から推定。" if ja else "Estimated from attendance and venue layout.",
+                "mitigation_actions": [a[0] if ja else a[1] for a in actions],
+                "cascading_risks": [c[0] if ja else c[1] for c in cascades],
+            }
+            risk = {
+                "category": category,
+                **text,
+                "probability": round(rng.uniform(0.1, 0.9), 2),
+                "severity": round(rng.uniform(2.0, 9.5), 1),
+                "location": {"center": {"lat": round(lat, 6), "lng": round(lng, 6)}, "radius_meters": rng.choice([20, 30, 50, 80])},
+            }
+            if bilingual:
+                risk["en"] = {
+                    "title": title[1],
+                    "description": f"{title[1]} may occur at {place[1]}.",
+                    "location_description": place[1],
+                    "evidence": "Estimated from attendance and venue layout.",
+                    "mitigation_actions": [a[1] for a in actions],
+                    "cascading_risks": [c[1] for c in cascades],
+                }
+            risks.append(risk)
+        return risks
+
+    @staticmethod
+    def _overall(rng: random.Random, contents: str, count: int, ja: bool, prompt: str) -> dict:
+        recommendations = [
+            rng.choice(ACTIONS)[0 if ja else 1] + (f"（{i + 1}）" if ja else f" ({i + 1})") for i in range(count)
+        ]
+        result = {
+            "overall_risk_score": round(rng.uniform(3.0, 8.0), 1),
+            "summary": "群衆の滞留と熱中症への備えを優先する。" if ja else "Prioritise crowd flow and heat illness measures.",
+            "recommendations": recommendations,
+        }
+        if "BILINGUAL OUTPUT (overall)" in prompt:
+            name = re.search(r"Event(?: Name)?: (.*)", contents)
+            location = re.search(r"(?:Event Location / Venue|Location): (.*)", contents)
+            result["en"] = {
+                "event_name": f"[en] {name.group(1).strip()}" if name else "",
+                "event_location": f"[en] {location.group(1).strip()}" if location else "",
+                "summary": "Prioritise crowd flow and heat illness measures.",
+                "recommendations": [f"Recommendation {i + 1}" for i in range(count)],
+            }
+        return result
+
+    @staticmethod
+    def _text(rng: random.Random, contents: str, ja: bool) -> str:
+        ja = ja or bool(_JA_RE.search(contents[-400:]))
+        sentences = (
+            ["まず混雑しやすい入口の誘導を確認してください。", "次に ToDo の未完了の項目を担当者ごとに確認します。",
+             "天候が変わる場合は避難経路の案内を先に掲示してください。"]
+            if ja
+            else ["Check steward coverage at the busiest entrance first.", "Then review open ToDo items by owner.",
+                  "If the weather turns, post evacuation route guidance early."]
+        )
+        return ("" if ja else " ").join(rng.sample(sentences, rng.randint(2, 3)))
+
+
+def _thinking_tokens(config: types.GenerateContentConfig, output_tokens: int) -> int:
+    tc = config.thinking_config
+    if tc is None:
+        return 0
+    if tc.thinking_budget == 0:
+        return 0
+    if tc.thinking_level == types.ThinkingLevel.HIGH or tc.thinking_budget == -1:
+        return output_tokens * 2
+    return output_tokens // 2
+
+
+class StandInBackend(LLMBackend):
+    """プロセス内のスタンドイン。遅延・失敗・途中切れを注入し、応答は GenerateContentResponse で返す。"""
+
+    name = "standin"
+
+    def __init__(
+        self,
+        latency: str | None = None,
+        error_rates: str | None = None,
+        truncate_rate: float | None = None,
+        ms_per_token: float | None = None,
+        seed: int | None = None,
+    ) -> None:
+        seed = seed if seed is not None else int(os.getenv("LLM_STANDIN_SEED", "0"))
+        self.model = StandInModel(seed)
+        self._latency = latency_sampler(latency)
+        self._errors = parse_error_rates(error_rates)
+        self._truncate = truncate_rate if truncate_rate is not None else float(os.getenv("LLM_STANDIN_TRUNCATE", "0"))
+        self._ms_per_token = ms_per_token if ms_per_token is not None else float(os.getenv("LLM_STANDIN_MS_PER_TOKEN", "0"))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Counter[str] = Counter()
+        self.errors: Counter[int] = Counter()
+        self.truncated = 0
+        self.output_tokens = 0
+
+    def _draw(self) -> tuple[float, int | None, bool]:
+        """(遅延の秒, 失敗させるステータス, 途中で切るか)。"""
+        with self._lock:
+            latency = self._latency(self._rng)
+            roll = self._rng.random()
+            code = None
+            for c, rate in self._errors:
+                if roll < rate:
+                    code = c
+                    break
+                roll -= rate
+            return latency, code, self._rng.random() < self._truncate
+
+    def _build(self, model: str, contents: str, config: types.GenerateContentConfig, truncate: bool):
+        kind, text = self.model.respond(model, contents, config)
+        finish = types.FinishReason.STOP
+        limit = config.max_output_tokens
+        keep = len(text)
+        if limit and estimate_tokens(text) > limit:
+            # 出力上限に収まる長さ（文字数の比で見積もる）
+            keep = int(len(text) * limit / estimate_tokens(text))
+        if truncate:
+            with self._lock:
+                keep = min(keep, int(len(text) * self._rng.uniform(0.3, 0.9)))
+        if keep < len(text):
+            text = text[: max(1, keep)]
+            finish = types.FinishReason.MAX_TOKENS
+        output = estimate_tokens(text)
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=estimate_tokens(str(config.system_instruction or "")) + estimate_tokens(contents),
+            candidates_token_count=output,
+            thoughts_token_count=_thinking_tokens(config, output) or None,
+        )
+        with self._lock:
+            self.calls[kind] += 1
+            self.truncated += int(finish == types.FinishReason.MAX_TOKENS)
+            self.output_tokens += output
+        return text, finish, usage
+
+    def _extra_seconds(self, usage: types.GenerateContentResponseUsageMetadata) -> float:
+        tokens = (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+        return tokens * self._ms_per_token / 1000
+
+    def _fail(self, code: int) -> errors.APIError:
+        with self._lock:
+            self.errors[code] += 1
+        return api_error(code)
+
+    @staticmethod
+    def _response(text: str, finish=None, usage=None) -> types.GenerateContentResponse:
+        return types.GenerateContentResponse(
+            candidates=[
+                types.Candidate(
+                    content=types.Content(role="model", parts=[types.Part(text=text)]),
+                    finish_reason=finish,
+                )
+            ],
+            usage_metadata=usage,
+        )
+
+    async def generate(self, model, contents, config, location=None):
+        latency, code, truncate = self._draw()
+        if code == 429:
+            raise self._fail(code)
+        text, finish, usage = self._build(model, contents, config, truncate)
+        await asyncio.sleep(latency + self._extra_seconds(usage))
+        if code is not None:
+            raise self._fail(code)
+        return self._response(text, finish, usage)
+
+    async def stream(self, model, contents, config, location=None):
+        latency, code, truncate = self._draw()
+
+        async def chunks() -> AsyncIterator[types.GenerateContentResponse]:
+            if code == 429:
+                raise self._fail(code)
+            text, finish, usage = self._build(model, contents, config, truncate)
+            # 最初の断片まで latency、以降はトークンあたりの遅延を断片に割り振る
+            await asyncio.sleep(latency)
+            if code is not None:
+                raise self._fail(code)
+            parts = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+            step = self._extra_seconds(usage) / len(parts)
+            for i, part in enumerate(parts):
+                if i:
+                    await asyncio.sleep(step)
+                last = i == len(parts) - 1
+                yield self._response(part, finish if last else None, usage if last else None)
+
+        return chunks()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "calls": dict(self.calls),
+                "errors": {str(code): n for code, n in self.errors.items()},
+                "truncated": self.truncated,
+                "output_tokens": self.output_tokens,
+            }
+
+
+# ---------------------------------------------------------------------------
+# HTTP（llm_backend.HttpBackend の相手）
+# ---------------------------------------------------------------------------
+
+
+class GenerateBody(BaseModel):
+    model: str
+    contents: str
+    config: dict = {}
+
+
+app = FastAPI(title="FlowGuard LLM stand-in")
+_backend: StandInBackend | None = None
+
+
+def _standin() -> StandInBackend:
+    global _backend
+    if _backend is None:
+        _backend = StandInBackend()
+    return _backend
+
+
+def _error_response(exc: errors.APIError) -> JSONResponse:
+    return JSONResponse(status_code=exc.code, content=exc.details)
+
+
+@app.post("/v1/generate")
+async def generate(body: GenerateBody):
+    config = types.GenerateContentConfig.model_validate(body.config)
+    try:
+        response = await _standin().generate(body.model, body.contents, config)
+    except errors.APIError as exc:
+        return _error_response(exc)
+    return response.model_dump(mode="json", exclude_none=True)
+
+
+@app.post("/v1/stream")
+async def stream(body: GenerateBody):
+    """NDJSON（1 行 1 断片）。失敗は最初の断片の前に決まるので、ステータスコードで返す。"""
+    config = types.GenerateContentConfig.model_validate(body.config)
+    chunks = await _standin().stream(body.model, body.contents, config)
+    try:
+        first = await anext(chunks)
+    except errors.APIError as exc:
+        return _error_response(exc)
+
+    async def lines():
+        yield first.model_dump_json(exclude_none=True) + "\n"
+        async for chunk in chunks:
+            yield chunk.model_dump_json(exclude_none=True) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/stats")
+async def stats():
+    return _standin().stats()
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="FlowGuard LLM stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Prometheus のテキスト形式（0.0.4）で返すメトリクス（GET /metrics）。
+
+prometheus_client は使わず、ここで必要な分（カウンタ・ヒストグラムと、スクレイプのときに読むゲージ等）だけを持つ。
+
+- 記録はラベルの組ごとの値への加算だけ（メトリクスごとのロック 1 つ）。ヒストグラムのバケットは bisect で探す
+- 待ち行列の深さやキャッシュのヒット数など、既存の stats() にある値は記録し直さず、スクレイプのときにコレクタが読む
+- ラベルはルート（パスのテンプレート）・段階・モデル・外部サービス名に限る（値の種類が増え続けない）
+- METRICS_ENABLED=0 で記録と /metrics を止める（オーバーヘッドの比較用。benchmarks/metrics_overhead.py）
+- /metrics・/ready・/health（METRICS_SKIP_PATHS）は記録しない
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+# リクエスト・外部呼び出し（秒）と、モデル呼び出し（秒。数秒〜数分）のバケット
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MODEL_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0, 320.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+ENABLED = os.getenv("METRICS_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+# 記録しないパス（スクレイプ自身とヘルスチェック。件数が多く処理が軽いので、記録の手間の割合が大きい）
+SKIP_PATHS = frozenset(
+    p.strip() for p in os.getenv("METRICS_SKIP_PATHS", "/metrics,/ready,/health").split(",") if p.strip()
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = HTTP_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self._upper = tuple(sorted(buckets))
+        # ラベルの組 → [バケットごとの件数（累積しない。最後は +Inf）..., 合計]
+        self._values: dict[tuple[str | int, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str | int) -> None:
+        if not ENABLED:
+            return
+        i = bisect_left(self._upper, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0.0] * (len(self._upper) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self._header()
+        for labels, row in items:
+            cumulative = 0.0
+            for upper, count in zip(self._upper + (float("inf"),), row):
+                cumulative += count
+                le = 'le="' + _number(upper) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(row[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {_number(cumulative)}")
+        return lines
+
+
+@dataclass
+class Family:
+    """コレクタが返す 1 つのメトリクス（スクレイプのたびに stats() から作る）。samples は (ラベル, 値)。"""
+
+    name: str
+    kind: str
+    help: str
+    samples: list[tuple[dict[str, str], float]] = field(default_factory=list)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.samples:
+            if value is None:
+                continue
+            names = tuple(labels)
+            lines.append(f"{self.name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], list[Family]]] = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = HTTP_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], list[Family]]) -> None:
+        """スクレイプのときに呼ぶ関数を登録する（既存の stats() を Family に直す）。"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for family in collector():
+                lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# プロセスで 1 つ
+REGISTRY = Registry()
+
+# 件数はヒストグラムの _count（ステータス・成否のラベル別）。1 回の記録で済むよう、件数のカウンタは別に持たない
+HTTP_DURATION = REGISTRY.histogram(
+    "flowguard_http_request_duration_seconds",
+    "HTTP request duration in seconds, until the last body chunk (streams included); _count is the request count.",
+    ("method", "route", "status"),
+)
+# 実行中のリクエスト数。イベントループの中だけで増減するのでロックを取らない
+_http_in_flight = 0
+REGISTRY.register_collector(
+    lambda: [Family("flowguard_http_requests_in_flight", "gauge", "HTTP requests currently being served.", [({}, _http_in_flight)])]
+)
+MODEL_DURATION = REGISTRY.histogram(
+    "flowguard_model_call_duration_seconds",
+    "Model call duration in seconds by pipeline stage, model and outcome (ok, error, cancelled); _count is the call count.",
+    ("stage", "model", "outcome"),
+    MODEL_BUCKETS,
+)
+MODEL_TOKENS = REGISTRY.counter(
+    "flowguard_model_tokens_total", "Model tokens by kind (prompt, cached, thinking, output).", ("stage", "model", "kind")
+)
+MODEL_COST = REGISTRY.counter("flowguard_model_cost_usd_total", "Estimated model cost in USD (MODEL_PRICES).", ("stage", "model"))
+EXTERNAL_DURATION = REGISTRY.histogram(
+    "flowguard_external_request_duration_seconds",
+    "Outbound HTTP call duration in seconds by service (overpass, open_meteo) and outcome (ok, error); _count is the call count.",
+    ("service", "outcome"),
+    EXTERNAL_BUCKETS,
+)
+
+
+def record_model_call(
+    stage: str, model: str, seconds: float, outcome: str, tokens: tuple[int, int, int, int], cost: float | None
+) -> None:
+    """StageTimer から 1 回のモデル呼び出しを記録する。tokens は (prompt, cached, thinking, output)。"""
+    if not ENABLED:
+        return
+    MODEL_DURATION.observe(seconds, stage, model, outcome)
+    for kind, count in zip(("prompt", "cached", "thinking", "output"), tokens):
+        if count:
+            MODEL_TOKENS.inc(stage, model, kind, amount=count)
+    if cost:
+        MODEL_COST.inc(stage, model, amount=cost)
+
+
+@contextmanager
+def track_external(service: str) -> Iterator[None]:
+    """外部 HTTP 呼び出し 1 回の所要時間と成否（with の中で例外が出たら error）を記録する。"""
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_DURATION.observe(time.perf_counter() - t0, service, outcome)
+
+
+class MetricsMiddleware:
+    """HTTP リクエストの所要時間（と件数）・実行中の数を記録する ASGI ミドルウェア（BaseHTTPMiddleware を通さない）。
+    ルートはパスのテンプレート（/api/mitigation/{simulation_id}）。どのルートにも当たらなければ unmatched。
+    SKIP_PATHS のパスは記録しない。1 リクエストあたりの手間は send の包みとヒストグラムへの加算 1 回（数 µs）。"""
+
+    def __init__(self, app, skip_paths: frozenset[str] | None = None) -> None:
+        self.app = app
+        self.skip_paths = SKIP_PATHS if skip_paths is None else skip_paths
+
+    async def __call__(self, scope, receive, send) -> None:
+        global _http_in_flight
+        if scope["type"] != "http" or not ENABLED or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        t0 = time.perf_counter()
+
+        # コルーチンにせず send の awaitable をそのまま返す（メッセージごとのフレームを 1 つ減らす）
+        def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            return send(message)
+
+        _http_in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _http_in_flight -= 1
+            # status は int のまま渡す（文字列にするのは出力のとき）
+            path = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_DURATION.observe(time.perf_counter() - t0, scope["method"], path, status)
@@ -0,0 +1,281 @@
+"""対策効果（対策前→対策後）の集計をサーバー側で保持する。
+
+シミュレーションごとに MitigationImpact から ToDo 単位の寄与を前計算しておき、
+チェックの切り替えは該当 ToDo の寄与を足し引きするだけで集計値を更新する（その ToDo に紐づく採用リスクと時間帯の数だけ）。
+集計を返す summary() はピーク時間帯を選び直すので時間帯数・リスク数に比例する。
+返す dict はフロントの DeltaSummary（utils/mitigationDelta.ts）と同じキーで、
+ダッシュボードと build_pdf の両方がこの状態を参照する。
+
+状態はプロセス内・シミュレーション間で共有のキャッシュで、チェック状態の正はクライアント側にある。
+toggle は手元の revision を添えて送り、一致しなければ（別のタブ・別インスタンスが更新した、LRU から外れて読み直した）
+StaleMitigationRevision になるので、クライアントはチェック全体を sync し直す。
+"""
+
+import copy
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable
+
+from models import SimulationResponse
+
+logger = logging.getLogger(__name__)
+
+MAX_SIMULATIONS = 256
+
+
+class StaleMitigationRevision(Exception):
+    """toggle の revision が現在の状態と一致しない（チェック全体の同期が必要）。"""
+
+
+class MitigationState:
+    def __init__(self, response: SimulationResponse) -> None:
+        self.simulation_id = response.simulation_id
+        self.score_before = float(response.overall_risk_score or 0)
+        self.danger_before = len(response.danger_points)
+        self.risk_count_before = len(response.risks)
+        self.risk_ids = {r.id for r in response.risks}
+
+        # ToDo ID → (スコア差分, 危険ポイント差分, 混雑時間差分)
+        self.contrib: dict[str, tuple[float, int, float]] = {}
+        for m in response.mitigation_impacts:
+            if not m.mitigation_id:
+                continue
+            prev = self.contrib.get(m.mitigation_id, (0.0, 0, 0.0))
+            self.contrib[m.mitigation_id] = (
+                prev[0] + float(m.risk_score_delta or 0),
+                prev[1] + int(m.danger_count_delta or 0),
+                prev[2] + float(m.congestion_time_delta_minutes or 0),
+            )
+
+        self.slot_labels = [s.label or (s.start_time or "")[:16] or "—" for s in response.risk_time_series]
+        self.slot_base = [float(s.risk_score or 0) for s in response.risk_time_series]
+        self.slot_total = [len(s.risk_ids) for s in response.risk_time_series]
+        self.slot_unresolved = list(self.slot_total)
+        self.slots_by_risk: dict[str, list[int]] = {}
+        for i, s in enumerate(response.risk_time_series):
+            for rid in s.risk_ids:
+                self.slots_by_risk.setdefault(rid, []).append(i)
+
+        self.checked: set[str] = set()
+        self.score_delta = 0.0
+        self.danger_delta = 0
+        self.congestion_delta = 0.0
+
+        # 採用ToDo: リスク ID ⇄ ToDo ID の対応と、リスクごとの未完了数
+        self.adopted_by_risk: dict[str, set[str]] = {}
+        self.adopted_risks: dict[str, set[str]] = {}
+        self.pending_by_risk: dict[str, int] = {}
+        self.resolved: set[str] = set()
+
+        # 変更のたびに進める版。epoch は状態を作り直すと変わる（読み直し・別インスタンスの状態と区別する）
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+
+    @property
+    def revision(self) -> str:
+        return f"{self.epoch}.{self.version}"
+
+    def copy(self) -> "MitigationState":
+        """チェック・採用の状態だけを複製する（前計算した寄与・時間帯は共有する）。"""
+        clone = copy.copy(self)
+        clone.slot_unresolved = list(self.slot_unresolved)
+        clone.checked = set(self.checked)
+        clone.adopted_by_risk = {rid: set(tids) for rid, tids in self.adopted_by_risk.items()}
+        clone.adopted_risks = {tid: set(rids) for tid, rids in self.adopted_risks.items()}
+        clone.pending_by_risk = dict(self.pending_by_risk)
+        clone.resolved = set(self.resolved)
+        return clone
+
+    def set_adopted(self, adopted: list[dict] | None) -> None:
+        """採用ToDo（id, risk_id）を設定し直す。リスク解決状況と時間帯スコアを再計算する。"""
+        self.version += 1
+        for rid in list(self.resolved):
+            self._mark_resolved(rid, False)
+        self.adopted_by_risk.clear()
+        self.adopted_risks.clear()
+        for item in adopted or []:
+            if not isinstance(item, dict):
+                continue
+            tid = str(item.get("id") or "")
+            rid = str(item.get("risk_id") or "")
+            if not tid or not rid:
+                continue
+            self.adopted_by_risk.setdefault(rid, set()).add(tid)
+            self.adopted_risks.setdefault(tid, set()).add(rid)
+        self.pending_by_risk = {
+            rid: sum(1 for t in tids if t not in self.checked)
+            for rid, tids in self.adopted_by_risk.items()
+        }
+        for rid, pending in self.pending_by_risk.items():
+            if pending == 0:
+                self._mark_resolved(rid, True)
+
+    def _mark_resolved(self, risk_id: str, resolved: bool) -> None:
+        if resolved == (risk_id in self.resolved):
+            return
+        step = -1 if resolved else 1
+        if resolved:
+            self.resolved.add(risk_id)
+        else:
+            self.resolved.discard(risk_id)
+        for i in self.slots_by_risk.get(risk_id, ()):
+            self.slot_unresolved[i] += step
+
+    def toggle(self, task_id: str, checked: bool) -> None:
+        """ToDo 1 件のチェック状態を変更する。寄与の足し引きのみで集計を更新する。"""
+        task_id = str(task_id)
+        if checked == (task_id in self.checked):
+            return
+        self.version += 1
+        sign = 1 if checked else -1
+        if checked:
+            self.checked.add(task_id)
+        else:
+            self.checked.discard(task_id)
+        score, danger, congestion = self.contrib.get(task_id, (0.0, 0, 0.0))
+        self.score_delta += sign * score
+        self.danger_delta += sign * danger
+        self.congestion_delta += sign * congestion
+
+        for rid in self.adopted_risks.get(task_id, ()):
+            self.pending_by_risk[rid] -= sign
+            self._mark_resolved(rid, self.pending_by_risk[rid] == 0)
+
+    def set_checks(self, todo_checks: dict | None) -> None:
+        """チェック状態をまとめて同期する。差分のある ToDo だけ toggle する。"""
+        wanted = {str(k) for k, v in (todo_checks or {}).items() if v is True}
+        for tid in self.checked - wanted:
+            self.toggle(tid, False)
+        for tid in wanted - self.checked:
+            self.toggle(tid, True)
+
+    def _effective_slot_score(self, i: int) -> float:
+        total = self.slot_total[i]
+        if total == 0:
+            return self.slot_base[i]
+        return max(0.0, min(10.0, self.slot_base[i] * self.slot_unresolved[i] / total))
+
+    def _peak_label(self, effective: bool) -> str:
+        if not self.slot_base:
+            return "—"
+        scores = [self._effective_slot_score(i) if effective else self.slot_base[i] for i in range(len(self.slot_base))]
+        best = 0
+        for i in range(1, len(scores)):
+            if scores[i] > scores[best]:
+                best = i
+        return self.slot_labels[best]
+
+    def effective_time_slots(self) -> list[dict]:
+        return [
+            {"label": self.slot_labels[i], "risk_score": round(self._effective_slot_score(i), 2)}
+            for i in range(len(self.slot_base))
+        ]
+
+    def snapshot(self) -> dict:
+        """エンドポイント用: 集計 + 時間帯ごとの対策後スコア + revision。"""
+        return {**self.summary(), "effectiveTimeSlots": self.effective_time_slots(), "revision": self.revision}
+
+    def summary(self) -> dict:
+        score_after = max(0.0, min(10.0, self.score_before + self.score_delta))
+        danger_after = max(0, self.danger_before + self.danger_delta)
+        resolved = len(self.resolved & self.risk_ids) if self.adopted_by_risk else 0
+        risk_count_after = max(0, self.risk_count_before - resolved)
+        return {
+            "riskScoreBefore": self.score_before,
+            "riskScoreAfter": score_after,
+            "riskScoreDelta": self.score_delta,
+            "dangerCountBefore": self.danger_before,
+            "dangerCountAfter": danger_after,
+            "dangerCountDelta": self.danger_delta,
+            "riskItemCountBefore": self.risk_count_before,
+            "riskItemCountAfter": risk_count_after,
+            "riskItemCountDelta": risk_count_after - self.risk_count_before,
+            "peakTimeBeforeLabel": self._peak_label(False),
+            "peakTimeAfterLabel": self._peak_label(True),
+            "congestionDeltaMinutes": self.congestion_delta,
+            "hasAnyChecked": len(self.checked) > 0,
+        }
+
+
+class MitigationEffectEngine:
+    """シミュレーション ID ごとの MitigationState を保持する（LRU で上限あり）。"""
+
+    def __init__(self, max_simulations: int = MAX_SIMULATIONS) -> None:
+        self._states: OrderedDict[str, MitigationState] = OrderedDict()
+        self._max = max_simulations
+        self._lock = threading.Lock()
+        self._loader: Callable[[str], SimulationResponse | None] | None = None
+
+    def set_loader(self, loader: Callable[[str], SimulationResponse | None]) -> None:
+        """未登録の ID を問い合わせられたときに結果を読み込む関数（結果ストア）を設定する。"""
+        self._loader = loader
+
+    def register(self, response: SimulationResponse) -> MitigationState:
+        state = MitigationState(response)
+        with self._lock:
+            self._states[response.simulation_id] = state
+            self._states.move_to_end(response.simulation_id)
+            while len(self._states) > self._max:
+                self._states.popitem(last=False)
+        return state
+
+    def get(self, simulation_id: str) -> MitigationState | None:
+        with self._lock:
+            state = self._states.get(simulation_id)
+            if state is not None:
+                self._states.move_to_end(simulation_id)
+                return state
+        response = self._loader(simulation_id) if self._loader else None
+        return self.register(response) if response is not None else None
+
+    def ensure(self, response: SimulationResponse) -> MitigationState:
+        return self.get(response.simulation_id) or self.register(response)
+
+    def summary_for(
+        self,
+        response: SimulationResponse | str,
+        todo_checks: dict | None,
+        adopted_todos: list | None = None,
+    ) -> dict | None:
+        """レポート出力・アシスト用: リクエストのチェック内容で集計を返す。共有の状態（ダッシュボード）は変えず、複製に適用する。
+        response はシミュレーション結果かその ID（ID で未知なら None）。
+        adopted_todos が None なら、sync と同じく現在の採用ToDo をそのまま使う。"""
+        state = self.get(response) if isinstance(response, str) else self.ensure(response)
+        if state is None:
+            return None
+        with self._lock:
+            state = state.copy()
+        state.set_checks(todo_checks)
+        if adopted_todos is not None:
+            state.set_adopted(adopted_todos)
+        return state.summary()
+
+    def current(self, simulation_id: str) -> dict | None:
+        state = self.get(simulation_id)
+        if state is None:
+            return None
+        with self._lock:
+            return state.snapshot()
+
+    def toggle(self, simulation_id: str, task_id: str, checked: bool, revision: str | None = None) -> dict | None:
+        """revision を渡すと、現在の状態の revision と一致するときだけ適用する（違えば StaleMitigationRevision）。"""
+        state = self.get(simulation_id)
+        if state is None:
+            return None
+        with self._lock:
+            if revision is not None and revision != state.revision:
+                raise StaleMitigationRevision(state.revision)
+            state.toggle(task_id, checked)
+            return state.snapshot()
+
+    def sync(self, simulation_id: str, todo_checks: dict | None, adopted_todos: list | None) -> dict | None:
+        state = self.get(simulation_id)
+        if state is None:
+            return None
+        with self._lock:
+            state.set_checks(todo_checks)
+            if adopted_todos is not None:
+                state.set_adopted(adopted_todos)
+            return state.snapshot()
@@ -0,0 +1,219 @@
+"""パイプラインの段階（stage）ごとのモデルの割り当てと、段階ごとの所要時間・トークン数の記録。
+
+段階: analysis（単一モデルの解析）、category.<カテゴリ>（カテゴリ別エージェント）、synthesis、translation、
+assist、assist.summary。ルート表は JSON で、MODEL_ROUTES_FILE（ファイル）と MODEL_ROUTES（環境変数。
+同じキーはファイルより優先）から読む。
+
+    {
+      "category": {"model": "gemini-2.5-flash", "thinking": "off"},
+      "category.legal_compliance": {"model": "gemini-2.5-pro"},
+      "synthesis": {"model": "gemini-3-pro-preview", "location": "global", "thinking": "high"},
+      "deep:synthesis": {"max_output_tokens": 8192},
+      "translation": {"model": "gemini-2.5-flash-lite", "location": "us-central1"}
+    }
+
+キーは「段階の系列（category）→ 段階（category.visibility）→ 解析の段階付き（deep:category → deep:category.visibility）」の
+順に重ね、後のものほど優先する。指定の無い項目は解析の段階（analysis_tiers）の既定のまま。
+項目: model, location, temperature, top_p, max_output_tokens, thinking（off / low / high）。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from google.genai import types
+
+from models import ModelCallUsage
+from services.metrics import record_model_call
+from services.model_usage import current_ledger, estimate_cost, usage_counts
+
+logger = logging.getLogger(__name__)
+
+ROUTE_FIELDS = ("model", "location", "temperature", "top_p", "max_output_tokens", "thinking")
+LATENCY_WINDOW = 256
+
+
+class ModelRoute:
+    """1 つの段階に重ねた上書き（None は上書きしない）。"""
+
+    def __init__(self, **fields) -> None:
+        self.model: str | None = fields.get("model")
+        self.location: str | None = fields.get("location")
+        self.temperature: float | None = fields.get("temperature")
+        self.top_p: float | None = fields.get("top_p")
+        self.max_output_tokens: int | None = fields.get("max_output_tokens")
+        self.thinking: str | None = fields.get("thinking")
+
+    def config(self, config: types.GenerateContentConfig) -> types.GenerateContentConfig:
+        update = {
+            name: getattr(self, name)
+            for name in ("temperature", "top_p", "max_output_tokens")
+            if getattr(self, name) is not None
+        }
+        return config.model_copy(update=update) if update else config
+
+
+def _load_routes() -> dict[str, dict]:
+    routes: dict[str, dict] = {}
+    path = os.getenv("MODEL_ROUTES_FILE", "").strip()
+    sources: list[tuple[str, str]] = []
+    if path:
+        with open(path, encoding="utf-8") as f:
+            sources.append((path, f.read()))
+    if os.getenv("MODEL_ROUTES", "").strip():
+        sources.append(("MODEL_ROUTES", os.environ["MODEL_ROUTES"]))
+    for name, text in sources:
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError(f"{name}: model routes must be a JSON object")
+        for key, route in data.items():
+            if not isinstance(route, dict):
+                raise ValueError(f"{name}: route {key!r} must be an object")
+            unknown = set(route) - set(ROUTE_FIELDS)
+            if unknown:
+                raise ValueError(f"{name}: route {key!r} has unknown fields {sorted(unknown)}")
+            if route.get("thinking") not in (None, "off", "low", "high"):
+                raise ValueError(f"{name}: route {key!r} thinking must be off, low or high")
+            routes[key] = route
+    return routes
+
+
+class ModelRouter:
+    def __init__(self, routes: dict[str, dict] | None = None) -> None:
+        self.routes = _load_routes() if routes is None else routes
+        if self.routes:
+            logger.info("Model routes loaded: %s", ", ".join(sorted(self.routes)))
+
+    def route(self, stage: str, tier: str | None = None) -> ModelRoute:
+        family = stage.split(".", 1)[0]
+        keys = [family, stage] if family != stage else [stage]
+        if tier:
+            keys += [f"{tier}:{k}" for k in keys]
+        merged: dict = {}
+        for key in keys:
+            merged.update(self.routes.get(key) or {})
+        return ModelRoute(**merged)
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class _StageCounters:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.cost_usd = 0.0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.thinking_tokens = 0
+        self.output_tokens = 0
+        self.latencies: list[float] = []
+
+
+class StageMetrics:
+    """段階 × モデルごとの呼び出し回数・失敗・再試行・所要時間（直近 LATENCY_WINDOW 件の p50/p95）・トークン数・
+    見積もり費用の累計（プロセス全体。ダッシュボード用）。"""
+
+    def __init__(self) -> None:
+        self._stages: dict[tuple[str, str], _StageCounters] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        stage: str,
+        model: str,
+        seconds: float,
+        usage=None,
+        error: bool = False,
+        attempt: int = 1,
+        cost_usd: float | None = None,
+    ) -> None:
+        prompt, cached, thinking, output = usage_counts(usage)
+        with self._lock:
+            c = self._stages.get((stage, model))
+            if c is None:
+                c = self._stages[(stage, model)] = _StageCounters()
+            c.calls += 1
+            c.errors += int(error)
+            c.retries += int(attempt > 1)
+            c.latencies.append(seconds)
+            if len(c.latencies) > LATENCY_WINDOW:
+                del c.latencies[0]
+            c.prompt_tokens += prompt
+            c.cached_tokens += cached
+            c.thinking_tokens += thinking
+            c.output_tokens += output
+            c.cost_usd += cost_usd or 0.0
+
+    def stats(self) -> dict:
+        out: dict[str, dict] = {}
+        with self._lock:
+            for (stage, model), c in sorted(self._stages.items()):
+                p50 = _percentile(c.latencies, 0.5)
+                p95 = _percentile(c.latencies, 0.95)
+                out.setdefault(stage, {})[model] = {
+                    "calls": c.calls,
+                    "errors": c.errors,
+                    "retries": c.retries,
+                    "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                    "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                    "prompt_tokens": c.prompt_tokens,
+                    "cached_tokens": c.cached_tokens,
+                    "thinking_tokens": c.thinking_tokens,
+                    "output_tokens": c.output_tokens,
+                    "cost_usd": round(c.cost_usd, 6),
+                }
+        return out
+
+
+class StageTimer:
+    """async with で 1 回の呼び出しを計る。usage は呼び出し後に response.usage_metadata を入れる。
+    プロセス全体の集計に加え、開いている台帳（model_usage.usage_ledger）があればそこにも 1 件記録する。"""
+
+    def __init__(self, metrics: "StageMetrics", stage: str, model: str, attempt: int = 1) -> None:
+        self.metrics = metrics
+        self.stage = stage
+        self.model = model
+        self.attempt = attempt
+        self.usage = None
+
+    async def __aenter__(self) -> "StageTimer":
+        self._t0 = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        seconds = time.perf_counter() - self._t0
+        error = exc_type is not None and not issubclass(exc_type, asyncio.CancelledError)
+        prompt, cached, thinking, output = usage_counts(self.usage)
+        cost = estimate_cost(self.model, prompt, cached, thinking, output)
+        self.metrics.record(self.stage, self.model, seconds, self.usage, error, self.attempt, cost)
+        outcome = "ok" if exc_type is None else "error" if error else "cancelled"
+        record_model_call(self.stage, self.model, seconds, outcome, (prompt, cached, thinking, output), cost)
+        ledger = current_ledger()
+        if ledger is not None:
+            ledger.record(
+                ModelCallUsage(
+                    stage=self.stage,
+                    model=self.model,
+                    attempt=self.attempt,
+                    ok=exc_type is None,
+                    latency_ms=round(seconds * 1000, 1),
+                    prompt_tokens=prompt,
+                    cached_tokens=cached,
+                    thinking_tokens=thinking,
+                    output_tokens=output,
+                    cost_usd=round(cost, 6) if cost is not None else None,
+                )
+            )
+
+
+# プロセス全体で 1 つ（/health の model_stages）
+STAGE_METRICS = StageMetrics()
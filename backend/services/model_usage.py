@@ -0,0 +1,148 @@
+"""モデル呼び出しごとの使用量（トークン・所要時間・試行回数・段階）と費用の見積もり。
+
+StageTimer（model_routing）が呼び出しのたびに記録する。シミュレーションや翻訳の間は
+usage_ledger() で台帳を開き、その間の呼び出し（並列のカテゴリ別エージェントを含む。asyncio のタスクは
+作成時のコンテキストを引き継ぐ）を SimulationResponse.usage の内訳にまとめる。
+
+費用は MODEL_PRICES（USD / 100 万トークン）による見積もり。キャッシュ済みのトークンは prompt_token_count に
+含まれるため、その分は cached の単価で数える。推論トークンは出力の単価。単価の無いモデルは None。
+"""
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from models import ModelCallUsage, ModelUsageTotals, SimulationUsage
+
+logger = logging.getLogger(__name__)
+
+# 公開の単価（USD / 100 万トークン、200k トークン以下のプロンプト）。MODEL_PRICES（JSON）で上書き・追加する
+DEFAULT_PRICES: dict[str, dict[str, float]] = {
+    "gemini-3-pro": {"input": 2.0, "cached": 0.2, "output": 12.0},
+    "gemini-2.5-pro": {"input": 1.25, "cached": 0.125, "output": 10.0},
+    "gemini-2.5-flash-lite": {"input": 0.1, "cached": 0.01, "output": 0.4},
+    "gemini-2.5-flash": {"input": 0.3, "cached": 0.03, "output": 2.5},
+}
+
+
+def _load_prices() -> dict[str, dict[str, float]]:
+    prices = dict(DEFAULT_PRICES)
+    raw = os.getenv("MODEL_PRICES", "").strip()
+    if raw:
+        prices.update(json.loads(raw))
+    return prices
+
+
+PRICES = _load_prices()
+
+
+def price_for(model: str) -> dict[str, float] | None:
+    """モデル ID に前方一致する単価のうち最も長いキーのもの（gemini-2.5-flash-lite は flash より優先）。"""
+    matches = [key for key in PRICES if model.startswith(key)]
+    return PRICES[max(matches, key=len)] if matches else None
+
+
+def usage_counts(usage) -> tuple[int, int, int, int]:
+    """usage_metadata から (prompt, cached, thinking, output) のトークン数。"""
+    if usage is None:
+        return 0, 0, 0, 0
+    return (
+        getattr(usage, "prompt_token_count", None) or 0,
+        getattr(usage, "cached_content_token_count", None) or 0,
+        getattr(usage, "thoughts_token_count", None) or 0,
+        getattr(usage, "candidates_token_count", None) or 0,
+    )
+
+
+def estimate_cost(model: str, prompt: int, cached: int, thinking: int, output: int) -> float | None:
+    price = price_for(model)
+    if price is None:
+        return None
+    cached = min(cached, prompt)
+    return (
+        (prompt - cached) * price["input"]
+        + cached * price.get("cached", price["input"])
+        + (thinking + output) * price["output"]
+    ) / 1_000_000
+
+
+def _add(totals: ModelUsageTotals, call: ModelCallUsage) -> None:
+    totals.calls += 1
+    totals.failed += int(not call.ok)
+    totals.latency_ms = round(totals.latency_ms + call.latency_ms, 1)
+    totals.max_latency_ms = max(totals.max_latency_ms, call.latency_ms)
+    totals.prompt_tokens += call.prompt_tokens
+    totals.cached_tokens += call.cached_tokens
+    totals.thinking_tokens += call.thinking_tokens
+    totals.output_tokens += call.output_tokens
+    if call.cost_usd is not None:
+        totals.cost_usd = round((totals.cost_usd or 0) + call.cost_usd, 6)
+
+
+class UsageLedger:
+    """1 回の処理（シミュレーション・翻訳）のモデル呼び出しの台帳。"""
+
+    def __init__(self, prior: SimulationUsage | None = None, parent: "UsageLedger | None" = None) -> None:
+        self.calls: list[ModelCallUsage] = list(prior.calls) if prior else []
+        self._prior_wall_ms = prior.wall_ms if prior else 0.0
+        self._t0 = time.perf_counter()
+        # 外側で開いている台帳（予算の精算用に main が開くもの）。新しい呼び出しはそこにも記録する
+        self._parent = parent
+
+    def record(self, call: ModelCallUsage) -> None:
+        self.calls.append(call)
+        if self._parent is not None:
+            self._parent.record(call)
+
+    def summary(self) -> SimulationUsage:
+        total = ModelUsageTotals()
+        by_stage: dict[str, ModelUsageTotals] = {}
+        for call in self.calls:
+            _add(total, call)
+            _add(by_stage.setdefault(call.stage, ModelUsageTotals()), call)
+        return SimulationUsage(
+            wall_ms=round(self._prior_wall_ms + (time.perf_counter() - self._t0) * 1000, 1),
+            total=total,
+            by_stage=by_stage,
+            calls=list(self.calls),
+        )
+
+    def describe(self) -> str:
+        """ログ用の 1 行（合計と、所要時間の長い段階）。"""
+        usage = self.summary()
+        slowest = sorted(usage.by_stage.items(), key=lambda kv: kv[1].max_latency_ms, reverse=True)[:3]
+        total = usage.total
+        return "%d calls (%d failed), %d prompt / %d cached / %d thinking / %d output tokens, %s, wall %.0f ms; slowest: %s" % (
+            total.calls,
+            total.failed,
+            total.prompt_tokens,
+            total.cached_tokens,
+            total.thinking_tokens,
+            total.output_tokens,
+            f"${total.cost_usd:.4f}" if total.cost_usd is not None else "cost n/a",
+            usage.wall_ms,
+            ", ".join(f"{stage} {t.max_latency_ms:.0f} ms" for stage, t in slowest) or "-",
+        )
+
+
+_current: ContextVar[UsageLedger | None] = ContextVar("model_usage_ledger", default=None)
+
+
+def current_ledger() -> UsageLedger | None:
+    return _current.get()
+
+
+@contextmanager
+def usage_ledger(prior: SimulationUsage | None = None) -> Iterator[UsageLedger]:
+    """この with の間（とその中で作ったタスク）のモデル呼び出しを台帳に記録する。prior の呼び出しに続けて記録する。
+    外側の台帳が開いていれば、新しい呼び出しはそちらにも記録する（prior の分は記録しない）。"""
+    ledger = UsageLedger(prior, _current.get())
+    token = _current.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current.reset(token)
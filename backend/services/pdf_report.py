@@ -3,7 +3,11 @@ import logging
 import os
 import re
 import subprocess
-from datetime import datetime
+import tempfile
+import time
+from contextlib import suppress
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
 
 from reportlab.lib import colors
 
@@ -15,6 +19,7 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen.canvas import Canvas
 from reportlab.platypus import (
+    Flowable,
     SimpleDocTemplate,
     Paragraph,
     Spacer,
@@ -22,117 +27,24 @@ from reportlab.platypus import (
     TableStyle,
 )
 
-from models import SimulationResponse, RiskCategory
-
-RISK_CATEGORY_HEADINGS_EN = {
-    RiskCategory.CROWD_SAFETY: "Crowd Safety",
-    RiskCategory.TRAFFIC_LOGISTICS: "Traffic & Logistics",
-    RiskCategory.ENVIRONMENTAL_HEALTH: "Environmental & Health",
-    RiskCategory.OPERATIONAL: "Operational",
-    RiskCategory.VISIBILITY: "Visibility & Blind Spots",
-    RiskCategory.LEGAL_COMPLIANCE: "Legal & Compliance",
-}
-
-RISK_CATEGORY_HEADINGS_JA = {
-    RiskCategory.CROWD_SAFETY: "群衆安全",
-    RiskCategory.TRAFFIC_LOGISTICS: "交通・物流",
-    RiskCategory.ENVIRONMENTAL_HEALTH: "環境・健康",
-    RiskCategory.OPERATIONAL: "運営",
-    RiskCategory.VISIBILITY: "高さ・死角",
-    RiskCategory.LEGAL_COMPLIANCE: "法的留意点",
-}
-
-LABELS_JA = {
-    "title": "FlowGuard AI",
-    "subtitle": "イベントリスク評価レポート",
-    "one_page_subtitle": "1枚サマリー",
-    "event": "イベント",
-    "location": "開催場所",
-    "date_time": "開催日時",
-    "report_id": "レポートID",
-    "generated": "作成日時",
-    "executive_summary": "エグゼクティブサマリー",
-    "overall_risk_score": "総合リスクスコア",
-    "risk_overview": "カテゴリ別リスク概要",
-    "category": "カテゴリ",
-    "count": "件数",
-    "detailed_risks": "リスク詳細",
-    "top_risks": "重要リスク（トップ3）",
-    "mitigation": "軽減策",
-    "recommendations": "推奨事項",
-    "immediate_actions": "今すぐやるべき対策",
-    "severity": "深刻度",
-    "probability": "発生確率",
-    "place": "場所",
-    "time_series": "時間帯ごとのリスク",
-    "time_slot": "時間帯",
-    "footer": "本レポートは FlowGuard AI により自動生成されています。計画の参考としてご利用ください。専門的な安全・法務の助言に代わるものではありません。",
-    "todo_list": "対策ToDo一覧",
-    "status": "状態",
-    "done": "完了",
-    "pending": "未完了",
-    "assignee": "担当",
-    "action": "対策内容",
-    "due_by": "期限",
-    "related_risk": "関連リスク",
-    "adopted_todos": "採用済みToDo（次にやるべきから採用）",
-    "recommended_routes": "推奨導線",
-    "staff_placement": "誘導員配置推奨",
-    "map_pins": "地図ピン",
-    "pin_name": "名称",
-    "pin_memo": "メモ",
-    "pin_type": "種別",
-    "bottleneck_reason": "理由",
-    "bottleneck_measures": "推奨対策",
-    "importance": "重要度",
-    "urgency": "緊急度",
-}
-
-LABELS_EN = {
-    "title": "FlowGuard AI",
-    "subtitle": "Event Risk Assessment Report",
-    "one_page_subtitle": "One-Page Summary",
-    "event": "Event",
-    "location": "Location",
-    "date_time": "Date / Time",
-    "report_id": "Report ID",
-    "generated": "Generated",
-    "executive_summary": "Executive Summary",
-    "overall_risk_score": "Overall Risk Score",
-    "risk_overview": "Risk Overview by Category",
-    "category": "Category",
-    "count": "Count",
-    "detailed_risks": "Detailed Risk Items",
-    "top_risks": "Top 3 Risks",
-    "mitigation": "Mitigation",
-    "recommendations": "Recommendations",
-    "immediate_actions": "Immediate Actions",
-    "severity": "Severity",
-    "probability": "Probability",
-    "place": "Location",
-    "time_series": "Risk by Time Slot",
-    "time_slot": "Time slot",
-    "footer": "This report was generated by FlowGuard AI. It is intended to support planning and does not replace professional safety or legal advice.",
-    "todo_list": "Mitigation ToDo List",
-    "status": "Status",
-    "done": "Done",
-    "pending": "Pending",
-    "assignee": "Assignee",
-    "action": "Action",
-    "due_by": "Due by",
-    "related_risk": "Related risk",
-    "adopted_todos": "Adopted ToDo (from Next Actions)",
-    "recommended_routes": "Recommended Routes",
-    "staff_placement": "Staff Placement",
-    "map_pins": "Map Pins",
-    "pin_name": "Name",
-    "pin_memo": "Memo",
-    "pin_type": "Type",
-    "bottleneck_reason": "Reason",
-    "bottleneck_measures": "Suggested measures",
-    "importance": "Importance",
-    "urgency": "Urgency",
-}
+from models import SimulationResponse
+from services.report_ir import (
+    ReportIR,
+    build_report_ir,
+    congestion_text,
+    count_text,
+    render_report,
+    truncate as _truncate,
+)
+
+ROLE_PDF_VARIANTS = ("role_organizer", "role_security", "role_local_gov", "role_venue_manager", "runbook")
+PDF_VARIANTS = ("full", "one_page") + ROLE_PDF_VARIANTS
+
+# 組版時に先読みする flowable の数と、長い表（ToDo・ピン）を分割する行数
+STORY_WINDOW = int(os.getenv("PDF_STORY_WINDOW", "64"))
+TABLE_CHUNK_ROWS = int(os.getenv("PDF_TABLE_CHUNK_ROWS", "40"))
+# ストリーミング配信用の一時ファイルの置き場所（None ならシステムの一時ディレクトリ）
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None
 
 _JAPANESE_FONT_REGISTERED: bool | None = None
 _PDF_FONT_NAME = "Helvetica"
@@ -165,22 +77,24 @@ def _make_numbered_canvas(pdf_font_name: str):
     return NumberedCanvas
 
 
-def _get_pdf_font() -> tuple[str, bool]:
-    global _JAPANESE_FONT_REGISTERED, _PDF_FONT_NAME
-    if _JAPANESE_FONT_REGISTERED is not None:
-        return _PDF_FONT_NAME, _JAPANESE_FONT_REGISTERED
-    candidates = [
-        "/app/fonts/NotoSansCJK.ttc",
-        "/app/fonts/ipaex.ttf",
-        "/usr/share/fonts/opentype/noto-cjk/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/truetype/noto-cjk/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/opentype/ipaexfont/ipaexg.ttf",
-        "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
-        "C:/Windows/Fonts/meiryo.ttf",
-        "C:/Windows/Fonts/msgothic.ttc",
-    ]
+FONT_CANDIDATES = [
+    "/app/fonts/NotoSansCJK.ttc",
+    "/app/fonts/ipaex.ttf",
+    "/usr/share/fonts/opentype/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/opentype/ipaexfont/ipaexg.ttf",
+    "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+    "C:/Windows/Fonts/meiryo.ttf",
+    "C:/Windows/Fonts/msgothic.ttc",
+]
+
+# 解決済みフォントパスのディスクキャッシュ。描画ワーカーの起動・入れ替えのたびに fc-list を走らせない
+FONT_PATH_CACHE = os.getenv("PDF_FONT_CACHE", os.path.join(tempfile.gettempdir(), "flowguard_pdf_font.txt"))
+
+
+def _fc_list_japanese_font() -> str | None:
     try:
         out = subprocess.run(
             ["fc-list", "--format=%{file}\\n", ":lang=ja"],
@@ -196,10 +110,45 @@ def _get_pdf_font() -> tuple[str, bool]:
                 if path.lower().endswith((".ttf", ".ttc")):
                     low = path.lower()
                     if "noto" in low or "cjk" in low or "japanese" in low or "jp" in low or "ipa" in low:
-                        candidates.insert(0, path)
-                        break
+                        return path
     except (FileNotFoundError, subprocess.TimeoutExpired):
         pass
+    return None
+
+
+def _font_candidates() -> list[str]:
+    """登録を試すフォントパス。PDF_FONT_PATH → ディスクキャッシュ → fc-list → 既定の候補 の順。"""
+    candidates = list(FONT_CANDIDATES)
+    try:
+        with open(FONT_PATH_CACHE, encoding="utf-8") as f:
+            cached = f.read().strip()
+    except OSError:
+        cached = ""
+    if cached and os.path.isfile(cached):
+        candidates.insert(0, cached)
+    else:
+        found = _fc_list_japanese_font()
+        if found:
+            candidates.insert(0, found)
+    override = os.getenv("PDF_FONT_PATH")
+    if override:
+        candidates.insert(0, override)
+    return candidates
+
+
+def _remember_font_path(path: str) -> None:
+    try:
+        with open(FONT_PATH_CACHE, "w", encoding="utf-8") as f:
+            f.write(path)
+    except OSError as e:
+        logger.debug("Font path cache not written: %s", e)
+
+
+def _get_pdf_font() -> tuple[str, bool]:
+    global _JAPANESE_FONT_REGISTERED, _PDF_FONT_NAME
+    if _JAPANESE_FONT_REGISTERED is not None:
+        return _PDF_FONT_NAME, _JAPANESE_FONT_REGISTERED
+    candidates = _font_candidates()
     for path in candidates:
         if not os.path.isfile(path):
             continue
@@ -210,6 +159,7 @@ def _get_pdf_font() -> tuple[str, bool]:
                 pdfmetrics.registerFont(TTFont("PdfJapanese", path))
             _PDF_FONT_NAME = "PdfJapanese"
             _JAPANESE_FONT_REGISTERED = True
+            _remember_font_path(path)
             logger.info("PDF Japanese font registered: %s", path)
             return _PDF_FONT_NAME, True
         except Exception as e:
@@ -220,28 +170,54 @@ def _get_pdf_font() -> tuple[str, bool]:
     return _PDF_FONT_NAME, False
 
 
+def warm_up() -> dict:
+    """フォントを解決・登録し、小さな文書を 1 枚描画して ReportLab を温める。所要時間（ms）を返す。"""
+    t0 = time.perf_counter()
+    pdf_font_name, use_unicode = _get_pdf_font()
+    font_ms = (time.perf_counter() - t0) * 1000
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    style = ParagraphStyle(name="WarmUp", fontName=pdf_font_name, fontSize=10)
+    table = Table([["FlowGuard", _safe_text("混雑リスク", use_unicode)]], style=TableStyle([("FONTNAME", (0, 0), (-1, -1), pdf_font_name)]))
+    doc.build([Paragraph(_safe_text("ウォームアップ warm-up", use_unicode), style), Spacer(1, 0.2 * cm), table], canvasmaker=_make_numbered_canvas(pdf_font_name))
+    return {
+        "font": pdf_font_name,
+        "unicode": use_unicode,
+        "font_ms": round(font_ms, 1),
+        "total_ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+
+
 def _safe_text(s: str, allow_unicode: bool) -> str:
     if allow_unicode:
         return s
     return re.sub(r"[^\x00-\x7f]", "?", s)
 
 
-def _truncate(s: str, max_len: int = 80) -> str:
-    s = (s or "").strip()
-    if len(s) <= max_len:
-        return s
-    return s[: max_len - 1] + "…"
-
-
-def _build_one_page_pdf(response: SimulationResponse, buffer: io.BytesIO,
-                        pdf_font_name: str, use_unicode: bool,
-                        labels: dict, category_headings: dict,
-                        delta_summary: dict | None = None) -> None:
+def _escaper(use_unicode: bool):
     def p(text: str) -> str:
         return _safe_text(text, use_unicode).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
 
+    return p
+
+
+def _delta_rows(ir: ReportIR, p) -> list[list[str]]:
+    labels, d = ir.labels, ir.delta
+    rows = [[p(labels["delta_score"]), f"{d.score_before:.1f} → {d.score_after:.1f}"]]
+    if d.danger_before is not None:
+        rows.append([p(labels["delta_danger"]), p(f"{count_text(labels, d.danger_before)} → {count_text(labels, d.danger_after)}")])
+    if d.congestion_minutes:
+        rows.append([p(labels["delta_congestion"]), p(congestion_text(labels, d.congestion_minutes))])
+    return rows
+
+
+def _build_one_page_pdf(ir: ReportIR, target: io.BytesIO | str,
+                        pdf_font_name: str, use_unicode: bool) -> None:
+    labels = ir.labels
+    p = _escaper(use_unicode)
+
     doc = SimpleDocTemplate(
-        buffer,
+        target,
         pagesize=A4,
         rightMargin=1.2 * cm,
         leftMargin=1.2 * cm,
@@ -303,24 +279,17 @@ def _build_one_page_pdf(response: SimulationResponse, buffer: io.BytesIO,
 
     # イベント・日時・ID（1行に詰める）
     meta_line = (
-        f"<b>{labels['event']}:</b> {p(_truncate(response.event_name, 35))}  |  "
-        f"<b>{labels['location']}:</b> {p(_truncate(response.event_location or '—', 25))}  |  "
-        f"<b>{labels['date_time']}:</b> {p((response.date_time or '—')[:16])}  |  "
-        f"ID: {(response.simulation_id or '')[:8]}"
+        f"<b>{labels['event']}:</b> {p(_truncate(ir.event_name, 35))}  |  "
+        f"<b>{labels['location']}:</b> {p(_truncate(ir.event_location or '—', 25))}  |  "
+        f"<b>{labels['date_time']}:</b> {p((ir.date_time or '—')[:16])}  |  "
+        f"ID: {ir.simulation_id[:8]}"
     )
     story.append(Paragraph(meta_line, meta_style))
     story.append(Spacer(1, 0.35 * cm))
 
     # 総合スコア + カテゴリ件数（1テーブル）
-    score_val = f"{response.overall_risk_score:.1f} / 10"
-    cat_parts = []
-    for cat, count in response.risk_count_by_category.items():
-        try:
-            label = category_headings.get(RiskCategory(cat), cat)
-        except ValueError:
-            label = cat
-        cat_parts.append(f"{p(label)}:{count}")
-    cat_line = "  |  ".join(cat_parts)
+    score_val = f"{ir.overall_risk_score:.1f} / 10"
+    cat_line = "  |  ".join(f"{p(c.label)}:{c.count}" for c in ir.category_counts)
     score_table = Table(
         [
             [labels["overall_risk_score"], score_val],
@@ -347,44 +316,31 @@ def _build_one_page_pdf(response: SimulationResponse, buffer: io.BytesIO,
     story.append(Spacer(1, 0.35 * cm))
 
     # 対策効果（対策前→対策後）差分
-    if delta_summary and isinstance(delta_summary, dict):
-        sb = delta_summary.get("riskScoreBefore")
-        sa = delta_summary.get("riskScoreAfter")
-        db = delta_summary.get("dangerCountBefore")
-        da = delta_summary.get("dangerCountAfter")
-        cong = delta_summary.get("congestionDeltaMinutes")
-        if sb is not None and sa is not None:
-            story.append(Paragraph("<b>対策効果（対策前 → 対策後）</b>", section_style))
-            delta_rows = [[p("総合リスクスコア"), f"{float(sb):.1f} → {float(sa):.1f}"]]
-            if db is not None and da is not None:
-                delta_rows.append([p("危険ポイント数"), f"{int(db)}件 → {int(da)}件"])
-            if cong is not None and float(cong) != 0:
-                delta_rows.append([p("混雑ピーク"), p(f"約{abs(int(float(cong)))}分短縮")])
-            tdelta = Table(delta_rows, colWidths=[4 * cm, 5 * cm])
-            tdelta.setStyle(
-                TableStyle([
-                    ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
-                    ("FONTNAME", (0, 0), (-1, -1), pdf_font_name),
-                    ("FONTSIZE", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-                    ("TOPPADDING", (0, 0), (-1, -1), 4),
-                    ("BOX", (0, 0), (-1, -1), 0.5, COLOR_BORDER),
-                ])
-            )
-            story.append(tdelta)
-            story.append(Spacer(1, 0.25 * cm))
+    if ir.delta:
+        story.append(Paragraph(f"<b>{p(labels['mitigation_effect'])}</b>", section_style))
+        tdelta = Table(_delta_rows(ir, p), colWidths=[4 * cm, 5 * cm])
+        tdelta.setStyle(
+            TableStyle([
+                ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
+                ("FONTNAME", (0, 0), (-1, -1), pdf_font_name),
+                ("FONTSIZE", (0, 0), (-1, -1), 8),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+                ("TOPPADDING", (0, 0), (-1, -1), 4),
+                ("BOX", (0, 0), (-1, -1), 0.5, COLOR_BORDER),
+            ])
+        )
+        story.append(tdelta)
+        story.append(Spacer(1, 0.25 * cm))
 
     # サマリー（1行に要約）
     story.append(Paragraph(f"<b>{labels['executive_summary']}</b>", section_style))
-    story.append(Paragraph(p(_truncate(response.summary, 220)), body_style))
+    story.append(Paragraph(p(_truncate(ir.summary, 220)), body_style))
     story.append(Spacer(1, 0.25 * cm))
 
     # 重要リスク トップ3（各1〜2行）
     story.append(Paragraph(f"<b>{labels['top_risks']}</b>", section_style))
-    top_risks = sorted(response.risks, key=lambda r: r.severity, reverse=True)[:3]
-    for i, r in enumerate(top_risks, 1):
-        loc = getattr(r, "location_description", None) or ""
-        loc_s = f" — {p(_truncate(loc, 30))}" if loc else ""
+    for i, r in enumerate(ir.top_risks, 1):
+        loc_s = f" — {p(_truncate(r.location, 30))}" if r.location else ""
         story.append(
             Paragraph(
                 f"{i}. <b>{p(_truncate(r.title, 40))}</b> ({labels['severity']}: {r.severity:.1f}){loc_s}",
@@ -395,171 +351,186 @@ def _build_one_page_pdf(response: SimulationResponse, buffer: io.BytesIO,
 
     # 今すぐやるべき対策 トップ3
     story.append(Paragraph(f"<b>{labels['immediate_actions']}</b>", section_style))
-    for i, rec in enumerate(response.recommendations[:3], 1):
+    for i, rec in enumerate(ir.recommendations[:3], 1):
         story.append(Paragraph(f"{i}. {p(_truncate(rec, 95))}", body_style))
     story.append(Spacer(1, 0.2 * cm))
 
     # 推奨配置・責任分界（1枚サマリー用）
     layout_parts = []
-    if response.map_routes:
-        rec_routes = [r for r in response.map_routes if r.type == "recommended"]
-        if rec_routes:
-            layout_parts.append(f"推奨導線 {len(rec_routes)}本")
-    if response.bottlenecks:
-        layout_parts.append(f"誘導員配置推奨 {len(response.bottlenecks)}箇所")
+    if ir.recommended_routes:
+        layout_parts.append(labels["layout_routes"].format(n=len(ir.recommended_routes)))
+    if ir.bottlenecks:
+        layout_parts.append(labels["layout_staff"].format(n=len(ir.bottlenecks)))
     if layout_parts:
-        story.append(Paragraph(f"<b>推奨配置:</b> {p(', '.join(layout_parts))}", body_style))
-    story.append(Paragraph("<b>責任分界:</b> 主催＝全体統括／警備＝誘導・警備／自治体＝許可・監視／施設＝設備・導線。連携窓口を事前に確認すること。", body_style))
+        story.append(Paragraph(f"<b>{p(labels['layout'])}:</b> {p(', '.join(layout_parts))}", body_style))
+    story.append(Paragraph(f"<b>{p(labels['responsibility'])}:</b> {p(labels['responsibility_text'])}", body_style))
     story.append(Spacer(1, 0.2 * cm))
 
     # 時間帯ごとのリスク（全スロット）
-    if getattr(response, "risk_time_series", None):
-        slots = response.risk_time_series
-        if slots:
-            story.append(Paragraph(f"<b>{labels['time_series']}</b>", section_style))
-            tdata = [[labels["time_slot"], labels.get("overall_risk_score", "スコア")]]
-            for s in slots:
-                label = getattr(s, "label", None) or f"{getattr(s, 'start_time', '')[:16]}"
-                if len(label) > 20:
-                    label = label[:17] + "..."
-                score = getattr(s, "risk_score", 0)
-                tdata.append([p(label), f"{float(score):.1f}"])
-            t = Table(tdata, colWidths=[4 * cm, 2.5 * cm])
-            t.setStyle(
-                TableStyle([
-                    ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
-                    ("FONTNAME", (0, 0), (-1, -1), pdf_font_name),
-                    ("FONTSIZE", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-                    ("TOPPADDING", (0, 0), (-1, -1), 4),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 6),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-                    ("BOX", (0, 0), (-1, -1), 0.5, COLOR_BORDER),
-                    ("LINEBELOW", (0, 0), (-1, 0), 0.5, COLOR_BORDER),
-                ])
-            )
-            story.append(t)
-            story.append(Spacer(1, 0.2 * cm))
+    if ir.time_slots:
+        story.append(Paragraph(f"<b>{labels['time_series']}</b>", section_style))
+        tdata = [[labels["time_slot"], labels["overall_risk_score"]]]
+        for s in ir.time_slots:
+            label = s.label
+            if len(label) > 20:
+                label = label[:17] + "..."
+            tdata.append([p(label), f"{s.score:.1f}"])
+        t = Table(tdata, colWidths=[4 * cm, 2.5 * cm])
+        t.setStyle(
+            TableStyle([
+                ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
+                ("FONTNAME", (0, 0), (-1, -1), pdf_font_name),
+                ("FONTSIZE", (0, 0), (-1, -1), 8),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+                ("TOPPADDING", (0, 0), (-1, -1), 4),
+                ("LEFTPADDING", (0, 0), (-1, -1), 6),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+                ("BOX", (0, 0), (-1, -1), 0.5, COLOR_BORDER),
+                ("LINEBELOW", (0, 0), (-1, 0), 0.5, COLOR_BORDER),
+            ])
+        )
+        story.append(t)
+        story.append(Spacer(1, 0.2 * cm))
 
     story.append(Paragraph(f"<i>{labels['footer']}</i>", footer_style))
 
     doc.build(story)
 
 
-def _build_full_pdf(
-    response: SimulationResponse,
-    buffer: io.BytesIO,
-    pdf_font_name: str,
-    use_unicode: bool,
-    labels: dict,
-    category_headings: dict,
-    delta_summary: dict | None = None,
-    site_check_memos: list | None = None,
-    todo_checks: dict | None = None,
-    adopted_todos: list | None = None,
-    pins: list | None = None,
-) -> None:
-    def p(text: str) -> str:
-        return _safe_text(text, use_unicode).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=1.8 * cm,
-        leftMargin=1.8 * cm,
-        topMargin=1.6 * cm,
-        bottomMargin=1.4 * cm,
-    )
-
+def _table_chunks(
+    head: list,
+    items: list,
+    make_row: Callable[[Any], list],
+    col_widths: list[float],
+    cell_style: list[tuple],
+    zebra: bool = False,
+) -> Iterator[Table]:
+    """行数の多い表を TABLE_CHUNK_ROWS 行ずつの Table に分けて返す。
+
+    1 つの巨大な Table はページ分割のたびに残り全行を持つ Table を作り直すので、時間もメモリも
+    行数に対して増える。枠線は先頭・末尾のチャンクだけ上下を引き、つなげると 1 つの表に見える。
+    """
+    for start in range(0, len(items), TABLE_CHUNK_ROWS):
+        part = items[start : start + TABLE_CHUNK_ROWS]
+        first = start == 0
+        offset = 1 if first else 0
+        style = list(cell_style) + [
+            ("LINEBEFORE", (0, 0), (0, -1), 0.5, COLOR_BORDER),
+            ("LINEAFTER", (-1, 0), (-1, -1), 0.5, COLOR_BORDER),
+        ]
+        if first:
+            style += [
+                ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
+                ("LINEABOVE", (0, 0), (-1, 0), 0.5, COLOR_BORDER),
+                ("LINEBELOW", (0, 0), (-1, 0), 1, COLOR_BORDER),
+            ]
+        if start + TABLE_CHUNK_ROWS >= len(items):
+            style.append(("LINEBELOW", (0, -1), (-1, -1), 0.5, COLOR_BORDER))
+        if zebra:
+            for i in range(len(part)):
+                if (start + i + 1) % 2 == 0:
+                    style.append(("BACKGROUND", (0, i + offset), (-1, i + offset), COLOR_ROW_ALT))
+        table = Table(([head] if first else []) + [make_row(item) for item in part], colWidths=col_widths)
+        table.setStyle(TableStyle(style))
+        yield table
+
+
+def _full_styles(pdf_font_name: str) -> dict[str, ParagraphStyle]:
     styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        name="ReportTitle",
-        parent=styles["Heading1"],
-        fontName=pdf_font_name,
-        fontSize=16,
-        spaceAfter=4,
-        textColor=COLOR_PRIMARY,
-    )
-    subtitle_style = ParagraphStyle(
-        name="ReportSubtitle",
-        fontName=pdf_font_name,
-        fontSize=11,
-        spaceAfter=12,
-        textColor=COLOR_TEXT_SEC,
-    )
-    heading_style = ParagraphStyle(
-        name="SectionHeading",
-        parent=styles["Heading2"],
-        fontName=pdf_font_name,
-        fontSize=11,
-        spaceBefore=14,
-        spaceAfter=6,
-        textColor=COLOR_PRIMARY,
-        borderPadding=(0, 0, 0, 0),
-    )
-    body_style = ParagraphStyle(
-        name="ReportBody",
-        parent=styles["Normal"],
-        fontName=pdf_font_name,
-        fontSize=9,
-        spaceAfter=5,
-        textColor=COLOR_TEXT,
-    )
-    heading3_style = ParagraphStyle(
-        name="ReportHeading3",
-        parent=styles["Heading3"],
-        fontName=pdf_font_name,
-        fontSize=10,
-        spaceBefore=8,
-        spaceAfter=4,
-        textColor=COLOR_TEXT,
-    )
-    table_cell_style = ParagraphStyle(
-        name="TableCell",
-        parent=styles["Normal"],
-        fontName=pdf_font_name,
-        fontSize=8,
-        spaceBefore=0,
-        spaceAfter=0,
-        textColor=COLOR_TEXT,
-        leading=10,
-    )
-    footer_style = ParagraphStyle(
-        name="Footer",
-        fontName=pdf_font_name,
-        fontSize=8,
-        textColor=COLOR_FOOTER,
-        spaceBefore=12,
-    )
+    return {
+        "title": ParagraphStyle(
+            name="ReportTitle",
+            parent=styles["Heading1"],
+            fontName=pdf_font_name,
+            fontSize=16,
+            spaceAfter=4,
+            textColor=COLOR_PRIMARY,
+        ),
+        "subtitle": ParagraphStyle(
+            name="ReportSubtitle",
+            fontName=pdf_font_name,
+            fontSize=11,
+            spaceAfter=12,
+            textColor=COLOR_TEXT_SEC,
+        ),
+        "heading": ParagraphStyle(
+            name="SectionHeading",
+            parent=styles["Heading2"],
+            fontName=pdf_font_name,
+            fontSize=11,
+            spaceBefore=14,
+            spaceAfter=6,
+            textColor=COLOR_PRIMARY,
+            borderPadding=(0, 0, 0, 0),
+        ),
+        "body": ParagraphStyle(
+            name="ReportBody",
+            parent=styles["Normal"],
+            fontName=pdf_font_name,
+            fontSize=9,
+            spaceAfter=5,
+            textColor=COLOR_TEXT,
+        ),
+        "heading3": ParagraphStyle(
+            name="ReportHeading3",
+            parent=styles["Heading3"],
+            fontName=pdf_font_name,
+            fontSize=10,
+            spaceBefore=8,
+            spaceAfter=4,
+            textColor=COLOR_TEXT,
+        ),
+        "cell": ParagraphStyle(
+            name="TableCell",
+            parent=styles["Normal"],
+            fontName=pdf_font_name,
+            fontSize=8,
+            spaceBefore=0,
+            spaceAfter=0,
+            textColor=COLOR_TEXT,
+            leading=10,
+        ),
+        "footer": ParagraphStyle(
+            name="Footer",
+            fontName=pdf_font_name,
+            fontSize=8,
+            textColor=COLOR_FOOTER,
+            spaceBefore=12,
+        ),
+    }
 
-    story = []
+
+def _full_story(ir: ReportIR, pdf_font_name: str, use_unicode: bool):
+    """フル版の flowable を先頭から順に返す。"""
+    labels = ir.labels
+    p = _escaper(use_unicode)
+    st = _full_styles(pdf_font_name)
+    heading_style, body_style, heading3_style = st["heading"], st["body"], st["heading3"]
 
     # ヘッダー
-    story.append(Paragraph(labels["title"], title_style))
-    story.append(Paragraph(labels["subtitle"], subtitle_style))
-    story.append(Spacer(1, 0.4 * cm))
+    yield Paragraph(labels["title"], st["title"])
+    yield Paragraph(labels["subtitle"], st["subtitle"])
+    yield Spacer(1, 0.4 * cm)
 
     # イベント情報（読みやすいブロック）
-    story.append(
-        Paragraph(
-            f"<b>{labels['event']}:</b> {p(response.event_name)}<br/>"
-            f"<b>{labels['location']}:</b> {p(response.event_location or '—')}<br/>"
-            f"<b>{labels['date_time']}:</b> {p(response.date_time or '—')}<br/>"
-            f"<b>{labels['report_id']}:</b> {response.simulation_id or '—'}  ·  "
-            f"<b>{labels['generated']}:</b> {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}",
-            body_style,
-        )
+    yield Paragraph(
+        f"<b>{labels['event']}:</b> {p(ir.event_name)}<br/>"
+        f"<b>{labels['location']}:</b> {p(ir.event_location or '—')}<br/>"
+        f"<b>{labels['date_time']}:</b> {p(ir.date_time or '—')}<br/>"
+        f"<b>{labels['report_id']}:</b> {ir.simulation_id or '—'}  ·  "
+        f"<b>{labels['generated']}:</b> {ir.generated_at}",
+        body_style,
     )
-    story.append(Spacer(1, 0.6 * cm))
+    yield Spacer(1, 0.6 * cm)
 
     # エグゼクティブサマリー
-    story.append(Paragraph(labels["executive_summary"], heading_style))
-    story.append(Paragraph(p(response.summary), body_style))
-    story.append(Spacer(1, 0.4 * cm))
+    yield Paragraph(labels["executive_summary"], heading_style)
+    yield Paragraph(p(ir.summary), body_style)
+    yield Spacer(1, 0.4 * cm)
 
     # 総合リスクスコア（見やすいテーブル）
     score_table = Table(
-        [[labels["overall_risk_score"], f"{response.overall_risk_score:.1f} / 10"]],
+        [[labels["overall_risk_score"], f"{ir.overall_risk_score:.1f} / 10"]],
         colWidths=[5 * cm, 4 * cm],
     )
     score_table.setStyle(
@@ -578,102 +549,66 @@ def _build_full_pdf(
             ("BOX", (0, 0), (-1, -1), 0.5, COLOR_BORDER),
         ])
     )
-    story.append(score_table)
-    story.append(Spacer(1, 0.6 * cm))
+    yield score_table
+    yield Spacer(1, 0.6 * cm)
 
     # 対策効果（対策前→対策後）差分
-    if delta_summary and isinstance(delta_summary, dict):
-        sb = delta_summary.get("riskScoreBefore")
-        sa = delta_summary.get("riskScoreAfter")
-        db = delta_summary.get("dangerCountBefore")
-        da = delta_summary.get("dangerCountAfter")
-        cong = delta_summary.get("congestionDeltaMinutes")
-        if sb is not None and sa is not None:
-            story.append(Paragraph("対策効果（対策前 → 対策後）", heading_style))
-            delta_rows = [[p("総合リスクスコア"), f"{float(sb):.1f} → {float(sa):.1f}"]]
-            if db is not None and da is not None:
-                delta_rows.append([p("危険ポイント数"), f"{int(db)}件 → {int(da)}件"])
-            if cong is not None and float(cong) != 0:
-                delta_rows.append([p("混雑ピーク"), p(f"約{abs(int(float(cong)))}分短縮")])
-            tdelta = Table(delta_rows, colWidths=[5 * cm, 5 * cm])
-            tdelta.setStyle(
-                TableStyle([
-                    ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
-                    ("FONTNAME", (0, 0), (-1, -1), pdf_font_name),
-                    ("FONTSIZE", (0, 0), (-1, -1), 9),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("BOX", (0, 0), (-1, -1), 0.5, COLOR_BORDER),
-                ])
-            )
-            story.append(tdelta)
-            story.append(Spacer(1, 0.4 * cm))
+    if ir.delta:
+        yield Paragraph(p(labels["mitigation_effect"]), heading_style)
+        tdelta = Table(_delta_rows(ir, p), colWidths=[5 * cm, 5 * cm])
+        tdelta.setStyle(
+            TableStyle([
+                ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
+                ("FONTNAME", (0, 0), (-1, -1), pdf_font_name),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+                ("TOPPADDING", (0, 0), (-1, -1), 8),
+                ("BOX", (0, 0), (-1, -1), 0.5, COLOR_BORDER),
+            ])
+        )
+        yield tdelta
+        yield Spacer(1, 0.4 * cm)
 
     # 対策ToDo一覧（全タスク・完了/未完了）
-    tasks = getattr(response, "mitigation_tasks", None) or []
-    if tasks:
-        story.append(Paragraph(labels["todo_list"], heading_style))
-        checked_set = set()
-        if isinstance(todo_checks, dict):
-            for tid, v in todo_checks.items():
-                if v:
-                    checked_set.add(str(tid))
-        todo_data = [[labels["status"], labels["assignee"], labels["action"], labels["due_by"]]]
-        for t in tasks:
-            tid = getattr(t, "id", "") or ""
-            status = labels["done"] if tid in checked_set else labels["pending"]
-            who = p((getattr(t, "who", "") or "")[:12])
-            action_text = (getattr(t, "action", "") or "").strip()
-            action_flowable = Paragraph(p(action_text), table_cell_style) if action_text else Paragraph("—", table_cell_style)
-            due = (getattr(t, "due_by", "") or "—")[:10]
-            todo_data.append([status, who, action_flowable, due])
-        if len(todo_data) > 1:
-            t_todo = Table(todo_data, colWidths=[1.8 * cm, 2.2 * cm, 10.5 * cm, 2.2 * cm])
-            todo_style = [
-                ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
+    if ir.todos:
+        yield Paragraph(labels["todo_list"], heading_style)
+        yield from _table_chunks(
+            [labels["status"], labels["assignee"], labels["action"], labels["due_by"]],
+            ir.todos,
+            lambda t: [
+                labels["done"] if t.done else labels["pending"],
+                p(t.who[:12]),
+                Paragraph(p(t.action), st["cell"]) if t.action else Paragraph("—", st["cell"]),
+                (t.due_by or "—")[:10],
+            ],
+            [1.8 * cm, 2.2 * cm, 10.5 * cm, 2.2 * cm],
+            [
                 ("FONTNAME", (0, 0), (-1, -1), pdf_font_name),
                 ("FONTSIZE", (0, 0), (-1, -1), 8),
                 ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
                 ("TOPPADDING", (0, 0), (-1, -1), 5),
                 ("LEFTPADDING", (0, 0), (-1, -1), 6),
                 ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-                ("BOX", (0, 0), (-1, -1), 0.5, COLOR_BORDER),
-                ("LINEBELOW", (0, 0), (-1, 0), 1, COLOR_BORDER),
-            ]
-            for i in range(1, len(todo_data)):
-                if i % 2 == 0:
-                    todo_style.append(("BACKGROUND", (0, i), (-1, i), COLOR_ROW_ALT))
-            t_todo.setStyle(TableStyle(todo_style))
-            story.append(t_todo)
-        story.append(Spacer(1, 0.5 * cm))
+            ],
+            zebra=True,
+        )
+        yield Spacer(1, 0.5 * cm)
 
     # 採用済みToDo（次にやるべきから採用した項目）
-    if adopted_todos and isinstance(adopted_todos, list) and len(adopted_todos) > 0:
-        story.append(Paragraph(labels["adopted_todos"], heading_style))
-        for i, item in enumerate(adopted_todos, 1):
-            if not isinstance(item, dict):
-                continue
-            action = item.get("action") or item.get("title") or "—"
-            who = (item.get("who") or "").strip() or "—"
-            risk_id = item.get("risk_id") or ""
-            story.append(
-                Paragraph(
-                    f"{i}. [{p(who)}] {p(str(action)[:70])}"
-                    + (f"  <i>({labels['related_risk']}: {p(str(risk_id)[:20])})</i>" if risk_id else ""),
-                    body_style,
-                )
+    if ir.adopted:
+        yield Paragraph(labels["adopted_todos"], heading_style)
+        for i, item in enumerate(ir.adopted, 1):
+            yield Paragraph(
+                f"{i}. [{p(item.who or '—')}] {p(item.action[:70])}"
+                + (f"  <i>({labels['related_risk']}: {p(item.risk_id[:20])})</i>" if item.risk_id else ""),
+                body_style,
             )
-        story.append(Spacer(1, 0.5 * cm))
+        yield Spacer(1, 0.5 * cm)
 
     # カテゴリ別概要（ヘッダー＋交互背景）
-    story.append(Paragraph(labels["risk_overview"], heading_style))
+    yield Paragraph(labels["risk_overview"], heading_style)
     cat_data = [[labels["category"], labels["count"]]]
-    for cat, count in response.risk_count_by_category.items():
-        try:
-            label = category_headings.get(RiskCategory(cat), cat)
-        except ValueError:
-            label = cat
-        cat_data.append([p(label), str(count)])
+    cat_data += [[p(c.label), str(c.count)] for c in ir.category_counts]
     cat_table = Table(cat_data, colWidths=[8 * cm, 3 * cm])
     cat_style = [
         ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
@@ -690,20 +625,18 @@ def _build_full_pdf(
         if i % 2 == 0:
             cat_style.append(("BACKGROUND", (0, i), (-1, i), COLOR_ROW_ALT))
     cat_table.setStyle(TableStyle(cat_style))
-    story.append(cat_table)
-    story.append(Spacer(1, 0.6 * cm))
+    yield cat_table
+    yield Spacer(1, 0.6 * cm)
 
     # 時間帯ごとのリスク（全スロット）
-    if getattr(response, "risk_time_series", None) and response.risk_time_series:
-        slots = response.risk_time_series
-        story.append(Paragraph(labels["time_series"], heading_style))
-        tdata = [[labels["time_slot"], labels.get("overall_risk_score", "スコア")]]
-        for s in slots:
-            label = getattr(s, "label", None) or (getattr(s, "start_time", "")[:16] if getattr(s, "start_time", None) else "—")
+    if ir.time_slots:
+        yield Paragraph(labels["time_series"], heading_style)
+        tdata = [[labels["time_slot"], labels["overall_risk_score"]]]
+        for s in ir.time_slots:
+            label = s.label
             if len(label) > 24:
                 label = label[:21] + "..."
-            score = getattr(s, "risk_score", 0)
-            tdata.append([p(label), f"{float(score):.1f}"])
+            tdata.append([p(label), f"{s.score:.1f}"])
         t = Table(tdata, colWidths=[6 * cm, 3 * cm])
         t.setStyle(
             TableStyle([
@@ -718,191 +651,196 @@ def _build_full_pdf(
                 ("LINEBELOW", (0, 0), (-1, 0), 1, COLOR_BORDER),
             ])
         )
-        story.append(t)
-        story.append(Spacer(1, 0.6 * cm))
+        yield t
+        yield Spacer(1, 0.6 * cm)
 
     # 推奨導線・誘導員配置
-    routes = getattr(response, "map_routes", None) or []
-    rec_routes = [r for r in routes if getattr(r, "type", "") == "recommended"]
-    bottlenecks = getattr(response, "bottlenecks", None) or []
-    if rec_routes or bottlenecks:
-        story.append(Paragraph(labels["recommended_routes"], heading_style))
-        if rec_routes:
-            route_labels = ", ".join(p(getattr(r, "label", "") or getattr(r, "id", "")[:8]) for r in rec_routes[:10])
-            story.append(
-                Paragraph(
-                    f"{p(labels['recommended_routes'])}: {len(rec_routes)} — {route_labels}",
-                    body_style,
-                )
+    if ir.recommended_routes or ir.bottlenecks:
+        yield Paragraph(labels["recommended_routes"], heading_style)
+        if ir.recommended_routes:
+            route_labels = ", ".join(p(r) for r in ir.recommended_routes[:10])
+            yield Paragraph(
+                f"{p(labels['recommended_routes'])}: {len(ir.recommended_routes)} — {route_labels}",
+                body_style,
             )
-        if bottlenecks:
-            story.append(Paragraph(labels["staff_placement"], heading3_style))
-            for b in bottlenecks[:15]:
-                loc = p((getattr(b, "location_description", "") or "")[:50])
-                reason = p((getattr(b, "reason", "") or "")[:40])
-                story.append(Paragraph(f"・ {loc} — {labels['bottleneck_reason']}: {reason}", body_style))
-                measures = getattr(b, "suggested_measures", None) or []
-                if measures:
-                    story.append(Paragraph(f"  {labels['bottleneck_measures']}: " + p("; ".join(measures)[:80]), body_style))
-        story.append(Spacer(1, 0.5 * cm))
+        if ir.bottlenecks:
+            yield Paragraph(labels["staff_placement"], heading3_style)
+            for b in ir.bottlenecks[:15]:
+                yield Paragraph(f"・ {p(b.location[:50])} — {labels['bottleneck_reason']}: {p(b.reason[:40])}", body_style)
+                if b.measures:
+                    yield Paragraph(f"  {labels['bottleneck_measures']}: " + p("; ".join(b.measures)[:80]), body_style)
+        yield Spacer(1, 0.5 * cm)
 
     # 現場確認メモ（テンプレ＋メモを差し込み）
-    if site_check_memos and isinstance(site_check_memos, list) and len(site_check_memos) > 0:
-        story.append(Paragraph("現場確認メモ", heading_style))
-        for item in site_check_memos:
-            if not isinstance(item, dict):
-                continue
-            label = item.get("label") or item.get("id") or "—"
-            category = item.get("category") or ""
-            memo = (item.get("memo") or "").strip()
-            linked = item.get("linkedTaskId")
-            line = f"<b>{p(str(label))}</b>"
-            if category:
-                line += f" （{p(str(category))}）"
-            story.append(Paragraph(line, body_style))
-            if memo:
-                story.append(Paragraph(p(memo), body_style))
-            if linked:
-                story.append(Paragraph(f"<i>関連ToDo: {p(str(linked)[:20])}</i>", body_style))
-            story.append(Spacer(1, 0.2 * cm))
-        story.append(Spacer(1, 0.4 * cm))
+    if ir.site_memos:
+        yield Paragraph(p(labels["site_check_memos"]), heading_style)
+        for m in ir.site_memos:
+            line = f"<b>{p(m.label)}</b>"
+            if m.category:
+                line += f" （{p(m.category)}）"
+            yield Paragraph(line, body_style)
+            if m.memo:
+                yield Paragraph(p(m.memo), body_style)
+            if m.linked_task_id:
+                yield Paragraph(f"<i>{p(labels['related_todo'])}: {p(m.linked_task_id[:20])}</i>", body_style)
+            yield Spacer(1, 0.2 * cm)
+        yield Spacer(1, 0.4 * cm)
 
     # 地図ピン一覧
-    if pins and isinstance(pins, list) and len(pins) > 0:
-        story.append(Paragraph(labels["map_pins"], heading_style))
-        pin_data = [[labels["pin_name"], labels["pin_type"], labels["pin_memo"]]]
-        for pin in pins:
-            if not isinstance(pin, dict):
-                continue
-            name = p((pin.get("name") or pin.get("id") or "—")[:30])
-            typ = p((pin.get("type") or "other")[:12])
-            memo = p((pin.get("memo") or "—")[:50])
-            pin_data.append([name, typ, memo])
-        if len(pin_data) > 1:
-            t_pins = Table(pin_data, colWidths=[4 * cm, 2.5 * cm, 9 * cm])
-            t_pins.setStyle(
-                TableStyle([
-                    ("BACKGROUND", (0, 0), (-1, 0), COLOR_HEADER_BG),
-                    ("FONTNAME", (0, 0), (-1, -1), pdf_font_name),
-                    ("FONTSIZE", (0, 0), (-1, -1), 9),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-                    ("TOPPADDING", (0, 0), (-1, -1), 6),
-                    ("BOX", (0, 0), (-1, -1), 0.5, COLOR_BORDER),
-                    ("LINEBELOW", (0, 0), (-1, 0), 1, COLOR_BORDER),
-                ])
-            )
-            story.append(t_pins)
-        story.append(Spacer(1, 0.5 * cm))
+    if ir.pins:
+        yield Paragraph(labels["map_pins"], heading_style)
+        yield from _table_chunks(
+            [labels["pin_name"], labels["pin_type"], labels["pin_memo"]],
+            ir.pins,
+            lambda pin: [p(pin.name[:30]), p(pin.type[:12]), p(pin.memo[:50])],
+            [4 * cm, 2.5 * cm, 9 * cm],
+            [
+                ("FONTNAME", (0, 0), (-1, -1), pdf_font_name),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+                ("TOPPADDING", (0, 0), (-1, -1), 6),
+            ],
+        )
+        yield Spacer(1, 0.5 * cm)
 
     # リスク詳細（セクション見出しを明確に）
-    story.append(Paragraph(labels["detailed_risks"], heading_style))
-    for cat in RiskCategory:
-        risks_in_cat = [r for r in response.risks if r.category == cat]
-        if not risks_in_cat:
-            continue
-        cat_label = category_headings.get(cat, getattr(cat, "value", str(cat)))
-        story.append(Paragraph(cat_label, heading3_style))
-        for r in risks_in_cat:
+    yield Paragraph(labels["detailed_risks"], heading_style)
+    for group in ir.risk_groups:
+        yield Paragraph(group.label, heading3_style)
+        for r in group.risks:
             extra = []
-            imp = getattr(r, "importance", None)
-            urg = getattr(r, "urgency", None)
-            if imp is not None:
-                extra.append(f"{labels['importance']}: {float(imp):.1f}")
-            if urg is not None:
-                extra.append(f"{labels['urgency']}: {float(urg):.1f}")
+            if r.importance is not None:
+                extra.append(f"{labels['importance']}: {r.importance:.1f}")
+            if r.urgency is not None:
+                extra.append(f"{labels['urgency']}: {r.urgency:.1f}")
             line = f"<b>{p(r.title)}</b>  ·  {labels['severity']}: {r.severity:.1f}  ·  {labels['probability']}: {r.probability * 100:.0f}%"
             if extra:
                 line += "  ·  " + "  ·  ".join(extra)
-            story.append(Paragraph(line, body_style))
-            loc_desc = getattr(r, "location_description", None) or ""
-            if loc_desc:
-                story.append(Paragraph(f"<b>{labels['place']}:</b> {p(loc_desc)}", body_style))
-            story.append(Paragraph(p(r.description), body_style))
+            yield Paragraph(line, body_style)
+            if r.location:
+                yield Paragraph(f"<b>{labels['place']}:</b> {p(r.location)}", body_style)
+            yield Paragraph(p(r.description), body_style)
             if r.mitigation_actions:
-                story.append(
-                    Paragraph(
-                        f"<b>{labels['mitigation']}:</b> " + p("; ".join(r.mitigation_actions)),
-                        body_style,
-                    )
-                )
-            story.append(Spacer(1, 0.15 * cm))
-        story.append(Spacer(1, 0.25 * cm))
+                yield Paragraph(f"<b>{labels['mitigation']}:</b> " + p("; ".join(r.mitigation_actions)), body_style)
+            yield Spacer(1, 0.15 * cm)
+        yield Spacer(1, 0.25 * cm)
 
     # 推奨事項
-    story.append(Paragraph(labels["recommendations"], heading_style))
-    for i, rec in enumerate(response.recommendations, 1):
-        story.append(Paragraph(f"{i}. {p(rec)}", body_style))
-    story.append(Spacer(1, 0.4 * cm))
+    yield Paragraph(labels["recommendations"], heading_style)
+    for i, rec in enumerate(ir.recommendations, 1):
+        yield Paragraph(f"{i}. {p(rec)}", body_style)
+    yield Spacer(1, 0.4 * cm)
 
-    story.append(Paragraph(f"<i>{labels['footer']}</i>", footer_style))
+    yield Paragraph(f"<i>{labels['footer']}</i>", st["footer"])
 
-    doc.build(story, canvasmaker=_make_numbered_canvas(pdf_font_name))
 
+class _LazyDocTemplate(SimpleDocTemplate):
+    """story をイテレータから STORY_WINDOW 件ずつ取り出して組版する SimpleDocTemplate。
 
-def _filter_tasks_by_role(tasks: list, variant: str) -> list:
-    v = (variant or "").strip().lower()
-    if not tasks:
-        return []
-    role_who = {
-        "role_organizer": ["主催", "主催者", "運営", "その他"],
-        "role_security": ["警備", "誘導", "保安", "救護"],
-        "role_local_gov": ["自治体", "許可", "監視", "報告"],
-        "role_venue_manager": ["施設", "設備", "導線"],
-        "runbook": [],
-    }
-    keywords = role_who.get(v, [])
-    if not keywords:
-        return tasks
-    out = []
-    for t in tasks:
-        who = (t.who or "").strip()
-        if any(k in who for k in keywords):
-            out.append(t)
-    return out if out else tasks
+    SimpleDocTemplate.build は全 flowable のリストを受け取るため、リスク・ToDo の多い
+    レポートでは未描画の Paragraph（解析済みの装飾付きテキスト）を全件同時に抱える。
+    ここでは公開の build に window 件だけのリストを渡し、flowable を 1 つ処理する前に呼ばれる
+    filterFlowables でイテレータから補充する（描画済みのものは build がリストから外す）。
+    """
 
+    def build_lazy(self, story: Iterable[Flowable], canvasmaker=Canvas, window: int | None = None) -> None:
+        # 1 つ処理してもリストが空にならないよう 2 件以上。空になると build はイテレータが残っていても終わる
+        self._window = max(2, window or STORY_WINDOW)
+        self._source = iter(story)
+        self._pending = list(islice(self._source, self._window))
+        try:
+            self.build(self._pending, canvasmaker=canvasmaker)
+        finally:
+            self._source = self._pending = None
 
-def _build_role_todo_pdf(
-    response: SimulationResponse,
-    buffer: io.BytesIO,
-    pdf_font_name: str,
-    use_unicode: bool,
-    labels: dict,
-    variant: str,
-) -> None:
-    def p(text: str) -> str:
-        return _safe_text(text, use_unicode).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    def filterFlowables(self, flowables: list[Flowable]) -> None:
+        # ページ先頭の処理（_hanging）など、story 以外のリストでも呼ばれる
+        if flowables is getattr(self, "_pending", None) and len(flowables) < self._window:
+            flowables.extend(islice(self._source, self._window - len(flowables)))
 
-    role_titles = {
-        "role_organizer": "主催者用 ToDo",
-        "role_security": "警備用 ToDo",
-        "role_local_gov": "自治体用 ToDo",
-        "role_venue_manager": "施設管理用 ToDo",
-        "runbook": "運用手順書 ToDo",
-    }
-    title = role_titles.get((variant or "").strip().lower(), "役割別 ToDo")
 
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=1.5 * cm, leftMargin=1.5 * cm, topMargin=1.2 * cm, bottomMargin=1.2 * cm)
+def _full_doc(target: io.BytesIO | str) -> _LazyDocTemplate:
+    return _LazyDocTemplate(
+        target,
+        pagesize=A4,
+        rightMargin=1.8 * cm,
+        leftMargin=1.8 * cm,
+        topMargin=1.6 * cm,
+        bottomMargin=1.4 * cm,
+    )
+
+
+def _build_full_pdf(ir: ReportIR, target: io.BytesIO | str, pdf_font_name: str, use_unicode: bool) -> None:
+    _full_doc(target).build_lazy(_full_story(ir, pdf_font_name, use_unicode), canvasmaker=_make_numbered_canvas(pdf_font_name))
+
+
+def _role_todo_story(ir: ReportIR, pdf_font_name: str, use_unicode: bool, variant: str) -> Iterator[Flowable]:
+    labels = ir.labels
+    p = _escaper(use_unicode)
+    title = labels.get(variant) or labels["role_todo"]
     body_style = ParagraphStyle(
         name="Body", fontName=pdf_font_name, fontSize=9, spaceAfter=4, textColor=COLOR_TEXT,
     )
     heading_style = ParagraphStyle(
         name="Heading", fontName=pdf_font_name, fontSize=12, spaceAfter=8, textColor=COLOR_PRIMARY,
     )
-    story = []
-    story.append(Paragraph(labels["title"], heading_style))
-    story.append(Paragraph(title, ParagraphStyle(name="Sub", fontName=pdf_font_name, fontSize=10, spaceAfter=6, textColor=COLOR_TEXT_SEC)))
-    story.append(Paragraph(f"{labels['event']}: {p(response.event_name)}  |  {labels['date_time']}: {p((response.date_time or '')[:16])}", body_style))
-    story.append(Spacer(1, 0.5 * cm))
-
-    tasks = _filter_tasks_by_role(response.mitigation_tasks, variant)
-    for i, t in enumerate(tasks, 1):
-        line = f"□ {i}. [{p(t.who or '担当')}] {p((t.action or '')[:80])}"
+    yield Paragraph(labels["title"], heading_style)
+    yield Paragraph(p(title), ParagraphStyle(name="Sub", fontName=pdf_font_name, fontSize=10, spaceAfter=6, textColor=COLOR_TEXT_SEC))
+    yield Paragraph(f"{labels['event']}: {p(ir.event_name)}  |  {labels['date_time']}: {p(ir.date_time[:16])}", body_style)
+    yield Spacer(1, 0.5 * cm)
+
+    for i, t in enumerate(ir.role_tasks.get(variant, ir.todos), 1):
+        line = f"□ {i}. [{p(t.who or labels['assignee_default'])}] {p(t.action[:80])}"
         if t.due_by:
-            line += f" （期限: {p(t.due_by[:10])}）"
-        story.append(Paragraph(line, body_style))
-    story.append(Spacer(1, 0.3 * cm))
-    story.append(Paragraph(f"<i>{labels['footer']}</i>", ParagraphStyle(name="Foot", fontName=pdf_font_name, fontSize=7, textColor=COLOR_FOOTER)))
-    doc.build(story)
+            line += p(labels["due_inline"].format(due=t.due_by[:10]))
+        yield Paragraph(line, body_style)
+    yield Spacer(1, 0.3 * cm)
+    yield Paragraph(f"<i>{labels['footer']}</i>", ParagraphStyle(name="Foot", fontName=pdf_font_name, fontSize=7, textColor=COLOR_FOOTER))
+
+
+def _build_role_todo_pdf(
+    ir: ReportIR,
+    target: io.BytesIO | str,
+    pdf_font_name: str,
+    use_unicode: bool,
+    variant: str,
+) -> None:
+    doc = _LazyDocTemplate(target, pagesize=A4, rightMargin=1.5 * cm, leftMargin=1.5 * cm, topMargin=1.2 * cm, bottomMargin=1.2 * cm)
+    doc.build_lazy(_role_todo_story(ir, pdf_font_name, use_unicode, variant))
+
+
+def _render_to(ir: ReportIR, variant: str, target: io.BytesIO | str) -> None:
+    pdf_font_name, use_unicode = _get_pdf_font()
+    v = (variant or "").strip().lower()
+    if v == "one_page":
+        _build_one_page_pdf(ir, target, pdf_font_name, use_unicode)
+    elif v in ROLE_PDF_VARIANTS:
+        _build_role_todo_pdf(ir, target, pdf_font_name, use_unicode, v)
+    else:
+        _build_full_pdf(ir, target, pdf_font_name, use_unicode)
+
+
+def render_pdf(ir: ReportIR, variant: str = "full") -> bytes:
+    """IR から PDF を出力する（PDF バックエンド）。"""
+    buffer = io.BytesIO()
+    _render_to(ir, variant, buffer)
+    return buffer.getvalue()
+
+
+def render_pdf_to_file(ir: ReportIR, variant: str = "full", path: str | None = None) -> str:
+    """IR から PDF をファイルに書き出してパスを返す。path 省略時は PDF_SPOOL_DIR に一時ファイルを作る。
+    大きいレポートのストリーミング配信用で、API プロセスは PDF 全体をメモリに載せずに分割して送れる。
+    一時ファイルの削除は呼び出し側が行う。"""
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="flowguard_", suffix=".pdf", dir=PDF_SPOOL_DIR)
+        os.close(fd)
+    try:
+        _render_to(ir, variant, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(path)
+        raise
+    return path
 
 
 def build_pdf(
@@ -914,41 +852,15 @@ def build_pdf(
     adopted_todos: list | None = None,
     pins: list | None = None,
 ) -> bytes:
-    pdf_font_name, use_unicode = _get_pdf_font()
-    is_ja = getattr(response, "locale", "ja") == "ja"
-    labels = LABELS_JA if is_ja else LABELS_EN
-    category_headings = RISK_CATEGORY_HEADINGS_JA if is_ja else RISK_CATEGORY_HEADINGS_EN
-
-    buffer = io.BytesIO()
-    v = (variant or "").strip().lower()
-    if v == "one_page":
-        _build_one_page_pdf(response, buffer, pdf_font_name, use_unicode, labels, category_headings, delta_summary)
-    elif v in ("role_organizer", "role_security", "role_local_gov", "role_venue_manager", "runbook"):
-        _build_role_todo_pdf(response, buffer, pdf_font_name, use_unicode, labels, v)
-    else:
-        _build_full_pdf(
-            response,
-            buffer,
-            pdf_font_name,
-            use_unicode,
-            labels,
-            category_headings,
-            delta_summary=delta_summary,
-            site_check_memos=site_check_memos,
-            todo_checks=todo_checks,
-            adopted_todos=adopted_todos,
-            pins=pins,
-        )
-
-    return buffer.getvalue()
-
-
-def _strip_html(s: str) -> str:
-    if not s:
-        return ""
-    s = re.sub(r"<[^>]+>", "", s)
-    s = s.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
-    return s.strip()
+    ir = build_report_ir(
+        response,
+        delta_summary=delta_summary,
+        site_check_memos=site_check_memos,
+        todo_checks=todo_checks,
+        adopted_todos=adopted_todos,
+        pins=pins,
+    )
+    return render_pdf(ir, variant)
 
 
 def get_report_text(
@@ -960,152 +872,12 @@ def get_report_text(
     pins: list | None = None,
 ) -> str:
     """PDFフル版と同じ構成のレポートをプレーンテキストで返す。アシストの回答用。"""
-    is_ja = getattr(response, "locale", "ja") == "ja"
-    labels = LABELS_JA if is_ja else LABELS_EN
-    category_headings = RISK_CATEGORY_HEADINGS_JA if is_ja else RISK_CATEGORY_HEADINGS_EN
-
-    def p(t: str) -> str:
-        return _safe_text((t or "").strip(), True)
-
-    lines: list[str] = []
-    lines.append(f"{labels['title']} — {labels['subtitle']}")
-    lines.append("")
-    lines.append(f"{labels['event']}: {p(response.event_name)}")
-    lines.append(f"{labels['location']}: {p(response.event_location or '—')}")
-    lines.append(f"{labels['date_time']}: {p(response.date_time or '—')}")
-    lines.append(f"{labels['report_id']}: {response.simulation_id or '—'}")
-    lines.append("")
-
-    lines.append(labels["executive_summary"])
-    lines.append(p(response.summary))
-    lines.append("")
-
-    lines.append(f"{labels['overall_risk_score']}: {response.overall_risk_score:.1f} / 10")
-    lines.append("")
-
-    if delta_summary and isinstance(delta_summary, dict):
-        sb = delta_summary.get("riskScoreBefore")
-        sa = delta_summary.get("riskScoreAfter")
-        if sb is not None and sa is not None:
-            lines.append("対策効果（対策前 → 対策後）")
-            lines.append(f"  総合リスクスコア: {float(sb):.1f} → {float(sa):.1f}")
-            db = delta_summary.get("dangerCountBefore")
-            da = delta_summary.get("dangerCountAfter")
-            if db is not None and da is not None:
-                lines.append(f"  危険ポイント数: {int(db)}件 → {int(da)}件")
-            lines.append("")
-
-    tasks = getattr(response, "mitigation_tasks", None) or []
-    if tasks:
-        lines.append(labels["todo_list"])
-        checked_set = set()
-        if isinstance(todo_checks, dict):
-            for tid, v in todo_checks.items():
-                if v:
-                    checked_set.add(str(tid))
-        for t in tasks:
-            tid = getattr(t, "id", "") or ""
-            status = labels["done"] if tid in checked_set else labels["pending"]
-            who = p((getattr(t, "who", "") or "")[:20])
-            action = p((getattr(t, "action", "") or "")[:200])
-            due = (getattr(t, "due_by", "") or "—")[:10]
-            lines.append(f"  [{status}] {who} — {action} （期限: {due}）")
-        lines.append("")
-
-    if adopted_todos and isinstance(adopted_todos, list):
-        lines.append(labels["adopted_todos"])
-        for i, item in enumerate(adopted_todos, 1):
-            if not isinstance(item, dict):
-                continue
-            action = item.get("action") or item.get("title") or "—"
-            who = (item.get("who") or "").strip() or "—"
-            lines.append(f"  {i}. [{p(who)}] {p(str(action)[:80])}")
-        lines.append("")
-
-    lines.append(labels["risk_overview"])
-    for cat, count in response.risk_count_by_category.items():
-        try:
-            label = category_headings.get(RiskCategory(cat), cat)
-        except ValueError:
-            label = cat
-        lines.append(f"  {p(str(label))}: {count}件")
-    lines.append("")
-
-    if getattr(response, "risk_time_series", None) and response.risk_time_series:
-        lines.append(labels["time_series"])
-        for s in response.risk_time_series:
-            label = getattr(s, "label", None) or (getattr(s, "start_time", "")[:16] if getattr(s, "start_time", None) else "—")
-            score = getattr(s, "risk_score", 0)
-            lines.append(f"  {p(str(label)[:30])}: {float(score):.1f}")
-        lines.append("")
-
-    routes = getattr(response, "map_routes", None) or []
-    bottlenecks = getattr(response, "bottlenecks", None) or []
-    if routes or bottlenecks:
-        lines.append(labels["recommended_routes"])
-        rec_routes = [r for r in routes if getattr(r, "type", "") == "recommended"]
-        if rec_routes:
-            lines.append(f"  {labels['recommended_routes']}: {len(rec_routes)}本")
-        if bottlenecks:
-            lines.append(labels["staff_placement"])
-            for b in bottlenecks[:15]:
-                loc = p((getattr(b, "location_description", "") or "")[:50])
-                reason = p((getattr(b, "reason", "") or "")[:40])
-                lines.append(f"    ・ {loc} — {labels['bottleneck_reason']}: {reason}")
-        lines.append("")
-
-    if site_check_memos and isinstance(site_check_memos, list):
-        lines.append("現場確認メモ")
-        for item in site_check_memos:
-            if not isinstance(item, dict):
-                continue
-            label = item.get("label") or item.get("id") or "—"
-            memo = (item.get("memo") or "").strip()
-            lines.append(f"  {p(str(label))}: {p(memo)[:150]}")
-        lines.append("")
-
-    if pins and isinstance(pins, list):
-        lines.append(labels["map_pins"])
-        for pin in pins:
-            if not isinstance(pin, dict):
-                continue
-            name = p((pin.get("name") or pin.get("id") or "—")[:30])
-            typ = p((pin.get("type") or "other")[:12])
-            memo = p((pin.get("memo") or "—")[:50])
-            lines.append(f"  {name} [{typ}]: {memo}")
-        lines.append("")
-
-    lines.append(labels["detailed_risks"])
-    for cat in RiskCategory:
-        risks_in_cat = [r for r in response.risks if r.category == cat]
-        if not risks_in_cat:
-            continue
-        cat_label = category_headings.get(cat, getattr(cat, "value", str(cat)))
-        lines.append(f"【{p(str(cat_label))}】")
-        for r in risks_in_cat:
-            imp = getattr(r, "importance", None)
-            urg = getattr(r, "urgency", None)
-            extra = []
-            if imp is not None:
-                extra.append(f"{labels['importance']}: {float(imp):.1f}")
-            if urg is not None:
-                extra.append(f"{labels['urgency']}: {float(urg):.1f}")
-            line = f" ・ {p(r.title)} — {labels['severity']}: {r.severity:.1f}  {labels['probability']}: {r.probability * 100:.0f}%"
-            if extra:
-                line += "  " + "  ".join(extra)
-            lines.append(line)
-            if getattr(r, "location_description", None):
-                lines.append(f"    {labels['place']}: {p(r.location_description)[:80]}")
-            lines.append(f"    {p(r.description)[:300]}")
-            if r.mitigation_actions:
-                lines.append(f"    {labels['mitigation']}: {p('; '.join(r.mitigation_actions))[:200]}")
-            lines.append("")
-        lines.append("")
-
-    lines.append(labels["recommendations"])
-    for i, rec in enumerate(response.recommendations, 1):
-        lines.append(f"  {i}. {p(rec)[:250]}")
-    lines.append("")
-    lines.append(_strip_html(labels["footer"]))
-
-    return "\n".join(lines)
+    ir = build_report_ir(
+        response,
+        delta_summary=delta_summary,
+        site_check_memos=site_check_memos,
+        todo_checks=todo_checks,
+        adopted_todos=adopted_todos,
+        pins=pins,
+    )
+    return render_report(ir, "text")
@@ -0,0 +1,293 @@
+"""LLM を待たずに返す暫定リスク評価（ルール・数式ベース）。
+
+ポリゴン面積と予想来場者数から群衆密度（Fruin のサービス水準）を求め、天候・気温の補正と
+イベント種別・来場者属性の事前分布を掛け合わせて 6 カテゴリのスコアを算出する。
+計算は NumPy でベクトル化しており、What-if のスライダーから数百ケースを一括評価できる。
+"""
+
+import math
+
+import numpy as np
+
+from models import (
+    AudienceType,
+    EventType,
+    RiskCategory,
+    SimulationRequest,
+    WeatherCondition,
+)
+from services.geometry import geodesic_area_m2, polygon_arrays
+
+CATEGORIES: list[RiskCategory] = list(RiskCategory)
+EVENT_TYPES: list[EventType] = list(EventType)
+AUDIENCE_TYPES: list[AudienceType] = list(AudienceType)
+WEATHER_CONDITIONS: list[WeatherCondition] = list(WeatherCondition)
+
+# 来場者のうちピーク時に同時滞在する割合と、ステージ・屋台等を除いた有効面積率
+PEAK_PRESENCE: dict[EventType, float] = {
+    EventType.MUSIC_FESTIVAL: 0.7,
+    EventType.FIREWORKS: 0.9,
+    EventType.MARATHON: 0.3,
+    EventType.DEMONSTRATION: 0.8,
+    EventType.SPORTS_EVENT: 0.9,
+    EventType.EXHIBITION: 0.35,
+    EventType.OTHER: 0.5,
+}
+USABLE_AREA_RATIO = 0.6
+
+# Fruin の滞留空間サービス水準（人/m²）: A〜F の境界
+FRUIN_LOS_BOUNDS = np.array([0.83, 1.11, 1.43, 3.33, 5.0])
+FRUIN_LOS_LABELS = np.array(["A", "B", "C", "D", "E", "F"])
+# 密度 → 群衆安全スコア（区分線形）
+DENSITY_SCORE_X = np.array([0.0, 0.83, 1.43, 3.33, 5.0, 7.0])
+DENSITY_SCORE_Y = np.array([1.0, 3.0, 5.0, 7.5, 9.0, 10.0])
+
+# イベント種別 × カテゴリの事前係数（列順は CATEGORIES）
+EVENT_PRIORS = np.array([
+    # crowd, traffic, env, ops, visibility, legal
+    [1.15, 1.00, 1.05, 1.10, 1.05, 1.00],  # music_festival
+    [1.20, 1.15, 1.00, 1.00, 1.15, 1.10],  # fireworks
+    [0.85, 1.25, 1.15, 1.00, 0.90, 1.10],  # marathon
+    [1.10, 1.15, 0.95, 0.95, 1.05, 1.25],  # demonstration
+    [1.10, 1.10, 1.00, 1.00, 0.95, 0.95],  # sports_event
+    [0.90, 1.05, 0.90, 1.05, 0.90, 0.95],  # exhibition
+    [1.00, 1.00, 1.00, 1.00, 1.00, 1.00],  # other
+])
+
+# 来場者属性 × カテゴリの事前係数
+AUDIENCE_PRIORS = np.array([
+    [1.05, 1.00, 0.95, 1.00, 1.00, 1.00],  # youth
+    [1.10, 1.00, 1.10, 1.05, 1.10, 1.00],  # family
+    [1.15, 1.05, 1.25, 1.05, 1.05, 1.00],  # elderly
+    [1.05, 1.00, 1.05, 1.00, 1.00, 1.00],  # mixed
+])
+
+# 天候 × カテゴリの加算ペナルティ
+WEATHER_PENALTIES = np.array([
+    [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],  # clear
+    [0.0, 0.0, 0.2, 0.0, 0.2, 0.0],  # cloudy
+    [0.6, 0.8, 1.0, 0.6, 0.6, 0.0],  # rain
+    [1.2, 1.5, 2.0, 1.2, 1.2, 0.3],  # heavy_rain
+    [1.8, 1.8, 3.0, 1.6, 1.5, 0.5],  # storm
+    [1.0, 1.8, 1.8, 1.0, 1.0, 0.2],  # snow
+    [0.8, 0.3, 3.0, 0.8, 0.0, 0.2],  # extreme_heat
+])
+
+DEFAULT_WEATHER = (25.0, 20.0, WeatherCondition.CLEAR)
+
+CATEGORY_TEXT: dict[str, dict[RiskCategory, tuple[str, str, list[str]]]] = {
+    "ja": {
+        RiskCategory.CROWD_SAFETY: (
+            "群衆密度の上昇による滞留・転倒",
+            "ピーク時の推定密度は {density:.2f} 人/m²（Fruin サービス水準 {los}）です。",
+            ["入退場の時間分散と一方通行導線の設定", "滞留が予想される箇所への誘導員配置"],
+        ),
+        RiskCategory.TRAFFIC_LOGISTICS: (
+            "周辺道路・公共交通の混雑",
+            "来場者 {attendance:,} 人の集中により、最寄り駅や周辺道路の混雑が想定されます。",
+            ["最寄り駅との分散誘導・臨時便の調整", "搬入車両と歩行者動線の分離"],
+        ),
+        RiskCategory.ENVIRONMENTAL_HEALTH: (
+            "天候・気温による体調不良",
+            "気温 {temperature:.0f}℃、降水確率 {precipitation:.0f}% の条件を前提としています。",
+            ["給水所・休憩所・日除け/雨除けの確保", "救護所と搬送ルートの事前確認"],
+        ),
+        RiskCategory.OPERATIONAL: (
+            "入場待機列・トイレ・ごみの処理能力不足",
+            "来場規模に対して受付・衛生設備の処理能力が不足する可能性があります。",
+            ["受付レーン・仮設トイレの増設計画", "スタッフ間の連絡手段と指揮系統の確認"],
+        ),
+        RiskCategory.VISIBILITY: (
+            "監視の死角・見通し不良",
+            "構造物や人垣によって監視の行き届かない箇所が生じる可能性があります。",
+            ["監視カメラ・高所監視員の配置検討", "夜間照明と死角箇所の巡回計画"],
+        ),
+        RiskCategory.LEGAL_COMPLIANCE: (
+            "許認可・届出の漏れ",
+            "道路使用・消防・食品衛生など、開催形態に応じた届出が必要です。",
+            ["警察・消防・保健所への届出状況の確認", "騒音・著作権等の関連規制の確認"],
+        ),
+    },
+    "en": {
+        RiskCategory.CROWD_SAFETY: (
+            "Crowd build-up and falls at high density",
+            "Estimated peak density is {density:.2f} persons/m² (Fruin level of service {los}).",
+            ["Stagger entry/exit times and set one-way flows", "Place stewards where crowds are expected to build up"],
+        ),
+        RiskCategory.TRAFFIC_LOGISTICS: (
+            "Congestion on nearby roads and public transit",
+            "With {attendance:,} attendees, congestion at the nearest stations and roads is expected.",
+            ["Coordinate dispersed routing and extra services with transit operators", "Separate delivery vehicles from pedestrian routes"],
+        ),
+        RiskCategory.ENVIRONMENTAL_HEALTH: (
+            "Heat, cold or weather-related illness",
+            "Assumes {temperature:.0f} °C and a {precipitation:.0f}% chance of precipitation.",
+            ["Provide water points, rest areas and shade/rain cover", "Confirm first-aid posts and ambulance routes"],
+        ),
+        RiskCategory.OPERATIONAL: (
+            "Insufficient capacity for queues, restrooms and waste",
+            "Reception and sanitation capacity may fall short for this attendance.",
+            ["Plan extra entry lanes and temporary restrooms", "Confirm staff communication channels and chain of command"],
+        ),
+        RiskCategory.VISIBILITY: (
+            "Blind spots and poor line of sight",
+            "Structures and crowds may create areas that staff and cameras cannot monitor.",
+            ["Consider cameras and elevated observers", "Plan lighting and patrols for blind spots"],
+        ),
+        RiskCategory.LEGAL_COMPLIANCE: (
+            "Missing permits or notifications",
+            "Road use, fire and food hygiene notifications may be required for this event format.",
+            ["Check filings with police, fire department and health centre", "Review noise and copyright regulations"],
+        ),
+    },
+}
+
+SUMMARY_TEXT = {
+    "ja": "暫定評価（AI 分析前の概算）: ピーク時推定密度 {density:.2f} 人/m²（サービス水準 {los}）。最も注意が必要なカテゴリは「{top}」です。AI による詳細分析が完了すると置き換わります。",
+    "en": "Provisional assessment (estimate before AI analysis): estimated peak density {density:.2f} persons/m² (level of service {los}). The category needing most attention is \"{top}\". This will be replaced when the detailed AI analysis completes.",
+}
+
+
+def fruin_level_of_service(density: np.ndarray) -> np.ndarray:
+    """人/m² の配列を Fruin サービス水準（A〜F）の配列に変換する。"""
+    return FRUIN_LOS_LABELS[np.searchsorted(FRUIN_LOS_BOUNDS, np.asarray(density, dtype=float), side="right")]
+
+
+def assess_variants(
+    area_m2: float,
+    attendance: np.ndarray,
+    temperature: np.ndarray,
+    precipitation: np.ndarray,
+    weather_idx: np.ndarray,
+    event_idx: int,
+    audience_idx: int,
+) -> dict[str, np.ndarray]:
+    """N ケースを一括評価する。戻り値の category_scores は (N, 6)、その他は (N,)。"""
+    attendance = np.asarray(attendance, dtype=float)
+    temperature = np.asarray(temperature, dtype=float)
+    precipitation = np.asarray(precipitation, dtype=float)
+    weather_idx = np.asarray(weather_idx, dtype=int)
+
+    presence = PEAK_PRESENCE[EVENT_TYPES[event_idx]]
+    usable = max(area_m2 * USABLE_AREA_RATIO, 1.0)
+    density = attendance * presence / usable
+
+    crowd = np.interp(density, DENSITY_SCORE_X, DENSITY_SCORE_Y)
+    scale = np.clip(1.6 * np.log10(np.maximum(attendance, 1.0)) - 2.0, 1.0, 8.5)
+    heat = np.clip((temperature - 28.0) * 0.45, 0.0, 3.0)
+    cold = np.clip((5.0 - temperature) * 0.25, 0.0, 2.0)
+    rain = precipitation / 100.0
+
+    base = np.empty((attendance.shape[0], len(CATEGORIES)))
+    base[:, 0] = crowd
+    base[:, 1] = scale + 0.6 * rain
+    base[:, 2] = 2.0 + heat + cold + 1.5 * rain
+    base[:, 3] = 0.5 * scale + 0.35 * crowd
+    base[:, 4] = 1.5 + 0.5 * crowd
+    base[:, 5] = 0.5 * scale + 1.0
+
+    prior = EVENT_PRIORS[event_idx] * AUDIENCE_PRIORS[audience_idx]
+    scores = np.clip(base * prior + WEATHER_PENALTIES[weather_idx], 1.0, 10.0)
+    overall = np.clip(0.6 * scores.max(axis=1) + 0.4 * scores.mean(axis=1), 0.0, 10.0)
+    return {
+        "density": density,
+        "category_scores": scores,
+        "overall": overall,
+    }
+
+
+def _weather_inputs(
+    request: SimulationRequest,
+    weather_override: tuple[float, float, WeatherCondition] | None,
+) -> tuple[float, float, WeatherCondition]:
+    if weather_override:
+        return weather_override
+    temp, precip, cond = DEFAULT_WEATHER
+    return (
+        request.temperature_celsius if request.temperature_celsius is not None else temp,
+        request.precipitation_probability if request.precipitation_probability is not None else precip,
+        request.weather_condition or cond,
+    )
+
+
+def assess_request(
+    request: SimulationRequest,
+    weather_override: tuple[float, float, WeatherCondition] | None = None,
+    variants: list[dict] | None = None,
+) -> dict[str, np.ndarray | float]:
+    """リクエスト（と任意の What-if 差分）を評価する。variants の各要素は
+    expected_attendance / temperature_celsius / precipitation_probability / weather_condition を上書きできる。"""
+    temp, precip, cond = _weather_inputs(request, weather_override)
+    rows = [{}] + list(variants or [])
+    attendance = np.array([float(v.get("expected_attendance", request.expected_attendance)) for v in rows])
+    temperature = np.array([float(v.get("temperature_celsius", temp)) for v in rows])
+    precipitation = np.array([float(v.get("precipitation_probability", precip)) for v in rows])
+    weather_idx = np.array([
+        WEATHER_CONDITIONS.index(WeatherCondition(v.get("weather_condition", cond)))
+        for v in rows
+    ])
+    area = geodesic_area_m2(*polygon_arrays(request.polygon))
+    result = assess_variants(
+        area,
+        attendance,
+        temperature,
+        precipitation,
+        weather_idx,
+        EVENT_TYPES.index(request.event_type),
+        AUDIENCE_TYPES.index(request.audience_type),
+    )
+    result["area_m2"] = area
+    result["temperature"] = temperature
+    result["precipitation"] = precipitation
+    return result
+
+
+def build_provisional_raw_result(
+    request: SimulationRequest,
+    center_lat: float,
+    center_lng: float,
+    weather_override: tuple[float, float, WeatherCondition] | None = None,
+) -> dict:
+    """暫定評価を LLM 応答と同じ形の dict（risks / overall_risk_score / summary / recommendations）で返す。"""
+    assessed = assess_request(request, weather_override)
+    scores = assessed["category_scores"][0]
+    density = float(assessed["density"][0])
+    los = str(fruin_level_of_service(density))
+    locale = request.locale if request.locale in CATEGORY_TEXT else "ja"
+    texts = CATEGORY_TEXT[locale]
+    radius = max(30.0, min(500.0, math.sqrt(assessed["area_m2"] / math.pi) * 0.5))
+    fmt = {
+        "density": density,
+        "los": los,
+        "attendance": request.expected_attendance,
+        "temperature": float(assessed["temperature"][0]),
+        "precipitation": float(assessed["precipitation"][0]),
+    }
+
+    risks = []
+    for i, cat in enumerate(CATEGORIES):
+        title, description, actions = texts[cat]
+        severity = round(float(scores[i]), 1)
+        risks.append({
+            "category": cat.value,
+            "title": title,
+            "description": description.format(**fmt),
+            "probability": round(min(0.95, 0.15 + severity / 12.0), 2),
+            "severity": severity,
+            "location": {
+                "center": {"lat": center_lat, "lng": center_lng},
+                "radius_meters": radius,
+            },
+            "location_description": request.event_location,
+            "mitigation_actions": actions,
+            "evidence": description.format(**fmt),
+        })
+    risks.sort(key=lambda r: r["severity"], reverse=True)
+
+    top_cat = CATEGORIES[int(np.argmax(scores))]
+    return {
+        "risks": risks,
+        "overall_risk_score": round(float(assessed["overall"][0]), 1),
+        "summary": SUMMARY_TEXT[locale].format(density=density, los=los, top=texts[top_cat][0]),
+        "recommendations": [a for r in risks[:3] for a in r["mitigation_actions"][:1]],
+    }
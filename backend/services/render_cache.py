@@ -0,0 +1,114 @@
+"""PDF・レポートテキストの描画結果キャッシュ。
+
+キーは「描画の版（RENDERER_VERSION）+ 結果本文 + 出力種別 + variant + 差分（delta_summary, todo_checks, adopted_todos, pins, memos）」の
+正規化 JSON の SHA-256。同じ内容の再エクスポートは描画せずにキャッシュから返す。
+キーはそのまま ETag にも使うので、If-None-Match が一致すれば本文を返さず 304 にできる。
+容量はバイト数で制限し、古いものから捨てる（LRU）。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any
+
+from models import SimulationResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# レポートのレイアウト・文言・テンプレート（pdf_report・report_ir の出力）を変えたら上げる。
+# キーと ETag が変わるので、ブラウザ・前段のキャッシュが古い版の本文を 304 で使い続けない
+RENDERER_VERSION = "1"
+
+# 同じ SimulationResponse オブジェクト（結果ストアのメモリ LRU 上のもの）は本文ハッシュを使い回す
+_payload_digests: dict[int, tuple[weakref.ref, str]] = {}
+_digest_lock = threading.Lock()
+
+
+def payload_digest(payload: SimulationResponse) -> str:
+    key = id(payload)
+    with _digest_lock:
+        hit = _payload_digests.get(key)
+        if hit is not None and hit[0]() is payload:
+            return hit[1]
+    digest = hashlib.sha256(payload.model_dump_json().encode("utf-8")).hexdigest()
+    with _digest_lock:
+        _payload_digests[key] = (weakref.ref(payload, lambda _r, k=key: _payload_digests.pop(k, None)), digest)
+    return digest
+
+
+def render_key(kind: str, payload: SimulationResponse, variant: str = "", overlays: dict[str, Any] | None = None) -> str:
+    """描画結果のキャッシュキー（= ETag）。overlays の None・空は省略と同じ扱い。"""
+    normalized = {k: v for k, v in (overlays or {}).items() if v not in (None, {}, [], "")}
+    extra = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    h = hashlib.sha256()
+    h.update(f"{RENDERER_VERSION}\x00{kind}\x00{variant or ''}\x00{payload_digest(payload)}\x00".encode("utf-8"))
+    h.update(extra.encode("utf-8"))
+    return h.hexdigest()[:40]
+
+
+def etag_matches(if_none_match: str | None, key: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/").strip('"') for t in if_none_match.split(",")]
+    return key in tags or "*" in tags
+
+
+class RenderCache:
+    def __init__(self, max_bytes: int | None = None) -> None:
+        self.max_bytes = max_bytes or int(os.getenv("RENDER_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self._entries: OrderedDict[str, bytes | str] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> bytes | str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: bytes | str) -> None:
+        size = len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes[key]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                old, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old)
+                self.evictions += 1
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
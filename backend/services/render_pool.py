@@ -0,0 +1,206 @@
+"""PDF・レポートテキストの描画をプロセスプールで実行する。
+
+ワーカーに渡すのはレポート IR（services/report_ir.py）で、結果本文の走査・集計は親プロセスで
+1 回だけ行う。
+ReportLab のレイアウトは CPU バウンドで、イベントループ上で実行すると他のリクエスト
+（simulate, assist, health）が止まる。描画は別プロセスで行い、フォント登録はワーカー起動時に
+1 回だけ行う。待ち行列の長さ・ジョブごとのタイムアウト・一定件数ごとのワーカー入れ替えで
+メモリ肥大やハングしたジョブがサーバー全体に波及しないようにする。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from services.report_ir import ReportIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = min(2, os.cpu_count() or 1)
+DEFAULT_MAX_QUEUE = 8
+DEFAULT_TIMEOUT_S = 60.0
+DEFAULT_MAX_TASKS_PER_CHILD = 50
+
+
+class RenderPoolBusy(Exception):
+    """待ち行列が上限に達している。"""
+
+
+class RenderTimeout(Exception):
+    """ジョブがタイムアウトした（ワーカーは入れ替え済み）。"""
+
+
+class RenderPoolRestarted(RenderPoolBusy):
+    """別のジョブのタイムアウト・クラッシュでプールが入れ替わり、このジョブは取り消された（再試行できる）。"""
+
+
+def _init_worker() -> None:
+    # ワーカー起動時にフォントを 1 回だけ解決・登録する
+    from services.pdf_report import _get_pdf_font
+
+    _get_pdf_font()
+
+
+def _warm_up_job() -> dict:
+    from services.pdf_report import warm_up
+
+    return {**warm_up(), "pid": os.getpid()}
+
+
+def _render_pdf_job(ir: ReportIR, variant: str) -> bytes:
+    from services.pdf_report import render_pdf
+
+    return render_pdf(ir, variant)
+
+
+def _render_pdf_file_job(ir: ReportIR, variant: str, path: str | None) -> str:
+    from services.pdf_report import render_pdf_to_file
+
+    return render_pdf_to_file(ir, variant, path)
+
+
+def _render_text_job(ir: ReportIR, fmt: str) -> str:
+    from services.report_ir import render_report
+
+    return render_report(ir, fmt)
+
+
+class RenderPool:
+    """レポート IR の描画（PDF・テキスト系）をプロセスプールで実行する。workers=0 ならスレッドで実行する。"""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        max_queue: int | None = None,
+        timeout_s: float | None = None,
+        max_tasks_per_child: int | None = None,
+    ) -> None:
+        self.workers = workers if workers is not None else int(os.getenv("RENDER_POOL_WORKERS", DEFAULT_WORKERS))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("RENDER_POOL_MAX_QUEUE", DEFAULT_MAX_QUEUE))
+        self.timeout_s = timeout_s or float(os.getenv("RENDER_TIMEOUT_S", DEFAULT_TIMEOUT_S))
+        self.max_tasks_per_child = max_tasks_per_child or int(
+            os.getenv("RENDER_POOL_MAX_TASKS_PER_CHILD", DEFAULT_MAX_TASKS_PER_CHILD)
+        )
+        # 実行中 + 待ち行列の合計がこの数を超えたら受け付けない
+        self._capacity = max(1, self.workers) + max(0, self.max_queue)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+        if self.workers > 0:
+            self._executor = self._new_executor()
+        logger.info(
+            "RenderPool ready (workers=%d, max_queue=%d, timeout=%.0fs, max_tasks_per_child=%d)",
+            self.workers, self.max_queue, self.timeout_s, self.max_tasks_per_child,
+        )
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            max_tasks_per_child=self.max_tasks_per_child,
+        )
+
+    def _restart(self, executor: ProcessPoolExecutor, reason: str) -> None:
+        """ハング・クラッシュしたワーカーごとプールを作り直す。executor が既に入れ替え済みなら何もしない
+        （同じプールの他のジョブの失敗で、新しいプールまで作り直さない）。"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = self._new_executor()
+            self.restarts += 1
+        logger.warning("RenderPool restarted (%s)", reason)
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for proc in processes:
+            if proc.is_alive():
+                proc.terminate()
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._in_flight >= self._capacity:
+                self.rejected += 1
+                raise RenderPoolBusy()
+            self._in_flight += 1
+        # このジョブを投げたプール。失敗したときは、これがまだ現在のプールである場合だけ入れ替える
+        with self._lock:
+            executor = self._executor
+        future = None
+        try:
+            if executor is None:
+                result = await asyncio.wait_for(asyncio.to_thread(fn, *args), self.timeout_s)
+            else:
+                future = executor.submit(fn, *args)
+                result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout_s)
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            if executor is not None:
+                self._restart(executor, f"job exceeded {self.timeout_s:.0f}s")
+            raise RenderTimeout()
+        except asyncio.CancelledError:
+            # 入れ替えたプールの待ち行列にあったジョブ（shutdown(cancel_futures=True)）。呼び出し側の取り消しはそのまま
+            current = asyncio.current_task()
+            if future is not None and future.cancelled() and not (current and current.cancelling()):
+                raise RenderPoolRestarted()
+            raise
+        except BrokenProcessPool:
+            # 自分のプールが壊れたなら入れ替える。既に入れ替え済み（一緒に実行中だったジョブ）なら再試行を促すだけ
+            if executor is not None:
+                self._restart(executor, "worker crashed")
+            raise RenderPoolRestarted()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    async def warm_up(self) -> dict:
+        """全ワーカーを起動して小さな文書を描画させる。起動時に 1 回呼ぶ。"""
+        t0 = time.perf_counter()
+        if self._executor is None:
+            results = [await asyncio.to_thread(_warm_up_job)]
+        else:
+            futures = [self._executor.submit(_warm_up_job) for _ in range(self.workers)]
+            results = await asyncio.to_thread(lambda: [f.result(timeout=self.timeout_s) for f in futures])
+        return {
+            "workers": len({r["pid"] for r in results}),
+            "font": results[0]["font"] if results else None,
+            "unicode": bool(results and results[0]["unicode"]),
+            "duration_ms": round((time.perf_counter() - t0) * 1000, 1),
+        }
+
+    async def render_pdf(self, ir: ReportIR, variant: str = "full") -> bytes:
+        return await self._run(_render_pdf_job, ir, variant)
+
+    async def render_pdf_file(self, ir: ReportIR, variant: str = "full", path: str | None = None) -> str:
+        """PDF を path（省略時は一時ファイル）に書き出してパスを返す（本文はプロセス間で受け渡さない）。"""
+        return await self._run(_render_pdf_file_job, ir, variant, path)
+
+    async def render_text(self, ir: ReportIR, fmt: str = "text") -> str:
+        return await self._run(_render_text_job, ir, fmt)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "capacity": self._capacity,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,826 @@
+"""レポートの中間表現（IR）と、テキスト系の出力バックエンド。
+
+SimulationResponse と差分（delta_summary, todo_checks, adopted_todos, pins, site_check_memos）から
+レポートに載せる内容（並べ替え・カテゴリ分け・ToDo の完了判定・役割別の絞り込み済み）を 1 回だけ組み立て、
+PDF（pdf_report.render_pdf）・プレーンテキスト・Markdown・HTML の各バックエンドはこの IR だけを見て出力する。
+IR には装飾やマークアップを含めず、切り詰め・エスケープは各バックエンドが行う。
+"""
+
+import html
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable
+
+from pydantic import BaseModel, Field
+
+from models import RiskCategory, SimulationResponse
+from services.render_cache import render_key
+
+logger = logging.getLogger(__name__)
+
+RISK_CATEGORY_HEADINGS_EN = {
+    RiskCategory.CROWD_SAFETY: "Crowd Safety",
+    RiskCategory.TRAFFIC_LOGISTICS: "Traffic & Logistics",
+    RiskCategory.ENVIRONMENTAL_HEALTH: "Environmental & Health",
+    RiskCategory.OPERATIONAL: "Operational",
+    RiskCategory.VISIBILITY: "Visibility & Blind Spots",
+    RiskCategory.LEGAL_COMPLIANCE: "Legal & Compliance",
+}
+
+RISK_CATEGORY_HEADINGS_JA = {
+    RiskCategory.CROWD_SAFETY: "群衆安全",
+    RiskCategory.TRAFFIC_LOGISTICS: "交通・物流",
+    RiskCategory.ENVIRONMENTAL_HEALTH: "環境・健康",
+    RiskCategory.OPERATIONAL: "運営",
+    RiskCategory.VISIBILITY: "高さ・死角",
+    RiskCategory.LEGAL_COMPLIANCE: "法的留意点",
+}
+
+LABELS_JA = {
+    "title": "FlowGuard AI",
+    "subtitle": "イベントリスク評価レポート",
+    "one_page_subtitle": "1枚サマリー",
+    "event": "イベント",
+    "location": "開催場所",
+    "date_time": "開催日時",
+    "report_id": "レポートID",
+    "generated": "作成日時",
+    "executive_summary": "エグゼクティブサマリー",
+    "overall_risk_score": "総合リスクスコア",
+    "risk_overview": "カテゴリ別リスク概要",
+    "category": "カテゴリ",
+    "count": "件数",
+    "detailed_risks": "リスク詳細",
+    "top_risks": "重要リスク（トップ3）",
+    "mitigation": "軽減策",
+    "recommendations": "推奨事項",
+    "immediate_actions": "今すぐやるべき対策",
+    "severity": "深刻度",
+    "probability": "発生確率",
+    "place": "場所",
+    "time_series": "時間帯ごとのリスク",
+    "time_slot": "時間帯",
+    "footer": "本レポートは FlowGuard AI により自動生成されています。計画の参考としてご利用ください。専門的な安全・法務の助言に代わるものではありません。",
+    "todo_list": "対策ToDo一覧",
+    "status": "状態",
+    "done": "完了",
+    "pending": "未完了",
+    "assignee": "担当",
+    "action": "対策内容",
+    "due_by": "期限",
+    "related_risk": "関連リスク",
+    "adopted_todos": "採用済みToDo（次にやるべきから採用）",
+    "recommended_routes": "推奨導線",
+    "staff_placement": "誘導員配置推奨",
+    "map_pins": "地図ピン",
+    "pin_name": "名称",
+    "pin_memo": "メモ",
+    "pin_type": "種別",
+    "bottleneck_reason": "理由",
+    "bottleneck_measures": "推奨対策",
+    "importance": "重要度",
+    "urgency": "緊急度",
+    "mitigation_effect": "対策効果（対策前 → 対策後）",
+    "delta_score": "総合リスクスコア",
+    "delta_danger": "危険ポイント数",
+    "delta_congestion": "混雑ピーク",
+    "congestion_shortened": "約{minutes}分短縮",
+    "count_unit": "件",
+    "routes_unit": "本",
+    "site_check_memos": "現場確認メモ",
+    "related_todo": "関連ToDo",
+    "layout": "推奨配置",
+    "layout_routes": "推奨導線 {n}本",
+    "layout_staff": "誘導員配置推奨 {n}箇所",
+    "responsibility": "責任分界",
+    "responsibility_text": "主催＝全体統括／警備＝誘導・警備／自治体＝許可・監視／施設＝設備・導線。連携窓口を事前に確認すること。",
+    "role_todo": "役割別 ToDo",
+    "role_organizer": "主催者用 ToDo",
+    "role_security": "警備用 ToDo",
+    "role_local_gov": "自治体用 ToDo",
+    "role_venue_manager": "施設管理用 ToDo",
+    "runbook": "運用手順書 ToDo",
+    "assignee_default": "担当",
+    "due_inline": " （期限: {due}）",
+}
+
+LABELS_EN = {
+    "title": "FlowGuard AI",
+    "subtitle": "Event Risk Assessment Report",
+    "one_page_subtitle": "One-Page Summary",
+    "event": "Event",
+    "location": "Location",
+    "date_time": "Date / Time",
+    "report_id": "Report ID",
+    "generated": "Generated",
+    "executive_summary": "Executive Summary",
+    "overall_risk_score": "Overall Risk Score",
+    "risk_overview": "Risk Overview by Category",
+    "category": "Category",
+    "count": "Count",
+    "detailed_risks": "Detailed Risk Items",
+    "top_risks": "Top 3 Risks",
+    "mitigation": "Mitigation",
+    "recommendations": "Recommendations",
+    "immediate_actions": "Immediate Actions",
+    "severity": "Severity",
+    "probability": "Probability",
+    "place": "Location",
+    "time_series": "Risk by Time Slot",
+    "time_slot": "Time slot",
+    "footer": "This report was generated by FlowGuard AI. It is intended to support planning and does not replace professional safety or legal advice.",
+    "todo_list": "Mitigation ToDo List",
+    "status": "Status",
+    "done": "Done",
+    "pending": "Pending",
+    "assignee": "Assignee",
+    "action": "Action",
+    "due_by": "Due by",
+    "related_risk": "Related risk",
+    "adopted_todos": "Adopted ToDo (from Next Actions)",
+    "recommended_routes": "Recommended Routes",
+    "staff_placement": "Staff Placement",
+    "map_pins": "Map Pins",
+    "pin_name": "Name",
+    "pin_memo": "Memo",
+    "pin_type": "Type",
+    "bottleneck_reason": "Reason",
+    "bottleneck_measures": "Suggested measures",
+    "importance": "Importance",
+    "urgency": "Urgency",
+    "mitigation_effect": "Mitigation Effect (before → after)",
+    "delta_score": "Overall risk score",
+    "delta_danger": "Danger points",
+    "delta_congestion": "Congestion peak",
+    "congestion_shortened": "about {minutes} min shorter",
+    "count_unit": "",
+    "routes_unit": "",
+    "site_check_memos": "Site Check Memos",
+    "related_todo": "Related ToDo",
+    "layout": "Recommended layout",
+    "layout_routes": "{n} recommended routes",
+    "layout_staff": "staff at {n} points",
+    "responsibility": "Responsibilities",
+    "responsibility_text": "Organizer = overall command / Security = guidance and security / Local government = permits and monitoring / Venue = facilities and routes. Confirm contact points in advance.",
+    "role_todo": "ToDo by Role",
+    "role_organizer": "Organizer ToDo",
+    "role_security": "Security ToDo",
+    "role_local_gov": "Local Government ToDo",
+    "role_venue_manager": "Venue Manager ToDo",
+    "runbook": "Runbook ToDo",
+    "assignee_default": "Owner",
+    "due_inline": " (due: {due})",
+}
+
+
+ROLE_KEYWORDS = {
+    "role_organizer": ["主催", "主催者", "運営", "その他"],
+    "role_security": ["警備", "誘導", "保安", "救護"],
+    "role_local_gov": ["自治体", "許可", "監視", "報告"],
+    "role_venue_manager": ["施設", "設備", "導線"],
+    "runbook": [],
+}
+
+IR_CACHE_SIZE = 32
+
+
+class DeltaEntry(BaseModel):
+    score_before: float
+    score_after: float
+    danger_before: int | None = None
+    danger_after: int | None = None
+    congestion_minutes: float | None = None
+
+
+class TodoEntry(BaseModel):
+    id: str = ""
+    who: str = ""
+    action: str = ""
+    due_by: str = ""
+    done: bool = False
+
+
+class AdoptedEntry(BaseModel):
+    who: str = ""
+    action: str = ""
+    risk_id: str = ""
+
+
+class CategoryCount(BaseModel):
+    label: str
+    count: int
+
+
+class TimeSlotEntry(BaseModel):
+    label: str
+    score: float
+
+
+class BottleneckEntry(BaseModel):
+    location: str = ""
+    reason: str = ""
+    measures: list[str] = Field(default_factory=list)
+
+
+class SiteMemoEntry(BaseModel):
+    label: str
+    category: str = ""
+    memo: str = ""
+    linked_task_id: str = ""
+
+
+class PinEntry(BaseModel):
+    name: str
+    type: str = "other"
+    memo: str = ""
+
+
+class RiskEntry(BaseModel):
+    title: str
+    severity: float
+    probability: float
+    importance: float | None = None
+    urgency: float | None = None
+    location: str = ""
+    description: str = ""
+    mitigation_actions: list[str] = Field(default_factory=list)
+
+
+class RiskGroup(BaseModel):
+    label: str
+    risks: list[RiskEntry]
+
+
+class ReportIR(BaseModel):
+    locale: str = "ja"
+    labels: dict[str, str]
+    event_name: str
+    event_location: str = ""
+    date_time: str = ""
+    simulation_id: str = ""
+    generated_at: str
+    summary: str = ""
+    overall_risk_score: float
+    delta: DeltaEntry | None = None
+    todos: list[TodoEntry] = Field(default_factory=list)
+    adopted: list[AdoptedEntry] = Field(default_factory=list)
+    category_counts: list[CategoryCount] = Field(default_factory=list)
+    time_slots: list[TimeSlotEntry] = Field(default_factory=list)
+    recommended_routes: list[str] = Field(default_factory=list)
+    bottlenecks: list[BottleneckEntry] = Field(default_factory=list)
+    site_memos: list[SiteMemoEntry] = Field(default_factory=list)
+    pins: list[PinEntry] = Field(default_factory=list)
+    risk_groups: list[RiskGroup] = Field(default_factory=list)
+    top_risks: list[RiskEntry] = Field(default_factory=list)
+    recommendations: list[str] = Field(default_factory=list)
+    role_tasks: dict[str, list[TodoEntry]] = Field(default_factory=dict)
+
+    def item_count(self) -> int:
+        """レポートの大きさの目安（リスク・ToDo・ピン・現場メモの件数の合計）。"""
+        return sum(len(g.risks) for g in self.risk_groups) + len(self.todos) + len(self.pins) + len(self.site_memos)
+
+
+def _category_label(cat, category_headings: dict) -> str:
+    try:
+        return str(category_headings.get(RiskCategory(cat), cat))
+    except ValueError:
+        return str(cat)
+
+
+def _filter_tasks_by_role(tasks: list[TodoEntry], variant: str) -> list[TodoEntry]:
+    keywords = ROLE_KEYWORDS.get((variant or "").strip().lower(), [])
+    if not tasks or not keywords:
+        return tasks
+    out = [t for t in tasks if any(k in t.who.strip() for k in keywords)]
+    return out if out else tasks
+
+
+def _delta_entry(delta_summary: dict | None) -> DeltaEntry | None:
+    if not delta_summary or not isinstance(delta_summary, dict):
+        return None
+    sb = delta_summary.get("riskScoreBefore")
+    sa = delta_summary.get("riskScoreAfter")
+    if sb is None or sa is None:
+        return None
+    db = delta_summary.get("dangerCountBefore")
+    da = delta_summary.get("dangerCountAfter")
+    cong = delta_summary.get("congestionDeltaMinutes")
+    both = db is not None and da is not None
+    return DeltaEntry(
+        score_before=float(sb),
+        score_after=float(sa),
+        danger_before=int(db) if both else None,
+        danger_after=int(da) if both else None,
+        congestion_minutes=float(cong) if cong is not None else None,
+    )
+
+
+def _risk_entry(r) -> RiskEntry:
+    return RiskEntry(
+        title=r.title,
+        severity=r.severity,
+        probability=r.probability,
+        importance=r.importance,
+        urgency=r.urgency,
+        location=r.location_description or "",
+        description=r.description,
+        mitigation_actions=list(r.mitigation_actions),
+    )
+
+
+def _build(
+    response: SimulationResponse,
+    delta_summary: dict | None,
+    site_check_memos: list | None,
+    todo_checks: dict | None,
+    adopted_todos: list | None,
+    pins: list | None,
+) -> ReportIR:
+    is_ja = getattr(response, "locale", "ja") == "ja"
+    labels = LABELS_JA if is_ja else LABELS_EN
+    category_headings = RISK_CATEGORY_HEADINGS_JA if is_ja else RISK_CATEGORY_HEADINGS_EN
+
+    checked = {str(tid) for tid, v in todo_checks.items() if v} if isinstance(todo_checks, dict) else set()
+    todos = [
+        TodoEntry(id=t.id or "", who=t.who or "", action=(t.action or "").strip(), due_by=t.due_by or "", done=(t.id or "") in checked)
+        for t in response.mitigation_tasks
+    ]
+    adopted = [
+        AdoptedEntry(
+            who=(item.get("who") or "").strip(),
+            action=str(item.get("action") or item.get("title") or "—"),
+            risk_id=str(item.get("risk_id") or ""),
+        )
+        for item in (adopted_todos if isinstance(adopted_todos, list) else [])
+        if isinstance(item, dict)
+    ]
+    memos = [
+        SiteMemoEntry(
+            label=str(item.get("label") or item.get("id") or "—"),
+            category=str(item.get("category") or ""),
+            memo=(item.get("memo") or "").strip(),
+            linked_task_id=str(item.get("linkedTaskId") or ""),
+        )
+        for item in (site_check_memos if isinstance(site_check_memos, list) else [])
+        if isinstance(item, dict)
+    ]
+    pin_entries = [
+        PinEntry(
+            name=str(pin.get("name") or pin.get("id") or "—"),
+            type=str(pin.get("type") or "other"),
+            memo=str(pin.get("memo") or "—"),
+        )
+        for pin in (pins if isinstance(pins, list) else [])
+        if isinstance(pin, dict)
+    ]
+
+    risk_entries = {id(r): _risk_entry(r) for r in response.risks}
+    groups = []
+    for cat in RiskCategory:
+        in_cat = [risk_entries[id(r)] for r in response.risks if r.category == cat]
+        if in_cat:
+            groups.append(RiskGroup(label=str(category_headings.get(cat, cat.value)), risks=in_cat))
+    top = [risk_entries[id(r)] for r in sorted(response.risks, key=lambda r: r.severity, reverse=True)[:3]]
+
+    return ReportIR(
+        locale=response.locale,
+        labels=labels,
+        event_name=response.event_name,
+        event_location=response.event_location or "",
+        date_time=response.date_time or "",
+        simulation_id=response.simulation_id or "",
+        generated_at=_generated_at(),
+        summary=response.summary,
+        overall_risk_score=response.overall_risk_score,
+        delta=_delta_entry(delta_summary),
+        todos=todos,
+        adopted=adopted,
+        category_counts=[
+            CategoryCount(label=_category_label(cat, category_headings), count=count)
+            for cat, count in response.risk_count_by_category.items()
+        ],
+        time_slots=[
+            TimeSlotEntry(label=s.label or (s.start_time[:16] if s.start_time else "—"), score=float(s.risk_score or 0))
+            for s in response.risk_time_series
+        ],
+        recommended_routes=[r.label or r.id[:8] for r in response.map_routes if r.type == "recommended"],
+        bottlenecks=[
+            BottleneckEntry(location=b.location_description or "", reason=b.reason or "", measures=list(b.suggested_measures))
+            for b in response.bottlenecks
+        ],
+        site_memos=memos,
+        pins=pin_entries,
+        risk_groups=groups,
+        top_risks=top,
+        recommendations=list(response.recommendations),
+        role_tasks={v: _filter_tasks_by_role(todos, v) for v in ROLE_KEYWORDS},
+    )
+
+
+def _generated_at() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+
+
+_ir_cache: OrderedDict[str, ReportIR] = OrderedDict()
+_ir_lock = threading.Lock()
+
+
+def build_report_ir(
+    response: SimulationResponse,
+    delta_summary: dict | None = None,
+    site_check_memos: list | None = None,
+    todo_checks: dict | None = None,
+    adopted_todos: list | None = None,
+    pins: list | None = None,
+) -> ReportIR:
+    """IR を組み立てる。同じ本文・差分なら直近の IR を使い回す（作成日時だけはその時刻に差し替えた浅いコピー）。"""
+    overlays = {
+        "delta_summary": delta_summary,
+        "site_check_memos": site_check_memos,
+        "todo_checks": todo_checks,
+        "adopted_todos": adopted_todos,
+        "pins": pins,
+    }
+    key = render_key("ir", response, overlays=overlays)
+    with _ir_lock:
+        hit = _ir_cache.get(key)
+        if hit is not None:
+            _ir_cache.move_to_end(key)
+    if hit is not None:
+        return hit.model_copy(update={"generated_at": _generated_at()})
+    ir = _build(response, delta_summary, site_check_memos, todo_checks, adopted_todos, pins)
+    with _ir_lock:
+        _ir_cache[key] = ir
+        while len(_ir_cache) > IR_CACHE_SIZE:
+            _ir_cache.popitem(last=False)
+    return ir
+
+
+def truncate(s: str, max_len: int = 80) -> str:
+    s = (s or "").strip()
+    if len(s) <= max_len:
+        return s
+    return s[: max_len - 1] + "…"
+
+
+def count_text(labels: dict, n: int) -> str:
+    return f"{n}{labels['count_unit']}"
+
+
+def congestion_text(labels: dict, minutes: float) -> str:
+    return labels["congestion_shortened"].format(minutes=abs(int(minutes)))
+
+
+# --- テキスト系バックエンド ---------------------------------------------------
+
+_RENDERERS: dict[str, Callable[[ReportIR], str]] = {}
+
+
+def register_renderer(fmt: str):
+    """出力形式を追加する。IR を受け取って文字列を返す関数を登録する。"""
+
+    def decorator(fn: Callable[[ReportIR], str]) -> Callable[[ReportIR], str]:
+        _RENDERERS[fmt] = fn
+        return fn
+
+    return decorator
+
+
+def report_formats() -> tuple[str, ...]:
+    return tuple(_RENDERERS)
+
+
+def render_report(ir: ReportIR, fmt: str = "text") -> str:
+    renderer = _RENDERERS.get(fmt)
+    if renderer is None:
+        raise ValueError(f"Unknown report format: {fmt}. Allowed: {', '.join(_RENDERERS)}")
+    return renderer(ir)
+
+
+@register_renderer("text")
+def render_text(ir: ReportIR) -> str:
+    """PDFフル版と同じ構成のプレーンテキスト。アシストのコンテキスト用に長い項目は切り詰める。"""
+    labels = ir.labels
+    lines: list[str] = []
+    lines.append(f"{labels['title']} — {labels['subtitle']}")
+    lines.append("")
+    lines.append(f"{labels['event']}: {ir.event_name.strip()}")
+    lines.append(f"{labels['location']}: {ir.event_location.strip() or '—'}")
+    lines.append(f"{labels['date_time']}: {ir.date_time.strip() or '—'}")
+    lines.append(f"{labels['report_id']}: {ir.simulation_id or '—'}")
+    lines.append("")
+
+    lines.append(labels["executive_summary"])
+    lines.append(ir.summary.strip())
+    lines.append("")
+
+    lines.append(f"{labels['overall_risk_score']}: {ir.overall_risk_score:.1f} / 10")
+    lines.append("")
+
+    if ir.delta:
+        d = ir.delta
+        lines.append(labels["mitigation_effect"])
+        lines.append(f"  {labels['delta_score']}: {d.score_before:.1f} → {d.score_after:.1f}")
+        if d.danger_before is not None:
+            lines.append(f"  {labels['delta_danger']}: {count_text(labels, d.danger_before)} → {count_text(labels, d.danger_after)}")
+        if d.congestion_minutes:
+            lines.append(f"  {labels['delta_congestion']}: {congestion_text(labels, d.congestion_minutes)}")
+        lines.append("")
+
+    if ir.todos:
+        lines.append(labels["todo_list"])
+        for t in ir.todos:
+            status = labels["done"] if t.done else labels["pending"]
+            due = labels["due_inline"].format(due=t.due_by[:10] or "—")
+            lines.append(f"  [{status}] {t.who[:20].strip()} — {t.action[:200].strip()}{due}")
+        lines.append("")
+
+    if ir.adopted:
+        lines.append(labels["adopted_todos"])
+        for i, item in enumerate(ir.adopted, 1):
+            lines.append(f"  {i}. [{item.who or '—'}] {item.action[:80].strip()}")
+        lines.append("")
+
+    lines.append(labels["risk_overview"])
+    for c in ir.category_counts:
+        lines.append(f"  {c.label}: {count_text(labels, c.count)}")
+    lines.append("")
+
+    if ir.time_slots:
+        lines.append(labels["time_series"])
+        for s in ir.time_slots:
+            lines.append(f"  {s.label[:30].strip()}: {s.score:.1f}")
+        lines.append("")
+
+    if ir.recommended_routes or ir.bottlenecks:
+        lines.append(labels["recommended_routes"])
+        if ir.recommended_routes:
+            lines.append(
+                f"  {labels['recommended_routes']}: {len(ir.recommended_routes)}{labels['routes_unit']} — "
+                + ", ".join(ir.recommended_routes[:10])
+            )
+        if ir.bottlenecks:
+            lines.append(labels["staff_placement"])
+            for b in ir.bottlenecks[:15]:
+                lines.append(f"    ・ {b.location[:50].strip()} — {labels['bottleneck_reason']}: {b.reason[:40].strip()}")
+                if b.measures:
+                    lines.append(f"      {labels['bottleneck_measures']}: " + "; ".join(b.measures)[:80])
+        lines.append("")
+
+    if ir.site_memos:
+        lines.append(labels["site_check_memos"])
+        for m in ir.site_memos:
+            lines.append(f"  {m.label}: {m.memo[:150].strip()}")
+        lines.append("")
+
+    if ir.pins:
+        lines.append(labels["map_pins"])
+        for pin in ir.pins:
+            lines.append(f"  {pin.name[:30].strip()} [{pin.type[:12].strip()}]: {pin.memo[:50].strip()}")
+        lines.append("")
+
+    lines.append(labels["detailed_risks"])
+    for group in ir.risk_groups:
+        lines.append(f"【{group.label}】")
+        for r in group.risks:
+            extra = []
+            if r.importance is not None:
+                extra.append(f"{labels['importance']}: {r.importance:.1f}")
+            if r.urgency is not None:
+                extra.append(f"{labels['urgency']}: {r.urgency:.1f}")
+            line = f" ・ {r.title.strip()} — {labels['severity']}: {r.severity:.1f}  {labels['probability']}: {r.probability * 100:.0f}%"
+            if extra:
+                line += "  " + "  ".join(extra)
+            lines.append(line)
+            if r.location:
+                lines.append(f"    {labels['place']}: {r.location.strip()[:80]}")
+            lines.append(f"    {r.description.strip()[:300]}")
+            if r.mitigation_actions:
+                lines.append(f"    {labels['mitigation']}: {'; '.join(r.mitigation_actions).strip()[:200]}")
+            lines.append("")
+        lines.append("")
+
+    lines.append(labels["recommendations"])
+    for i, rec in enumerate(ir.recommendations, 1):
+        lines.append(f"  {i}. {rec.strip()[:250]}")
+    lines.append("")
+    lines.append(labels["footer"])
+
+    return "\n".join(lines)
+
+
+def _md(s: str) -> str:
+    # 表のセル・行頭で Markdown として解釈されないようにする
+    return (s or "").replace("\\", "\\\\").replace("|", "\\|").replace("\n", " ").strip()
+
+
+@register_renderer("markdown")
+def render_markdown(ir: ReportIR) -> str:
+    labels = ir.labels
+    out: list[str] = [f"# {labels['title']} — {labels['subtitle']}", ""]
+    out.append(f"- **{labels['event']}:** {_md(ir.event_name)}")
+    out.append(f"- **{labels['location']}:** {_md(ir.event_location) or '—'}")
+    out.append(f"- **{labels['date_time']}:** {_md(ir.date_time) or '—'}")
+    out.append(f"- **{labels['report_id']}:** {ir.simulation_id or '—'} · **{labels['generated']}:** {ir.generated_at}")
+    out += ["", f"## {labels['executive_summary']}", "", _md(ir.summary), ""]
+    out += [f"**{labels['overall_risk_score']}:** {ir.overall_risk_score:.1f} / 10", ""]
+
+    if ir.delta:
+        d = ir.delta
+        out += [f"## {labels['mitigation_effect']}", "", "| | |", "|---|---|"]
+        out.append(f"| {labels['delta_score']} | {d.score_before:.1f} → {d.score_after:.1f} |")
+        if d.danger_before is not None:
+            out.append(f"| {labels['delta_danger']} | {count_text(labels, d.danger_before)} → {count_text(labels, d.danger_after)} |")
+        if d.congestion_minutes:
+            out.append(f"| {labels['delta_congestion']} | {congestion_text(labels, d.congestion_minutes)} |")
+        out.append("")
+
+    if ir.todos:
+        out += [f"## {labels['todo_list']}", ""]
+        for t in ir.todos:
+            due = labels["due_inline"].format(due=t.due_by[:10]) if t.due_by else ""
+            out.append(f"- [{'x' if t.done else ' '}] **{_md(t.who) or '—'}** {_md(t.action) or '—'}{due}")
+        out.append("")
+
+    if ir.adopted:
+        out += [f"## {labels['adopted_todos']}", ""]
+        for i, item in enumerate(ir.adopted, 1):
+            related = f" _({labels['related_risk']}: {_md(item.risk_id)})_" if item.risk_id else ""
+            out.append(f"{i}. [{_md(item.who) or '—'}] {_md(item.action)}{related}")
+        out.append("")
+
+    out += [f"## {labels['risk_overview']}", "", f"| {labels['category']} | {labels['count']} |", "|---|---:|"]
+    out += [f"| {_md(c.label)} | {c.count} |" for c in ir.category_counts]
+    out.append("")
+
+    if ir.time_slots:
+        out += [f"## {labels['time_series']}", "", f"| {labels['time_slot']} | {labels['overall_risk_score']} |", "|---|---:|"]
+        out += [f"| {_md(s.label)} | {s.score:.1f} |" for s in ir.time_slots]
+        out.append("")
+
+    if ir.recommended_routes or ir.bottlenecks:
+        out += [f"## {labels['recommended_routes']}", ""]
+        if ir.recommended_routes:
+            out += [f"{labels['recommended_routes']}: {len(ir.recommended_routes)} — " + ", ".join(_md(r) for r in ir.recommended_routes[:10]), ""]
+        if ir.bottlenecks:
+            out += [f"### {labels['staff_placement']}", ""]
+            for b in ir.bottlenecks[:15]:
+                out.append(f"- {_md(b.location)} — {labels['bottleneck_reason']}: {_md(b.reason)}")
+                if b.measures:
+                    out.append(f"  - {labels['bottleneck_measures']}: " + _md("; ".join(b.measures)))
+            out.append("")
+
+    if ir.site_memos:
+        out += [f"## {labels['site_check_memos']}", ""]
+        for m in ir.site_memos:
+            head = f"- **{_md(m.label)}**" + (f"（{_md(m.category)}）" if m.category else "")
+            out.append(head + (f": {_md(m.memo)}" if m.memo else ""))
+            if m.linked_task_id:
+                out.append(f"  - _{labels['related_todo']}: {_md(m.linked_task_id)}_")
+        out.append("")
+
+    if ir.pins:
+        out += [f"## {labels['map_pins']}", "", f"| {labels['pin_name']} | {labels['pin_type']} | {labels['pin_memo']} |", "|---|---|---|"]
+        out += [f"| {_md(p.name)} | {_md(p.type)} | {_md(p.memo)} |" for p in ir.pins]
+        out.append("")
+
+    out += [f"## {labels['detailed_risks']}", ""]
+    for group in ir.risk_groups:
+        out += [f"### {_md(group.label)}", ""]
+        for r in group.risks:
+            extra = ""
+            if r.importance is not None:
+                extra += f" · {labels['importance']}: {r.importance:.1f}"
+            if r.urgency is not None:
+                extra += f" · {labels['urgency']}: {r.urgency:.1f}"
+            out.append(f"- **{_md(r.title)}** · {labels['severity']}: {r.severity:.1f} · {labels['probability']}: {r.probability * 100:.0f}%{extra}")
+            if r.location:
+                out.append(f"  - {labels['place']}: {_md(r.location)}")
+            out.append(f"  - {_md(r.description)}")
+            if r.mitigation_actions:
+                out.append(f"  - {labels['mitigation']}: " + _md("; ".join(r.mitigation_actions)))
+        out.append("")
+
+    out += [f"## {labels['recommendations']}", ""]
+    out += [f"{i}. {_md(rec)}" for i, rec in enumerate(ir.recommendations, 1)]
+    out += ["", f"_{labels['footer']}_", ""]
+    return "\n".join(out)
+
+
+def _h(s: str) -> str:
+    return html.escape(s or "")
+
+
+@register_renderer("html")
+def render_html(ir: ReportIR) -> str:
+    labels = ir.labels
+
+    def table(head: list[str], rows: list[list[str]]) -> str:
+        th = "".join(f"<th>{_h(c)}</th>" for c in head)
+        body = "".join("<tr>" + "".join(f"<td>{_h(c)}</td>" for c in row) + "</tr>" for row in rows)
+        return f"<table><thead><tr>{th}</tr></thead><tbody>{body}</tbody></table>"
+
+    parts: list[str] = [
+        f'<!DOCTYPE html><html lang="{_h(ir.locale)}"><head><meta charset="utf-8">',
+        f"<title>{_h(labels['title'])} — {_h(ir.event_name)}</title>",
+        "<style>body{font-family:sans-serif;max-width:52em;margin:2em auto;color:#212121}"
+        "h1,h2,h3{color:#1A237E}table{border-collapse:collapse;margin:.5em 0}"
+        "th,td{border:1px solid #BDBDBD;padding:4px 8px;text-align:left}th{background:#E8EAF6}"
+        ".footer{color:#757575;font-size:.85em}</style></head><body>",
+        f"<h1>{_h(labels['title'])}</h1><p>{_h(labels['subtitle'])}</p>",
+        "<p>"
+        f"<b>{_h(labels['event'])}:</b> {_h(ir.event_name)}<br>"
+        f"<b>{_h(labels['location'])}:</b> {_h(ir.event_location or '—')}<br>"
+        f"<b>{_h(labels['date_time'])}:</b> {_h(ir.date_time or '—')}<br>"
+        f"<b>{_h(labels['report_id'])}:</b> {_h(ir.simulation_id or '—')} · <b>{_h(labels['generated'])}:</b> {_h(ir.generated_at)}"
+        "</p>",
+        f"<h2>{_h(labels['executive_summary'])}</h2><p>{_h(ir.summary)}</p>",
+        table([labels["overall_risk_score"], ""], [[labels["overall_risk_score"], f"{ir.overall_risk_score:.1f} / 10"]]),
+    ]
+
+    if ir.delta:
+        d = ir.delta
+        rows = [[labels["delta_score"], f"{d.score_before:.1f} → {d.score_after:.1f}"]]
+        if d.danger_before is not None:
+            rows.append([labels["delta_danger"], f"{count_text(labels, d.danger_before)} → {count_text(labels, d.danger_after)}"])
+        if d.congestion_minutes:
+            rows.append([labels["delta_congestion"], congestion_text(labels, d.congestion_minutes)])
+        parts.append(f"<h2>{_h(labels['mitigation_effect'])}</h2>" + table(["", ""], rows))
+
+    if ir.todos:
+        rows = [[labels["done"] if t.done else labels["pending"], t.who[:12], t.action or "—", t.due_by[:10] or "—"] for t in ir.todos]
+        parts.append(f"<h2>{_h(labels['todo_list'])}</h2>" + table([labels["status"], labels["assignee"], labels["action"], labels["due_by"]], rows))
+
+    if ir.adopted:
+        items = "".join(
+            f"<li>[{_h(a.who or '—')}] {_h(a.action)}"
+            + (f" <i>({_h(labels['related_risk'])}: {_h(a.risk_id)})</i>" if a.risk_id else "")
+            + "</li>"
+            for a in ir.adopted
+        )
+        parts.append(f"<h2>{_h(labels['adopted_todos'])}</h2><ol>{items}</ol>")
+
+    parts.append(
+        f"<h2>{_h(labels['risk_overview'])}</h2>"
+        + table([labels["category"], labels["count"]], [[c.label, str(c.count)] for c in ir.category_counts])
+    )
+
+    if ir.time_slots:
+        parts.append(
+            f"<h2>{_h(labels['time_series'])}</h2>"
+            + table([labels["time_slot"], labels["overall_risk_score"]], [[s.label, f"{s.score:.1f}"] for s in ir.time_slots])
+        )
+
+    if ir.recommended_routes or ir.bottlenecks:
+        parts.append(f"<h2>{_h(labels['recommended_routes'])}</h2>")
+        if ir.recommended_routes:
+            parts.append(f"<p>{_h(labels['recommended_routes'])}: {len(ir.recommended_routes)} — {_h(', '.join(ir.recommended_routes[:10]))}</p>")
+        if ir.bottlenecks:
+            items = "".join(
+                f"<li>{_h(b.location)} — {_h(labels['bottleneck_reason'])}: {_h(b.reason)}"
+                + (f"<br>{_h(labels['bottleneck_measures'])}: {_h('; '.join(b.measures))}" if b.measures else "")
+                + "</li>"
+                for b in ir.bottlenecks[:15]
+            )
+            parts.append(f"<h3>{_h(labels['staff_placement'])}</h3><ul>{items}</ul>")
+
+    if ir.site_memos:
+        items = "".join(
+            f"<li><b>{_h(m.label)}</b>"
+            + (f"（{_h(m.category)}）" if m.category else "")
+            + (f"<br>{_h(m.memo)}" if m.memo else "")
+            + (f"<br><i>{_h(labels['related_todo'])}: {_h(m.linked_task_id)}</i>" if m.linked_task_id else "")
+            + "</li>"
+            for m in ir.site_memos
+        )
+        parts.append(f"<h2>{_h(labels['site_check_memos'])}</h2><ul>{items}</ul>")
+
+    if ir.pins:
+        parts.append(
+            f"<h2>{_h(labels['map_pins'])}</h2>"
+            + table([labels["pin_name"], labels["pin_type"], labels["pin_memo"]], [[p.name, p.type, p.memo] for p in ir.pins])
+        )
+
+    parts.append(f"<h2>{_h(labels['detailed_risks'])}</h2>")
+    for group in ir.risk_groups:
+        parts.append(f"<h3>{_h(group.label)}</h3>")
+        for r in group.risks:
+            meta = f"{_h(labels['severity'])}: {r.severity:.1f} · {_h(labels['probability'])}: {r.probability * 100:.0f}%"
+            if r.importance is not None:
+                meta += f" · {_h(labels['importance'])}: {r.importance:.1f}"
+            if r.urgency is not None:
+                meta += f" · {_h(labels['urgency'])}: {r.urgency:.1f}"
+            block = f"<p><b>{_h(r.title)}</b> · {meta}"
+            if r.location:
+                block += f"<br><b>{_h(labels['place'])}:</b> {_h(r.location)}"
+            block += f"<br>{_h(r.description)}"
+            if r.mitigation_actions:
+                block += f"<br><b>{_h(labels['mitigation'])}:</b> {_h('; '.join(r.mitigation_actions))}"
+            parts.append(block + "</p>")
+
+    items = "".join(f"<li>{_h(rec)}</li>" for rec in ir.recommendations)
+    parts.append(f"<h2>{_h(labels['recommendations'])}</h2><ol>{items}</ol>")
+    parts.append(f'<p class="footer"><i>{_h(labels["footer"])}</i></p></body></html>')
+    return "".join(parts)
@@ -0,0 +1,188 @@
+"""アシスト用のレポート検索（プロセス内の BM25）。
+
+レポート本文（render_text と同じ構成のプレーンテキスト）を見出し・リスク単位のチャンクに分け、
+質問に関係する上位のチャンクだけをプロンプトに入れる。先頭から一律に切り詰めるのと違い、
+末尾のリスク詳細・推奨事項も質問に応じて参照できる。
+
+日本語は分かち書きしないため、かな・漢字の連続は文字 bigram、英数字は単語を索引語にする。
+索引は本文のハッシュごとに LRU で保持する（同じシミュレーションの質問では作り直さない）。
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 6
+DEFAULT_MAX_CHARS = 4000
+DEFAULT_INDEX_CACHE_SIZE = 32
+# 見出しの下が長い（ToDo 一覧など）ときに分割するチャンクの目安の文字数
+CHUNK_CHARS = 800
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[._-][a-z0-9]+)*")
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff66-\uff9f々ー]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """英数字は単語、かな・漢字の連続は文字 bigram（1 文字だけの連続はその文字）。"""
+    lowered = text.lower()
+    tokens = _WORD_RE.findall(lowered)
+    for run in _CJK_RE.findall(lowered):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class ReportChunk:
+    def __init__(self, index: int, heading: str, text: str) -> None:
+        self.index = index
+        self.heading = heading
+        self.text = text
+
+
+def _is_risk_line(line: str) -> bool:
+    return line.startswith(" ・ ")
+
+
+def chunk_report(text: str) -> list[ReportChunk]:
+    """空行で区切られた節を 1 チャンク、リスク詳細はリスク 1 件を 1 チャンクにする。
+    長い節は CHUNK_CHARS ごとに分け、見出し（節の 1 行目・【カテゴリ】）を各チャンクの先頭に付ける。"""
+    chunks: list[ReportChunk] = []
+    heading = ""
+    group = ""
+    block: list[str] = []
+
+    def flush() -> None:
+        nonlocal block
+        if not block:
+            return
+        title = f"{heading} {group}".strip() if group else heading
+        body: list[str] = []
+        size = 0
+        for line in block:
+            if body and size + len(line) > CHUNK_CHARS:
+                chunks.append(ReportChunk(len(chunks), title, "\n".join(body)))
+                body, size = [], 0
+            body.append(line)
+            size += len(line) + 1
+        chunks.append(ReportChunk(len(chunks), title, "\n".join(body)))
+        block = []
+
+    for line in text.splitlines():
+        if not line.strip():
+            flush()
+            continue
+        if line.startswith("【") and line.rstrip().endswith("】"):
+            if block == [heading]:
+                block = []  # 「リスク詳細」の見出しだけの節はチャンクにしない
+            flush()
+            group = line.strip()
+            continue
+        if _is_risk_line(line):
+            flush()
+            block.append(line)
+            continue
+        if not block and not line.startswith(" "):
+            # 節の 1 行目（見出し）。リスク詳細の続き（字下げ行）ではない
+            if not line.startswith("【"):
+                heading = line.strip()[:60]
+                group = ""
+        block.append(line)
+    flush()
+    return chunks
+
+
+class ReportIndex:
+    """1 本のレポートの BM25 索引。"""
+
+    def __init__(self, text: str) -> None:
+        self.chunks = chunk_report(text)
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._lengths: list[int] = []
+        for chunk in self.chunks:
+            terms = Counter(tokenize(f"{chunk.heading}\n{chunk.text}"))
+            self._lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self._postings.setdefault(term, []).append((chunk.index, tf))
+        self._avg_len = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+    def scores(self, query: str) -> dict[int, float]:
+        n = len(self.chunks)
+        out: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for idx, tf in postings:
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[idx] / self._avg_len)
+                out[idx] = out.get(idx, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        return out
+
+    def search(self, query: str, top_k: int, max_chars: int) -> list[ReportChunk]:
+        """質問に関係する上位チャンクを、max_chars に収まる範囲でレポートの順に返す。
+        一致する語が無ければ先頭から（従来の切り詰めと同じ、ただし max_chars まで）。"""
+        scored = self.scores(query)
+        ranked = sorted(scored, key=lambda i: scored[i], reverse=True) if scored else range(len(self.chunks))
+        picked: list[ReportChunk] = []
+        used = 0
+        for idx in ranked:
+            chunk = self.chunks[idx]
+            size = len(chunk.heading) + len(chunk.text) + 2
+            if used + size > max_chars:
+                continue
+            picked.append(chunk)
+            used += size
+            if len(picked) >= top_k:
+                break
+        return sorted(picked, key=lambda c: c.index)
+
+
+class ReportRetriever:
+    """本文のハッシュ → ReportIndex（LRU）。"""
+
+    def __init__(self, max_entries: int | None = None, top_k: int | None = None, max_chars: int | None = None) -> None:
+        self.max_entries = max_entries or int(os.getenv("ASSIST_INDEX_CACHE_SIZE", DEFAULT_INDEX_CACHE_SIZE))
+        self.top_k = top_k or int(os.getenv("ASSIST_RETRIEVAL_TOP_K", DEFAULT_TOP_K))
+        self.max_chars = max_chars or int(os.getenv("ASSIST_RETRIEVAL_MAX_CHARS", DEFAULT_MAX_CHARS))
+        self._indexes: OrderedDict[str, ReportIndex] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def index_for(self, text: str) -> ReportIndex:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+        index = ReportIndex(text)
+        logger.debug("Report index built (%d chunks, %d chars)", len(index.chunks), len(text))
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+    def excerpts(self, text: str, question: str) -> str:
+        """質問に関係するレポートの抜粋（見出し付き）。"""
+        chunks = self.index_for(text).search(question, self.top_k, self.max_chars)
+        return "\n\n".join(
+            c.text if not c.heading or c.text.startswith(c.heading) else f"[{c.heading}]\n{c.text}" for c in chunks
+        )
+
+    def stats(self) -> dict:
+        return {"indexes": len(self._indexes), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,113 @@
+"""シミュレーション結果のサーバー側ストア。
+
+結果は simulation_id（と翻訳版の場合は translation_locale）をキーに SQLite（WAL）へ
+zlib 圧縮した JSON で保存し、直近に使った結果は検証済みの SimulationResponse のまま
+メモリ上の LRU に保持する。レポート・翻訳・アシストは ID と小さな差分（todo_checks, pins 等）
+だけを受け取り、数百 KB の本文を毎回受け取って検証し直さずに済む。
+
+put・get は SQLite・zlib・検証を同期で行うので、エンドポイントからは asyncio.to_thread で呼ぶ。
+行数の上限は開いた後の最初の put と、その後は PRUNE_EVERY_ROWS 件（上限の 1/10 以下）保存するごとに確かめる。
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from models import SimulationResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "flowguard_results.sqlite3")
+DEFAULT_HOT_SIZE = 64
+DEFAULT_MAX_ROWS = 5000
+# 行数の上限を確かめる間隔（保存した件数）
+PRUNE_EVERY_ROWS = 100
+
+
+class ResultStore:
+    def __init__(
+        self,
+        path: str | None = None,
+        hot_size: int | None = None,
+        max_rows: int | None = None,
+    ) -> None:
+        self._path = path or os.getenv("RESULT_STORE_PATH", DEFAULT_DB_PATH)
+        self._hot_size = hot_size or int(os.getenv("RESULT_STORE_HOT_SIZE", DEFAULT_HOT_SIZE))
+        self._max_rows = max_rows or int(os.getenv("RESULT_STORE_MAX_ROWS", DEFAULT_MAX_ROWS))
+        self._hot: OrderedDict[tuple[str, str], SimulationResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " simulation_id TEXT NOT NULL,"
+            " variant TEXT NOT NULL DEFAULT '',"
+            " created_at REAL NOT NULL,"
+            " body BLOB NOT NULL,"
+            " PRIMARY KEY (simulation_id, variant))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at)")
+        # None なら次の put で行数を確かめる（開いた直後は上限を超えているかもしれない）
+        self._stored_since_prune: int | None = None
+        self._prune_every = min(PRUNE_EVERY_ROWS, max(1, self._max_rows // 10))
+        logger.info("ResultStore opened (path=%s, hot=%d)", self._path, self._hot_size)
+
+    def _remember(self, key: tuple[str, str], response: SimulationResponse) -> None:
+        self._hot[key] = response
+        self._hot.move_to_end(key)
+        while len(self._hot) > self._hot_size:
+            self._hot.popitem(last=False)
+
+    def put(self, response: SimulationResponse, variant: str = "") -> None:
+        """結果を保存する。variant は翻訳版のロケール（原文は空文字）。"""
+        key = (response.simulation_id, variant or "")
+        blob = zlib.compress(response.model_dump_json().encode("utf-8"), 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (simulation_id, variant, created_at, body) VALUES (?, ?, ?, ?)",
+                (key[0], key[1], time.time(), blob),
+            )
+            self._remember(key, response)
+            if self._stored_since_prune is not None:
+                self._stored_since_prune += 1
+            if self._stored_since_prune is None or self._stored_since_prune >= self._prune_every:
+                self._prune()
+
+    def get(self, simulation_id: str, variant: str = "") -> SimulationResponse | None:
+        key = (simulation_id, variant or "")
+        with self._lock:
+            hit = self._hot.get(key)
+            if hit is not None:
+                self._hot.move_to_end(key)
+                return hit
+            row = self._conn.execute(
+                "SELECT body FROM results WHERE simulation_id = ? AND variant = ?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        response = SimulationResponse.model_validate_json(zlib.decompress(row[0]))
+        with self._lock:
+            self._remember(key, response)
+        return response
+
+    def _prune(self) -> None:
+        """行数が上限を超えていれば、古い行から消す。ロックを持って呼ぶ。"""
+        self._stored_since_prune = 0
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count <= self._max_rows:
+            return
+        self._conn.execute(
+            "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY created_at LIMIT ?)",
+            (count - self._max_rows,),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
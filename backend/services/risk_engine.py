@@ -1,5 +1,4 @@
 import logging
-import os
 import uuid
 from collections import Counter
 
@@ -7,6 +6,7 @@ from models import (
     SimulationRequest,
     SimulationResponse,
     RiskItem,
+    RiskItemText,
     RiskLocation,
     RiskCategory,
     LatLng,
@@ -19,12 +19,35 @@ from models import (
     MitigationImpact,
     MapDangerPoint,
     WeatherCondition,
+    SimulationText,
+    SimulationUsage,
 )
-from services.gemini_service import GeminiService
+from services.gemini_service import GeminiService, is_bilingual
+from services.llm_backend import LLMBackend
+from services.model_usage import usage_ledger
+from services.translation_memory import TranslationMemory, apply_translations, extract_strings
 from services.weather_service import fetch_weather_for_event
+from services.geometry import clamp_points_to_polygon, polygon_centroid
+from services.pre_assessment import (
+    CATEGORIES,
+    assess_request,
+    build_provisional_raw_result,
+    fruin_level_of_service,
+)
 
 logger = logging.getLogger(__name__)
 
+# _enrich_response がコードで付ける表示文字列の英語（バイリンガル生成の英語版に使う）
+GENERATED_LABELS_EN = {
+    "深刻度": "Severity",
+    "発生確率": "Probability",
+    "開催時間帯": "Event hours",
+    "メイン時間帯": "Main time slot",
+    "担当者": "Assignee",
+    "リスク低減": "Risk reduction",
+    "リスク": "Risk",
+}
+
 
 def _parse_date_time_range(date_time: str) -> tuple[str, str | None, str | None]:
     if not date_time or not date_time.strip():
@@ -57,16 +80,24 @@ CATEGORY_MAP: dict[str, RiskCategory] = {
 
 
 class RiskEngine:
-    def __init__(self) -> None:
-        self.gemini = GeminiService()
+    def __init__(self, backend: LLMBackend | None = None) -> None:
+        self.gemini = GeminiService(backend)
 
     async def run_simulation(
         self, request: SimulationRequest
+    ) -> SimulationResponse:
+        with usage_ledger() as ledger:
+            response = await self._run_simulation(request)
+        response.usage = ledger.summary()
+        logger.info("Simulation model usage: %s", ledger.describe())
+        return response
+
+    async def _run_simulation(
+        self, request: SimulationRequest
     ) -> SimulationResponse:
         logger.info("Starting simulation for: %s", request.event_name)
 
-        center_lat = sum(p.lat for p in request.polygon) / len(request.polygon)
-        center_lng = sum(p.lng for p in request.polygon) / len(request.polygon)
+        center_lat, center_lng = polygon_centroid(request.polygon)
 
         weather_override = None
         weather_dt, _start, _end = _parse_date_time_range(request.date_time)
@@ -83,8 +114,9 @@ class RiskEngine:
             weather_override = (temp, precip, cond)
             logger.info("Using fetched weather: %.1f C, %.0f%%, %s", temp, precip, cond.value)
 
-        use_multi_agent = os.environ.get("USE_MULTI_AGENT", "").strip().lower() in ("1", "true", "yes")
-        if use_multi_agent:
+        profile = self.gemini.profile(request)
+        logger.info("Analysis tier: %s", profile.describe())
+        if profile.use_multi_agent():
             raw_result = await self._run_simulation_multi_agent(request, weather_override)
         else:
             raw_result = await self.gemini.analyze_risks(
@@ -96,6 +128,31 @@ class RiskEngine:
             raw_result, center_lat, center_lng, request, weather_override
         )
 
+    def pre_assess(self, request: SimulationRequest) -> SimulationResponse:
+        """LLM を呼ばずにルール・数式ベースの暫定結果を返す。AI の結果が届いたら置き換える前提。"""
+        center_lat, center_lng = polygon_centroid(request.polygon)
+        raw_result = build_provisional_raw_result(request, center_lat, center_lng)
+        response = self._build_simulation_response(raw_result, center_lat, center_lng, request, None)
+        response.provisional = True
+        return response
+
+    def evaluate_variants(self, request: SimulationRequest, variants: list[dict]) -> list[dict]:
+        """What-if 用: 複数ケースの暫定スコアを一括計算する（先頭はベースケース）。"""
+        assessed = assess_request(request, variants=variants)
+        los = fruin_level_of_service(assessed["density"])
+        out = []
+        for i in range(len(assessed["overall"])):
+            out.append({
+                "overall_risk_score": round(float(assessed["overall"][i]), 1),
+                "density_per_m2": round(float(assessed["density"][i]), 3),
+                "level_of_service": str(los[i]),
+                "category_scores": {
+                    cat.value: round(float(assessed["category_scores"][i][j]), 1)
+                    for j, cat in enumerate(CATEGORIES)
+                },
+            })
+        return out
+
     async def _run_simulation_multi_agent(
         self,
         request: SimulationRequest,
@@ -128,10 +185,85 @@ class RiskEngine:
             "overall_risk_score": synthesis.get("overall_risk_score", 5.0),
             "summary": synthesis.get("summary", "Risk analysis complete."),
             "recommendations": synthesis.get("recommendations", []),
+            "en": synthesis.get("en"),
         }
 
-    async def translate_simulation_to_english(self, payload: dict) -> dict:
-        return await self.gemini.translate_simulation_to_english(payload)
+    async def translate_simulation_to_english(
+        self,
+        payload: dict,
+        memory: TranslationMemory | None = None,
+    ) -> dict:
+        """翻訳の呼び出しは元の結果の usage に続けて記録する（英語版の usage はシミュレーション + 翻訳の合計）。"""
+        prior = payload.get("usage")
+        with usage_ledger(SimulationUsage.model_validate(prior) if prior else None) as ledger:
+            translated = await self.gemini.translate_simulation_to_english(payload, memory)
+        if len(ledger.calls) > len(prior["calls"] if prior else []):
+            translated["usage"] = ledger.summary().model_dump(mode="json")
+            logger.info("Translation model usage (with simulation): %s", ledger.describe())
+        return translated
+
+    @staticmethod
+    def _bilingual_pairs(response: SimulationResponse) -> dict[str, str]:
+        """バイリンガル生成の結果から 日本語 → 英語 の組を作る（_enrich_response で派生する文字列を含む）。
+        リストは件数が一致するときだけ組にする。"""
+        pairs: dict[str, str] = dict(GENERATED_LABELS_EN)
+
+        def pair(ja: str, en: str) -> None:
+            if ja and en:
+                pairs[ja] = en
+
+        def pair_lists(ja: list[str], en: list[str]) -> None:
+            if len(ja) == len(en):
+                for a, b in zip(ja, en):
+                    pair(a, b)
+
+        for r in response.risks:
+            if r.en is None:
+                continue
+            pair(r.title, r.en.title)
+            pair(r.title[:30], r.en.title)  # 危険ポイントのラベル
+            pair(r.description, r.en.description)
+            pair(r.description[:100], r.en.description)  # 要因の説明（根拠が無いとき）
+            pair(r.location_description, r.en.location_description)
+            pair(r.evidence, r.en.evidence)
+            pair_lists(r.mitigation_actions, r.en.mitigation_actions)
+            pair_lists(r.cascading_risks, r.en.cascading_risks)
+        if response.en is not None:
+            pair(response.event_name, response.en.event_name)
+            pair(response.event_location, response.en.event_location)
+            pair(response.summary, response.en.summary)
+            pair_lists(response.recommendations, response.en.recommendations)
+        return pairs
+
+    def english_variant(
+        self,
+        response: SimulationResponse,
+        memory: TranslationMemory | None = None,
+    ) -> dict | None:
+        """バイリンガル生成の結果から英語版を組み立てる（モデルは呼ばない）。組は翻訳メモリにも保存し、
+        /api/translate-simulation がメモリだけで答えられるようにする。英語の無い文字列が残れば None。
+        翻訳メモリ（SQLite）を読み書きするので、イベントループからは asyncio.to_thread で呼ぶ。"""
+        if response.en is None and not any(r.en for r in response.risks):
+            return None
+        pairs = self._bilingual_pairs(response)
+        if memory is not None:
+            memory.store("en", pairs)
+        payload = response.model_dump(mode="json")
+        strings = extract_strings(payload)
+        missing = list(dict.fromkeys(text for _, text in strings if text not in pairs))
+        if missing and memory is not None:
+            pairs.update(memory.lookup("en", missing))
+            missing = [text for text in missing if text not in pairs]
+        if missing:
+            logger.info(
+                "Bilingual result %s: %d strings without English, left to /api/translate-simulation",
+                response.simulation_id,
+                len(missing),
+            )
+            return None
+        translated = apply_translations(payload, strings, pairs)
+        translated["translation_locale"] = "en"
+        return translated
 
     def _build_simulation_response(
         self,
@@ -141,7 +273,8 @@ class RiskEngine:
         request: SimulationRequest,
         weather_override: tuple[float, float, any] | None,
     ) -> SimulationResponse:
-        risks = self._parse_risks(raw_result.get("risks", []))
+        bilingual = is_bilingual(request)
+        risks = self._parse_risks(raw_result.get("risks", []), request.polygon, bilingual)
 
         category_counts = Counter(r.category.value for r in risks)
         risk_count_by_category = {
@@ -176,6 +309,8 @@ class RiskEngine:
             traffic_predictions=[],
             weather_used=weather_used,
             locale=request.locale,
+            analysis_tier=request.analysis_tier.value,
+            en=self._parse_text(SimulationText, raw_result.get("en")) if bilingual else None,
         )
         _, time_start, time_end = _parse_date_time_range(request.date_time)
         self._enrich_response(request, risks, response, time_start, time_end)
@@ -198,6 +333,19 @@ class RiskEngine:
             return [str(x).strip() for x in value if str(x).strip()]
         return []
 
+    @classmethod
+    def _parse_text(cls, model: type[RiskItemText] | type[SimulationText], raw: dict | None):
+        """バイリンガル生成の "en" オブジェクト。無い・形が違うときは None（日本語だけの結果として扱う）。"""
+        if not isinstance(raw, dict):
+            return None
+        values = {}
+        for name, field in model.model_fields.items():
+            if field.annotation == list[str]:
+                values[name] = cls._ensure_list_str(raw.get(name))
+            else:
+                values[name] = str(raw.get(name) or "").strip()
+        return model(**values) if any(values.values()) else None
+
     @staticmethod
     def _parse_severity(value: str | int | float | None) -> float:
         if value is None:
@@ -236,7 +384,12 @@ class RiskEngine:
         except (TypeError, ValueError):
             return 0.5
 
-    def _parse_risks(self, raw_risks: list[dict]) -> list[RiskItem]:
+    def _parse_risks(
+        self,
+        raw_risks: list[dict],
+        polygon: list[LatLng] | None = None,
+        bilingual: bool = False,
+    ) -> list[RiskItem]:
         parsed: list[RiskItem] = []
         for idx, raw in enumerate(raw_risks):
             try:
@@ -270,6 +423,7 @@ class RiskEngine:
                     urgency=self._parse_optional_score(raw.get("urgency"), 5.0),
                     execution_difficulty=self._parse_optional_score(raw.get("execution_difficulty"), 5.0),
                     evidence=str(raw.get("evidence", "")).strip() or "",
+                    en=self._parse_text(RiskItemText, raw.get("en")) if bilingual else None,
                 )
                 parsed.append(risk)
 
@@ -277,8 +431,26 @@ class RiskEngine:
                 logger.warning("Skipping risk item %d: %s", idx, exc)
                 continue
 
+        if polygon and len(polygon) >= 3 and parsed:
+            self._clamp_risk_locations(parsed, polygon)
         return parsed
 
+    @staticmethod
+    def _clamp_risk_locations(risks: list[RiskItem], polygon: list[LatLng]) -> None:
+        """LLM が返した座標のうちポリゴン外のものを一括で境界の内側（大きく外れた場合は内部の代表点）に寄せる。
+        ボトルネック・危険ポイントはリスクの座標を引き継ぐため、ここで補正すれば全マーカーが収まる。"""
+        lats = [r.location.center.lat for r in risks]
+        lngs = [r.location.center.lng for r in risks]
+        new_lats, new_lngs, moved = clamp_points_to_polygon(lats, lngs, polygon)
+        if not moved.any():
+            return
+        for i in moved.nonzero()[0]:
+            risks[i].location.center = LatLng(
+                lat=max(-90.0, min(90.0, float(new_lats[i]))),
+                lng=max(-180.0, min(180.0, float(new_lngs[i]))),
+            )
+        logger.info("Clamped %d/%d risk locations into the polygon", int(moved.sum()), len(risks))
+
     @staticmethod
     def _parse_optional_score(value: str | int | float | None, default: float) -> float | None:
         if value is None:
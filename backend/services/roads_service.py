@@ -5,6 +5,8 @@ from typing import Any
 import httpx
 
 from models import LatLng
+from services.cassette import outbound_transport
+from services.metrics import track_external
 
 logger = logging.getLogger(__name__)
 
@@ -59,13 +61,14 @@ async def snap_path_to_map_boundaries(path: list[LatLng]) -> list[LatLng]:
     out skel qt;
     """
     try:
-        async with httpx.AsyncClient(timeout=25.0) as client:
-            resp = await client.post(
-                OVERPASS_URL,
-                data={"data": query},
-                headers={"Accept": "application/json"},
-            )
-            resp.raise_for_status()
+        async with httpx.AsyncClient(timeout=25.0, transport=outbound_transport()) as client:
+            with track_external("overpass"):
+                resp = await client.post(
+                    OVERPASS_URL,
+                    data={"data": query},
+                    headers={"Accept": "application/json"},
+                )
+                resp.raise_for_status()
             data = resp.json()
     except Exception as exc:
         logger.warning("Overpass (boundaries) request failed: %s", exc)
@@ -131,13 +134,14 @@ async def fetch_roads_in_area(
     """
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(
-                OVERPASS_URL,
-                data={"data": query},
-                headers={"Accept": "application/json"},
-            )
-            resp.raise_for_status()
+        async with httpx.AsyncClient(timeout=30.0, transport=outbound_transport()) as client:
+            with track_external("overpass"):
+                resp = await client.post(
+                    OVERPASS_URL,
+                    data={"data": query},
+                    headers={"Accept": "application/json"},
+                )
+                resp.raise_for_status()
             data = resp.json()
     except Exception as exc:
         logger.warning("Overpass request failed: %s", exc)
@@ -0,0 +1,264 @@
+"""シミュレーション結果の翻訳メモリ。
+
+結果の中の表示文字列は重複が多い（ToDo の action はリスクの mitigation_actions の写し、
+ボトルネックの suggested_measures もその先頭 3 件、要因の「深刻度」「発生確率」は全リスク共通）。
+翻訳は結果 JSON を丸ごと送らず、表示文字列を取り出して重複を除き、メモリに無い文字列だけを翻訳する。
+訳文は原文 → 訳文の組として SQLite（WAL）に保存し、別のシミュレーションでも再利用する。
+最後に各文字列の位置へ訳文を書き戻して結果を組み立て直す。
+"""
+
+import copy
+import heapq
+import logging
+import math
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from services.assist_memory import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "flowguard_translations.sqlite3")
+DEFAULT_HOT_SIZE = 20000
+DEFAULT_MAX_ROWS = 200000
+# 使った訳文の used_at をまとめて書く件数・間隔（秒）と、行数の上限を確かめる間隔（保存した件数）
+TOUCH_FLUSH_SIZE = 256
+TOUCH_FLUSH_S = 30.0
+PRUNE_EVERY_ROWS = 1000
+
+# 翻訳する表示文字列（リストのキーは各要素、"[]" は文字列のリスト）
+TRANSLATABLE_FIELDS: dict[str, tuple[str, ...]] = {
+    "": ("event_name", "event_location", "date_time", "summary", "recommendations[]"),
+    "risks": (
+        "title",
+        "description",
+        "location_description",
+        "evidence",
+        "mitigation_actions[]",
+        "cascading_risks[]",
+    ),
+    "mitigation_tasks": ("who", "action", "required_items[]"),
+    "composite_risks": ("title", "description", "conditions[]"),
+    "bottlenecks": ("location_description", "reason", "suggested_measures[]"),
+    "risk_time_series": ("label",),
+    "danger_points": ("label",),
+    "map_routes": ("label",),
+    "mitigation_impacts": ("indicators_improved[]",),
+    "change_history": ("description",),
+}
+RISK_FACTOR_FIELDS = ("label", "explanation")
+
+# 日本語（かな・漢字）を含まない文字列は訳さない（ID・数値・既に英語の文字列）
+_JA_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]")
+
+Path = tuple[str | int, ...]
+
+
+def _needs_translation(value) -> bool:
+    return isinstance(value, str) and bool(value.strip()) and bool(_JA_RE.search(value))
+
+
+def _collect(obj: dict, fields: tuple[str, ...], prefix: Path, out: list[tuple[Path, str]]) -> None:
+    for field in fields:
+        if field.endswith("[]"):
+            name = field[:-2]
+            values = obj.get(name)
+            if isinstance(values, list):
+                for i, v in enumerate(values):
+                    if _needs_translation(v):
+                        out.append((prefix + (name, i), v))
+        elif _needs_translation(obj.get(field)):
+            out.append((prefix + (field,), obj[field]))
+
+
+def extract_strings(payload: dict) -> list[tuple[Path, str]]:
+    """結果から翻訳対象の (位置, 原文) を取り出す。同じ原文が複数の位置に現れてもそのまま返す。"""
+    out: list[tuple[Path, str]] = []
+    for section, fields in TRANSLATABLE_FIELDS.items():
+        if not section:
+            _collect(payload, fields, (), out)
+            continue
+        items = payload.get(section)
+        if not isinstance(items, list):
+            continue
+        for i, item in enumerate(items):
+            if isinstance(item, dict):
+                _collect(item, fields, (section, i), out)
+    for i, breakdown in enumerate(payload.get("risk_factor_breakdowns") or []):
+        if not isinstance(breakdown, dict):
+            continue
+        for j, factor in enumerate(breakdown.get("factors") or []):
+            if isinstance(factor, dict):
+                _collect(factor, RISK_FACTOR_FIELDS, ("risk_factor_breakdowns", i, "factors", j), out)
+    return out
+
+
+def apply_translations(payload: dict, strings: list[tuple[Path, str]], translations: dict[str, str]) -> dict:
+    """各位置の原文を訳文に置き換えた結果（コピー）を返す。訳文が無い文字列は原文のまま。"""
+    result = copy.deepcopy(payload)
+    for path, source in strings:
+        target = translations.get(source)
+        if not target:
+            continue
+        node = result
+        for key in path[:-1]:
+            node = node[key]
+        node[path[-1]] = target
+    return result
+
+
+def pack_batches(sources: list[str], max_tokens: int, max_items: int) -> list[list[str]]:
+    """原文をトークン数の目安で釣り合うバッチに分ける（件数ではなく量で分ける）。
+    バッチ数は max_tokens・max_items の両方に収まる最小の数にし、長い文字列から順に
+    いちばん軽いバッチへ入れる。並列に訳すと所要時間は最も重いバッチで決まるため、
+    先頭から詰めて最後に小さなバッチが残る分け方より全体が早く終わる。"""
+    if not sources:
+        return []
+    sizes = {text: estimate_tokens(text) + 4 for text in sources}  # + キーと区切りの分
+    count = max(
+        math.ceil(sum(sizes.values()) / max(1, max_tokens)),
+        math.ceil(len(sources) / max(1, max_items)),
+        1,
+    )
+    bins: list[tuple[int, int]] = [(0, i) for i in range(count)]
+    batches: list[list[str]] = [[] for _ in range(count)]
+    for text in sorted(sources, key=lambda t: sizes[t], reverse=True):
+        load, i = heapq.heappop(bins)
+        batches[i].append(text)
+        heapq.heappush(bins, (load + sizes[text], i))
+    return [b for b in batches if b]
+
+
+class TranslationMemory:
+    """(訳先ロケール, 原文) → 訳文。直近に使った組はメモリ上にも保持する。"""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        hot_size: int | None = None,
+        max_rows: int | None = None,
+    ) -> None:
+        self._path = path or os.getenv("TRANSLATION_MEMORY_PATH", DEFAULT_DB_PATH)
+        self._hot_size = hot_size or int(os.getenv("TRANSLATION_MEMORY_HOT_SIZE", DEFAULT_HOT_SIZE))
+        self._max_rows = max_rows or int(os.getenv("TRANSLATION_MEMORY_MAX_ROWS", DEFAULT_MAX_ROWS))
+        self._hot: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " locale TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " target TEXT NOT NULL,"
+            " used_at REAL NOT NULL,"
+            " PRIMARY KEY (locale, source))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_used_at ON translations (used_at)")
+        # used_at をまだ書いていない、使った訳文のキー
+        self._touched: set[tuple[str, str]] = set()
+        self._touched_since = time.monotonic()
+        # None なら次の store で行数を確かめる（開いた直後は上限を超えているかもしれない）
+        self._stored_since_prune: int | None = None
+        self._prune_every = min(PRUNE_EVERY_ROWS, max(1, self._max_rows // 10))
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        logger.info("TranslationMemory opened (path=%s)", self._path)
+
+    def _remember(self, key: tuple[str, str], target: str) -> None:
+        self._hot[key] = target
+        self._hot.move_to_end(key)
+        while len(self._hot) > self._hot_size:
+            self._hot.popitem(last=False)
+
+    def lookup(self, locale: str, sources: list[str]) -> dict[str, str]:
+        """メモリにある訳文だけを返す（無い原文はキーに含まれない）。"""
+        found: dict[str, str] = {}
+        missing: list[str] = []
+        with self._lock:
+            for source in sources:
+                target = self._hot.get((locale, source))
+                if target is not None:
+                    self._hot.move_to_end((locale, source))
+                    found[source] = target
+                else:
+                    missing.append(source)
+            # SQLite の変数の上限に収まるように分けて引く
+            for i in range(0, len(missing), 500):
+                part = missing[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT source, target FROM translations WHERE locale = ? AND source IN ({','.join('?' * len(part))})",
+                    (locale, *part),
+                ).fetchall()
+                for source, target in rows:
+                    found[source] = target
+                    self._remember((locale, source), target)
+            # メモリ上で当たった訳文も使われたものとして数える（書かないと、よく使う行ほど先に消える）
+            self._touched.update((locale, source) for source in found)
+            if len(self._touched) >= TOUCH_FLUSH_SIZE or time.monotonic() - self._touched_since >= TOUCH_FLUSH_S:
+                self._flush_touched()
+            self.hits += len(found)
+            self.misses += len(sources) - len(found)
+        return found
+
+    def store(self, locale: str, pairs: dict[str, str]) -> None:
+        if not pairs:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (locale, source, target, used_at) VALUES (?, ?, ?, ?)",
+                [(locale, s, t, now) for s, t in pairs.items()],
+            )
+            for s, t in pairs.items():
+                self._remember((locale, s), t)
+                self._touched.discard((locale, s))
+            self.stored += len(pairs)
+            if self._stored_since_prune is not None:
+                self._stored_since_prune += len(pairs)
+            if self._stored_since_prune is None or self._stored_since_prune >= self._prune_every:
+                self._prune()
+
+    def _flush_touched(self) -> None:
+        """使った訳文の used_at をまとめて今の時刻にする。ロックを持って呼ぶ。"""
+        if self._touched:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE translations SET used_at = ? WHERE locale = ? AND source = ?",
+                [(now, locale, source) for locale, source in self._touched],
+            )
+            self._touched.clear()
+        self._touched_since = time.monotonic()
+
+    def _prune(self) -> None:
+        """行数が上限を超えていれば、used_at の古い行から消す。ロックを持って呼ぶ。"""
+        self._stored_since_prune = 0
+        self._flush_touched()
+        count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if count <= self._max_rows:
+            return
+        self._conn.execute(
+            "DELETE FROM translations WHERE rowid IN (SELECT rowid FROM translations ORDER BY used_at LIMIT ?)",
+            (count - self._max_rows,),
+        )
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hot": len(self._hot),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "stored": self.stored,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self._conn.close()
@@ -4,6 +4,8 @@ from datetime import datetime
 import httpx
 
 from models import WeatherCondition
+from services.cassette import outbound_transport
+from services.metrics import track_external
 
 logger = logging.getLogger(__name__)
 
@@ -59,9 +61,10 @@ async def fetch_weather_for_event(
             f"&timezone=auto"
         )
         logger.debug("Fetching weather from Open-Meteo for %s at (%s, %s)", date_str, lat, lng)
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
+        async with httpx.AsyncClient(timeout=15.0, transport=outbound_transport()) as client:
+            with track_external("open_meteo"):
+                resp = await client.get(url)
+                resp.raise_for_status()
             data = resp.json()
 
         hourly = data.get("hourly", {})
@@ -0,0 +1,78 @@
+import asyncio
+
+from services.assist_answer_cache import AssistAnswerCache, question_language, question_terms
+from services.assist_engine import AssistEngine
+from services.llm_standin import StandInBackend
+
+
+def _engine() -> AssistEngine:
+    return AssistEngine(backend=StandInBackend(latency="0"))
+
+
+def _model_calls(engine: AssistEngine) -> int:
+    return sum(engine.backend.stats()["calls"].values())
+
+
+def _ask(engine: AssistEngine, question: str, context: dict | None = None, **kwargs) -> dict:
+    return asyncio.run(engine.ask(question, context, **kwargs))
+
+
+def test_guide_only_questions_are_answered_from_the_cache():
+    engine = _engine()
+    first = _ask(engine, "How do I export a PDF?", {"step": 3})
+    assert not first["cached"] and _model_calls(engine) == 1
+    # 言い換え（語の集合が同じ）もモデルを呼ばずに返す
+    again = _ask(engine, "how to export the pdf", {"step": 3, "event_name": "", "risk_count": 0})
+    assert again["cached"] and again["answer"] == first["answer"]
+    assert _model_calls(engine) == 1
+
+
+def test_questions_with_project_data_are_not_cached():
+    engine = _engine()
+    context = {"step": 3, "event_name": "夏祭り", "risk_count": 12}
+    for _ in range(2):
+        assert not _ask(engine, "How do I export a PDF?", context)["cached"]
+    assert _model_calls(engine) == 2
+    assert engine.answers.stats()["stores"] == 0
+
+
+def test_session_questions_are_not_cached():
+    engine = _engine()
+    context = {"step": 3, "report_text": "夏祭りのレポート"}
+    for _ in range(2):
+        assert not _ask(engine, "How do I export a PDF?", context, session_id="JOIN1")["cached"]
+    assert _model_calls(engine) == 2
+
+
+def test_entries_are_separate_per_language_and_step():
+    engine = _engine()
+    _ask(engine, "How do I export a PDF?", {"step": 3})
+    assert not _ask(engine, "How do I export a PDF?", {"step": 4})["cached"]
+    assert not _ask(engine, "PDF の出力方法を教えて", {"step": 3})["cached"]
+    assert _ask(engine, "PDF の出力方法は？", {"step": 3})["cached"]
+    assert _model_calls(engine) == 3
+
+
+def test_guide_change_invalidates_every_entry():
+    cache = AssistAnswerCache()
+    key = cache.key("guide-1", 0, "What is the alert threshold?")
+    cache.put(key, "80%")
+    assert cache.get(cache.key("guide-1", 0, "what's the alert threshold")) == "80%"
+    assert cache.get(cache.key("guide-2", 0, "What is the alert threshold?")) is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["invalidations"] == 1
+    # 生成中にガイドが変わった回答は登録しない
+    cache.put(key, "80%")
+    assert cache.stats()["entries"] == 0
+
+
+def test_dissimilar_questions_miss():
+    cache = AssistAnswerCache()
+    cache.put(cache.key("g", 0, "How do I export a PDF?"), "From the report menu.")
+    assert cache.get(cache.key("g", 0, "How do I change the alert threshold?")) is None
+
+
+def test_question_terms_normalise_script_and_plurals():
+    assert question_language("PDF の出力") == "ja" and question_language("Export PDF") == "en"
+    assert question_terms("Export PDFs") == question_terms("ＥＸＰＯＲＴ the pdf")
+    # ひらがな（助詞・語尾）と「教えて」「方法」は区別に使わない
+    assert question_terms("出力方法を教えて") == question_terms("出力方法は？") == {"出力", "力方"}
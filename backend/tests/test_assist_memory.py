@@ -0,0 +1,50 @@
+from services.assist_memory import ConversationMemory, estimate_tokens
+from services.assist_session import AssistSession
+
+
+def test_recent_turns_overflow_into_pending_within_budget():
+    memory = ConversationMemory(budget_tokens=200)
+    assert memory.recent_tokens == 140
+    overflowed = False
+    for i in range(10):
+        overflowed = memory.add(f"question {i} " + "x" * 80, f"answer {i} " + "y" * 120)
+    assert overflowed
+    assert sum(t.tokens for t in memory.recent) <= memory.recent_tokens
+    assert memory.turns == 10
+    assert len(memory.recent) + len(memory.pending) == 10
+    # 要約待ちはプロンプトに入らない
+    lines = memory.prompt_lines()
+    assert lines[0] == "[Conversation so far]"
+    assert not any("question 0" in line for line in lines)
+
+
+def test_fold_and_restore_keep_summary_within_budget():
+    memory = ConversationMemory(budget_tokens=100)
+    for i in range(6):
+        memory.add(f"q{i} " + "a" * 100, "b" * 200)
+    batch = memory.take_pending()
+    assert batch and not memory.pending
+    memory.fold("s" * 1000)
+    assert estimate_tokens(memory.summary) <= memory.summary_tokens + 1
+    memory.restore(batch)
+    assert estimate_tokens(memory.summary) <= memory.summary_tokens + 1
+    assert memory.prompt_lines()[1].startswith("Summary of earlier conversation:")
+
+
+def test_japanese_counts_one_token_per_character():
+    assert estimate_tokens("混雑") == 2
+    assert estimate_tokens("abcd") == 1
+
+
+def test_session_memory_is_per_client():
+    session = AssistSession("JOIN1", "digest", "system", "static", None, 60)
+    a = session.memory_for("tab-a")
+    b = session.memory_for("tab-b")
+    assert a is not b
+    a.add("Aの質問", "Aへの回答")
+    assert b.prompt_lines() == []
+    assert session.memory_for("tab-a") is a
+    session.max_clients = 2
+    session.memory_for("tab-c")
+    # 使われていないクライアントから捨てる
+    assert list(session.memories) == ["tab-a", "tab-c"]
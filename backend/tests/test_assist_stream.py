@@ -0,0 +1,96 @@
+import asyncio
+
+from services.assist_engine import AssistEngine
+from services.llm_standin import StandInBackend
+
+CONTEXT = {"step": "result", "event_name": "夏祭り", "risk_count": 12}
+
+
+def _engine(**standin) -> AssistEngine:
+    return AssistEngine(backend=StandInBackend(latency="0", **standin))
+
+
+async def _turn(engine: AssistEngine, question: str = "駐車場の混雑対策を教えて"):
+    # 回答キャッシュに当たらないよう、結果画面の状態を付けて聞く
+    return await engine.prepare(question, {**CONTEXT, "overall_risk_score": 7.0})
+
+
+def test_stream_emits_meta_deltas_and_done():
+    engine = _engine()
+
+    async def run() -> list[dict]:
+        return [event async for event in engine.stream(await _turn(engine), "tab-a")]
+
+    events = asyncio.run(run())
+    assert events[0]["event"] == "meta"
+    deltas = [e["text"] for e in events if e["event"] == "delta"]
+    assert len(deltas) > 1
+    done = events[-1]
+    assert done["event"] == "done" and done["cached"] is False
+    assert 0 <= done["ttft_ms"] <= done["total_ms"]
+    assert done["chars"] == len("".join(deltas))
+    assert engine.latency.streams == 1 and engine.latency.cancelled == 0
+    assert engine._streams == {}
+
+
+def test_new_question_supersedes_the_stream_of_the_same_client():
+    engine = _engine(ms_per_token=50)
+
+    async def run() -> tuple[list[dict], list[dict], list[dict]]:
+        first = engine.stream(await _turn(engine), "tab-a")
+        head = [await anext(first), await anext(first)]
+        # 同じクライアントの次の質問と、別のクライアントの質問
+        second = engine.stream(await _turn(engine, "トイレの数は足りていますか"), "tab-a")
+        other = engine.stream(await _turn(engine, "救護所の場所は"), "tab-b")
+        # ストリームはメタの次（モデルを呼ぶとき）に前のストリームを打ち切る
+        for stream in (second, other):
+            await anext(stream)
+            await anext(stream)
+        rest = [event async for event in first]
+        await second.aclose()
+        return head, rest, [event async for event in other]
+
+    head, rest, other = asyncio.run(run())
+    assert [e["event"] for e in head] == ["meta", "delta"]
+    assert rest[-1] == {"event": "cancelled", "reason": "superseded"}
+    assert other[-1]["event"] == "done"
+    stats = engine.latency.stats()
+    assert stats["superseded"] == 1
+    # 打ち切られた 1 本目は完了扱いにしない。2 本目は途中で閉じた（切断）
+    assert stats["cancelled"] == 1
+    assert engine._streams == {}
+
+
+def test_client_disconnect_cancels_the_model_stream():
+    engine = _engine(ms_per_token=50)
+
+    async def run() -> asyncio.Task:
+        stream = engine.stream(await _turn(engine), "tab-a")
+        await anext(stream)
+        await anext(stream)
+        producer = engine._streams["tab-a"]
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return producer
+
+    producer = asyncio.run(run())
+    assert producer.cancelled()
+    assert engine.latency.cancelled == 1 and engine.latency.streams == 1
+    assert engine._streams == {}
+
+
+def test_cached_answer_streams_without_a_model_call():
+    engine = _engine()
+
+    async def run(turn) -> list[dict]:
+        return [event async for event in engine.stream(turn, "tab-a")]
+
+    question = "PDF はどこから出力できますか"
+    first = asyncio.run(run(asyncio.run(engine.prepare(question, {"step": 1}))))
+    calls = engine.backend.stats()["calls"]
+    turn = asyncio.run(engine.prepare(question, {"step": 1}))
+    assert turn.cached
+    second = asyncio.run(run(turn))
+    assert engine.backend.stats()["calls"] == calls
+    assert [e["text"] for e in second if e["event"] == "delta"] == ["".join(e["text"] for e in first if e["event"] == "delta").strip()]
+    assert second[-1]["cached"] is True
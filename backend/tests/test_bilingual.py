@@ -0,0 +1,69 @@
+import asyncio
+import re
+
+import pytest
+
+from models import AnalysisTier, RiskItemText, SimulationRequest, SimulationResponse
+from services.llm_standin import StandInBackend
+from services.risk_engine import RiskEngine
+from services.translation_memory import TranslationMemory
+
+JAPANESE = re.compile(r"[぀-ヿ一-鿿]")
+
+
+def _request(**kwargs) -> SimulationRequest:
+    return SimulationRequest(**{
+        "event_name": "夏祭り",
+        "event_type": "music_festival",
+        "event_location": "渋谷",
+        "date_time": "2026-08-01T10:00",
+        "expected_attendance": 5000,
+        "audience_type": "mixed",
+        "polygon": [{"lat": 35.0, "lng": 139.0}, {"lat": 35.002, "lng": 139.0}, {"lat": 35.002, "lng": 139.003}],
+        # 天気を指定して、天気の取得（外部 API）を呼ばない
+        "temperature_celsius": 25,
+        "precipitation_probability": 10,
+        "weather_condition": "clear",
+        **kwargs,
+    })
+
+
+def _simulate(request: SimulationRequest) -> tuple[RiskEngine, SimulationResponse]:
+    engine = RiskEngine(StandInBackend(latency="0"))
+    return engine, asyncio.run(engine.run_simulation(request))
+
+
+@pytest.mark.parametrize("tier", list(AnalysisTier))
+def test_bilingual_run_carries_english_for_every_field(tier):
+    engine, response = _simulate(_request(bilingual=True, analysis_tier=tier))
+    assert response.en is not None and response.en.summary
+    assert len(response.en.recommendations) == len(response.recommendations)
+    assert response.risks
+    for risk in response.risks:
+        assert risk.en is not None and risk.en.title
+        assert len(risk.en.mitigation_actions) == len(risk.mitigation_actions)
+        assert len(risk.en.cascading_risks) == len(risk.cascading_risks)
+
+    # 英語版は翻訳の呼び出しなしで組み立てられる
+    calls = dict(engine.gemini.backend.stats()["calls"])
+    english = engine.english_variant(response, TranslationMemory(path=":memory:"))
+    assert english is not None and english["translation_locale"] == "en"
+    assert engine.gemini.backend.stats()["calls"] == calls
+    assert [r["title"] for r in english["risks"]] == [r.en.title for r in response.risks]
+    assert english["summary"] == response.en.summary
+    assert not any(JAPANESE.search(r["title"] + r["description"]) for r in english["risks"])
+
+
+def test_single_language_runs_have_no_english_fields():
+    for request in (_request(), _request(bilingual=True, locale="en")):
+        engine, response = _simulate(request)
+        assert response.en is None
+        assert all(r.en is None for r in response.risks)
+        assert engine.english_variant(response) is None
+
+
+def test_malformed_english_objects_are_dropped_or_coerced():
+    engine = RiskEngine(StandInBackend(latency="0"))
+    assert engine._parse_text(RiskItemText, "Crowd surge") is None
+    text = engine._parse_text(RiskItemText, {"title": "Crowd surge", "mitigation_actions": "Add stewards", "cascading_risks": None})
+    assert text == RiskItemText(title="Crowd surge", mitigation_actions=["Add stewards"])
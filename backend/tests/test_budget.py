@@ -0,0 +1,123 @@
+import pytest
+from starlette.requests import Request
+
+from models import ModelUsageTotals, SimulationUsage
+from services.budget import BudgetExceeded, BudgetManager, usage_tokens
+
+
+def _manager(**kwargs) -> BudgetManager:
+    return BudgetManager(**{"window_s": 3600, "tokens": 100_000, "calls": 10, **kwargs})
+
+
+def test_reserve_and_settle_refund_unused_estimate():
+    budgets = _manager()
+    res = budgets.reserve("ip:a", "assist")
+    assert (res.tokens, res.calls) == (4000, 1)
+    budgets.settle(res, 1000, 1)
+    bucket = budgets._buckets["ip:a"]
+    assert bucket.tokens == pytest.approx(99_000, abs=1)
+    assert bucket.calls == pytest.approx(9, abs=0.01)
+    # 精算は 1 回だけ
+    budgets.settle(res, 50_000, 5)
+    assert bucket.tokens == pytest.approx(99_000, abs=1)
+
+
+def test_release_returns_the_whole_reservation():
+    budgets = _manager()
+    res = budgets.reserve("ip:a", "translate")
+    budgets.release(res)
+    assert budgets._buckets["ip:a"].tokens == pytest.approx(100_000, abs=1)
+
+
+def test_tier_falls_back_to_lighter_stage_then_rejects():
+    budgets = _manager(tokens=100_000, calls=100)
+    res, tier = budgets.reserve_tier("ip:a", "deep")
+    assert tier == "deep"
+    # 大きな deep は満杯なら容量を超えても通るが、次は軽い段階になる
+    budgets.settle(res, 90_000, 7)
+    res, tier = budgets.reserve_tier("ip:a", "deep")
+    assert tier == "fast"
+    assert budgets.outcomes["downgraded"] == 1
+    with pytest.raises(BudgetExceeded) as info:
+        budgets.reserve_tier("ip:a", "deep")
+    assert info.value.retry_after_s >= 1
+
+
+def test_keys_are_independent():
+    budgets = _manager(calls=1)
+    budgets.reserve("ip:a", "assist")
+    with pytest.raises(BudgetExceeded):
+        budgets.reserve("ip:a", "assist")
+    budgets.reserve("ip:b", "assist")
+
+
+def test_disabled_budget_always_admits():
+    budgets = _manager(tokens=0, calls=0)
+    for _ in range(100):
+        assert budgets.reserve("ip:a", "simulate:deep").tokens == 0
+
+
+def test_persisted_buckets_survive_restart(tmp_path):
+    path = str(tmp_path / "budgets.sqlite3")
+    budgets = _manager(path=path)
+    budgets.settle(budgets.reserve("ip:a", "assist"), 40_000, 4)
+    budgets.close()
+    restarted = _manager(path=path)
+    restarted.reserve("ip:a", "assist")
+    assert restarted._buckets["ip:a"].tokens < 60_000
+    restarted.close()
+
+
+def test_settle_is_saved_in_batches(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "budgets.sqlite3")
+    budgets = _manager(path=path)
+    for key in ("ip:a", "ip:b"):
+        budgets.settle(budgets.reserve(key, "assist"), 10_000, 1)
+    # 精算では書かず、flush でまとめて書く
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM buckets").fetchone()[0] == 0
+    assert budgets.stats()["unsaved"] == 2
+    budgets.flush()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM buckets").fetchone()[0] == 2
+    assert budgets.stats()["unsaved"] == 0
+    budgets.close()
+
+
+def test_usage_tokens_counts_prompt_thinking_and_output():
+    usage = SimulationUsage(total=ModelUsageTotals(calls=3, prompt_tokens=100, cached_tokens=40, thinking_tokens=20, output_tokens=5))
+    assert usage_tokens(usage) == (125, 3)
+    assert usage_tokens(None) == (0, 0)
+
+
+def _request(headers: dict[str, str], client: str = "10.0.0.1") -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": (client, 1234),
+    })
+
+
+def test_budget_key_ignores_client_supplied_headers(monkeypatch):
+    import main
+
+    spoofed = {"X-Project-Id": "fresh-1", "X-Owner-Id": "fresh-2", "X-Forwarded-For": "1.2.3.4"}
+    assert main._budget_key(_request(spoofed)) == "ip:10.0.0.1"
+    # プロキシ 1 段の後ろでは、プロキシが右端に付けた接続元だけを使う
+    monkeypatch.setattr(main, "BUDGET_TRUSTED_PROXIES", 1)
+    assert main._budget_key(_request({"X-Forwarded-For": "1.2.3.4, 203.0.113.9"})) == "ip:203.0.113.9"
+
+
+def test_trusted_proxies_default_to_one_on_cloud_run(monkeypatch):
+    import main
+
+    monkeypatch.delenv("BUDGET_TRUSTED_PROXIES", raising=False)
+    monkeypatch.delenv("K_SERVICE", raising=False)
+    assert main._trusted_proxy_count() == 0
+    monkeypatch.setenv("K_SERVICE", "flowguard-backend")
+    assert main._trusted_proxy_count() == 1
+    # 明示した値（ロードバランサの後ろなら 2 等）が優先
+    monkeypatch.setenv("BUDGET_TRUSTED_PROXIES", "2")
+    assert main._trusted_proxy_count() == 2
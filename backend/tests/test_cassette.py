@@ -0,0 +1,103 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+from google.genai import errors, types
+
+from services.cassette import Cassette, CassetteBackend, CassetteMiss, CassetteTransport
+from services.llm_standin import StandInBackend
+
+CONFIG = types.GenerateContentConfig(system_instruction="Generate between 10 and 20 risk items", response_mime_type="application/json")
+OVERPASS = "https://overpass.example/api/interpreter"
+
+
+async def _collect(backend, contents: str) -> list[str]:
+    return [chunk.text async for chunk in await backend.stream("m", contents, CONFIG)]
+
+
+def _overpass(query: str) -> httpx.Request:
+    return httpx.Request("POST", OVERPASS, data={"data": query})
+
+
+def _record(path) -> tuple[str, list[str], httpx.Response]:
+    """スタンドインと偽の Overpass を相手に記録し、(generate の本文, ストリームの断片, HTTP 応答) を返す。"""
+    cassette = Cassette(str(path), "record")
+    backend = CassetteBackend(StandInBackend(latency="0"), cassette)
+    transport = CassetteTransport(cassette)
+    transport._inner = httpx.MockTransport(lambda request: httpx.Response(200, json={"elements": [1, 2]}))
+
+    async def run():
+        text = (await backend.generate("m", "Event: a", CONFIG)).text
+        chunks = await _collect(backend, "Event: b")
+        response = await transport.handle_async_request(_overpass("[out:json];\n  way(1);\nout;"))
+        return text, chunks, response
+
+    try:
+        return asyncio.run(run())
+    finally:
+        cassette.close()
+
+
+def test_record_then_replay_returns_the_same_interactions(tmp_path):
+    path = tmp_path / "c.jsonl.gz"
+    text, chunks, response = _record(path)
+
+    cassette = Cassette(str(path), "replay")
+    backend = CassetteBackend(StandInBackend(latency="0", error_rates="503=1"), cassette)
+    transport = CassetteTransport(cassette)
+    assert asyncio.run(backend.generate("m", "Event: a", CONFIG)).text == text
+    assert asyncio.run(_collect(backend, "Event: b")) == chunks
+    # Overpass のクエリの改行・字下げが違っても同じ記録に当たる
+    replayed = asyncio.run(transport.handle_async_request(_overpass("[out:json]; way(1); out;")))
+    assert replayed.status_code == 200 and replayed.json() == response.json()
+    assert cassette.stats()["replayed"] == 3 and cassette.stats()["misses"] == 0
+
+
+def test_replay_miss_fails(tmp_path):
+    path = tmp_path / "c.jsonl.gz"
+    _record(path)
+    cassette = Cassette(str(path), "replay")
+    backend = CassetteBackend(StandInBackend(latency="0"), cassette)
+    with pytest.raises(CassetteMiss):
+        asyncio.run(backend.generate("m", "Event: never recorded", CONFIG))
+    with pytest.raises(CassetteMiss):
+        asyncio.run(CassetteTransport(cassette).handle_async_request(_overpass("way(2);")))
+    assert cassette.stats()["misses"] == 2
+
+
+def test_recorded_errors_replay_in_order(tmp_path):
+    path = tmp_path / "c.jsonl.gz"
+    cassette = Cassette(str(path), "record")
+    failing = CassetteBackend(StandInBackend(latency="0", error_rates="503=1"), cassette)
+    with pytest.raises(errors.ServerError):
+        asyncio.run(failing.generate("m", "Event: a", CONFIG))
+    text = asyncio.run(CassetteBackend(StandInBackend(latency="0"), cassette).generate("m", "Event: a", CONFIG)).text
+    cassette.close()
+
+    # 503 → 成功の順に返し、尽きたら最後の結果を繰り返す
+    replay = CassetteBackend(StandInBackend(latency="0"), Cassette(str(path), "replay"))
+    with pytest.raises(errors.ServerError) as info:
+        asyncio.run(replay.generate("m", "Event: a", CONFIG))
+    assert info.value.code == 503
+    assert asyncio.run(replay.generate("m", "Event: a", CONFIG)).text == text
+    assert asyncio.run(replay.generate("m", "Event: a", CONFIG)).text == text
+
+
+def test_recording_keeps_one_handle_and_survives_a_missing_close(tmp_path, monkeypatch):
+    path = tmp_path / "c.jsonl.gz"
+    opened = []
+    real_open = gzip.open
+    monkeypatch.setattr(gzip, "open", lambda *args, **kwargs: opened.append(args[1]) or real_open(*args, **kwargs))
+    cassette = Cassette(str(path), "record")
+    backend = CassetteBackend(StandInBackend(latency="0"), cassette)
+    for i in range(5):
+        asyncio.run(backend.generate("m", f"Event: {i}", CONFIG))
+    assert opened == ["wt"]
+
+    # close せずに読む（記録中に落ちた場合）。flush 済みの 5 件は再生できる
+    replay = Cassette(str(path), "replay")
+    assert len(replay._entries) == 5
+    cassette.close()
+    with pytest.raises(RuntimeError):
+        asyncio.run(backend.generate("m", "Event: after close", CONFIG))
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from google.genai import types
+
+from models import AnalysisTier, SimulationRequest
+from services.gemini_service import SYSTEM_PROMPT, GeminiService, _fill_prompt
+from services.llm_standin import StandInBackend, StandInModel
+
+
+def _request(tier: AnalysisTier) -> SimulationRequest:
+    return SimulationRequest(
+        event_name="夏祭り",
+        event_type="music_festival",
+        event_location="渋谷",
+        date_time="2026-08-01T10:00",
+        expected_attendance=5000,
+        audience_type="mixed",
+        polygon=[{"lat": 35.0, "lng": 139.0}, {"lat": 35.002, "lng": 139.0}, {"lat": 35.002, "lng": 139.003}],
+        analysis_tier=tier,
+    )
+
+
+def _system_prompts(tier: AnalysisTier) -> tuple[GeminiService, dict[str, str]]:
+    """解析・カテゴリ・合成の各段階に渡した system_instruction。"""
+    backend = StandInBackend(latency="0")
+    prompts: dict[str, str] = {}
+    generate = backend.generate
+
+    async def recording(model, contents, config: types.GenerateContentConfig, location=None):
+        kind = StandInModel.kind(contents, str(config.system_instruction), config)
+        prompts[kind] = str(config.system_instruction)
+        return await generate(model, contents, config, location)
+
+    backend.generate = recording
+    service = GeminiService(backend=backend)
+    request = _request(tier)
+
+    async def run():
+        await service.analyze_risks(request)
+        risks = (await service.analyze_risks_for_category(request, "crowd_safety"))["risks"]
+        await service.synthesize_overall(risks, request)
+
+    asyncio.run(run())
+    return service, prompts
+
+
+@pytest.mark.parametrize("tier", list(AnalysisTier))
+def test_every_tier_prompt_carries_its_counts(tier):
+    service, prompts = _system_prompts(tier)
+    profile = service.profile(_request(tier))
+    lo, hi = profile.risk_count
+    assert f"Generate between {lo} and {hi} risk items" in prompts["analysis"]
+    lo, hi = profile.category_risk_count
+    assert f"Generate {lo} to {hi} risk items" in prompts["category"]
+    lo, hi = profile.recommendation_count
+    assert f"array of {lo} to {hi} actionable" in prompts["synthesis"]
+    for prompt in prompts.values():
+        assert "{min_" not in prompt and "{max_" not in prompt
+
+
+def test_fill_prompt_rejects_unknown_fields():
+    with pytest.raises(KeyError):
+        _fill_prompt(SYSTEM_PROMPT, min_recommendations=1)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from models import LatLng
+from services.geometry import (
+    LocalFrame,
+    clamp_points_to_polygon,
+    geodesic_area_m2,
+    polygon_arrays,
+    polygon_centroid,
+    points_in_polygon,
+)
+
+FRAME = LocalFrame(35.68, 139.76)
+
+
+def _polygon(xy: list[tuple[float, float]]) -> list[LatLng]:
+    lats, lngs = FRAME.to_latlng(np.array([p[0] for p in xy]), np.array([p[1] for p in xy]))
+    return [LatLng(lat=float(a), lng=float(b)) for a, b in zip(lats, lngs)]
+
+
+def _points(xy: list[tuple[float, float]]) -> tuple[np.ndarray, np.ndarray]:
+    return FRAME.to_latlng(np.array([p[0] for p in xy], dtype=float), np.array([p[1] for p in xy], dtype=float))
+
+
+# 幅 10m の L 字（重心が外に出る）
+L_SHAPE = _polygon([(0, 0), (100, 0), (100, 10), (10, 10), (10, 100), (0, 100)])
+# 頂点の角が鋭い三角形
+SPIKE = _polygon([(0, 0), (200, 0), (0, 5)])
+
+
+def test_area_and_centroid_of_square():
+    square = _polygon([(0, 0), (100, 0), (100, 100), (0, 100)])
+    lats, lngs = polygon_arrays(square)
+    assert abs(geodesic_area_m2(lats, lngs) - 10000) < 10
+    lat, lng = polygon_centroid(square)
+    x, y = FRAME.to_xy(np.array([lat]), np.array([lng]))
+    assert abs(x[0] - 50) < 0.01 and abs(y[0] - 50) < 0.01
+
+
+def test_l_shape_centroid_is_outside():
+    lat, lng = polygon_centroid(L_SHAPE)
+    assert not points_in_polygon(np.array([lat]), np.array([lng]), L_SHAPE)[0]
+
+
+def test_clamped_points_are_inside_concave_polygon():
+    lats, lngs = _points([(5, 5), (50, 50), (200, 5), (5, 300), (-3, 50), (60, 20), (20000, 20000)])
+    out_lats, out_lngs, moved = clamp_points_to_polygon(lats, lngs, L_SHAPE)
+    assert moved.tolist() == [False, True, True, True, True, True, True]
+    assert points_in_polygon(out_lats, out_lngs, L_SHAPE).all()
+    # 内側の点はそのまま、近い点は境界のすぐ内側
+    assert out_lats[0] == lats[0] and out_lngs[0] == lngs[0]
+    x, y = FRAME.to_xy(out_lats, out_lngs)
+    assert abs(x[4] - 0) < 1 and abs(y[4] - 50) < 1
+    assert abs(x[5] - 60) < 1 and abs(y[5] - 10) < 1
+
+
+def test_far_points_land_inside_concave_polygon():
+    lats, lngs = np.array([0.0, 35.0]), np.array([0.0, 139.0])
+    out_lats, out_lngs, moved = clamp_points_to_polygon(lats, lngs, L_SHAPE)
+    assert moved.all()
+    assert points_in_polygon(out_lats, out_lngs, L_SHAPE).all()
+
+
+def test_points_near_a_sharp_corner_stay_inside():
+    lats, lngs = _points([(260, -1), (201, 0.5), (-1, 6)])
+    out_lats, out_lngs, moved = clamp_points_to_polygon(lats, lngs, SPIKE)
+    assert moved.all()
+    assert points_in_polygon(out_lats, out_lngs, SPIKE).all()
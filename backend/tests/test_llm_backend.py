@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+from google.genai import errors, types
+
+from services import llm_standin
+from services.llm_backend import HttpBackend, LLMBackend
+from services.llm_standin import StandInBackend
+
+CONFIG = types.GenerateContentConfig(
+    system_instruction="Generate between 10 and 20 risk items",
+    response_mime_type="application/json",
+    max_output_tokens=4096,
+)
+
+
+def _http_backend(monkeypatch, **standin) -> HttpBackend:
+    """HTTP のスタンドイン（llm_standin.app）に ASGI で繋いだ HttpBackend。"""
+    monkeypatch.setattr(llm_standin, "_backend", StandInBackend(latency="0", **standin))
+    backend = HttpBackend(base_url="http://standin")
+    backend._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=llm_standin.app), base_url="http://standin")
+    return backend
+
+
+async def _collect(backend: HttpBackend) -> list[types.GenerateContentResponse]:
+    return [chunk async for chunk in await backend.stream("m", "Event: a", CONFIG)]
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        LLMBackend()
+
+    class GenerateOnly(LLMBackend):
+        async def generate(self, model, contents, config, location=None):
+            return types.GenerateContentResponse()
+
+    with pytest.raises(TypeError):
+        GenerateOnly()
+
+
+def test_http_generate_maps_config_and_response(monkeypatch):
+    backend = _http_backend(monkeypatch)
+    response = asyncio.run(backend.generate("gemini-x", "Event: a", CONFIG))
+    local = asyncio.run(StandInBackend(latency="0").generate("gemini-x", "Event: a", CONFIG))
+    # 設定（system_instruction・mime・上限）が届き、応答は同じ GenerateContentResponse に戻る
+    assert response.text == local.text
+    assert response.candidates[0].finish_reason == local.candidates[0].finish_reason
+    assert response.usage_metadata == local.usage_metadata
+    assert llm_standin._backend.stats()["calls"] == {"analysis": 1}
+
+
+def test_http_errors_map_to_api_errors(monkeypatch):
+    backend = _http_backend(monkeypatch, error_rates="503=1")
+    with pytest.raises(errors.ServerError) as info:
+        asyncio.run(backend.generate("m", "Event: a", CONFIG))
+    assert info.value.code == 503 and "503" in str(info.value)
+
+    # ストリームの失敗は最初の断片の前に決まり、ステータスコードで返る
+    backend = _http_backend(monkeypatch, error_rates="429=1")
+    with pytest.raises(errors.ClientError) as info:
+        asyncio.run(_collect(backend))
+    assert info.value.code == 429
+
+
+def test_http_stream_yields_ndjson_chunks(monkeypatch):
+    backend = _http_backend(monkeypatch)
+    chunks = asyncio.run(_collect(backend))
+    local = asyncio.run(StandInBackend(latency="0").generate("m", "Event: a", CONFIG))
+    assert len(chunks) > 1
+    assert "".join(c.text for c in chunks) == local.text
+    assert chunks[-1].usage_metadata == local.usage_metadata
+
+
+def test_http_error_without_json_body():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(502, text="bad gateway")
+
+    backend = HttpBackend(base_url="http://standin")
+    backend._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://standin")
+    with pytest.raises(errors.ServerError) as info:
+        asyncio.run(backend.generate("m", "Event: a", CONFIG))
+    assert info.value.code == 502 and "bad gateway" in str(info.value)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import time
+
+import pytest
+from google.genai import errors, types
+
+from models import AnalysisTier, RiskCategory, RiskItem, RiskItemText, SimulationRequest, SimulationText
+from services.gemini_service import GeminiService
+from services.llm_standin import StandInBackend, latency_sampler, parse_error_rates
+
+CONFIG = types.GenerateContentConfig(system_instruction="Generate between 10 and 20 risk items", response_mime_type="application/json")
+
+
+def _request(**kwargs) -> SimulationRequest:
+    return SimulationRequest(
+        event_name="夏祭り",
+        event_type="music_festival",
+        event_location="渋谷",
+        date_time="2026-08-01T10:00",
+        expected_attendance=5000,
+        audience_type="mixed",
+        polygon=[{"lat": 35.0, "lng": 139.0}, {"lat": 35.002, "lng": 139.0}, {"lat": 35.002, "lng": 139.003}],
+        **kwargs,
+    )
+
+
+def _recording_service() -> tuple[GeminiService, list[tuple[str, types.GenerateContentConfig, str]]]:
+    """スタンドインの生の応答（プロンプト・設定・本文）を記録する GeminiService。"""
+    backend = StandInBackend(latency="0")
+    calls: list[tuple[str, types.GenerateContentConfig, str]] = []
+    generate = backend.generate
+
+    async def recording(model, contents, config, location=None):
+        response = await generate(model, contents, config, location)
+        calls.append((contents, config, response.text))
+        return response
+
+    backend.generate = recording
+    return GeminiService(backend=backend), calls
+
+
+def _assert_risks(risks: list[dict], lo: int, hi: int, bilingual: bool = False) -> None:
+    assert lo <= len(risks) <= hi
+    for raw in risks:
+        risk = RiskItem.model_validate(raw)
+        if bilingual:
+            en = RiskItemText.model_validate(raw["en"])
+            assert len(en.mitigation_actions) == len(risk.mitigation_actions)
+            assert len(en.cascading_risks) == len(risk.cascading_risks)
+        else:
+            assert "en" not in raw
+
+
+@pytest.mark.parametrize("tier", list(AnalysisTier))
+@pytest.mark.parametrize("bilingual", [False, True])
+def test_analysis_output_matches_the_prompt_schema(tier, bilingual):
+    service, calls = _recording_service()
+    request = _request(analysis_tier=tier, bilingual=bilingual)
+    asyncio.run(service.analyze_risks(request))
+    (_, config, text), = calls
+    result = json.loads(text)
+    lo, hi = service.profile(request).risk_count
+    _assert_risks(result["risks"], lo, hi, bilingual)
+    assert 1.0 <= result["overall_risk_score"] <= 10.0
+    assert isinstance(result["summary"], str) and result["recommendations"]
+    assert all(isinstance(r, str) for r in result["recommendations"])
+    if bilingual:
+        assert len(SimulationText.model_validate(result["en"]).recommendations) == len(result["recommendations"])
+    assert config.response_mime_type == "application/json"
+
+
+@pytest.mark.parametrize("bilingual", [False, True])
+def test_category_and_synthesis_outputs_match_the_prompt_schema(bilingual):
+    service, calls = _recording_service()
+    request = _request(analysis_tier=AnalysisTier.DEEP, bilingual=bilingual)
+    profile = service.profile(request)
+    merged = []
+    for category in RiskCategory:
+        merged += asyncio.run(service.analyze_risks_for_category(request, category.value))["risks"]
+        risks = json.loads(calls[-1][2])["risks"]
+        _assert_risks(risks, *profile.category_risk_count, bilingual)
+        assert {r["category"] for r in risks} == {category.value}
+
+    asyncio.run(service.synthesize_overall(merged, request))
+    result = json.loads(calls[-1][2])
+    lo, hi = profile.recommendation_count
+    assert lo <= len(result["recommendations"]) <= hi
+    assert 1.0 <= result["overall_risk_score"] <= 10.0
+    if bilingual:
+        SimulationText.model_validate(result["en"])
+
+
+def test_translation_returns_the_same_keys():
+    service, calls = _recording_service()
+    out = asyncio.run(service._translate_batch(["入口", "出口", "救護所"]))
+    assert out == {"入口": "[en] 入口", "出口": "[en] 出口", "救護所": "[en] 救護所"}
+    assert set(json.loads(calls[0][2])) == {"s0", "s1", "s2"}
+
+
+def test_text_answers_follow_the_question_language():
+    backend = StandInBackend(latency="0")
+    config = types.GenerateContentConfig(system_instruction="assistant")
+    ja = asyncio.run(backend.generate("m", "質問: 混雑対策は？", config)).text
+    en = asyncio.run(backend.generate("m", "Question: how to handle crowds?", config)).text
+    assert any("぀" <= c <= "ヿ" for c in ja)
+    assert en.isascii()
+
+
+def test_same_prompt_and_seed_give_the_same_text():
+    first = asyncio.run(StandInBackend(latency="0", seed=1).generate("m", "Event: a", CONFIG)).text
+    assert asyncio.run(StandInBackend(latency="0", seed=1).generate("m", "Event: a", CONFIG)).text == first
+    assert asyncio.run(StandInBackend(latency="0", seed=2).generate("m", "Event: a", CONFIG)).text != first
+
+
+def test_injected_errors_use_api_error_types():
+    backend = StandInBackend(latency="300", error_rates="429=1")
+    t0 = time.perf_counter()
+    with pytest.raises(errors.ClientError) as info:
+        asyncio.run(backend.generate("m", "Event: a", CONFIG))
+    # 429 は待たずに返す。既存の再試行はメッセージのステータスを見る
+    assert time.perf_counter() - t0 < 0.2
+    assert info.value.code == 429 and "429" in str(info.value)
+
+    backend = StandInBackend(latency="0", error_rates="503=1")
+    with pytest.raises(errors.ServerError) as info:
+        asyncio.run(backend.generate("m", "Event: a", CONFIG))
+    assert info.value.code == 503
+    assert backend.stats()["errors"] == {"503": 1}
+
+
+def test_truncation_and_output_limit_cut_the_json():
+    response = asyncio.run(StandInBackend(latency="0", truncate_rate=1).generate("m", "Event: a", CONFIG))
+    assert response.candidates[0].finish_reason == types.FinishReason.MAX_TOKENS
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(response.text)
+
+    limited = CONFIG.model_copy(update={"max_output_tokens": 50})
+    response = asyncio.run(StandInBackend(latency="0").generate("m", "Event: a", limited))
+    assert response.candidates[0].finish_reason == types.FinishReason.MAX_TOKENS
+    assert response.usage_metadata.candidates_token_count <= 50
+
+
+def test_latency_and_per_token_delay():
+    t0 = time.perf_counter()
+    asyncio.run(StandInBackend(latency="150").generate("m", "Event: a", CONFIG))
+    assert time.perf_counter() - t0 >= 0.15
+
+    backend = StandInBackend(latency="0", ms_per_token=0.5)
+    t0 = time.perf_counter()
+    response = asyncio.run(backend.generate("m", "Event: a", CONFIG))
+    assert time.perf_counter() - t0 >= response.usage_metadata.candidates_token_count * 0.0005
+
+
+def test_stream_reassembles_to_the_generated_text():
+    backend = StandInBackend(latency="0")
+
+    async def collect() -> list[types.GenerateContentResponse]:
+        return [chunk async for chunk in await backend.stream("m", "Event: a", CONFIG)]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert "".join(c.text for c in chunks) == asyncio.run(StandInBackend(latency="0").generate("m", "Event: a", CONFIG)).text
+    assert chunks[-1].usage_metadata is not None and chunks[0].usage_metadata is None
+
+
+def test_knob_parsing():
+    assert parse_error_rates("429=0.05, 503=0.1") == [(429, 0.05), (503, 0.1)]
+    with pytest.raises(ValueError):
+        parse_error_rates("429=0.7,503=0.4")
+    assert latency_sampler("250")(None) == 0.25
+    with pytest.raises(ValueError):
+        latency_sampler("pareto:1,2")
@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import metrics
+from services.metrics import HTTP_DURATION, Family, MetricsMiddleware, Registry
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+
+
+def test_counter_and_histogram_render_prometheus_text():
+    registry = Registry()
+    calls = registry.counter("test_calls_total", "Calls.", ("stage",))
+    duration = registry.histogram("test_seconds", "Duration.", ("stage",), buckets=(0.1, 1.0))
+    calls.inc("a")
+    calls.inc("a", amount=2)
+    calls.inc('b"\n')
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        duration.observe(seconds, "a")
+    registry.register_collector(lambda: [Family("test_depth", "gauge", "Depth.", [({}, 3), ({"pool": "x"}, None)])])
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP test_calls_total Calls.", "# TYPE test_calls_total counter"]
+    assert 'test_calls_total{stage="a"} 3' in lines
+    assert 'test_calls_total{stage="b\\"\\n"} 1' in lines
+    # バケットは累積（le は上限を含む）
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="1"} 3' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{stage="a"} 3.65' in lines
+    assert 'test_seconds_count{stage="a"} 4' in lines
+    # None の値は出さない
+    assert "test_depth 3" in lines
+    assert not any(line.startswith("test_depth{") for line in lines)
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    registry = Registry()
+    calls = registry.counter("test_off_total", "Calls.")
+    calls.inc()
+    assert registry.render().splitlines() == ["# HELP test_off_total Calls.", "# TYPE test_off_total counter"]
+
+
+SKIP = frozenset({"/ready"})
+
+
+def _call(path: str, status: int, route: str | None) -> None:
+    scope = {"type": "http", "method": "GET", "path": path}
+
+    async def app(scope, receive, send):
+        if route is not None:
+            scope["route"] = SimpleNamespace(path=route)
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(MetricsMiddleware(app, skip_paths=SKIP)(scope, None, send))
+    assert sent == ["http.response.start", "http.response.body"]
+
+
+def _count(route: str, status: int) -> float:
+    row = HTTP_DURATION._values.get(("GET", route, status))
+    return sum(row[:-1]) if row else 0
+
+
+def test_middleware_records_route_template_and_status():
+    before = _count("/api/items/{item_id}", 404)
+    _call("/api/items/42", 404, "/api/items/{item_id}")
+    assert _count("/api/items/{item_id}", 404) == before + 1
+    before = _count("unmatched", 200)
+    _call("/nowhere", 200, None)
+    assert _count("unmatched", 200) == before + 1
+    assert any(
+        line.startswith('flowguard_http_request_duration_seconds_count{method="GET",route="/api/items/{item_id}",status="404"}')
+        for line in HTTP_DURATION.render()
+    )
+
+
+def test_middleware_skips_probe_paths():
+    before = _count("/ready", 200)
+    _call("/ready", 200, "/ready")
+    assert _count("/ready", 200) == before
@@ -0,0 +1,106 @@
+import pytest
+
+from models import LatLng, MitigationImpact, RiskItem, RiskLocation, RiskTimeSlot, SimulationResponse
+from services.mitigation_engine import MitigationEffectEngine, StaleMitigationRevision
+
+
+def _response() -> SimulationResponse:
+    location = RiskLocation(center=LatLng(lat=35.0, lng=139.0), radius_meters=50)
+    risks = [
+        RiskItem(id=rid, category="crowd_safety", title=rid, description="", probability=0.5, severity=5,
+                 location=location, mitigation_actions=[])
+        for rid in ("r1", "r2")
+    ]
+    return SimulationResponse(
+        simulation_id="sim-1",
+        event_name="test",
+        risks=risks,
+        overall_risk_score=6,
+        summary="",
+        recommendations=[],
+        risk_count_by_category={"crowd_safety": 2},
+        risk_time_series=[
+            RiskTimeSlot(label="10:00", risk_score=8, risk_ids=["r1", "r2"]),
+            RiskTimeSlot(label="11:00", risk_score=4, risk_ids=["r2"]),
+        ],
+        mitigation_impacts=[
+            MitigationImpact(mitigation_id="t1", risk_score_delta=-1.5, danger_count_delta=-1),
+            MitigationImpact(mitigation_id="t2", risk_score_delta=-0.5),
+        ],
+    )
+
+
+ADOPTED = [{"id": "t1", "risk_id": "r1"}, {"id": "t2", "risk_id": "r2"}]
+
+
+def test_toggle_updates_summary_incrementally():
+    engine = MitigationEffectEngine()
+    engine.register(_response())
+    engine.sync("sim-1", {}, ADOPTED)
+    summary = engine.toggle("sim-1", "t1", True)
+    assert summary["riskScoreAfter"] == 4.5
+    assert summary["riskItemCountAfter"] == 1
+    summary = engine.toggle("sim-1", "t2", True)
+    assert summary["riskScoreAfter"] == 4.0
+    assert summary["riskItemCountAfter"] == 0
+    assert summary["peakTimeAfterLabel"] == "10:00"
+    summary = engine.toggle("sim-1", "t1", False)
+    assert summary["riskScoreAfter"] == 5.5
+    assert summary["riskItemCountAfter"] == 1
+
+
+def test_summary_for_export_leaves_dashboard_state_alone():
+    engine = MitigationEffectEngine()
+    response = _response()
+    engine.register(response)
+    dashboard = engine.sync("sim-1", {"t1": True}, ADOPTED)
+
+    exported = engine.summary_for(response, {"t1": True, "t2": True}, None)
+    assert exported["riskScoreAfter"] == 4.0
+    assert exported["riskItemCountAfter"] == 0
+    exported = engine.summary_for(response, {}, [])
+    assert exported["riskItemCountAfter"] == 2
+
+    # エクスポートで採用ToDo・チェックが消えていない
+    assert engine.sync("sim-1", {"t1": True}, None) == dashboard
+    assert engine.toggle("sim-1", "t2", True)["riskItemCountAfter"] == 0
+
+
+def test_toggle_with_a_stale_revision_asks_for_a_full_sync():
+    engine = MitigationEffectEngine()
+    engine.register(_response())
+    first = engine.sync("sim-1", {}, ADOPTED)
+    # 別のタブが先に更新した
+    other = engine.toggle("sim-1", "t2", True, first["revision"])
+    assert other["revision"] != first["revision"]
+    with pytest.raises(StaleMitigationRevision):
+        engine.toggle("sim-1", "t1", True, first["revision"])
+    assert engine.current("sim-1")["riskScoreAfter"] == 5.5
+
+    # 全体を送り直せば、手元のチェックどおりになる
+    synced = engine.sync("sim-1", {"t1": True}, ADOPTED)
+    assert synced["riskScoreAfter"] == 4.5
+    assert engine.toggle("sim-1", "t2", True, synced["revision"])["riskScoreAfter"] == 4.0
+
+
+def test_reloaded_state_has_a_new_revision():
+    response = _response()
+    engine = MitigationEffectEngine(max_simulations=1)
+    engine.set_loader(lambda simulation_id: response if simulation_id == "sim-1" else None)
+    revision = engine.sync("sim-1", {"t1": True}, ADOPTED)["revision"]
+    engine.register(response.model_copy(update={"simulation_id": "sim-2"}))
+    # LRU から外れて読み直した状態にはチェックが無いので、古い revision の toggle は通さない
+    with pytest.raises(StaleMitigationRevision):
+        engine.toggle("sim-1", "t2", True, revision)
+
+
+def test_summary_for_by_id_reads_without_changing_the_shared_state():
+    engine = MitigationEffectEngine()
+    engine.register(_response())
+    dashboard = engine.sync("sim-1", {"t1": True}, ADOPTED)
+
+    # アシストの質問ごとのチェック状態で集計しても、ダッシュボードの状態・revision は変わらない
+    assisted = engine.summary_for("sim-1", {"t1": True, "t2": True})
+    assert assisted["riskScoreAfter"] == 4.0
+    assert engine.current("sim-1") == dashboard
+    assert engine.summary_for("unknown", {}) is None
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+from google.genai import types
+
+from models import AnalysisTier, SimulationRequest
+from services.gemini_service import GeminiService
+from services.llm_standin import StandInBackend
+from services.model_routing import STAGE_METRICS, ModelRouter
+
+ROUTES = {
+    "category": {"model": "flash", "thinking": "off"},
+    "category.legal_compliance": {"model": "pro", "location": "global"},
+    "deep:category": {"max_output_tokens": 8192},
+    "deep:category.visibility": {"model": "pro-deep"},
+    "synthesis": {"temperature": 0.2},
+}
+
+
+def _request(tier: AnalysisTier) -> SimulationRequest:
+    return SimulationRequest(
+        event_name="夏祭り",
+        event_type="music_festival",
+        event_location="渋谷",
+        date_time="2026-08-01T10:00",
+        expected_attendance=5000,
+        audience_type="mixed",
+        polygon=[{"lat": 35.0, "lng": 139.0}, {"lat": 35.002, "lng": 139.0}, {"lat": 35.002, "lng": 139.003}],
+        analysis_tier=tier,
+    )
+
+
+def test_routes_layer_family_stage_then_tier():
+    router = ModelRouter(ROUTES)
+    visibility = router.route("category.visibility")
+    assert (visibility.model, visibility.thinking, visibility.max_output_tokens) == ("flash", "off", None)
+    legal = router.route("category.legal_compliance", "fast")
+    assert (legal.model, legal.location, legal.thinking) == ("pro", "global", "off")
+    deep = router.route("category.visibility", "deep")
+    assert (deep.model, deep.thinking, deep.max_output_tokens) == ("pro-deep", "off", 8192)
+    # 段階の無いキー（analysis）は上書きしない
+    analysis = router.route("analysis", "deep")
+    assert analysis.model is None and analysis.location is None
+
+
+def test_route_config_overrides_only_set_fields():
+    config = types.GenerateContentConfig(temperature=0.7, top_p=0.9, max_output_tokens=4096)
+    routed = ModelRouter(ROUTES).route("synthesis").config(config)
+    assert (routed.temperature, routed.top_p, routed.max_output_tokens) == (0.2, 0.9, 4096)
+    assert ModelRouter(ROUTES).route("translation").config(config) is config
+
+
+def test_env_routes_override_the_file(tmp_path, monkeypatch):
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps({"synthesis": {"model": "from-file"}, "translation": {"model": "lite"}}), encoding="utf-8")
+    monkeypatch.setenv("MODEL_ROUTES_FILE", str(path))
+    monkeypatch.setenv("MODEL_ROUTES", json.dumps({"synthesis": {"model": "from-env"}}))
+    router = ModelRouter()
+    assert router.route("synthesis").model == "from-env"
+    assert router.route("translation").model == "lite"
+
+
+@pytest.mark.parametrize(
+    "routes",
+    [
+        "[]",
+        '{"synthesis": "pro"}',
+        '{"synthesis": {"modle": "pro"}}',
+        '{"synthesis": {"thinking": "max"}}',
+    ],
+)
+def test_invalid_routes_are_rejected(routes, monkeypatch):
+    monkeypatch.delenv("MODEL_ROUTES_FILE", raising=False)
+    monkeypatch.setenv("MODEL_ROUTES", routes)
+    with pytest.raises(ValueError):
+        ModelRouter()
+
+
+def test_service_calls_each_stage_with_its_route(monkeypatch):
+    monkeypatch.delenv("MODEL_ROUTES_FILE", raising=False)
+    monkeypatch.setenv("MODEL_ROUTES", json.dumps(ROUTES))
+    backend = StandInBackend(latency="0")
+    calls: dict[str, tuple[str, str | None, types.GenerateContentConfig]] = {}
+    generate = backend.generate
+
+    async def recording(model, contents, config, location=None):
+        system = str(config.system_instruction)
+        stage = system.split("ASSIGNED CATEGORY: ")[1].split()[0] if "ASSIGNED CATEGORY:" in system else "synthesis"
+        calls[stage] = (model, location, config)
+        return await generate(model, contents, config, location)
+
+    backend.generate = recording
+    service = GeminiService(backend=backend)
+    request = _request(AnalysisTier.DEEP)
+    before = STAGE_METRICS.stats().get("category.legal_compliance", {}).get("pro", {}).get("calls", 0)
+
+    async def run():
+        risks = []
+        for category in ("visibility", "legal_compliance"):
+            risks += (await service.analyze_risks_for_category(request, category))["risks"]
+        await service.synthesize_overall(risks, request)
+
+    asyncio.run(run())
+    model, _, config = calls["visibility"]
+    assert model == "pro-deep" and config.max_output_tokens == 8192
+    model, location, _ = calls["legal_compliance"]
+    assert (model, location) == ("pro", "global")
+    assert calls["synthesis"][2].temperature == 0.2
+    # 段階 × モデルごとに記録する
+    stats = STAGE_METRICS.stats()
+    assert stats["category.legal_compliance"]["pro"]["calls"] == before + 1
+    assert stats["category.visibility"]["pro-deep"]["output_tokens"] > 0
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from google.genai import types
+
+from models import AnalysisTier, ModelCallUsage, SimulationRequest
+from services.llm_standin import StandInBackend
+from services.model_routing import StageMetrics, StageTimer
+from services.model_usage import estimate_cost, price_for, usage_ledger
+from services.risk_engine import RiskEngine
+
+
+def _usage(prompt: int, cached: int = 0, thinking: int = 0, output: int = 0) -> types.GenerateContentResponseUsageMetadata:
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt,
+        cached_content_token_count=cached,
+        thoughts_token_count=thinking,
+        candidates_token_count=output,
+    )
+
+
+async def _call(metrics: StageMetrics, stage: str, model: str, usage=None, attempt: int = 1, fail: bool = False) -> None:
+    async with StageTimer(metrics, stage, model, attempt) as timer:
+        timer.usage = usage
+        if fail:
+            raise RuntimeError("503")
+
+
+def test_cached_tokens_are_priced_at_the_cached_rate():
+    # gemini-2.5-flash: 入力 0.3、キャッシュ 0.03、出力 2.5（USD / 100 万トークン）
+    assert estimate_cost("gemini-2.5-flash", 1_000_000, 0, 0, 0) == pytest.approx(0.3)
+    assert estimate_cost("gemini-2.5-flash", 1_000_000, 600_000, 0, 0) == pytest.approx(0.4 * 0.3 + 0.6 * 0.03)
+    # 推論トークンは出力の単価。キャッシュがプロンプトより多くてもプロンプトまで
+    assert estimate_cost("gemini-2.5-flash", 100, 500, 1_000_000, 0) == pytest.approx(100 * 0.03 / 1e6 + 2.5)
+    assert price_for("gemini-2.5-flash-lite-001")["input"] == 0.1
+    assert estimate_cost("unknown-model", 100, 0, 0, 10) is None
+
+
+def test_ledger_totals_and_by_stage():
+    metrics = StageMetrics()
+
+    async def run():
+        await asyncio.gather(
+            _call(metrics, "category.visibility", "gemini-2.5-flash", _usage(1000, 400, 50, 200)),
+            _call(metrics, "category.operational", "gemini-2.5-flash", _usage(1200, 0, 0, 300)),
+        )
+        with pytest.raises(RuntimeError):
+            await _call(metrics, "synthesis", "gemini-2.5-pro", fail=True)
+        await _call(metrics, "synthesis", "gemini-2.5-pro", _usage(3000, 0, 100, 500), attempt=2)
+
+    with usage_ledger() as ledger:
+        asyncio.run(run())
+    usage = ledger.summary()
+    assert usage.total.calls == 4 and usage.total.failed == 1
+    assert (usage.total.prompt_tokens, usage.total.cached_tokens, usage.total.thinking_tokens, usage.total.output_tokens) == (
+        5200, 400, 150, 1000,
+    )
+    assert set(usage.by_stage) == {"category.visibility", "category.operational", "synthesis"}
+    synthesis = usage.by_stage["synthesis"]
+    assert synthesis.calls == 2 and synthesis.failed == 1 and synthesis.output_tokens == 500
+    assert usage.total.cost_usd == pytest.approx(sum(c.cost_usd for c in usage.calls), abs=1e-6)
+    assert usage.by_stage["category.visibility"].cost_usd == pytest.approx(
+        estimate_cost("gemini-2.5-flash", 1000, 400, 50, 200), abs=1e-6
+    )
+    assert [c.attempt for c in usage.calls if c.stage == "synthesis"] == [1, 2]
+    # プロセス全体の集計にも入る
+    stats = metrics.stats()
+    assert stats["synthesis"]["gemini-2.5-pro"]["errors"] == 1
+    assert stats["synthesis"]["gemini-2.5-pro"]["retries"] == 1
+    assert stats["category.visibility"]["gemini-2.5-flash"]["cached_tokens"] == 400
+
+
+def test_nested_ledgers_and_prior_calls():
+    metrics = StageMetrics()
+    prior = ModelCallUsage(stage="analysis", model="gemini-2.5-flash", prompt_tokens=10, output_tokens=5)
+
+    with usage_ledger() as outer:
+        with usage_ledger() as base:
+            base.record(prior)
+        with usage_ledger(base.summary()) as inner:
+            asyncio.run(_call(metrics, "translation", "gemini-2.5-flash", _usage(100, 0, 0, 50)))
+    # 続きの台帳は前の呼び出しを含む。外側の台帳には prior の分を二重に記録しない
+    assert [c.stage for c in inner.summary().calls] == ["analysis", "translation"]
+    assert [c.stage for c in outer.summary().calls] == ["analysis", "translation"]
+    assert inner.summary().total.prompt_tokens == 110
+
+
+def test_simulation_response_carries_the_breakdown():
+    engine = RiskEngine(StandInBackend(latency="0"))
+    request = SimulationRequest(
+        event_name="夏祭り",
+        event_type="music_festival",
+        event_location="渋谷",
+        date_time="2026-08-01T10:00",
+        expected_attendance=5000,
+        audience_type="mixed",
+        polygon=[{"lat": 35.0, "lng": 139.0}, {"lat": 35.002, "lng": 139.0}, {"lat": 35.002, "lng": 139.003}],
+        temperature_celsius=25,
+        precipitation_probability=10,
+        weather_condition="clear",
+        analysis_tier=AnalysisTier.DEEP,
+    )
+    usage = asyncio.run(engine.run_simulation(request)).usage
+    assert usage.total.calls == 7
+    assert set(usage.by_stage) == {f"category.{c}" for c in (
+        "crowd_safety", "traffic_logistics", "environmental_health", "operational", "visibility", "legal_compliance"
+    )} | {"synthesis"}
+    assert usage.total.output_tokens == sum(t.output_tokens for t in usage.by_stage.values())
+    assert usage.wall_ms > 0
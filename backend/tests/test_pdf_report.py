@@ -0,0 +1,90 @@
+import asyncio
+import io
+import time
+
+import pytest
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+from services.pdf_report import _LazyDocTemplate
+
+
+@pytest.fixture(autouse=True)
+def invariant_pdf(monkeypatch):
+    # 作成日時・ID を固定して、同じ組版なら同じバイト列になるようにする
+    monkeypatch.setattr(rl_config, "invariant", 1)
+
+
+def _story(n: int, pulled: list[int] | None = None):
+    style = getSampleStyleSheet()["BodyText"]
+    for i in range(n):
+        if pulled is not None:
+            pulled[0] += 1
+        yield Paragraph(f"{i}. " + "long text " * (i % 60), style)
+        if i % 25 == 0:
+            yield Spacer(1, 20)
+
+
+def _lazy(n: int, window: int) -> bytes:
+    buffer = io.BytesIO()
+    _LazyDocTemplate(buffer, pagesize=A4).build_lazy(_story(n), window=window)
+    return buffer.getvalue()
+
+
+def test_lazy_build_matches_the_eager_build():
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(list(_story(300)))
+    assert _lazy(300, window=8) == buffer.getvalue()
+
+
+@pytest.mark.parametrize("window", [1, 2, 16])
+def test_lazy_build_keeps_every_flowable(window):
+    # 窓が小さくても途中で終わらない（build はリストが空になると終わる）
+    assert _lazy(120, window=window) == _lazy(120, window=10**6)
+
+
+def test_lazy_build_bounds_lookahead():
+    pulled, drawn = [0], [0]
+    peak = 0
+
+    class Doc(_LazyDocTemplate):
+        def afterFlowable(self, flowable):
+            nonlocal peak
+            drawn[0] += 1
+            peak = max(peak, pulled[0] - drawn[0])
+
+    Doc(io.BytesIO(), pagesize=A4).build_lazy(_story(500, pulled), window=8)
+    assert pulled[0] == 500
+    # 取り出したが描画していない Paragraph は先読みの窓の中にしかない（Spacer・分割した断片の描画は多めに数える）
+    assert peak <= 8
+
+
+def test_cancelled_file_render_removes_the_spool_file(tmp_path, monkeypatch):
+    import main
+
+    started = []
+
+    def slow_render(ir, variant, path):
+        started.append(path)
+        time.sleep(0.3)
+        # 取り消された後も、スレッド・ワーカーの描画はファイルを書き終える
+        with open(path, "wb") as f:
+            f.write(b"%PDF-")
+        return path
+
+    monkeypatch.setattr(main, "render_pool", None)
+    monkeypatch.setattr(main, "PDF_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "render_pdf_to_file", slow_render)
+
+    async def disconnect_while_rendering():
+        task = asyncio.ensure_future(main._render_pdf_file(None, "full"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.5)
+
+    asyncio.run(disconnect_while_rendering())
+    assert started and not list(tmp_path.iterdir())
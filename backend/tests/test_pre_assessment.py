@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from models import RiskCategory, RiskItem, SimulationRequest, WeatherCondition
+from services.pre_assessment import (
+    AUDIENCE_TYPES,
+    CATEGORIES,
+    EVENT_TYPES,
+    WEATHER_CONDITIONS,
+    assess_request,
+    assess_variants,
+    build_provisional_raw_result,
+    fruin_level_of_service,
+)
+
+CROWD = CATEGORIES.index(RiskCategory.CROWD_SAFETY)
+ENVIRONMENT = CATEGORIES.index(RiskCategory.ENVIRONMENTAL_HEALTH)
+
+
+def _request(**kwargs) -> SimulationRequest:
+    return SimulationRequest(**{
+        "event_name": "夏祭り",
+        "event_type": "music_festival",
+        "event_location": "渋谷",
+        "date_time": "2026-08-01T10:00",
+        "expected_attendance": 5000,
+        "audience_type": "mixed",
+        "polygon": [{"lat": 35.0, "lng": 139.0}, {"lat": 35.002, "lng": 139.0}, {"lat": 35.002, "lng": 139.003}],
+        **kwargs,
+    })
+
+
+def _assess(attendance, temperature=25.0, precipitation=20.0, weather=0, event=0, audience=3, area=10_000.0):
+    n = max(np.size(attendance), np.size(temperature), np.size(precipitation))
+    return assess_variants(
+        area,
+        np.broadcast_to(attendance, n),
+        np.broadcast_to(temperature, n),
+        np.broadcast_to(precipitation, n),
+        np.broadcast_to(weather, n),
+        event,
+        audience,
+    )
+
+
+def test_fruin_level_of_service_bounds():
+    assert list(fruin_level_of_service([0.0, 0.83, 1.0, 1.2, 2.0, 4.0, 9.0])) == ["A", "B", "B", "C", "D", "E", "F"]
+
+
+def test_scores_grow_with_attendance():
+    result = _assess(np.linspace(0, 200_000, 400))
+    assert np.all(np.diff(result["density"]) >= 0)
+    assert np.all(np.diff(result["category_scores"][:, CROWD]) >= 0)
+    assert np.all(np.diff(result["overall"]) >= -1e-9)
+
+
+def test_scores_grow_with_heat_cold_and_rain():
+    hot = _assess(5000, temperature=np.linspace(28, 45, 50))["category_scores"][:, ENVIRONMENT]
+    assert np.all(np.diff(hot) >= 0) and hot[-1] > hot[0]
+    cold = _assess(5000, temperature=np.linspace(5, -15, 50))["category_scores"][:, ENVIRONMENT]
+    assert np.all(np.diff(cold) >= 0) and cold[-1] > cold[0]
+    wet = _assess(5000, precipitation=np.linspace(0, 100, 50))["category_scores"]
+    assert np.all(np.diff(wet, axis=0) >= 0)
+
+
+def test_scores_stay_within_bounds_for_any_input():
+    rng = np.random.default_rng(0)
+    n = 2000
+    for event in range(len(EVENT_TYPES)):
+        for audience in range(len(AUDIENCE_TYPES)):
+            result = assess_variants(
+                float(rng.uniform(1, 1e6)),
+                rng.uniform(0, 1e6, n),
+                rng.uniform(-30, 50, n),
+                rng.uniform(0, 100, n),
+                rng.integers(0, len(WEATHER_CONDITIONS), n),
+                event,
+                audience,
+            )
+            assert result["category_scores"].shape == (n, len(CATEGORIES))
+            assert np.all((result["category_scores"] >= 1.0) & (result["category_scores"] <= 10.0))
+            assert np.all((result["overall"] >= 0.0) & (result["overall"] <= 10.0))
+
+
+def test_variants_override_the_request():
+    request = _request(weather_condition=WeatherCondition.CLEAR, temperature_celsius=25, precipitation_probability=0)
+    result = assess_request(request, variants=[{"expected_attendance": 50_000}, {"weather_condition": "storm"}])
+    base, crowded, stormy = result["overall"]
+    assert crowded > base and stormy > base
+    assert result["density"][1] == pytest.approx(result["density"][0] * 10)
+
+
+@pytest.mark.parametrize("locale", ["ja", "en"])
+def test_provisional_result_has_the_llm_shape(locale):
+    raw = build_provisional_raw_result(_request(locale=locale), 35.001, 139.001)
+    risks = [RiskItem.model_validate(r) for r in raw["risks"]]
+    assert {r.category for r in risks} == set(CATEGORIES)
+    assert [r.severity for r in risks] == sorted((r.severity for r in risks), reverse=True)
+    assert 0.0 <= raw["overall_risk_score"] <= 10.0
+    assert raw["summary"] and len(raw["recommendations"]) == 3
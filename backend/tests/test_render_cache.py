@@ -0,0 +1,37 @@
+from models import SimulationResponse
+from services import render_cache
+from services.render_cache import etag_matches, render_key
+
+
+def _response() -> SimulationResponse:
+    return SimulationResponse(
+        simulation_id="sim-1",
+        event_name="夏祭り",
+        risks=[],
+        overall_risk_score=3.0,
+        summary="総評",
+        recommendations=[],
+        risk_count_by_category={},
+    )
+
+
+def test_key_depends_on_content_variant_and_overlays():
+    payload = _response()
+    key = render_key("pdf", payload, "full", {"pins": None, "todo_checks": {}})
+    # None・空の差分は省略と同じ
+    assert key == render_key("pdf", payload, "full")
+    assert key != render_key("pdf", payload, "one_page")
+    assert key != render_key("text", payload, "full")
+    assert key != render_key("pdf", payload, "full", {"todo_checks": {"t1": True}})
+    assert key != render_key("pdf", payload.model_copy(update={"summary": "別の総評"}), "full")
+
+
+def test_renderer_version_changes_the_key_and_etag(monkeypatch):
+    payload = _response()
+    key = render_key("pdf", payload, "full")
+    monkeypatch.setattr(render_cache, "RENDERER_VERSION", render_cache.RENDERER_VERSION + "-next")
+    bumped = render_key("pdf", payload, "full")
+    assert bumped != key
+    # 古い版の ETag では 304 にならない
+    assert not etag_matches(f'"{key}"', bumped)
+    assert etag_matches(f'W/"{bumped}", "other"', bumped)
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from services.render_pool import RenderPool, RenderPoolRestarted, RenderTimeout
+
+
+def _sleep_job(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def _crash_job(_: float) -> None:
+    os._exit(1)
+
+
+def _run_all(pool: RenderPool, *jobs) -> list:
+    async def main():
+        tasks = []
+        for job in jobs:
+            fn, arg = job if isinstance(job, tuple) else (_sleep_job, job)
+            tasks.append(asyncio.ensure_future(pool._run(fn, arg)))
+            # 投げた順にワーカー・待ち行列へ入れる
+            await asyncio.sleep(0.05)
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def pool():
+    p = RenderPool(workers=1, max_queue=4, timeout_s=1.5)
+    # ワーカーを起動しておく（起動時間をタイムアウトに含めない）
+    asyncio.run(p._run(_sleep_job, 0))
+    yield p
+    p.shutdown()
+
+
+def test_timeout_restarts_once_and_queued_jobs_are_retryable(pool):
+    stuck, queued_a, queued_b = _run_all(pool, 30, 0.1, 0.1)
+    assert isinstance(stuck, RenderTimeout)
+    assert isinstance(queued_a, RenderPoolRestarted)
+    assert isinstance(queued_b, RenderPoolRestarted)
+    assert pool.restarts == 1
+    # 新しいプールでは普通に描画できる
+    assert asyncio.run(pool._run(_sleep_job, 0)) == 0
+    assert pool.restarts == 1
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_crash_restarts_once_for_all_jobs_of_the_broken_pool():
+    pool = RenderPool(workers=2, max_queue=2, timeout_s=10)
+    try:
+        # 2 つのワーカーを起動しておく（ワーカーは必要になってから起動される）
+        _run_all(pool, 0.5, 0.5)
+        stuck, crashed = _run_all(pool, 30, (_crash_job, 0))
+        # どちらも壊れたプールのジョブ。作り直しは 1 回だけで、どちらも再試行を促す
+        assert isinstance(crashed, RenderPoolRestarted)
+        assert isinstance(stuck, RenderPoolRestarted)
+        assert pool.restarts == 1
+        assert asyncio.run(pool._run(_sleep_job, 0)) == 0
+    finally:
+        pool.shutdown()
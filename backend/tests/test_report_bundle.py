@@ -0,0 +1,88 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from models import SimulationResponse
+
+
+def _body(simulation_id: str = "abcdef12-3456") -> dict:
+    return SimulationResponse(
+        simulation_id=simulation_id,
+        event_name="夏祭り",
+        risks=[{
+            "id": "r1",
+            "category": "crowd_safety",
+            "title": "入口の滞留",
+            "description": "開場直後に東入口で滞留する",
+            "probability": 0.6,
+            "severity": 7.0,
+            "location": {"center": {"lat": 35.0, "lng": 139.0}, "radius_meters": 30},
+            "mitigation_actions": ["誘導員を増員する"],
+        }],
+        overall_risk_score=6.0,
+        summary="総評",
+        recommendations=["誘導員を増員する"],
+        risk_count_by_category={"crowd_safety": 1},
+    ).model_dump(mode="json")
+
+
+@pytest.fixture(autouse=True)
+def inline_renderer(monkeypatch):
+    # 描画プール・キャッシュを使わずに同じプロセスで描画する
+    monkeypatch.setattr(main, "render_pool", None)
+    monkeypatch.setattr(main, "render_cache", None)
+
+
+def _zip(variants: str | None) -> zipfile.ZipFile:
+    response = asyncio.run(main.export_report_bundle(_body(), variants, "zip"))
+    assert response.media_type == "application/zip"
+    assert response.headers["content-disposition"] == 'attachment; filename="FlowGuard_Reports_abcdef12.zip"'
+    return zipfile.ZipFile(io.BytesIO(response.body))
+
+
+def test_zip_contains_every_default_variant():
+    archive = _zip(None)
+    assert archive.namelist() == [f"FlowGuard_Report_abcdef12_{v}.pdf" for v in main.DEFAULT_BUNDLE_VARIANTS]
+    for info in archive.infolist():
+        assert info.compress_type == zipfile.ZIP_STORED
+        assert archive.read(info).startswith(b"%PDF-")
+
+
+def test_requested_variants_are_deduplicated_in_order():
+    archive = _zip(" one_page, full,ONE_PAGE ")
+    assert archive.namelist() == ["FlowGuard_Report_abcdef12_one_page.pdf", "FlowGuard_Report_abcdef12_full.pdf"]
+
+
+def test_unknown_variant_and_format_are_rejected():
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(main.export_report_bundle(_body(), "full,poster", "zip"))
+    assert info.value.status_code == 400 and "poster" in info.value.detail
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(main.export_report_bundle(_body(), None, "tar"))
+    assert info.value.status_code == 400
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(main.export_report_bundle(_body(""), None, "zip"))
+    assert info.value.status_code == 400
+
+
+def test_multipart_streams_one_part_per_variant():
+    async def read() -> tuple[str, bytes]:
+        response = await main.export_report_bundle(_body(), "full,one_page,role_security", "multipart")
+        return response.media_type, b"".join([chunk async for chunk in response.body_iterator])
+
+    media_type, body = asyncio.run(read())
+    boundary = media_type.split("boundary=")[1]
+    parts = body.split(f"--{boundary}".encode())
+    assert parts[0] == b"" and parts[-1] == b"--\r\n"
+    variants = []
+    for part in parts[1:-1]:
+        head, content = part.split(b"\r\n\r\n", 1)
+        assert b"Content-Type: application/pdf" in head
+        variants.append(head.split(b"X-Report-Variant: ")[1].decode())
+        assert content.startswith(b"%PDF-")
+    # 描画が終わった順に届くので、順序は問わない
+    assert sorted(variants) == ["full", "one_page", "role_security"]
@@ -0,0 +1,28 @@
+from models import SimulationResponse
+from services import report_ir
+from services.report_ir import build_report_ir, render_report
+
+
+def _response() -> SimulationResponse:
+    return SimulationResponse(
+        simulation_id="sim-ir",
+        event_name="夏祭り",
+        risks=[],
+        overall_risk_score=3.0,
+        summary="総評",
+        recommendations=["推奨"],
+        risk_count_by_category={},
+    )
+
+
+def test_cached_ir_is_stamped_with_the_current_time(monkeypatch):
+    response = _response()
+    monkeypatch.setattr(report_ir, "_generated_at", lambda: "2026-01-01 09:00 UTC")
+    first = build_report_ir(response, todo_checks={"t1": True})
+    monkeypatch.setattr(report_ir, "_generated_at", lambda: "2026-01-02 10:30 UTC")
+    second = build_report_ir(response, todo_checks={"t1": True})
+    assert first.generated_at == "2026-01-01 09:00 UTC"
+    assert second.generated_at == "2026-01-02 10:30 UTC"
+    # 作成日時以外は使い回す
+    assert second.risk_groups is first.risk_groups
+    assert "2026-01-02 10:30 UTC" in render_report(second, "markdown")
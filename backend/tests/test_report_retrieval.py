@@ -0,0 +1,72 @@
+from models import SimulationResponse
+from services.report_ir import build_report_ir, render_report
+from services.report_retrieval import ReportRetriever, chunk_report, tokenize
+
+CATEGORIES = ("crowd_safety", "traffic_logistics", "environmental_health", "operational", "visibility", "legal_compliance")
+
+
+def _risk(i: int, title: str, description: str) -> dict:
+    return {
+        "id": f"r{i}",
+        "category": CATEGORIES[i % len(CATEGORIES)],
+        "title": title,
+        "description": description,
+        "probability": 0.5,
+        "severity": 5.0,
+        "location": {"center": {"lat": 35.0, "lng": 139.0}, "radius_meters": 30},
+        "mitigation_actions": [f"対策{i}"],
+    }
+
+
+def _report_text(n_risks: int = 120) -> str:
+    """リスク n_risks 件のレポート本文。最後のリスクだけが花火の打ち上げ場所の話題。"""
+    risks = [_risk(i, f"入口{i}の滞留", "開場直後に入口付近で来場者が滞留する。" * 6) for i in range(n_risks - 1)]
+    risks.append(_risk(n_risks - 1, "花火打ち上げ場所の落下物", "打ち上げ筒の周囲に燃えかすが落下する。"))
+    response = SimulationResponse(
+        simulation_id="sim-retrieval",
+        event_name="夏祭り",
+        risks=risks,
+        overall_risk_score=6.0,
+        summary="総評",
+        recommendations=["誘導員を増員する"],
+        risk_count_by_category={},
+    )
+    return render_report(build_report_ir(response), "text")
+
+
+def test_tokenize_uses_words_and_cjk_bigrams():
+    assert tokenize("PDF 出力") == ["pdf", "出力"]
+    assert tokenize("花火大会 v1.2") == ["v1.2", "花火", "火大", "大会"]
+
+
+def test_each_risk_is_its_own_chunk():
+    text = _report_text(12)
+    chunks = chunk_report(text)
+    risk_chunks = [c for c in chunks if c.text.startswith(" ・ ")]
+    assert len(risk_chunks) == 12
+    # 見出しにカテゴリが付く
+    assert all("【" in c.heading for c in risk_chunks)
+
+
+def test_question_retrieves_the_relevant_risk_from_the_end():
+    text = _report_text()
+    assert len(text) > 12_000 and text.find("花火打ち上げ場所") > 12_000
+    retriever = ReportRetriever(top_k=3, max_chars=2000)
+    excerpts = retriever.excerpts(text, "花火の打ち上げ場所で気をつけることは？")
+    assert "花火打ち上げ場所の落下物" in excerpts
+    assert len(excerpts) <= 2000
+
+
+def test_index_is_cached_per_report():
+    text = _report_text(12)
+    retriever = ReportRetriever()
+    retriever.excerpts(text, "入口")
+    retriever.excerpts(text, "花火")
+    retriever.excerpts(text + "\n追記", "花火")
+    assert retriever.stats() == {"indexes": 2, "hits": 1, "misses": 2}
+
+
+def test_unmatched_question_falls_back_to_the_start():
+    text = _report_text(12)
+    excerpts = ReportRetriever(top_k=2, max_chars=4000).excerpts(text, "zzz")
+    assert excerpts.startswith(text.strip().splitlines()[0])
@@ -0,0 +1,72 @@
+import sqlite3
+
+from models import SimulationResponse
+from services import result_store
+from services.result_store import ResultStore
+
+
+def _response(simulation_id: str, summary: str = "総評") -> SimulationResponse:
+    return SimulationResponse(
+        simulation_id=simulation_id,
+        event_name="夏祭り",
+        risks=[],
+        overall_risk_score=3.0,
+        summary=summary,
+        recommendations=["誘導員を増員する"],
+        risk_count_by_category={},
+    )
+
+
+def _count(path) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def test_round_trip_through_sqlite(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    store = ResultStore(path=path)
+    store.put(_response("sim-1"))
+    assert store.get("sim-1") == _response("sim-1")
+    assert store.get("unknown") is None
+    store.close()
+
+    # 開き直すとメモリ上の LRU は空なので、SQLite から読んで検証し直す
+    reopened = ResultStore(path=path)
+    assert reopened.get("sim-1") == _response("sim-1")
+    reopened.close()
+
+
+def test_variants_are_stored_separately(tmp_path):
+    store = ResultStore(path=str(tmp_path / "results.sqlite3"), hot_size=1)
+    store.put(_response("sim-1", "総評"))
+    store.put(_response("sim-1", "Summary"), variant="en")
+    assert store.get("sim-1").summary == "総評"
+    assert store.get("sim-1", "en").summary == "Summary"
+    assert store.get("sim-1", "fr") is None
+    # 同じ ID・variant は上書き
+    store.put(_response("sim-1", "Summary 2"), variant="en")
+    assert store.get("sim-1", "en").summary == "Summary 2"
+    store.close()
+
+
+def test_row_limit_is_checked_periodically(tmp_path, monkeypatch):
+    path = str(tmp_path / "results.sqlite3")
+    store = ResultStore(path=path, hot_size=2, max_rows=20)
+    counts = []
+    prune = store._prune
+    monkeypatch.setattr(store, "_prune", lambda: counts.append(1) or prune())
+    for i in range(25):
+        store.put(_response(f"sim-{i}"))
+    # 開いた後の最初の 1 回と、上限の 1/10（2 件）ごと。古い行から消え、上限の 1/10 までしか超えない
+    assert len(counts) == 1 + 24 // 2
+    assert _count(path) <= 20 + 2
+    assert store.get("sim-0") is None
+    assert store.get("sim-24") is not None
+    store.close()
+
+    monkeypatch.setattr(result_store, "PRUNE_EVERY_ROWS", 1000)
+    store = ResultStore(path=path, max_rows=5)
+    store.put(_response("sim-new"))
+    # 開いた直後の最初の put で上限まで減らす
+    assert _count(path) == 5
+    store.close()
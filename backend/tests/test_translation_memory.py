@@ -0,0 +1,79 @@
+import time
+
+from services import translation_memory
+from services.assist_memory import estimate_tokens
+from services.translation_memory import TranslationMemory, pack_batches
+
+
+def _rows(memory: TranslationMemory) -> dict[str, float]:
+    return dict(memory._conn.execute("SELECT source, used_at FROM translations").fetchall())
+
+
+def test_hot_hits_keep_entries_from_being_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(translation_memory, "TOUCH_FLUSH_SIZE", 1)
+    memory = TranslationMemory(path=str(tmp_path / "tm.sqlite3"), hot_size=100, max_rows=20)
+    memory.store("en", {"よく使う": "often"})
+    memory.store("en", {f"古い{i}": f"old {i}" for i in range(9)})
+    # メモリ上で当たった訳文の used_at も進む
+    before = _rows(memory)["よく使う"]
+    time.sleep(0.01)
+    assert memory.lookup("en", ["よく使う"]) == {"よく使う": "often"}
+    assert _rows(memory)["よく使う"] > before
+    memory.store("en", {f"新しい{i}": f"new {i}" for i in range(15)})
+    rows = _rows(memory)
+    assert len(rows) == 20
+    # 消えた 5 件は使われていない古い訳文だけ
+    assert "よく使う" in rows
+    assert sum(source.startswith("古い") for source in rows) == 4
+    memory.close()
+
+
+def test_touches_are_written_in_batches(tmp_path):
+    memory = TranslationMemory(path=str(tmp_path / "tm.sqlite3"))
+    memory.store("en", {"原文": "source"})
+    before = _rows(memory)["原文"]
+    time.sleep(0.01)
+    memory.lookup("en", ["原文"])
+    # 件数・間隔に届くまではまとめて持っておき、閉じるときに書く
+    assert _rows(memory)["原文"] == before
+    assert memory._touched == {("en", "原文")}
+    memory.close()
+    reopened = TranslationMemory(path=str(tmp_path / "tm.sqlite3"))
+    assert _rows(reopened)["原文"] > before
+    reopened.close()
+
+
+def test_row_limit_is_checked_periodically(tmp_path, monkeypatch):
+    counts = []
+    memory = TranslationMemory(path=str(tmp_path / "tm.sqlite3"), max_rows=100)
+    original = memory._prune
+    monkeypatch.setattr(memory, "_prune", lambda: (counts.append(1), original()))
+    for i in range(30):
+        memory.store("en", {f"文{i}": f"text {i}"})
+    # 開いた後の最初の 1 回と、上限の 1/10（10 件）ごと
+    assert len(counts) == 3
+    memory.close()
+
+
+def _load(batch: list[str]) -> int:
+    return sum(estimate_tokens(text) + 4 for text in batch)
+
+
+def test_pack_batches_uses_the_fewest_balanced_batches():
+    sources = [f"原文{i} " + "長い説明。" * (i % 17) for i in range(120)]
+    batches = pack_batches(sources, max_tokens=1500, max_items=40)
+    assert sorted(text for batch in batches for text in batch) == sorted(sources)
+    total = _load(sources)
+    assert len(batches) == max(-(-total // 1500), 3)
+    assert all(len(batch) <= 40 for batch in batches)
+    loads = [_load(batch) for batch in batches]
+    # 長い順にいちばん軽いバッチへ入れるので、差は最も長い 1 件を超えない
+    assert max(loads) - min(loads) <= max(estimate_tokens(text) + 4 for text in sources)
+
+
+def test_pack_batches_edge_cases():
+    assert pack_batches([], max_tokens=100, max_items=10) == []
+    assert pack_batches(["一つ"], max_tokens=100, max_items=10) == [["一つ"]]
+    # 1 件で上限を超える文字列も落とさない
+    huge = "とても長い。" * 500
+    assert sorted(sum(pack_batches([huge, "短い"], max_tokens=10, max_items=10), [])) == sorted([huge, "短い"])
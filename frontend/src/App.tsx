@@ -37,7 +37,6 @@ import {
   type AssistContext,
 } from "./services/api";
 import { computeNextActionProposals } from "./utils/nextActionProposals";
-import { computeDeltaSummary } from "./utils/mitigationDelta";
 import { useLanguage } from "./i18n/LanguageContext";
 import { useProject } from "./context/ProjectContext";
 import type { Locale } from "./i18n/translations";
@@ -117,7 +116,7 @@ export default function App() {
     } catch {}
   }, []);
 
-  const { result, loading, error, simulate, reset: resetSimulation } = useRiskSimulation();
+  const { result, provisional, loading, error, simulate, reset: resetSimulation } = useRiskSimulation();
 
   // プロジェクト（参加コード）が変わったら What-if はそのプロジェクト専用にするためクリア
   useEffect(() => {
@@ -179,24 +178,21 @@ export default function App() {
   );
 
   useEffect(() => {
-    if (activeStep !== 2 || !displayResult?.simulation_id) {
+    // 保存済みの結果はサーバーがセッション用の本文を組み立てるので、本文を取得するのは暫定結果のときだけ
+    if (activeStep !== 2 || !displayResult?.simulation_id || !displayResult.provisional) {
       setReportText(null);
       return;
     }
-    const adoptedTasks = (adoptedProposals ?? []).map((p) => ({
-      id: p.taskId ?? p.key,
-      risk_id: p.riskId,
-    }));
     const adoptedForPdf = (adoptedProposals ?? []).map((p) => ({
       id: p.taskId ?? p.key,
       who: "",
       action: p.title,
       risk_id: p.riskId,
     }));
-    const delta = computeDeltaSummary(displayResult, todoChecks, adoptedTasks.length > 0 ? adoptedTasks : undefined);
+    // 対策効果はサーバーが todoChecks・採用ToDo から集計する（delta は送らない）
     getReportText(
       displayResult,
-      delta,
+      null,
       siteCheckMemos?.length ? siteCheckMemos : undefined,
       todoChecks,
       adoptedForPdf.length > 0 ? adoptedForPdf : undefined,
@@ -251,6 +247,9 @@ export default function App() {
         ? nextActionProposals.map((p) => ({ title: p.title, reason: p.reason, source: p.source }))
         : undefined,
       report_text: reportText ?? undefined,
+      simulation_id: displayResult?.provisional ? undefined : displayResult?.simulation_id,
+      translation_locale: displayResult?.translation_locale ?? undefined,
+      todo_checks: displayResult?.provisional ? undefined : todoChecks,
       todo_checked_count: todo_total_count > 0 ? todo_checked_count : undefined,
       todo_total_count: todo_total_count > 0 ? todo_total_count : undefined,
       pins_count: pins.length,
@@ -602,6 +601,11 @@ export default function App() {
               <Typography variant="h6" sx={{ fontWeight: 600 }}>
                 {completionPhase ? t.loading.complete : t.loading.title}
               </Typography>
+              {provisional && !completionPhase && (
+                <Typography variant="body2" color="text.secondary">
+                  {t.loading.provisional(provisional.overall_risk_score.toFixed(1))}
+                </Typography>
+              )}
             </Box>
           </Fade>
         )}
@@ -688,7 +692,8 @@ export default function App() {
       </Box>
 
       <SettingsDialog open={settingsOpen} onClose={() => setSettingsOpen(false)} />
-      <AssistFab assistContext={assistContext} />
+      {/* 静的コンテキストはプロジェクトで共有し、会話メモリ・ストリームはタブごと（api.ts の client_id） */}
+      <AssistFab assistContext={assistContext} contextId={joinCode ?? displayResult?.simulation_id} />
     </Box>
   );
 }
@@ -13,7 +13,7 @@ import CloseIcon from "@mui/icons-material/Close";
 import SmartToyIcon from "@mui/icons-material/SmartToy";
 import SendIcon from "@mui/icons-material/Send";
 import { useLanguage } from "../i18n/LanguageContext";
-import { askAssist, type AssistContext } from "../services/api";
+import { streamAssist, type AssistContext } from "../services/api";
 
 const FAB_SIZE = 48;
 const PANEL_WIDTH = 340;
@@ -29,14 +29,18 @@ type MessageRole = "assistant" | "user";
 interface ChatMessage {
   role: MessageRole;
   text: string;
+  /** ストリーミング中の回答を追記する先の識別子 */
+  id?: number;
 }
 
 export interface AssistFabProps {
   /** Optional app state for context-aware next-action suggestions */
   assistContext?: AssistContext | null;
+  /** 静的コンテキストを共有する単位（参加コードまたはシミュレーション ID）。再送を省く。会話はタブごとに分かれる */
+  contextId?: string | null;
 }
 
-export default function AssistFab({ assistContext }: AssistFabProps = {}) {
+export default function AssistFab({ assistContext, contextId }: AssistFabProps = {}) {
   const { t } = useLanguage();
   const [fabX, setFabX] = useState(() => typeof window !== "undefined" ? window.innerWidth - FAB_SIZE - 16 : 300);
   const [fabY, setFabY] = useState(() => typeof window !== "undefined" ? window.innerHeight - FAB_SIZE - 80 : 300);
@@ -53,6 +57,9 @@ export default function AssistFab({ assistContext }: AssistFabProps = {}) {
   const panelDragRef = useRef({ active: false, startX: 0, startY: 0, startLeft: 0, startTop: 0 });
   const resizeRef = useRef({ active: false, startX: 0, startY: 0, startW: 0, startH: 0 });
   const fabClickRef = useRef({ downX: 0, downY: 0 });
+  // 回答ストリーミング中の質問。パネルを閉じる・次の質問を送ると abort して打ち切る
+  const streamRef = useRef<AbortController | null>(null);
+  const messageIdRef = useRef(0);
 
   // パネルを開いたときに挨拶がなければ1件追加
   useEffect(() => {
@@ -67,7 +74,13 @@ export default function AssistFab({ assistContext }: AssistFabProps = {}) {
 
   useEffect(() => {
     if (messages.length) scrollToBottom();
-  }, [messages.length, scrollToBottom]);
+  }, [messages, scrollToBottom]);
+
+  useEffect(() => {
+    if (!panelOpen) streamRef.current?.abort();
+  }, [panelOpen]);
+
+  useEffect(() => () => streamRef.current?.abort(), []);
 
   const handleFabMouseDown = useCallback((e: React.MouseEvent) => {
     e.preventDefault();
@@ -139,20 +152,34 @@ export default function AssistFab({ assistContext }: AssistFabProps = {}) {
 
   const handleSend = useCallback(async () => {
     const text = inputValue.trim();
-    if (!text || loading) return;
+    if (!text) return;
+    // 回答中に次の質問を送ったら前の回答は打ち切る（途中までの文は残す）
+    streamRef.current?.abort();
+    const controller = new AbortController();
+    streamRef.current = controller;
+    const id = ++messageIdRef.current;
     setInputValue("");
-    setMessages((prev) => [...prev, { role: "user", text }]);
+    setMessages((prev) => [...prev, { role: "user", text }, { role: "assistant", text: "", id }]);
     setLoading(true);
+    const append = (delta: string) => {
+      setLoading(false);
+      setMessages((prev) => prev.map((m) => (m.id === id ? { ...m, text: m.text + delta } : m)));
+    };
     try {
-      const answer = await askAssist(text, assistContext);
-      setMessages((prev) => [...prev, { role: "assistant", text: answer }]);
+      await streamAssist(text, assistContext, contextId, append, controller.signal);
     } catch (e) {
-      const errMsg = e instanceof Error ? e.message : t.assist.error;
-      setMessages((prev) => [...prev, { role: "assistant", text: `⚠️ ${errMsg}` }]);
+      if (!controller.signal.aborted) {
+        const errMsg = e instanceof Error ? e.message : t.assist.error;
+        setMessages((prev) => prev.map((m) => (m.id === id ? { ...m, text: m.text ? `${m.text}\n⚠️ ${errMsg}` : `⚠️ ${errMsg}` } : m)));
+      }
     } finally {
-      setLoading(false);
+      setMessages((prev) => prev.filter((m) => m.id !== id || m.text));
+      if (streamRef.current === controller) {
+        streamRef.current = null;
+        setLoading(false);
+      }
     }
-  }, [inputValue, loading, assistContext, t.assist.error]);
+  }, [inputValue, assistContext, contextId, t.assist.error]);
 
   return (
     <>
@@ -239,7 +266,7 @@ export default function AssistFab({ assistContext }: AssistFabProps = {}) {
               gap: 1.5,
             }}
           >
-            {messages.map((msg, i) => (
+            {messages.filter((msg) => msg.text).map((msg, i) => (
               <Box
                 key={i}
                 sx={{
@@ -333,7 +360,6 @@ export default function AssistFab({ assistContext }: AssistFabProps = {}) {
               }}
               multiline
               maxRows={3}
-              disabled={loading}
               variant="outlined"
               sx={{
                 "& .MuiOutlinedInput-root": {
@@ -345,7 +371,7 @@ export default function AssistFab({ assistContext }: AssistFabProps = {}) {
             <IconButton
               color="primary"
               onClick={handleSend}
-              disabled={loading || !inputValue.trim()}
+              disabled={!inputValue.trim()}
               sx={{ flexShrink: 0, bgcolor: "primary.main", color: "primary.contrastText", "&:hover": { bgcolor: "primary.dark" }, "&.Mui-disabled": { bgcolor: "grey.300", color: "grey.500" } }}
               aria-label={t.assist.send}
             >
@@ -3,7 +3,9 @@ import Box from "@mui/material/Box";
 import Button from "@mui/material/Button";
 import Card from "@mui/material/Card";
 import CardContent from "@mui/material/CardContent";
+import Checkbox from "@mui/material/Checkbox";
 import FormControl from "@mui/material/FormControl";
+import FormControlLabel from "@mui/material/FormControlLabel";
 import Grid from "@mui/material/Grid2";
 import IconButton from "@mui/material/IconButton";
 import InputLabel from "@mui/material/InputLabel";
@@ -20,7 +22,7 @@ import type { SelectChangeEvent } from "@mui/material/Select";
 
 import { EventType, AudienceType } from "../types";
 import type { MissionConfig } from "../types";
-import { UserRole, AlertThreshold } from "../types";
+import { UserRole, AlertThreshold, AnalysisTier } from "../types";
 import { useLanguage } from "../i18n/LanguageContext";
 import { fetchTemplates, validateInput } from "../services/api";
 import type { ScenarioTemplate, ValidationIssue } from "../services/api";
@@ -42,6 +44,7 @@ const DEFAULT_CONFIG: MissionConfig = {
   additional_notes: "",
   role: UserRole.ORGANIZER,
   alert_threshold: AlertThreshold.STANDARD,
+  analysis_tier: AnalysisTier.STANDARD,
 };
 
 function normalizeMissionConfig(initial?: MissionConfig): MissionConfig {
@@ -356,6 +359,36 @@ export default function MissionSetup({
                 </Typography>
               </Popover>
             </Grid>
+            <Grid size={{ xs: 12, sm: 6 }}>
+              <FormControl fullWidth>
+                <InputLabel>{t.mission.analysisTier}</InputLabel>
+                <Select
+                  value={config.analysis_tier ?? AnalysisTier.STANDARD}
+                  label={t.mission.analysisTier}
+                  onChange={handleSelectChange("analysis_tier")}
+                >
+                  {Object.values(AnalysisTier).map((val) => (
+                    <MenuItem key={val} value={val}>
+                      {t.mission.analysisTierOptions[val] ?? val}
+                    </MenuItem>
+                  ))}
+                </Select>
+              </FormControl>
+            </Grid>
+            <Grid size={{ xs: 12, sm: 6 }}>
+              <FormControlLabel
+                control={
+                  <Checkbox
+                    checked={config.bilingual ?? false}
+                    onChange={(e) => setConfig((prev) => ({ ...prev, bilingual: e.target.checked }))}
+                  />
+                }
+                label={t.mission.bilingual}
+              />
+              <Typography variant="caption" color="text.secondary" sx={{ display: "block", ml: 4 }}>
+                {t.mission.bilingualDescription}
+              </Typography>
+            </Grid>
           </Grid>
         </CardContent>
       </Card>
@@ -35,8 +35,8 @@ import type { WhatIfCase } from "../types/whatIf";
 import type { SiteCheckItem } from "../types/siteCheck";
 import { RiskCategory, RISK_CATEGORY_COLORS } from "../types";
 import { useLanguage } from "../i18n/LanguageContext";
-import { downloadReportPdf } from "../services/api";
-import { computeDeltaSummary } from "../utils/mitigationDelta";
+import { downloadReportBundle, downloadReportPdf } from "../services/api";
+import { useMitigationSummary } from "../hooks/useMitigationSummary";
 import { PIN_TYPE_IDS, getPinTypeLabel } from "../utils/pins";
 
 import MapView from "./MapView";
@@ -310,6 +310,11 @@ export default function RiskDashboard({
   );
 
   const effectiveTodoChecks = isInProject ? (todoChecks ?? {}) : localTodoChecks;
+  const adoptedTaskRefs = useMemo(
+    () => tasksForList.map((t) => ({ id: t.id, risk_id: t.risk_id })),
+    [tasksForList],
+  );
+  const mitigationSummary = useMitigationSummary(data, effectiveTodoChecks, adoptedTaskRefs);
   const handleTodoCheckEffective = useCallback(
     (taskId: string, checked: boolean) => {
       if (isInProject && onTodoCheck) {
@@ -354,7 +359,7 @@ export default function RiskDashboard({
   const handleExportPdf = useCallback(async () => {
     setPdfLoading(true);
     try {
-      const delta = computeDeltaSummary(data, effectiveTodoChecks);
+      const delta = mitigationSummary;
       const adoptedForPdf = adoptedAsTasks.map((t) => ({
         id: t.id,
         who: t.who,
@@ -367,20 +372,22 @@ export default function RiskDashboard({
         memo: pin.memo,
         type: pin.type,
       }));
-      const blob = await downloadReportPdf(
-        data,
-        pdfVariant,
+      const isBundle = pdfVariant === "bundle";
+      const overlays = [
         delta,
         siteCheckMemos,
         effectiveTodoChecks,
         adoptedForPdf.length > 0 ? adoptedForPdf : undefined,
         pinsForPdf.length > 0 ? pinsForPdf : undefined,
-      );
+      ] as const;
+      const blob = isBundle
+        ? await downloadReportBundle(data, null, ...overlays)
+        : await downloadReportPdf(data, pdfVariant, ...overlays);
       const url = URL.createObjectURL(blob);
       const a = document.createElement("a");
       a.href = url;
       const simId = (data.simulation_id || "").slice(0, 8) || "report";
-      a.download = `FlowGuard_Report_${(data.event_name || "Report").replace(/\s+/g, "_").slice(0, 30)}_${simId}.pdf`;
+      a.download = `FlowGuard_Report_${(data.event_name || "Report").replace(/\s+/g, "_").slice(0, 30)}_${simId}.${isBundle ? "zip" : "pdf"}`;
       a.click();
       URL.revokeObjectURL(url);
     } catch (err) {
@@ -389,7 +396,7 @@ export default function RiskDashboard({
     } finally {
       setPdfLoading(false);
     }
-  }, [data, pdfVariant, effectiveTodoChecks, siteCheckMemos, adoptedAsTasks, pins]);
+  }, [data, pdfVariant, mitigationSummary, effectiveTodoChecks, siteCheckMemos, adoptedAsTasks, pins]);
 
   const handleToggleCategory = useCallback((cat: RiskCategory) => {
     setVisibleCategories((prev) => {
@@ -569,6 +576,7 @@ export default function RiskDashboard({
             >
               <MenuItem value="full">{t.dashboardExtra.pdfFull}</MenuItem>
               <MenuItem value="one_page">{t.dashboardExtra.pdfOnePage}</MenuItem>
+              <MenuItem value="bundle">{t.dashboardExtra.pdfBundle}</MenuItem>
             </Select>
           </FormControl>
           <Button
@@ -604,7 +612,7 @@ export default function RiskDashboard({
             onToggleCategory={handleToggleCategory}
             riskCountByCategory={data.risk_count_by_category}
             overallScore={data.overall_risk_score ?? 0}
-            overallScoreAfter={computeDeltaSummary(data, effectiveTodoChecks).riskScoreAfter}
+            overallScoreAfter={mitigationSummary.riskScoreAfter}
           />
           <Divider />
           <FormControl size="small" fullWidth sx={{ px: 2, pt: 1 }}>
@@ -849,14 +857,14 @@ export default function RiskDashboard({
               onProposalDecision={handleProposalDecision}
               onAdoptProposal={handleAdoptProposal}
               onShowMeasuresPanel={() => setRightPanelTab(1)}
-              adoptedTasks={tasksForList.map((t) => ({ id: t.id, risk_id: t.risk_id }))}
+              adoptedTasks={adoptedTaskRefs}
             />
           </Box>
           <Box id="right-panel-1" role="tabpanel" hidden={rightPanelTab !== 1} sx={{ flex: 1, minHeight: 0, overflow: "auto" }}>
             <MeasuresAndNextActionsPanel
               data={data}
+              deltaSummary={mitigationSummary}
               todoChecks={effectiveTodoChecks}
-              adoptedTasks={tasksForList.map((t) => ({ id: t.id, risk_id: t.risk_id }))}
               eventDateIso={eventDateIso}
               proposalDecisionLog={effectiveProposalDecisionLog}
               onProposalDecision={handleProposalDecision}
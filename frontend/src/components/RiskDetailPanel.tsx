@@ -23,10 +23,11 @@ import type { RiskFactorBreakdown } from "../types";
 import { RiskCategory, RISK_CATEGORY_COLORS } from "../types";
 import { useLanguage } from "../i18n/LanguageContext";
 import {
-  computeDeltaSummary,
+  baselineDeltaSummary,
   computeEffectiveTimeSlots,
   countResolvedTodos,
   type AdoptedTaskRef,
+  type DeltaSummary,
 } from "../utils/mitigationDelta";
 import {
   type NextActionProposal,
@@ -208,8 +209,8 @@ function SummaryView({
 
 export function MeasuresAndNextActionsPanel({
   data,
+  deltaSummary,
   todoChecks,
-  adoptedTasks,
   eventDateIso,
   proposalDecisionLog,
   onProposalDecision,
@@ -217,8 +218,9 @@ export function MeasuresAndNextActionsPanel({
   onAdoptProposal,
 }: {
   data: SimulationResponse;
+  /** サーバーの対策効果エンジンの集計（useMitigationSummary） */
+  deltaSummary?: DeltaSummary | null;
   todoChecks?: Record<string, boolean> | null;
-  adoptedTasks?: AdoptedTaskRef[] | null;
   eventDateIso?: string | null;
   proposalDecisionLog?: ProposalDecisionEntry[];
   onProposalDecision?: (key: string, decision: "adopted" | "rejected" | "deferred") => void;
@@ -226,7 +228,7 @@ export function MeasuresAndNextActionsPanel({
   onAdoptProposal?: (proposal: NextActionProposal) => void;
 }) {
   const { t } = useLanguage();
-  const delta = computeDeltaSummary(data, todoChecks, adoptedTasks);
+  const delta = deltaSummary ?? baselineDeltaSummary(data);
   const proposals = computeNextActionProposals(data, todoChecks, eventDateIso, proposalDecisionLog ?? [], t.proposals);
   const sectionSx = { mb: 2 };
   const headingSx = { fontWeight: 600, mb: 0.75, fontSize: "0.875rem", color: "text.primary" };
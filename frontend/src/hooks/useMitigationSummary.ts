@@ -0,0 +1,76 @@
+// ---------------------------------------------------------------------------
+// FlowGuard AI - Mitigation Summary Hook
+// ---------------------------------------------------------------------------
+
+import { useEffect, useRef, useState } from "react";
+import type { SimulationResponse } from "../types";
+import { syncMitigationChecks, toggleMitigationTask, type ServerDeltaSummary } from "../services/api";
+import { baselineDeltaSummary, type AdoptedTaskRef, type DeltaSummary } from "../utils/mitigationDelta";
+
+/**
+ * サーバーの対策効果エンジンの集計（対策前→対策後）を返す。
+ * シミュレーション・採用ToDo が変わったら全体を同期し、チェックが 1 件だけ変わったときは toggle だけ送る。
+ * サーバーの状態はプロセス内の共有キャッシュ（別タブ・別インスタンス・読み直しでずれる）なので、toggle には
+ * 直前の応答の revision を添え、合わなければ（409 など失敗したら）手元のチェック全体で同期し直す。
+ * 応答が届くまでと、サーバーに保存されない暫定結果では対策前の値（baselineDeltaSummary）を返す。
+ */
+export function useMitigationSummary(
+  data: SimulationResponse | null | undefined,
+  todoChecks: Record<string, boolean> | null | undefined,
+  adoptedTasks?: AdoptedTaskRef[] | null,
+): DeltaSummary {
+  const [summary, setSummary] = useState<ServerDeltaSummary | null>(null);
+  const [summaryFor, setSummaryFor] = useState<string | null>(null);
+  const simulationId = data && !data.provisional ? data.simulation_id : null;
+  const adoptedKey = JSON.stringify((adoptedTasks ?? []).map((t) => [t.id, t.risk_id ?? ""]));
+  // 最後にサーバーへ送った状態（差分が 1 件なら toggle で済ませる）
+  const sent = useRef<{ simulationId: string; adoptedKey: string; checks: Record<string, boolean> } | null>(null);
+  // 最後に受け取ったサーバーの状態の版（toggle に添える）
+  const revision = useRef<string | null>(null);
+  const requestSeq = useRef(0);
+
+  useEffect(() => {
+    if (!simulationId) {
+      sent.current = null;
+      revision.current = null;
+      return;
+    }
+    const checks = Object.fromEntries(Object.entries(todoChecks ?? {}).filter(([, v]) => v === true));
+    const prev = sent.current;
+    const syncAll = () => syncMitigationChecks(simulationId, checks, adoptedTasks ?? []);
+    let call: Promise<ServerDeltaSummary>;
+    if (prev && prev.simulationId === simulationId && prev.adoptedKey === adoptedKey) {
+      const changed = [...new Set([...Object.keys(prev.checks), ...Object.keys(checks)])].filter(
+        (id) => Boolean(prev.checks[id]) !== Boolean(checks[id]),
+      );
+      if (changed.length === 0) return;
+      const base = revision.current;
+      call =
+        changed.length === 1 && base
+          ? toggleMitigationTask(simulationId, changed[0], Boolean(checks[changed[0]]), base).catch(syncAll)
+          : syncAll();
+    } else {
+      call = syncAll();
+    }
+    sent.current = { simulationId, adoptedKey, checks };
+    // 応答が来るまでの次の変更は全体を同期する（同じ revision で toggle を重ねない）
+    revision.current = null;
+    const seq = ++requestSeq.current;
+    call
+      .then((next) => {
+        if (seq !== requestSeq.current) return;
+        revision.current = next.revision ?? null;
+        setSummary(next);
+        setSummaryFor(simulationId);
+      })
+      .catch((e) => {
+        // 次の変更で全体を同期し直す
+        sent.current = null;
+        console.error("[FlowGuard] mitigation summary", e);
+      });
+    // adoptedTasks は中身（adoptedKey）で比較する
+  }, [simulationId, adoptedKey, todoChecks]);
+
+  if (!summary || summaryFor !== simulationId) return baselineDeltaSummary(data);
+  return summary;
+}
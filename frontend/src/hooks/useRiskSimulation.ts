@@ -4,10 +4,12 @@
 
 import { useCallback, useState } from "react";
 import type { LatLng, MissionConfig, SimulationResponse } from "../types";
-import { runSimulation } from "../services/api";
+import { runPreAssessment, runSimulation } from "../services/api";
 
 interface UseRiskSimulationReturn {
   result: SimulationResponse | null;
+  /** AI 分析中に表示する暫定結果。AI の結果が届くと null に戻る */
+  provisional: SimulationResponse | null;
   loading: boolean;
   error: string | null;
   simulate: (
@@ -20,6 +22,7 @@ interface UseRiskSimulationReturn {
 
 export function useRiskSimulation(): UseRiskSimulationReturn {
   const [result, setResult] = useState<SimulationResponse | null>(null);
+  const [provisional, setProvisional] = useState<SimulationResponse | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
@@ -28,25 +31,35 @@ export function useRiskSimulation(): UseRiskSimulationReturn {
       setLoading(true);
       setError(null);
       setResult(null);
+      setProvisional(null);
 
+      let settled = false;
       try {
         const dateTime =
           config.date_time ??
           (config.event_date && config.start_time && config.end_time
             ? `${config.event_date} ${config.start_time}–${config.end_time}`
             : "");
-        const response = await runSimulation({
+        const payload = {
           ...config,
           date_time: dateTime,
           polygon,
           locale,
-        });
+        };
+        runPreAssessment(payload)
+          .then((preview) => {
+            if (!settled) setProvisional(preview);
+          })
+          .catch(() => {});
+        const response = await runSimulation(payload);
         setResult(response);
       } catch (err) {
         const message =
           err instanceof Error ? err.message : "Simulation failed";
         setError(message);
       } finally {
+        settled = true;
+        setProvisional(null);
         setLoading(false);
       }
     },
@@ -55,9 +68,10 @@ export function useRiskSimulation(): UseRiskSimulationReturn {
 
   const reset = useCallback(() => {
     setResult(null);
+    setProvisional(null);
     setError(null);
     setLoading(false);
   }, []);
 
-  return { result, loading, error, simulate, reset };
+  return { result, provisional, loading, error, simulate, reset };
 }
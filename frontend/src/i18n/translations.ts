@@ -83,6 +83,10 @@ export interface TranslationStrings {
     alertOptions: Record<string, string>;
     alertThresholdDescription: string;
     alertThresholdHelpLabel: string;
+    bilingual: string;
+    bilingualDescription: string;
+    analysisTier: string;
+    analysisTierOptions: Record<string, string>;
   };
   area: {
     title: string;
@@ -98,6 +102,8 @@ export interface TranslationStrings {
     description: string;
     steps: string[];
     complete: string;
+    /** AI 分析前の暫定スコア表示 */
+    provisional: (score: string) => string;
   };
   error: {
     startOver: string;
@@ -309,6 +315,7 @@ export interface TranslationStrings {
     noRisksMessage: string;
     pdfFull: string;
     pdfOnePage: string;
+    pdfBundle: string;
     translatingContent: string;
   };
   /** 次にやるべき確認・対策の提案文（locale に応じて表示） */
@@ -424,6 +431,14 @@ const ja: TranslationStrings = {
     alertOptions: { conservative: "保守的", standard: "標準", aggressive: "攻め" },
     alertThresholdDescription: "リスク検出の感度です。保守的＝やや厳しめに多く検出、標準＝バランス、攻め＝重要度の高いものに絞って検出。分析結果の件数や推奨の出方に影響します。",
     alertThresholdHelpLabel: "説明",
+    bilingual: "日本語と英語を同時に生成",
+    bilingualDescription: "解析時に英語の文面も同時に生成します。英語表示への切り替えが翻訳待ちなしで即座に行えます（解析の出力量は増えます）。",
+    analysisTier: "解析の深さ",
+    analysisTierOptions: {
+      fast: "高速（数秒〜15 秒・企画初期の確認）",
+      standard: "標準（30〜90 秒）",
+      deep: "詳細（1〜3 分・最終レビュー）",
+    },
   },
   area: {
     title: "イベントエリアの指定",
@@ -450,6 +465,7 @@ const ja: TranslationStrings = {
       "最終レポートを生成中...",
     ],
     complete: "完了",
+    provisional: (score: string) => `暫定リスクスコア ${score} / 10（AI 分析完了後に置き換わります）`,
   },
   error: {
     startOver: "最初からやり直す",
@@ -684,6 +700,7 @@ const ja: TranslationStrings = {
     noRisksMessage: "リスクは検出されませんでした。エリアや設定を変えて再実行してみてください。",
     pdfFull: "フルレポート",
     pdfOnePage: "1枚サマリー",
+    pdfBundle: "一式（ZIP）",
     translatingContent: "翻訳中…",
   },
   proposals: {
@@ -798,6 +815,14 @@ const en: TranslationStrings = {
     alertOptions: { conservative: "Conservative", standard: "Standard", aggressive: "Aggressive" },
     alertThresholdDescription: "Sensitivity for risk detection. Conservative = detect more (stricter), Standard = balanced, Aggressive = focus on higher-priority risks. Affects how many risks are listed and which recommendations appear.",
     alertThresholdHelpLabel: "Help",
+    bilingual: "Generate Japanese and English together",
+    bilingualDescription: "Also writes the English text during the analysis, so switching the display to English is instant with no translation step (the analysis output is larger).",
+    analysisTier: "Analysis depth",
+    analysisTierOptions: {
+      fast: "Fast (seconds, early planning check)",
+      standard: "Standard (30-90 s)",
+      deep: "Deep (1-3 min, final review)",
+    },
   },
   area: {
     title: "Designate Event Area",
@@ -824,6 +849,7 @@ const en: TranslationStrings = {
       "Generating final report...",
     ],
     complete: "Complete",
+    provisional: (score: string) => `Provisional risk score ${score} / 10 (replaced when the AI analysis completes)`,
   },
   error: {
     startOver: "Start Over",
@@ -1058,6 +1084,7 @@ const en: TranslationStrings = {
     noRisksMessage: "No risks detected. Try changing the area or settings and run again.",
     pdfFull: "Full report",
     pdfOnePage: "One-page summary",
+    pdfBundle: "All reports (ZIP)",
     translatingContent: "Translating…",
   },
   proposals: {
@@ -1,4 +1,5 @@
 import type { LatLng, MissionConfig, SimulationRequest, SimulationResponse } from "../types";
+import type { AdoptedTaskRef, DeltaSummary } from "../utils/mitigationDelta";
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL ?? "";
 
@@ -11,13 +12,20 @@ const SIMULATE_TIMEOUT_MS = (() => {
   return 240_000;
 })();
 
+function jsonHeaders(extra?: Record<string, string>): Record<string, string> {
+  return {
+    "Content-Type": "application/json",
+    ...extra,
+  };
+}
+
 async function request<T>(
   path: string,
   options?: RequestInit,
 ): Promise<T> {
   const url = `${API_BASE}${path}`;
   const res = await fetch(url, {
-    headers: { "Content-Type": "application/json" },
+    headers: jsonHeaders(),
     ...options,
   });
 
@@ -50,6 +58,9 @@ const ASSIST_TIMEOUT_MS = 30_000;
  * - todos: 対策ToDo一覧（アクション・担当・完了有無）
  * - next_action_proposals: 次にやるべき確認・対策（未完了重要ToDo・期限超過・高リスク時間帯から算出）
  * - todo_checked_count, todo_total_count, pins_count, map_todos_count: 進捗・地図上の数
+ *
+ * event_name, summary, recommendations, risks, report_text はプロジェクトで共有する静的コンテキスト
+ * （askAssist の contextId）としてサーバーに保持され、内容が変わらない限り 2 回目以降は送らない。
  */
 
 /** リスク1件（アシスト用）。深刻度・重要度・緊急度・説明・対策案を渡す */
@@ -94,36 +105,180 @@ export interface AssistContext {
   next_action_proposals?: AssistContextNextAction[];
   /** PDFフル版と同じ構成のレポート本文。具体的な質問にはこれを基に回答する */
   report_text?: string;
+  /** report_text が無い場合、サーバーはこの ID の保存済み結果から本文を組み立てる */
+  simulation_id?: string;
+  translation_locale?: string | null;
+  todo_checks?: Record<string, boolean>;
   todo_checked_count?: number;
   todo_total_count?: number;
   pins_count?: number;
   map_todos_count?: number;
 }
 
-export async function askAssist(question: string, context?: AssistContext | null): Promise<string> {
-  const url = `${API_BASE}/api/assist`;
-  const controller = new AbortController();
-  const timeoutId = setTimeout(() => controller.abort(), ASSIST_TIMEOUT_MS);
-  const body: { question: string; context?: AssistContext } = { question: question.trim() };
-  if (context && Object.keys(context).length > 0) body.context = context;
-  try {
-    const res = await fetch(url, {
+/** セッションに保持される（質問ごとに送り直さない）コンテキストのキー。サーバーの STATIC_CONTEXT_KEYS と対応 */
+const ASSIST_STATIC_KEYS = ["event_name", "summary", "recommendations", "risks", "report_text"] as const;
+
+/** このタブの ID。同じプロジェクトの別の参加者・別のタブの質問でストリームが打ち切られないよう、サーバーはこれで区別する */
+const ASSIST_CLIENT_ID =
+  crypto.randomUUID?.() ?? `tab-${Date.now()}-${Math.random().toString(36).slice(2, 10)}`;
+
+/** contextId → { サーバーが返した context_digest, そのとき送った静的コンテキスト } */
+const assistSessions = new Map<string, { digest: string; staticJson: string }>();
+
+function splitAssistContext(context: AssistContext): { staticJson: string; light: AssistContext } {
+  const picked: Record<string, unknown> = {};
+  const light: Record<string, unknown> = { ...context };
+  for (const key of ASSIST_STATIC_KEYS) {
+    picked[key] = context[key];
+    delete light[key];
+  }
+  return { staticJson: JSON.stringify(picked), light: light as AssistContext };
+}
+
+/**
+ * /api/assist・/api/assist/stream に POST する。contextId（body の session_id）は静的コンテキストの単位でプロジェクトの
+ * 参加者が共有し、会話メモリとストリームの打ち切りはタブごとの client_id で分かれる。contextId があり静的コンテキストが前回と同じなら
+ * context_digest だけを送り、サーバー側のセッションが切れていれば（409）全文で 1 回だけ送り直す。
+ */
+async function postAssist(
+  path: string,
+  question: string,
+  context: AssistContext | null | undefined,
+  contextId: string | null | undefined,
+  signal: AbortSignal,
+): Promise<{ res: Response; remember: (digest: string | null | undefined) => void }> {
+  const url = `${API_BASE}${path}`;
+  const hasContext = Boolean(context && Object.keys(context).length > 0);
+  const split = hasContext && contextId ? splitAssistContext(context as AssistContext) : null;
+  const known = contextId ? assistSessions.get(contextId) : undefined;
+
+  const send = (light: boolean): Promise<Response> => {
+    const body: {
+      question: string;
+      context?: AssistContext;
+      session_id?: string;
+      client_id: string;
+      context_digest?: string;
+    } = { question: question.trim(), client_id: ASSIST_CLIENT_ID };
+    if (hasContext) body.context = light && split ? split.light : (context as AssistContext);
+    if (contextId) body.session_id = contextId;
+    if (light && known) body.context_digest = known.digest;
+    return fetch(url, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify(body),
-      signal: controller.signal,
+      signal,
     });
-    clearTimeout(timeoutId);
-    if (!res.ok) {
-      const err = await res.json().catch(() => ({}));
-      throw new Error((err as { detail?: string }).detail ?? `HTTP ${res.status}`);
+  };
+
+  const canSendLight = Boolean(split && known && known.staticJson === split.staticJson);
+  let res = await send(canSendLight);
+  if (res.status === 409 && canSendLight) {
+    assistSessions.delete(contextId as string);
+    res = await send(false);
+  }
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({}));
+    throw new Error((err as { detail?: string }).detail ?? `HTTP ${res.status}`);
+  }
+  const remember = (digest: string | null | undefined) => {
+    if (contextId && split && digest) {
+      assistSessions.set(contextId, { digest, staticJson: split.staticJson });
     }
-    const data = (await res.json()) as { answer?: string };
+  };
+  return { res, remember };
+}
+
+/**
+ * アシストに質問する。contextId（静的コンテキストを共有する単位。プロジェクトの参加コードやシミュレーション ID）を渡すと、
+ * 2 回目以降は静的コンテキスト（要約・リスク・レポート本文）を省いて context_digest だけを送る。
+ */
+export async function askAssist(
+  question: string,
+  context?: AssistContext | null,
+  contextId?: string | null,
+): Promise<string> {
+  const controller = new AbortController();
+  const timeoutId = setTimeout(() => controller.abort(), ASSIST_TIMEOUT_MS);
+  try {
+    const { res, remember } = await postAssist("/api/assist", question, context, contextId, controller.signal);
+    const data = (await res.json()) as { answer?: string; context_digest?: string | null };
+    remember(data.context_digest);
     return typeof data.answer === "string" ? data.answer : "回答を取得できませんでした。";
   } catch (e) {
+    if (e instanceof Error) throw e;
+    throw new Error("Assistant request failed.");
+  } finally {
     clearTimeout(timeoutId);
+  }
+}
+
+/** ストリーミング回答の計測値（サーバーの done イベント）。ttft_ms は最初の断片まで、total_ms は全体 */
+export interface AssistStreamTiming {
+  ttft_ms: number;
+  total_ms: number;
+  chars: number;
+}
+
+/**
+ * アシストに質問し、回答を届いた断片ごとに onDelta に渡す（/api/assist/stream の Server-Sent Events）。
+ * signal を abort すると（パネルを閉じた・次の質問を送った）接続を切り、サーバー側のモデル呼び出しも止まる。
+ * 返り値は全文と計測値。サーバー側で打ち切られた場合（同じタブの新しい質問）は cancelled: true。
+ */
+export async function streamAssist(
+  question: string,
+  context: AssistContext | null | undefined,
+  contextId: string | null | undefined,
+  onDelta: (text: string) => void,
+  signal?: AbortSignal,
+): Promise<{ answer: string; timing: AssistStreamTiming | null; cancelled: boolean }> {
+  const controller = new AbortController();
+  const abort = () => controller.abort();
+  signal?.addEventListener("abort", abort);
+  // 最初の断片までは通常のタイムアウト。以降は断片・ping が届く限り待つ
+  let timeoutId = setTimeout(abort, ASSIST_TIMEOUT_MS);
+  let answer = "";
+  let timing: AssistStreamTiming | null = null;
+  let cancelled = false;
+  try {
+    const { res, remember } = await postAssist("/api/assist/stream", question, context, contextId, controller.signal);
+    if (!res.body) throw new Error("Assistant request failed.");
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      clearTimeout(timeoutId);
+      timeoutId = setTimeout(abort, ASSIST_TIMEOUT_MS);
+      buffer += value;
+      let sep: number;
+      while ((sep = buffer.indexOf("\n\n")) >= 0) {
+        const block = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        let name = "message";
+        let data = "";
+        for (const line of block.split("\n")) {
+          if (line.startsWith("event: ")) name = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        if (!data) continue;
+        const payload = JSON.parse(data) as Record<string, unknown>;
+        if (name === "meta") remember(payload.context_digest as string | null);
+        else if (name === "delta") {
+          answer += payload.text as string;
+          onDelta(payload.text as string);
+        } else if (name === "done") timing = payload as unknown as AssistStreamTiming;
+        else if (name === "cancelled") cancelled = true;
+        else if (name === "error") throw new Error((payload.message as string) ?? "Assistant request failed.");
+      }
+    }
+    return { answer, timing, cancelled };
+  } catch (e) {
     if (e instanceof Error) throw e;
     throw new Error("Assistant request failed.");
+  } finally {
+    clearTimeout(timeoutId);
+    signal?.removeEventListener("abort", abort);
   }
 }
 
@@ -149,6 +304,8 @@ export function buildSimulationRequest(
     locale,
     role: config.role,
     alert_threshold: config.alert_threshold,
+    bilingual: config.bilingual ?? false,
+    analysis_tier: config.analysis_tier,
   };
 }
 
@@ -160,7 +317,7 @@ export async function runSimulation(
   try {
     const res = await fetch(`${API_BASE}/api/simulate`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify(payload),
       signal: controller.signal,
     });
@@ -184,6 +341,16 @@ export async function runSimulation(
   }
 }
 
+/** LLM を待たずに返るルールベースの暫定結果（provisional=true）。AI の結果が届いたら置き換える */
+export async function runPreAssessment(
+  payload: SimulationRequest,
+): Promise<SimulationResponse> {
+  return request("/api/simulate/preview", {
+    method: "POST",
+    body: JSON.stringify(payload),
+  });
+}
+
 export async function fetchConfig(): Promise<{ google_maps_api_key: string }> {
   return request("/api/config");
 }
@@ -258,14 +425,58 @@ export interface PinForPdf {
   type?: string;
 }
 
+/** レポート系リクエストの差分部分（本文以外） */
+function reportOverlays(
+  deltaSummary?: PdfDeltaSummary | null,
+  siteCheckMemos?: SiteCheckItemForPdf[] | null,
+  todoChecks?: Record<string, boolean> | null,
+  adoptedTodos?: AdoptedTodoForPdf[] | null,
+  pins?: PinForPdf[] | null,
+): Record<string, unknown> {
+  const body: Record<string, unknown> = {};
+  if (deltaSummary) body.delta_summary = deltaSummary;
+  if (siteCheckMemos && siteCheckMemos.length > 0) body.site_check_memos = siteCheckMemos;
+  if (todoChecks && typeof todoChecks === "object") body.todo_checks = todoChecks;
+  if (adoptedTodos && adoptedTodos.length > 0) body.adopted_todos = adoptedTodos;
+  if (pins && pins.length > 0) body.pins = pins;
+  return body;
+}
+
+/**
+ * サーバーに保存済みの結果を simulation_id で参照して送る（本文は送らない）。
+ * サーバーが結果を持っていない（404）場合だけ本文ごと送り直す。
+ */
+async function postWithStoredResult(
+  url: string,
+  payload: SimulationResponse,
+  overlays: Record<string, unknown>,
+  extraHeaders?: Record<string, string>,
+): Promise<Response> {
+  const post = (body: Record<string, unknown>) =>
+    fetch(url, {
+      method: "POST",
+      headers: jsonHeaders(extraHeaders),
+      body: JSON.stringify(body),
+    });
+  if (payload.simulation_id && !payload.provisional) {
+    const res = await post({
+      simulation_id: payload.simulation_id,
+      translation_locale: payload.translation_locale ?? null,
+      ...overlays,
+    });
+    if (res.status !== 404) return res;
+  }
+  const body: Record<string, unknown> = { ...payload, ...overlays };
+  if (!body.simulation_id || typeof body.simulation_id !== "string") {
+    body.simulation_id = `fg-${Date.now()}-${Math.random().toString(36).slice(2, 10)}`;
+  }
+  return post(body);
+}
+
 export async function translateSimulationResponse(
   payload: SimulationResponse,
 ): Promise<SimulationResponse> {
-  const res = await fetch(`${API_BASE}/api/translate-simulation`, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload),
-  });
+  const res = await postWithStoredResult(`${API_BASE}/api/translate-simulation`, payload, {});
   const text = await res.text();
   if (!res.ok) {
     let detail = `HTTP ${res.status}`;
@@ -292,6 +503,10 @@ export async function translateSimulationResponse(
   return translated as SimulationResponse;
 }
 
+/** 直近にダウンロードした PDF（ETag 付き）。同じ内容なら 304 で本文の再送を省く */
+const PDF_CACHE_MAX = 8;
+const pdfCache = new Map<string, { etag: string; blob: Blob }>();
+
 export async function downloadReportPdf(
   payload: import("../types").SimulationResponse,
   variant?: string,
@@ -302,20 +517,16 @@ export async function downloadReportPdf(
   pins?: PinForPdf[] | null,
 ): Promise<Blob> {
   const url = variant ? `${API_BASE}/api/report/pdf?variant=${encodeURIComponent(variant)}` : `${API_BASE}/api/report/pdf`;
-  const body: Record<string, unknown> = { ...payload };
-  if (!body.simulation_id || typeof body.simulation_id !== "string") {
-    body.simulation_id = `fg-${Date.now()}-${Math.random().toString(36).slice(2, 10)}`;
-  }
-  if (deltaSummary) body.delta_summary = deltaSummary;
-  if (siteCheckMemos && siteCheckMemos.length > 0) body.site_check_memos = siteCheckMemos;
-  if (todoChecks && typeof todoChecks === "object") body.todo_checks = todoChecks;
-  if (adoptedTodos && adoptedTodos.length > 0) body.adopted_todos = adoptedTodos;
-  if (pins && pins.length > 0) body.pins = pins;
-  const res = await fetch(url, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(body),
-  });
+  const overlays = reportOverlays(deltaSummary, siteCheckMemos, todoChecks, adoptedTodos, pins);
+  const cacheKey = JSON.stringify([url, payload.simulation_id, payload.translation_locale ?? null, overlays]);
+  const cached = pdfCache.get(cacheKey);
+  const res = await postWithStoredResult(
+    url,
+    payload,
+    overlays,
+    cached ? { "If-None-Match": cached.etag } : undefined,
+  );
+  if (res.status === 304 && cached) return cached.blob;
   if (!res.ok) {
     const text = await res.text();
     let detail = `HTTP ${res.status}`;
@@ -327,9 +538,76 @@ export async function downloadReportPdf(
     }
     throw new Error(detail);
   }
+  const blob = await res.blob();
+  const etag = res.headers.get("ETag");
+  if (etag) {
+    pdfCache.set(cacheKey, { etag, blob });
+    if (pdfCache.size > PDF_CACHE_MAX) pdfCache.delete(pdfCache.keys().next().value as string);
+  }
+  return blob;
+}
+
+/** 複数 variant の PDF を 1 リクエストで ZIP として取得する（省略時は full・1枚サマリー・役割別 4 種） */
+export async function downloadReportBundle(
+  payload: SimulationResponse,
+  variants?: string[] | null,
+  deltaSummary?: PdfDeltaSummary | null,
+  siteCheckMemos?: SiteCheckItemForPdf[] | null,
+  todoChecks?: Record<string, boolean> | null,
+  adoptedTodos?: AdoptedTodoForPdf[] | null,
+  pins?: PinForPdf[] | null,
+): Promise<Blob> {
+  const query = variants && variants.length > 0 ? `?variants=${encodeURIComponent(variants.join(","))}` : "";
+  const overlays = reportOverlays(deltaSummary, siteCheckMemos, todoChecks, adoptedTodos, pins);
+  const res = await postWithStoredResult(`${API_BASE}/api/report/bundle${query}`, payload, overlays);
+  if (!res.ok) {
+    const text = await res.text();
+    let detail = `HTTP ${res.status}`;
+    try {
+      const j = JSON.parse(text) as { detail?: string };
+      detail = j.detail ?? detail;
+    } catch {
+      detail = text || detail;
+    }
+    throw new Error(detail);
+  }
   return res.blob();
 }
 
+/** サーバー側の対策効果エンジンの集計（DeltaSummary と同じキー + 時間帯ごとの対策後スコア + 状態の版） */
+export type ServerDeltaSummary = DeltaSummary & {
+  effectiveTimeSlots?: { label: string; risk_score: number }[];
+  revision?: string;
+};
+
+/**
+ * ToDo 1 件のチェック切り替えをサーバーに反映し、更新後の対策効果を受け取る。
+ * revision（直前の応答の値）がサーバーの状態と違えば 409 で失敗するので、呼び出し側で全体を同期し直す。
+ */
+export async function toggleMitigationTask(
+  simulationId: string,
+  taskId: string,
+  checked: boolean,
+  revision: string,
+): Promise<ServerDeltaSummary> {
+  return request(`/api/mitigation/${encodeURIComponent(simulationId)}/toggle`, {
+    method: "POST",
+    body: JSON.stringify({ task_id: taskId, checked, revision }),
+  });
+}
+
+/** チェック状態・採用ToDo をまとめてサーバーに同期する */
+export async function syncMitigationChecks(
+  simulationId: string,
+  todoChecks: Record<string, boolean>,
+  adoptedTodos?: AdoptedTaskRef[] | null,
+): Promise<ServerDeltaSummary> {
+  return request(`/api/mitigation/${encodeURIComponent(simulationId)}`, {
+    method: "PUT",
+    body: JSON.stringify({ todo_checks: todoChecks, adopted_todos: adoptedTodos ?? null }),
+  });
+}
+
 /** PDFフル版と同じ構成のレポートをテキストで取得。アシストのコンテキスト用。 */
 export async function getReportText(
   payload: import("../types").SimulationResponse,
@@ -339,20 +617,8 @@ export async function getReportText(
   adoptedTodos?: AdoptedTodoForPdf[] | null,
   pins?: PinForPdf[] | null,
 ): Promise<string> {
-  const body: Record<string, unknown> = { ...payload };
-  if (!body.simulation_id || typeof body.simulation_id !== "string") {
-    body.simulation_id = `fg-${Date.now()}-${Math.random().toString(36).slice(2, 10)}`;
-  }
-  if (deltaSummary) body.delta_summary = deltaSummary;
-  if (siteCheckMemos && siteCheckMemos.length > 0) body.site_check_memos = siteCheckMemos;
-  if (todoChecks && typeof todoChecks === "object") body.todo_checks = todoChecks;
-  if (adoptedTodos && adoptedTodos.length > 0) body.adopted_todos = adoptedTodos;
-  if (pins && pins.length > 0) body.pins = pins;
-  const res = await fetch(`${API_BASE}/api/report/text`, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(body),
-  });
+  const overlays = reportOverlays(deltaSummary, siteCheckMemos, todoChecks, adoptedTodos, pins);
+  const res = await postWithStoredResult(`${API_BASE}/api/report/text`, payload, overlays);
   if (!res.ok) {
     const text = await res.text();
     let detail = `HTTP ${res.status}`;
@@ -22,6 +22,14 @@ export enum AlertThreshold {
   AGGRESSIVE = "aggressive",
 }
 
+// --- 解析の段階（速さ・深さ）------------------------------------------------
+
+export enum AnalysisTier {
+  FAST = "fast",
+  STANDARD = "standard",
+  DEEP = "deep",
+}
+
 // --- リスク要因分解（根拠表示）-----------------------------------------------
 
 export type RiskFactorType =
@@ -1,6 +1,7 @@
 export {
   UserRole,
   AlertThreshold,
+  AnalysisTier,
   type RiskFactorContribution,
   type RiskFactorBreakdown,
   type RiskTimeSlot,
@@ -101,6 +102,17 @@ export interface RiskItem {
   execution_difficulty?: number;
   /** 根拠・要因分解（どの入力・条件が主因か） */
   evidence?: string;
+  /** バイリンガル生成時の英語の文面 */
+  en?: RiskItemText | null;
+}
+
+export interface RiskItemText {
+  title: string;
+  description: string;
+  location_description: string;
+  evidence: string;
+  mitigation_actions: string[];
+  cascading_risks: string[];
 }
 
 // --- Request / Response ----------------------------------------------------
@@ -120,6 +132,10 @@ export interface SimulationRequest {
   locale: string;
   role?: string;
   alert_threshold?: string;
+  /** 日本語と英語の文面を同時に生成する（英語表示への切り替えを即時にする） */
+  bilingual?: boolean;
+  /** 解析の段階: fast（企画初期の確認）/ standard / deep（最終レビュー） */
+  analysis_tier?: string;
 }
 
 export interface TrafficPrediction {
@@ -153,6 +169,48 @@ export interface SimulationResponse {
   map_routes?: MapRouteSegment[];
   change_history?: ChangeHistoryEntry[];
   mitigation_impacts?: MitigationImpact[];
+  /** ルールベースの暫定結果（AI 分析完了前）なら true */
+  provisional?: boolean;
+  /** 機械翻訳版の場合のロケール（例: "en"）。サーバー側ストアのキー */
+  translation_locale?: string | null;
+  /** 結果を出した解析の段階 */
+  analysis_tier?: string;
+  /** バイリンガル生成時の結果全体の英語の文面 */
+  en?: { event_name: string; event_location: string; summary: string; recommendations: string[] } | null;
+  /** モデル呼び出しの内訳（トークン・所要時間・見積もり費用）。翻訳版は翻訳の呼び出しを含む */
+  usage?: SimulationUsage | null;
+}
+
+export interface ModelUsageTotals {
+  calls: number;
+  failed: number;
+  latency_ms: number;
+  max_latency_ms: number;
+  prompt_tokens: number;
+  cached_tokens: number;
+  thinking_tokens: number;
+  output_tokens: number;
+  cost_usd: number | null;
+}
+
+export interface ModelCallUsage {
+  stage: string;
+  model: string;
+  attempt: number;
+  ok: boolean;
+  latency_ms: number;
+  prompt_tokens: number;
+  cached_tokens: number;
+  thinking_tokens: number;
+  output_tokens: number;
+  cost_usd: number | null;
+}
+
+export interface SimulationUsage {
+  wall_ms: number;
+  total: ModelUsageTotals;
+  by_stage: Record<string, ModelUsageTotals>;
+  calls: ModelCallUsage[];
 }
 
 // --- Mission config (Step 1 form state) ------------------------------------
@@ -174,6 +232,8 @@ export interface MissionConfig {
   additional_notes: string;
   role?: string;
   alert_threshold?: string;
+  bilingual?: boolean;
+  analysis_tier?: string;
 }
 
 // --- UI constants ----------------------------------------------------------
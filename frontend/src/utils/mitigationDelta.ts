@@ -1,10 +1,10 @@
 /**
- * 対策前→対策後の定量差分を算出（ToDo チェック状態に連動）
- * 総合リスクスコア・危険ポイント数・混雑ピーク時間の差分を返す
+ * 対策前→対策後の定量差分の型と、ToDo 解決状況による時間帯スコアの補正
+ * 集計そのものはサーバー（/api/mitigation, hooks/useMitigationSummary）が行う
  */
 
 import type { SimulationResponse } from "../types";
-import type { MitigationImpact, RiskTimeSlot } from "../types/extended";
+import type { RiskTimeSlot } from "../types/extended";
 
 /** 採用ToDo（対策効果で「解決したリスク」を数える用） */
 export type AdoptedTaskRef = { id: string; risk_id?: string };
@@ -26,91 +26,32 @@ export interface DeltaSummary {
 }
 
 /**
- * シミュレーション結果と ToDo チェック状態から「対策前→対策後」の集計差分を計算する。
- * adoptedTasks を渡すと、リスク項目の件数変化（対策後＝未解決のリスク数）を算出する。
+ * 対策前の値だけの DeltaSummary（対策後＝対策前）。
+ * 対策後の集計はサーバーの対策効果エンジン（/api/mitigation）が行い、届くまでの表示と暫定結果に使う。
  */
-export function computeDeltaSummary(
-  data: SimulationResponse,
-  todoChecks?: Record<string, boolean> | null,
-  adoptedTasks?: AdoptedTaskRef[] | null,
-): DeltaSummary {
-  if (!data || typeof data !== "object") {
-    return {
-      riskScoreBefore: 0,
-      riskScoreAfter: 0,
-      riskScoreDelta: 0,
-      dangerCountBefore: 0,
-      dangerCountAfter: 0,
-      dangerCountDelta: 0,
-      riskItemCountBefore: 0,
-      riskItemCountAfter: 0,
-      riskItemCountDelta: 0,
-      peakTimeBeforeLabel: "—",
-      peakTimeAfterLabel: "—",
-      congestionDeltaMinutes: 0,
-      hasAnyChecked: false,
-    };
-  }
-  const riskScoreBefore = data.overall_risk_score ?? 0;
-  const dangerCountBefore = data.danger_points?.length ?? 0;
-  const risks = data.risks ?? [];
-  const riskItemCountBefore = risks.length;
-  const timeSlots = Array.isArray(data.risk_time_series) ? data.risk_time_series : [];
+export function baselineDeltaSummary(data: SimulationResponse | null | undefined): DeltaSummary {
+  const timeSlots = Array.isArray(data?.risk_time_series) ? data.risk_time_series : [];
   const topSlot = timeSlots.length
     ? timeSlots.reduce((a, b) => ((b?.risk_score ?? 0) > (a?.risk_score ?? 0) ? b : a))
     : null;
+  const riskScoreBefore = data?.overall_risk_score ?? 0;
+  const dangerCountBefore = data?.danger_points?.length ?? 0;
+  const riskItemCountBefore = data?.risks?.length ?? 0;
   const peakTimeBeforeLabel = topSlot?.label ?? "—";
-
-  const checkedIds = new Set<string>();
-  if (todoChecks && typeof todoChecks === "object") {
-    for (const [id, checked] of Object.entries(todoChecks)) {
-      if (checked === true) checkedIds.add(id);
-    }
-  }
-
-  const impacts = (data.mitigation_impacts ?? []) as MitigationImpact[];
-  let riskScoreDelta = 0;
-  let dangerCountDelta = 0;
-  let congestionDeltaMinutes = 0;
-
-  for (const m of impacts) {
-    const mid = m.mitigation_id != null ? String(m.mitigation_id) : "";
-    if (!mid || !checkedIds.has(mid)) continue;
-    riskScoreDelta += m.risk_score_delta ?? 0;
-    dangerCountDelta += m.danger_count_delta ?? 0;
-    congestionDeltaMinutes += m.congestion_time_delta_minutes ?? 0;
-  }
-
-  const riskScoreAfter = Math.max(0, Math.min(10, riskScoreBefore + riskScoreDelta));
-  const dangerCountAfter = Math.max(0, dangerCountBefore + dangerCountDelta);
-
-  let riskItemCountAfter = riskItemCountBefore;
-  if (adoptedTasks && adoptedTasks.length > 0) {
-    const resolvedRiskIds = new Set<string>();
-    for (const risk of risks) {
-      const tasksForRisk = adoptedTasks.filter((t) => t.risk_id === risk.id);
-      if (tasksForRisk.length === 0) continue;
-      const allChecked = tasksForRisk.every((t) => checkedIds.has(t.id));
-      if (allChecked) resolvedRiskIds.add(risk.id);
-    }
-    riskItemCountAfter = Math.max(0, riskItemCountBefore - resolvedRiskIds.size);
-  }
-  const riskItemCountDelta = riskItemCountAfter - riskItemCountBefore;
-
   return {
     riskScoreBefore,
-    riskScoreAfter,
-    riskScoreDelta,
+    riskScoreAfter: riskScoreBefore,
+    riskScoreDelta: 0,
     dangerCountBefore,
-    dangerCountAfter,
-    dangerCountDelta,
+    dangerCountAfter: dangerCountBefore,
+    dangerCountDelta: 0,
     riskItemCountBefore,
-    riskItemCountAfter,
-    riskItemCountDelta,
+    riskItemCountAfter: riskItemCountBefore,
+    riskItemCountDelta: 0,
     peakTimeBeforeLabel,
     peakTimeAfterLabel: peakTimeBeforeLabel,
-    congestionDeltaMinutes,
-    hasAnyChecked: checkedIds.size > 0,
+    congestionDeltaMinutes: 0,
+    hasAnyChecked: false,
   };
 }
 